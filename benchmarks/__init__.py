@@ -0,0 +1,7 @@
+"""
+Benchmarks for the Flat Earth Debate Game.
+
+Run a benchmark module from the repository root, for example::
+
+    python -m benchmarks.bench_analyzer
+"""
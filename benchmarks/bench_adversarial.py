@@ -0,0 +1,76 @@
+"""
+CPU and memory spent scoring hostile arguments.
+
+Scores arguments of growing size built to be expensive, comparing the
+original path (lowercase the whole text, then scan it) with the chunked
+classify_text that analyze_argument now uses:
+
+- filler: long text with no keyword at all
+- near-miss: keyword prefixes that make the scanner try and back off
+- stuffing: the top-weighted keyword up front, then megabytes of padding
+- whitespace: runs of mixed whitespace between keywords
+
+The last table shows the worst case at the MAX_REQUEST_BYTES body limit,
+which is the most any single request can cost now that larger bodies are
+refused with a 413 before they are parsed.
+"""
+
+import time
+import tracemalloc
+
+from flat_earth_game import api
+from flat_earth_game.argument_analyzer import ArgumentAnalyzer
+
+SIZES = (1 << 10, 1 << 16, 1 << 20, 1 << 22)
+
+
+def build(kind, size):
+    """Return an adversarial argument of about ``size`` characters."""
+    if kind == "filler":
+        unit = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. "
+    elif kind == "near-miss":
+        unit = "satellit curvatur gravitationa circumnavigat horizo timezon "
+    elif kind == "stuffing":
+        return "The CURVATURE of the Earth. " + "z" * size
+    else:
+        unit = "Ships \t\n\r    DISAPPEAR \n\n\n\n     over     "
+    return (unit * (size // len(unit) + 1))[:size]
+
+
+def measure(score, text, repeat):
+    """Return (seconds per call, peak bytes allocated) for scoring ``text``."""
+    began = time.perf_counter()
+    for _ in range(repeat):
+        score(text)
+    elapsed = (time.perf_counter() - began) / repeat
+    tracemalloc.start()
+    score(text)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    """Print cost per argument for each input kind and size."""
+    index = ArgumentAnalyzer().keyword_index
+    paths = (("lower+scan", lambda text: index.classify(text.lower())),
+             ("chunked", index.classify_text))
+    print(f"{'input':>10} {'size':>8} " + " ".join(f"{name + ' ms':>14} {'peak KB':>9}" for name, _ in paths))
+    for kind in ("filler", "near-miss", "stuffing", "whitespace"):
+        for size in SIZES:
+            text = build(kind, size)
+            repeat = max(1, (1 << 20) // size)
+            cells = []
+            for _, score in paths:
+                elapsed, peak = measure(score, text, repeat)
+                cells.append(f"{elapsed * 1000:>14.3f} {peak / 1024:>9.0f}")
+            print(f"{kind:>10} {size:>8} " + " ".join(cells))
+
+    print(f"\nWorst case per request at the {api.max_request_bytes:,} byte body limit:")
+    for kind in ("filler", "near-miss", "stuffing", "whitespace"):
+        elapsed, peak = measure(index.classify_text, build(kind, api.max_request_bytes), 50)
+        print(f"{kind:>10}: {elapsed * 1000:6.2f} ms, {peak / 1024:.0f} KB peak")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Classification throughput of ArgumentAnalyzer as the keyword table grows.
+
+Compares the compiled keyword index against the original per-keyword
+substring scan for keyword tables of 30 up to 10,000 entries. Tables of up
+to ``SCAN_MAX_KEYWORDS`` keywords, such as the built-in 30-keyword one, are
+checked keyword by keyword in rank order; larger ones use the compiled
+regular expression.
+
+Indexed throughput is not flat as the table grows. On one CPU with Python
+3.11 a run gave, in classifications per second:
+
+    keywords   legacy/s  indexed/s  speedup
+          30    213,268    465,333     2.2x
+         100     78,159    118,586     1.5x
+       1000      6,871     80,084    11.7x
+      10000        687     52,783    76.9x
+
+so the expression costs about 2.2x more at 10,000 keywords than at 100.
+Expect run-to-run noise of 20% or more on a shared machine.
+"""
+
+import random
+import string
+import time
+
+from flat_earth_game.argument_analyzer import ArgumentAnalyzer
+from flat_earth_game.keyword_index import KeywordIndex
+
+TABLE_SIZES = (30, 100, 1000, 10000)
+
+ARGUMENTS = [
+    "Ships disappear bottom-first over the horizon",
+    "NASA has many satellite photos of Earth taken from space",
+    "Different time zones prove Earth is round because the sun lights half of it",
+    "People have sailed around the world since Magellan",
+    "I just think it is obviously round, everyone knows that",
+]
+
+
+def build_table(size, seed=0):
+    """
+    Build a synthetic evidence table with ``size`` keywords in total.
+
+    The real table is kept as the first categories so the sample arguments
+    still match, and random filler keywords are spread over extra categories.
+    """
+    rng = random.Random(seed)
+    table = {name: dict(data) for name, data in ArgumentAnalyzer().evidence_weights.items()}
+    count = sum(len(data["keywords"]) for data in table.values())
+    category = 0
+    while count < size:
+        keywords = []
+        for _ in range(min(50, size - count)):
+            length = rng.randint(5, 12)
+            keywords.append("".join(rng.choice(string.ascii_lowercase) for _ in range(length)))
+        table[f"synthetic_{category}"] = {
+            "keywords": keywords,
+            "weight": rng.randint(1, 30),
+            "description": "Synthetic benchmark category",
+        }
+        count += len(keywords)
+        category += 1
+    return table
+
+
+def legacy_classify(table, text):
+    """The original ``keyword in text`` scan, kept for comparison."""
+    text = text.lower()
+    max_weight = 0
+    best_category = None
+    for category, data in table.items():
+        for keyword in data["keywords"]:
+            if keyword.lower() in text:
+                if data["weight"] > max_weight:
+                    max_weight = data["weight"]
+                    best_category = category
+    return best_category, max_weight
+
+
+def measure(func, texts, min_time=0.2):
+    """Return calls per second of ``func`` over ``texts``."""
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        for text in texts:
+            func(text)
+        calls += len(texts)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return calls / elapsed
+
+
+def main():
+    """Print throughput for each keyword table size."""
+    print(f"{'keywords':>10} {'legacy/s':>12} {'indexed/s':>12} {'speedup':>8}")
+    for size in TABLE_SIZES:
+        table = build_table(size)
+        index = KeywordIndex(table)
+        for text in ARGUMENTS:
+            assert index.classify(text.lower()) == legacy_classify(table, text)
+        legacy = measure(lambda text: legacy_classify(table, text), ARGUMENTS)
+        indexed = measure(lambda text: index.classify(text.lower()), ARGUMENTS)
+        print(f"{size:>10} {legacy:>12.0f} {indexed:>12.0f} {indexed / legacy:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Load test for /token_balance lookups, uncached versus BalanceCache.
+
+THREADS pollers look up balances from a skewed set of ADDRESSES against a
+local mock JSON-RPC node with LATENCY seconds per request, while a block
+with a few Transfer logs is mined every BLOCK_TIME seconds. "rpc" makes a
+balanceOf call per lookup, as /token_balance did before the cache. The
+cached modes keep the cache fresh with an EventFollower on Transfer logs,
+invalidating either per Transfer or every block.
+"""
+
+import random
+import threading
+import time
+
+from flat_earth_game.balance_cache import BalanceCache
+from flat_earth_game.payment_index import EventFollower
+from flat_earth_game.rpc_transport import RPCTransport
+from flat_earth_game.tests.mock_rpc import MockRPCNode
+
+THREADS = 16
+LOOKUPS = 1000
+ADDRESSES = 500
+LATENCY = 0.002
+BLOCK_TIME = 0.5
+TRANSFERS_PER_BLOCK = 5
+TOKEN = "0x00000000000000000000000000000000000000bb"
+TOPIC = "0x" + "cd" * 32
+
+
+def run(node, addresses, lookup):
+    """Run every poller thread and return (seconds, http requests, latencies)."""
+    latencies = []
+    lock = threading.Lock()
+
+    def poll(seed):
+        rng = random.Random(seed)
+        mine = []
+        for _ in range(LOOKUPS):
+            address = addresses[min(int(rng.paretovariate(1.2)) - 1, ADDRESSES - 1)]
+            began = time.perf_counter()
+            lookup(address)
+            mine.append(time.perf_counter() - began)
+        with lock:
+            latencies.extend(mine)
+
+    before = node.http_requests
+    threads = [threading.Thread(target=poll, args=(seed,)) for seed in range(THREADS)]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return time.perf_counter() - began, node.http_requests - before, latencies
+
+
+def main():
+    """Print throughput, latency and RPC usage for each mode."""
+    rng = random.Random(0)
+    addresses = ["0x%040x" % rng.getrandbits(160) for _ in range(ADDRESSES)]
+    balances = {address: rng.randrange(1000) for address in addresses}
+    stopped = threading.Event()
+
+    def transfer_forever(node):
+        while not stopped.wait(BLOCK_TIME):
+            for _ in range(TRANSFERS_PER_BLOCK):
+                sender, receiver = rng.sample(addresses, 2)
+                balances[receiver] += 1
+                node.emit_log(TOKEN, [TOPIC, "0x" + sender[2:].rjust(64, "0"),
+                                      "0x" + receiver[2:].rjust(64, "0")], "0x%064x" % 1)
+            node.mine()
+
+    with MockRPCNode(latency=LATENCY) as node:
+        node.handlers["eth_call"] = lambda tx, block="latest": hex(balances[tx["owner"]])
+        threading.Thread(target=transfer_forever, args=(node,), daemon=True).start()
+        rpc = RPCTransport(node.url, pool_size=THREADS)
+
+        def balance_of(address):
+            return int(rpc.read("eth_call", [{"owner": address}, "latest"]), 16)
+
+        print(f"{THREADS} threads x {LOOKUPS} lookups over {ADDRESSES} addresses, "
+              f"{LATENCY * 1000:.0f} ms RPC latency\n")
+        print(f"{'mode':>10} {'lookups/s':>10} {'p50 us':>8} {'p99 us':>8} "
+              f"{'http reqs':>10} {'hit rate':>9}")
+
+        elapsed, requests, latencies = run(node, addresses, balance_of)
+        print(f"{'rpc':>10} {THREADS * LOOKUPS / elapsed:>10.0f} "
+              f"{latencies[len(latencies) // 2] * 1e6:>8.0f} "
+              f"{latencies[int(len(latencies) * 0.99)] * 1e6:>8.0f} {requests:>10} {'-':>9}")
+
+        for per_block in (False, True):
+            cache = BalanceCache(balance_of, per_block=per_block)
+            follower = EventFollower(rpc, TOKEN, TOPIC, on_log=cache.on_transfer,
+                                     on_synced=cache.advance, start_block=node.block_number,
+                                     poll_interval=BLOCK_TIME / 2)
+            follower.poll_once()
+            follower.start()
+            elapsed, requests, latencies = run(node, addresses, cache.get)
+            follower.stop()
+            mode = "per-block" if per_block else "transfer"
+            print(f"{mode:>10} {THREADS * LOOKUPS / elapsed:>10.0f} "
+                  f"{latencies[len(latencies) // 2] * 1e6:>8.0f} "
+                  f"{latencies[int(len(latencies) * 0.99)] * 1e6:>8.0f} {requests:>10} "
+                  f"{cache.snapshot()['hit_rate']:>9.1%}")
+        stopped.set()
+
+
+if __name__ == "__main__":
+    main()
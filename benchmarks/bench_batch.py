@@ -0,0 +1,59 @@
+"""
+Throughput of batch argument scoring compared with the scalar path.
+"""
+
+import random
+import time
+
+from flat_earth_game.argument_analyzer import ArgumentAnalyzer
+
+CORPUS_SIZE = 200000
+
+FILLER = ("the", "earth", "is", "round", "because", "we", "can", "see", "that",
+          "it", "looks", "obvious", "when", "you", "think", "about")
+
+
+def build_corpus(analyzer, size=CORPUS_SIZE, seed=0):
+    """Build synthetic player arguments, most of them containing evidence."""
+    rng = random.Random(seed)
+    keywords = [keyword for data in analyzer.evidence_weights.values()
+                for keyword in data["keywords"]]
+    corpus = []
+    for _ in range(size):
+        words = [rng.choice(FILLER) for _ in range(rng.randint(4, 20))]
+        for _ in range(rng.randint(0, 2)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(keywords))
+        corpus.append(" ".join(words))
+    return corpus
+
+
+def main():
+    """Print scalar and batch throughput over the same corpus."""
+    analyzer = ArgumentAnalyzer()
+    corpus = build_corpus(analyzer)
+
+    start = time.perf_counter()
+    scalar = [analyzer.analyze_argument(text) for text in corpus]
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    category_ids = []
+    weights = []
+    for ids, batch_weights in analyzer.analyze_stream(corpus):
+        category_ids.extend(ids)
+        weights.extend(batch_weights)
+    batch_time = time.perf_counter() - start
+
+    categories = analyzer.categories
+    for (category, weight), category_id, batch_weight in zip(scalar, category_ids, weights):
+        assert category == (categories[category_id] if category_id >= 0 else None)
+        assert weight == batch_weight
+
+    print(f"arguments: {len(corpus)}")
+    print(f"scalar:    {len(corpus) / scalar_time:>12.0f} arguments/s")
+    print(f"batch:     {len(corpus) / batch_time:>12.0f} arguments/s")
+    print(f"speedup:   {scalar_time / batch_time:>12.1f}x")
+
+
+if __name__ == "__main__":
+    main()
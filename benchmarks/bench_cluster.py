@@ -0,0 +1,133 @@
+"""
+Scaling of the multi-process server from one worker to the CPU count.
+
+Starts a Cluster with 1, 2, 4, ... workers on one port, each worker's chain
+client replaced by bench_serving's StubQuai, and drives it with CONNECTIONS
+keep-alive clients that each play GAMES games. Since connections land on
+any worker, most /submit_argument calls are forwarded to the session's
+owner. Then reports, for a cluster holding SESSIONS sessions, how many move
+and how long it takes when a worker is added and removed. Run with an
+optional worker limit::
+
+    python -m benchmarks.bench_cluster 8
+"""
+
+import asyncio
+import itertools
+import os
+import sys
+import time
+
+from benchmarks.bench_serving import ARGUMENTS, Client, StubQuai, free_port
+from flat_earth_game.cluster import Cluster
+from flat_earth_game.tests.mock_rpc import MockRPCNode
+
+CONNECTIONS = 256
+GAMES = 4
+RPC_LATENCY = 0.002
+SESSIONS = 20000
+
+
+def stub_chain(rpc_url):
+    """Return a worker setup that installs StubQuai with its own session ids."""
+    def setup():
+        from flat_earth_game import api
+        api._quai = StubQuai(rpc_url)
+        api._quai._session_ids = itertools.count(os.getpid() << 32)
+    return setup
+
+
+async def play(port, wallet, games, latencies, errors):
+    """Play ``games`` games over one connection, recording request latencies."""
+    client = Client(port)
+    for _ in range(games):
+        requests = [("/start_game", {"wallet_address": wallet})]
+        for argument in ARGUMENTS:
+            requests.append(("/submit_argument", {"argument": argument, "wallet_address": wallet}))
+        session_id = None
+        for path, body in requests:
+            if path == "/submit_argument":
+                if session_id is None:
+                    break
+                body["session_id"] = session_id
+            began = time.perf_counter()
+            try:
+                status, payload = await client.request("POST", path, body)
+            except (OSError, ValueError, asyncio.IncompleteReadError):
+                client.close()
+                errors.append(path)
+                continue
+            latencies.append(time.perf_counter() - began)
+            if status >= 400:
+                errors.append(path)
+            elif path == "/start_game":
+                session_id = payload.get("session_id")
+    client.close()
+
+
+def load(port, connections, games):
+    """Return (requests, seconds, sorted latencies, errors) for one load run."""
+    latencies, errors = [], []
+
+    async def run_all():
+        await asyncio.gather(*(play(port, "0x%040x" % i, games, latencies, errors)
+                               for i in range(connections)))
+    began = time.perf_counter()
+    asyncio.run(run_all())
+    elapsed = time.perf_counter() - began
+    latencies.sort()
+    return len(latencies), elapsed, latencies, errors
+
+
+def rebalancing(rpc_url, workers):
+    """Print how many sessions move, and how fast, when a worker joins and leaves."""
+    port = free_port()
+    cluster = Cluster(workers, port=port, setup=stub_chain(rpc_url))
+    cluster.start()
+    try:
+        load(port, 100, SESSIONS // 100)
+        statuses = cluster.status()
+        before = sum(status["sessions"] for status in statuses)
+        received = sum(status["migrated_in"] for status in statuses)
+        began = time.perf_counter()
+        cluster.add_worker()
+        added = time.perf_counter() - began
+        moved = sum(status["migrated_in"] for status in cluster.status()) - received
+        began = time.perf_counter()
+        cluster.remove_worker()
+        removed = time.perf_counter() - began
+        after = sum(status["sessions"] for status in cluster.status())
+        print(f"\n{before:,} sessions on {workers} workers: adding a worker moved {moved:,} "
+              f"({moved / before:.0%}) in {added:.2f} s; removing it took {removed:.2f} s; "
+              f"{after:,} sessions afterwards")
+    finally:
+        cluster.stop()
+
+
+def main(max_workers=None):
+    """Print throughput at each cluster size, then rebalancing figures."""
+    max_workers = max_workers or os.cpu_count()
+    sizes = sorted({1 << i for i in range(max_workers.bit_length())} | {max_workers})
+    with MockRPCNode(latency=RPC_LATENCY) as node:
+        print(f"{CONNECTIONS} connections x {GAMES} games, {RPC_LATENCY * 1000:.0f} ms RPC latency, "
+              f"{os.cpu_count()} CPUs\n")
+        print(f"{'workers':>7} {'requests':>9} {'req/s':>8} {'speedup':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        single = None
+        for workers in sizes:
+            port = free_port()
+            cluster = Cluster(workers, port=port, setup=stub_chain(node.url))
+            cluster.start()
+            try:
+                requests, elapsed, latencies, errors = load(port, CONNECTIONS, GAMES)
+            finally:
+                cluster.stop()
+            rate = requests / elapsed
+            single = single or rate
+            print(f"{workers:>7} {requests:>9} {rate:>8.0f} {rate / single:>7.2f}x "
+                  f"{latencies[len(latencies) // 2] * 1000:>8.1f} "
+                  f"{latencies[int(len(latencies) * 0.99)] * 1000:>8.1f} {len(errors):>7}")
+        rebalancing(node.url, max(2, sizes[-1]))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
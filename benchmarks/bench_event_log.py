@@ -0,0 +1,105 @@
+"""
+Write throughput and recovery time of the session event log.
+
+Appends EVENTS events (a session start, then turns, for EVENTS / 10
+sessions) to a log in a temporary directory and reports:
+
+- append rate without waiting for disk, fsyncing each group commit
+- append rate when many threads wait for durability, against one fsync
+  per event
+- time to recover every session from the log alone and from a snapshot
+  plus the log tail
+
+Pass the number of events as the first argument (default 1,000,000).
+"""
+
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from flat_earth_game.event_log import EventLog
+
+EVENTS = 1000000
+TURNS_PER_SESSION = 9
+SYNC_THREADS = 64
+SYNC_EVENTS = 50000
+SINGLE_FSYNC_EVENTS = 2000
+
+
+def fill(log, events):
+    """Append ``events`` events from this thread; return seconds taken until durable."""
+    began = time.perf_counter()
+    session = 0
+    written = 0
+    while written < events:
+        key = str(session)
+        log.log_start(key, session)
+        written += 1
+        for turn in range(min(TURNS_PER_SESSION, events - written)):
+            log.log_turn(key, turn % 5, 20)
+            written += 1
+        session += 1
+    log.flush()
+    return time.perf_counter() - began
+
+
+def concurrent_fill(log, events, threads):
+    """Append ``events`` turns from ``threads`` threads; return seconds taken."""
+    per_thread = events // threads
+
+    def work(worker):
+        for turn in range(per_thread):
+            log.log_turn(f"{worker}", turn % 5, 20)
+    workers = [threading.Thread(target=work, args=(worker,)) for worker in range(threads)]
+    began = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - began
+
+
+def recovery(events, snapshot_every):
+    """Return (seconds to recover, sessions, seconds to write) for a filled log."""
+    directory = tempfile.mkdtemp()
+    try:
+        log = EventLog(directory, sync=False, snapshot_every=snapshot_every)
+        written = fill(log, events)
+        log.close()
+        log = EventLog(directory, sync=False)
+        began = time.perf_counter()
+        sessions = log.recover()
+        elapsed = time.perf_counter() - began
+        log.close()
+        return elapsed, len(sessions), written
+    finally:
+        shutil.rmtree(directory)
+
+
+def main():
+    """Print write and recovery figures."""
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else EVENTS
+
+    elapsed, sessions, written = recovery(events, 0)
+    print(f"async append, fsync per group: {events / written:>10,.0f} events/s ({events:,} events)")
+    print(f"recover from log only:         {elapsed:>10.2f} s ({sessions:,} sessions)")
+    elapsed, sessions, _ = recovery(events, events // 10)
+    print(f"recover from snapshot + tail:  {elapsed:>10.2f} s ({sessions:,} sessions)")
+
+    for label, threads, count in (("sync, 1 thread (fsync per event)", 1, SINGLE_FSYNC_EVENTS),
+                                  (f"sync, {SYNC_THREADS} threads (group commit)", SYNC_THREADS, SYNC_EVENTS)):
+        directory = tempfile.mkdtemp()
+        try:
+            log = EventLog(directory)
+            seconds = concurrent_fill(log, count, threads)
+            log.close()
+            print(f"{label + ':':<31}{count / seconds:>10,.0f} events/s "
+                  f"({count / log.commits:.1f} events per fsync)")
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
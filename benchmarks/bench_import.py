@@ -0,0 +1,88 @@
+"""
+Import time and cold start of the package, the game and the web interface.
+
+Each measurement runs in a fresh interpreter, RUNS times, and reports the
+fastest run. "import ms" is the module's cumulative time from
+``python -X importtime``, "modules" the number of modules it pulled in, and
+"cold ms" the wall time from interpreter start to the first answered
+argument (for web_interface, the first /submit_argument response through
+the Flask test client).
+"""
+
+import subprocess
+import sys
+
+RUNS = 5
+
+MODULES = {
+    "flat_earth_game": "import flat_earth_game",
+    "game": "from flat_earth_game.game import FlatEarthDebateGame",
+    "web_interface": "from flat_earth_game import web_interface"
+}
+
+COLD_STARTS = {
+    "flat_earth_game": "import flat_earth_game",
+    "game": ("from flat_earth_game.game import FlatEarthDebateGame\n"
+             "FlatEarthDebateGame().process_argument('satellite photos show a sphere')"),
+    "web_interface": ("from flat_earth_game.web_interface import create_app, sessions\n"
+                      "sessions.create(1)\n"
+                      "create_app().test_client().post('/submit_argument', json={\n"
+                      "    'argument': 'satellite photos show a sphere',\n"
+                      "    'session_id': 1, 'wallet_address': '0xabc'})")
+}
+
+TIMER = ("import time\n"
+         "began = time.perf_counter()\n"
+         "{code}\n"
+         "import sys\n"
+         "print(time.perf_counter() - began, len(sys.modules))")
+
+
+def run(code, *flags):
+    """Run ``code`` in a fresh interpreter and return the completed process."""
+    return subprocess.run([sys.executable, *flags, "-c", code],
+                          capture_output=True, text=True)
+
+
+def import_time(module, code):
+    """Return (cumulative import ms, modules loaded) for one import, or None."""
+    best = None
+    for _ in range(RUNS):
+        result = run(TIMER.format(code=code), "-X", "importtime")
+        if result.returncode:
+            return None
+        top = "flat_earth_game" if module == "flat_earth_game" else "flat_earth_game." + module
+        cumulative = [int(line.split("|")[1]) for line in result.stderr.splitlines()
+                      if line.split("|")[-1].strip() == top]
+        modules = int(result.stdout.split()[1])
+        if cumulative and (best is None or cumulative[0] < best[0]):
+            best = (cumulative[0], modules)
+    return best and (best[0] / 1000, best[1])
+
+
+def cold_start(code):
+    """Return the fastest wall time in ms for ``code`` in a fresh interpreter."""
+    best = None
+    for _ in range(RUNS):
+        result = run(TIMER.format(code=code))
+        if result.returncode:
+            return None, result.stderr.strip().splitlines()[-1]
+        elapsed = float(result.stdout.split()[0]) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, None
+
+
+def main():
+    """Print import and cold start times for each entry point."""
+    print(f"{'module':>16} {'import ms':>10} {'modules':>8} {'cold ms':>8}")
+    for module, code in MODULES.items():
+        timing = import_time(module, code)
+        cold, error = cold_start(COLD_STARTS[module])
+        if timing is None or cold is None:
+            print(f"{module:>16} {'unavailable':>10}  {error or ''}")
+            continue
+        print(f"{module:>16} {timing[0]:>10.1f} {timing[1]:>8} {cold:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Reload latency and worker memory of compiled knowledge base files.
+
+Builds a large synthetic knowledge base (10,000 keywords and a few hundred
+rebuttal lines per category), then reports:
+
+- time to build the tables from source versus mapping the compiled file
+- request latency on a busy thread while the file is reloaded repeatedly
+- memory of WORKERS processes that each load the tables, from source
+  or mapped; PSS splits shared pages between the processes that map them,
+  so it shows what the workers cost together (Linux only)
+"""
+
+import json
+import multiprocessing
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+from benchmarks.bench_analyzer import build_table
+from flat_earth_game.argument_analyzer import ArgumentAnalyzer, default_analyzer
+from flat_earth_game.knowledge_base import KnowledgeBase, install_knowledge_base
+from flat_earth_game.knowledge_file import KnowledgeBaseReloader, compile_knowledge_base, load_knowledge_base
+
+KEYWORDS = 10000
+REBUTTALS_PER_CATEGORY = 300
+WORKERS = 32
+RELOADS = 20
+
+ARGUMENT = "Ships disappear bottom-first over the horizon as they sail away from port"
+
+
+def build_tables():
+    """Return a large (evidence_weights, rebuttals) pair."""
+    evidence_weights = build_table(KEYWORDS)
+    rebuttals = {
+        category: [f"Rebuttal {line} to {category}: that is only what they want you to believe."
+                   for line in range(REBUTTALS_PER_CATEGORY)]
+        for category in evidence_weights
+    }
+    return evidence_weights, rebuttals
+
+
+def memory():
+    """Return (rss, pss) of this process in kilobytes."""
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                values[parts[0]] = int(parts[1])
+    return values["Rss:"], values["Pss:"]
+
+
+def worker(mode, source, path, barrier, results):
+    """Load the tables once, use every rebuttal line, and report memory growth."""
+    before = memory()
+    began = time.perf_counter()
+    if mode == "source":
+        with open(source) as f:
+            tables = json.load(f)
+        knowledge_base = KnowledgeBase(tables["evidence_weights"], tables["rebuttals"])
+    else:
+        knowledge_base = load_knowledge_base(path)
+    analyzer = ArgumentAnalyzer(knowledge_base)
+    load_seconds = time.perf_counter() - began
+    for category in knowledge_base.categories:
+        for line in knowledge_base.rebuttals[category]:
+            len(line)
+    analyzer.analyze_argument(ARGUMENT)
+    barrier.wait()  # every worker holds its tables while memory is read
+    after = memory()
+    results.put((after[0] - before[0], after[1] - before[1], load_seconds))
+    barrier.wait()
+
+
+def worker_memory(mode, source, path):
+    """Return total (rss, pss) growth in megabytes across WORKERS workers, and mean load ms."""
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(WORKERS)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(mode, source, path, barrier, results))
+                 for _ in range(WORKERS)]
+    for process in processes:
+        process.start()
+    totals = [0, 0, 0.0]
+    for _ in processes:
+        for i, value in enumerate(results.get()):
+            totals[i] += value
+    for process in processes:
+        process.join()
+    return totals[0] / 1024, totals[1] / 1024, totals[2] / WORKERS * 1000
+
+
+def reload_latency(path):
+    """Return (load ms per reload, p50 us, p99 us, max us) while reloading on another thread."""
+    reloader = KnowledgeBaseReloader(path, interval=0)
+    latencies = []
+    stopped = threading.Event()
+
+    def serve():
+        while not stopped.is_set():
+            began = time.perf_counter()
+            default_analyzer().analyze_argument(ARGUMENT)
+            latencies.append(time.perf_counter() - began)
+    thread = threading.Thread(target=serve)
+    thread.start()
+    load_times = []
+    for version in range(RELOADS):
+        os.utime(path, ns=(version, version))  # a new signature, as a publish would give
+        reloader.check()
+        load_times.append(reloader.last_reload_seconds)
+    stopped.set()
+    thread.join()
+    latencies.sort()
+    return (statistics.mean(load_times) * 1000, latencies[len(latencies) // 2] * 1e6,
+            latencies[int(len(latencies) * 0.99)] * 1e6, latencies[-1] * 1e6)
+
+
+def main():
+    """Print load, reload and memory figures."""
+    directory = tempfile.mkdtemp()
+    try:
+        evidence_weights, rebuttals = build_tables()
+        source = os.path.join(directory, "tables.json")
+        path = os.path.join(directory, "knowledge.fekb")
+        with open(source, "w") as f:
+            json.dump({"evidence_weights": evidence_weights, "rebuttals": rebuttals}, f)
+        compile_knowledge_base(path, evidence_weights, rebuttals)
+        print(f"file size: {os.path.getsize(path) / 1e6:.1f} MB")
+
+        began = time.perf_counter()
+        KnowledgeBase(evidence_weights, rebuttals)
+        print(f"build from tables: {(time.perf_counter() - began) * 1000:8.1f} ms")
+        began = time.perf_counter()
+        load_knowledge_base(path)
+        print(f"map compiled file: {(time.perf_counter() - began) * 1000:8.1f} ms (keyword pattern already compiled)")
+
+        install_knowledge_base(load_knowledge_base(path))
+        load_ms, p50, p99, worst = reload_latency(path)
+        print(f"{RELOADS} hot reloads: {load_ms:.1f} ms each off the request path; "
+              f"requests meanwhile p50 {p50:.0f} us, p99 {p99:.0f} us, max {worst:.0f} us")
+
+        if os.path.exists("/proc/self/smaps_rollup"):
+            for mode in ("source", "mapped"):
+                rss, pss, load_ms = worker_memory(mode, source, path)
+                print(f"{WORKERS} workers, {mode:>6}: +{rss:7.1f} MB RSS, +{pss:7.1f} MB PSS in total, "
+                      f"{load_ms:.0f} ms to load in a fresh worker")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
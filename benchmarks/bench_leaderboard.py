@@ -0,0 +1,73 @@
+"""
+Cost of leaderboard queries and updates at 10M players.
+
+Fills the score board with PLAYERS won games, one ``record_game`` call each,
+then times, per operation:
+
+- rank: a random player's position on the board
+- top 100: the first page of the board
+- middle page: a page of 100 from the middle of the board
+- update: a new best game for a random player, which moves its entry
+
+and the peak resident memory. The last line is what a ranking costs without
+an index: sorting every player's score once, which is the least a query
+would pay when computed from game records or balances on demand.
+
+    python -m benchmarks.bench_leaderboard [players]
+"""
+
+import random
+import resource
+import sys
+import time
+
+from flat_earth_game.leaderboard import Leaderboards
+
+PLAYERS = 10_000_000
+QUERIES = 100_000
+
+
+def address(n):
+    return "0x%040x" % n
+
+
+def timed(operation, count):
+    """Return microseconds per call of ``operation(i)`` over ``count`` calls."""
+    began = time.perf_counter()
+    for i in range(count):
+        operation(i)
+    return (time.perf_counter() - began) / count * 1e6
+
+
+def main():
+    """Print build rate, per-query latency and memory for a full board."""
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else PLAYERS
+    rng = random.Random(1)
+    scores = [rng.randrange(100, 2000) for _ in range(players)]
+    attempts = [rng.randrange(1, 40) for _ in range(players)]
+    boards = Leaderboards()
+    board = boards.scores
+
+    began = time.perf_counter()
+    for n in range(players):
+        boards.record_game(address(n), scores[n], attempts[n])
+    built = time.perf_counter() - began
+    print(f"{players:,} players: built in {built:.1f} s ({players / built:,.0f} games/s), "
+          f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:,.0f} MB\n")
+
+    probes = [address(rng.randrange(players)) for _ in range(QUERIES)]
+    middle = players // 2
+    print(f"{'operation':>14} {'us/op':>10}")
+    print(f"{'rank':>14} {timed(lambda i: board.rank(probes[i]), QUERIES):>10.2f}")
+    print(f"{'top 100':>14} {timed(lambda i: boards.top('score', 100), QUERIES // 10):>10.2f}")
+    print(f"{'middle page':>14} {timed(lambda i: boards.top('score', 100, middle), QUERIES // 10):>10.2f}")
+    print(f"{'update':>14} "
+          f"{timed(lambda i: boards.record_game(probes[i], 2000 + i, 1), QUERIES):>10.2f}")
+
+    began = time.perf_counter()
+    sorted(scores, reverse=True)
+    print(f"\nSorting every score once instead: {(time.perf_counter() - began) * 1e3:,.0f} ms per ranking")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Per-game memory footprint with private versus shared analyzer tables.
+
+"Private" gives every game its own ArgumentAnalyzer over its own copy of the
+evidence and rebuttal tables, which is how games were built before the
+knowledge base was shared. "Shared" is the default FlatEarthDebateGame().
+"Pool" holds the same number of game states in a GameStatePool.
+"""
+
+import gc
+import time
+import tracemalloc
+
+from flat_earth_game.argument_analyzer import ArgumentAnalyzer
+from flat_earth_game.game import FlatEarthDebateGame
+from flat_earth_game.game_state import GameStatePool
+from flat_earth_game.knowledge_base import KnowledgeBase
+
+GAMES = 10000
+
+
+def private_game():
+    """Build a game that owns a private copy of the analyzer tables."""
+    return FlatEarthDebateGame(analyzer=ArgumentAnalyzer(KnowledgeBase()))
+
+
+def footprint(factory, count=GAMES):
+    """Return (bytes per game, microseconds per game) for ``factory``."""
+    FlatEarthDebateGame()  # build the shared tables outside the measurement
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    games = [factory() for _ in range(count)]
+    elapsed = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del games
+    return memory / count, elapsed / count * 1e6
+
+
+def pooled_footprint(count=GAMES):
+    """Return (bytes per game, microseconds per game) for a GameStatePool."""
+    FlatEarthDebateGame()
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    pool = GameStatePool(capacity=count)
+    for _ in range(count):
+        pool.allocate()
+    elapsed = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del pool
+    return memory / count, elapsed / count * 1e6
+
+
+def main():
+    """Print memory and construction time per game for each layout."""
+    print(f"{'layout':>8} {'bytes/game':>12} {'us/game':>10}")
+    for name, factory in (("private", private_game), ("shared", FlatEarthDebateGame)):
+        memory, elapsed = footprint(factory)
+        print(f"{name:>8} {memory:>12.0f} {elapsed:>10.1f}")
+    memory, elapsed = pooled_footprint()
+    print(f"{'pool':>8} {memory:>12.0f} {elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Overhead of timing spans, disabled and enabled.
+
+Times a trivial function, a span block and a full
+FlatEarthDebateGame.process_argument call bare, instrumented with spans
+off, and instrumented with spans on, and reports nanoseconds per call.
+"""
+
+import timeit
+
+from flat_earth_game import metrics
+from flat_earth_game.game import FlatEarthDebateGame
+
+CALLS = 1000000
+GAME_CALLS = 100000
+
+
+def noop(x):
+    return x
+
+
+timed_noop = metrics.timed("bench.noop")(noop)
+
+
+def span_block():
+    with metrics.span("bench.block"):
+        pass
+
+
+def per_call(func, calls):
+    """Return the best of five runs in nanoseconds per call."""
+    return min(timeit.repeat(func, number=calls, repeat=5)) / calls * 1e9
+
+
+def main():
+    """Print per-call cost for each case with spans off and on."""
+    game = FlatEarthDebateGame()
+    # Calling the undecorated method measures process_argument without its span
+    bare_process = FlatEarthDebateGame.process_argument.__wrapped__
+    argument = "Ships disappear over the horizon"
+    cases = [
+        ("function", lambda: noop(1), lambda: timed_noop(1), CALLS),
+        ("span block", lambda: None, span_block, CALLS),
+        ("process_argument", lambda: bare_process(game, argument),
+         lambda: game.process_argument(argument), GAME_CALLS)
+    ]
+    print(f"{'case':>17} {'bare ns':>9} {'off ns':>9} {'on ns':>9} {'off +ns':>8} {'on +ns':>8}")
+    for name, bare, instrumented, calls in cases:
+        metrics.disable()
+        bare_ns = per_call(bare, calls)
+        off_ns = per_call(instrumented, calls)
+        metrics.enable()
+        on_ns = per_call(instrumented, calls)
+        metrics.disable()
+        print(f"{name:>17} {bare_ns:>9.0f} {off_ns:>9.0f} {on_ns:>9.0f} "
+              f"{off_ns - bare_ns:>8.0f} {on_ns - bare_ns:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Throughput of concurrent owner payouts, node-read nonces versus NonceManager.
+
+Each mode sends PAYOUTS transactions from one owner account with WORKERS
+threads against a local mock node that orders transactions by nonce, adds
+LATENCY seconds to every HTTP request and mines a block every BLOCK_TIME
+seconds:
+
+- serialized: read the pending nonce and send under one lock, which is the
+  only way to stay collision-free when the node picks the nonce
+- racing: read the pending nonce and send without a lock, retrying each
+  collision the node rejects
+- managed: NonceManager hands out nonces locally, one RPC call per payout
+
+"sent/s" counts accepted payouts per second of sending and "mined s" is the
+time until the last one is in a block. Every mode runs in one process: a
+NonceManager must be the only sender for its account, so the managed
+numbers do not carry over to several processes sharing an owner.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flat_earth_game.nonce_manager import NonceManager
+from flat_earth_game.rpc_transport import RPCError, RPCTransport
+from flat_earth_game.tests.mock_rpc import MockRPCNode
+
+PAYOUTS = 1000
+WORKERS = 32
+LATENCY = 0.005
+BLOCK_TIME = 0.25
+OWNER = "0x00000000000000000000000000000000000000aa"
+
+
+def payout(rpc, fields):
+    """Send one reward transaction with the given sender fields."""
+    return rpc.call("eth_sendTransaction", [dict(fields, to="0xbb", value="0x1")])
+
+
+def read_nonce(rpc):
+    return int(rpc.call("eth_getTransactionCount", [OWNER, "pending"]), 16)
+
+
+def run_serialized(rpc):
+    lock = threading.Lock()
+
+    def send(_):
+        with lock:
+            return payout(rpc, {"from": OWNER, "nonce": read_nonce(rpc)}), 0
+    return send
+
+
+def run_racing(rpc):
+    def send(_):
+        collisions = 0
+        while True:
+            try:
+                return payout(rpc, {"from": OWNER, "nonce": read_nonce(rpc)}), collisions
+            except RPCError:
+                collisions += 1
+    return send
+
+
+def run_managed(rpc):
+    nonces = NonceManager(rpc.call, OWNER)
+    return lambda _: (nonces.send(lambda fields: payout(rpc, fields)), 0)
+
+
+def main():
+    """Print send throughput, collisions and time to mine for each mode."""
+    print(f"{PAYOUTS} payouts, {WORKERS} workers, {LATENCY * 1e3:.0f} ms RPC latency, "
+          f"{BLOCK_TIME}s blocks\n")
+    print(f"{'mode':>10} {'sent/s':>10} {'mined s':>10} {'collisions':>11} {'http reqs':>10}")
+    for name, runner in (("serialized", run_serialized), ("racing", run_racing),
+                         ("managed", run_managed)):
+        with MockRPCNode(block_time=BLOCK_TIME, latency=LATENCY) as node:
+            rpc = RPCTransport(node.url, pool_size=WORKERS)
+            send = runner(rpc)
+            began = time.perf_counter()
+            with ThreadPoolExecutor(WORKERS) as workers:
+                results = list(workers.map(send, range(PAYOUTS)))
+            sent = time.perf_counter() - began
+            last = results[-1][0]
+            while last not in node.receipts or node.transaction_count(OWNER) != hex(PAYOUTS):
+                time.sleep(0.01)
+            mined = time.perf_counter() - began
+            collisions = sum(count for _, count in results)
+            print(f"{name:>10} {PAYOUTS / sent:>10.1f} {mined:>10.2f} {collisions:>11} "
+                  f"{node.http_requests:>10}")
+            rpc.close()
+
+
+if __name__ == "__main__":
+    main()
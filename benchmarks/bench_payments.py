@@ -0,0 +1,67 @@
+"""
+Payment verification latency and RPC usage, per-request RPC versus index.
+
+A local mock JSON-RPC node holds PLAYERS paid games as GameStarted logs and
+answers checkPayment-style eth_call requests. "rpc" makes one call per
+verification, as verify_payment did before the index. "index" syncs a
+PaymentIndex from the logs once and then answers locally.
+"""
+
+import random
+import time
+
+from flat_earth_game.payment_index import EventFollower, PaymentIndex, decode_game_started
+from flat_earth_game.rpc_transport import RPCTransport
+from flat_earth_game.tests.mock_rpc import MockRPCNode
+
+PLAYERS = 10000
+VERIFICATIONS = 2000
+CONTRACT = "0x00000000000000000000000000000000000000aa"
+TOPIC = "0x" + "ab" * 32
+
+
+def main():
+    """Print verification latency and RPC usage for both strategies."""
+    rng = random.Random(0)
+    players = ["0x%040x" % rng.getrandbits(160) for _ in range(PLAYERS)]
+    paid = set(players)
+    queries = [rng.choice(players) if rng.random() < 0.8 else "0x%040x" % rng.getrandbits(160)
+               for _ in range(VERIFICATIONS)]
+
+    with MockRPCNode() as node:
+        node.handlers["eth_call"] = lambda tx, block="latest": tx["player"] in paid
+        for session_id, player in enumerate(players):
+            node.emit_log(CONTRACT, [TOPIC], "0x" + player[2:].rjust(64, "0") + "%064x" % session_id)
+        node.mine()
+        rpc = RPCTransport(node.url)
+
+        def check_payment(player):
+            return rpc([("eth_call", [{"player": player}, "latest"])])[0]
+
+        print(f"{PLAYERS} paid players, {VERIFICATIONS} verifications\n")
+        print(f"{'mode':>6} {'us/verify':>10} {'http reqs':>10} {'setup s':>8}")
+
+        before = node.http_requests
+        began = time.perf_counter()
+        results = [check_payment(player) for player in queries]
+        elapsed = time.perf_counter() - began
+        print(f"{'rpc':>6} {elapsed / VERIFICATIONS * 1e6:>10.1f} "
+              f"{node.http_requests - before:>10} {0:>8.2f}")
+
+        before = node.http_requests
+        began = time.perf_counter()
+        index = PaymentIndex(check_payment)
+        EventFollower(rpc, CONTRACT, TOPIC,
+                      on_log=lambda log: index.record(decode_game_started(log)[0]),
+                      on_synced=index.mark_synced).poll_once()
+        setup = time.perf_counter() - began
+        began = time.perf_counter()
+        indexed = [index.verify(player) for player in queries]
+        elapsed = time.perf_counter() - began
+        assert indexed == results
+        print(f"{'index':>6} {elapsed / VERIFICATIONS * 1e6:>10.1f} "
+              f"{node.http_requests - before:>10} {setup:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
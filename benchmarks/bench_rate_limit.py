@@ -0,0 +1,90 @@
+"""
+Overhead of the request rate limiter and the idempotency cache.
+
+Replays REQUESTS requests spread over WALLETS wallets (a few of them bots
+sending far more than their share) at 50,000 requests per second of
+simulated time, and reports the cost of each check on the request thread:
+
+- api.throttle, which takes a token from a wallet and a session bucket
+- RateLimiter.acquire on its own
+- IdempotencyCache.run for a replayed response
+
+Pass the number of requests as the first argument (default 2,000,000).
+"""
+
+import random
+import sys
+import time
+
+from flat_earth_game import api
+from flat_earth_game.rate_limit import IdempotencyCache, RateLimiter
+
+REQUESTS = 2000000
+WALLETS = 200000
+BOTS = 100
+RPS = 50000
+
+
+class SimulatedClock:
+    """Clock that advances one request interval per reading."""
+
+    def __init__(self, interval):
+        self.now = 0.0
+        self.interval = interval
+
+    def __call__(self):
+        self.now += self.interval
+        return self.now
+
+
+def traffic(count):
+    """Return (wallet, session) pairs; half the requests come from BOTS wallets."""
+    rng = random.Random(0)
+    requests = []
+    for _ in range(count):
+        wallet = rng.randrange(BOTS) if rng.random() < 0.5 else rng.randrange(WALLETS)
+        requests.append(("0x%040x" % wallet, str(wallet * 3)))
+    return requests
+
+
+def main():
+    """Print per-request costs."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else REQUESTS
+    requests = traffic(count)
+
+    # Two bucket reads per request
+    limiter = RateLimiter(rate=5, burst=20, slots=1 << 20, clock=SimulatedClock(1 / (2 * RPS)))
+    api.rate_limiter = limiter
+    throttle = api.throttle
+    limited = 0
+    began = time.perf_counter()
+    for wallet, session in requests:
+        if throttle('wallet:' + wallet, 'session:' + session) is not None:
+            limited += 1
+    elapsed = time.perf_counter() - began
+    print(f"api.throttle:           {elapsed / count * 1e6:5.2f} us per request "
+          f"({limited / count:.0%} limited, {limiter.evictions:,} evictions, "
+          f"{count / elapsed:,.0f} requests/s on one thread)")
+
+    limiter = RateLimiter(rate=5, burst=20, slots=1 << 20, clock=SimulatedClock(1 / RPS))
+    keys = ['wallet:' + wallet for wallet, _ in requests]
+    acquire = limiter.acquire
+    began = time.perf_counter()
+    for key in keys:
+        acquire(key)
+    elapsed = time.perf_counter() - began
+    print(f"RateLimiter.acquire:    {elapsed / count * 1e6:5.2f} us per call")
+
+    cache = IdempotencyCache()
+    response = ({'session_id': 1}, 200)
+    for key in keys[:WALLETS]:
+        cache.run(key, lambda: response)
+    began = time.perf_counter()
+    for key in keys[:WALLETS]:
+        cache.run(key, lambda: response)
+    elapsed = time.perf_counter() - began
+    print(f"IdempotencyCache.run:   {elapsed / WALLETS * 1e6:5.2f} us per replayed response")
+
+
+if __name__ == "__main__":
+    main()
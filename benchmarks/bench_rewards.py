@@ -0,0 +1,57 @@
+"""
+Transactions and wall time needed to pay out winners, one by one or batched.
+
+Runs against a local mock JSON-RPC node mining a block every BLOCK_TIME
+seconds. Each settlement sends one transaction and waits for its receipt,
+as ``reward_winner`` and ``reward_winners`` do. Pass the number of rewards
+as the first argument (default 10,000).
+"""
+
+import sys
+import time
+
+from flat_earth_game.reward_queue import RewardQueue, reward_key
+from flat_earth_game.rpc_transport import RPCTransport
+from flat_earth_game.tests.mock_rpc import MockRPCNode
+
+REWARDS = 10000
+BATCH_SIZE = 100
+BLOCK_TIME = 0.01
+RECEIPT_POLL = 0.002
+
+
+def settler(rpc):
+    """Build a settle function that sends one transaction and waits for it."""
+    def settle(entries):
+        tx_hash = rpc([("eth_sendTransaction", [{"rewards": len(entries)}])])[0]
+        while rpc([("eth_getTransactionReceipt", [tx_hash])])[0] is None:
+            time.sleep(RECEIPT_POLL)
+        return {"success": True}
+    return settle
+
+
+def run(rewards, batch_size):
+    """Return (transactions sent, seconds) to settle ``rewards`` wins."""
+    with MockRPCNode(block_time=BLOCK_TIME) as node:
+        queue = RewardQueue(settler(RPCTransport(node.url)), max_batch=batch_size)
+        began = time.perf_counter()
+        for session_id in range(rewards):
+            queue.enqueue("0x%040x" % session_id, 100, reward_key(session_id))
+        queue.flush()
+        elapsed = time.perf_counter() - began
+        assert queue.rewards_settled == rewards
+        return node.calls["eth_sendTransaction"], elapsed
+
+
+def main():
+    """Print transaction count and wall time with and without batching."""
+    rewards = int(sys.argv[1]) if len(sys.argv) > 1 else REWARDS
+    print(f"{rewards} rewards, {BLOCK_TIME}s blocks\n")
+    print(f"{'mode':>12} {'transactions':>14} {'seconds':>10}")
+    for name, batch_size in (("unbatched", 1), (f"batch={BATCH_SIZE}", BATCH_SIZE)):
+        transactions, elapsed = run(rewards, batch_size)
+        print(f"{name:>12} {transactions:>14} {elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
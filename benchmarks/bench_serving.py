@@ -0,0 +1,209 @@
+"""
+Side-by-side load test of the Flask and ASGI serving modes.
+
+Each mode is started in its own process, with the chain client replaced by
+StubQuai, which talks to a local mock JSON-RPC node adding RPC_LATENCY
+seconds to every request. CONNECTIONS keep-alive clients then each play
+GAMES games: a /start_game, one /submit_argument per entry of ARGUMENTS
+and a /token_balance lookup. Flask runs on werkzeug's threaded server and
+the ASGI app on uvicorn. Run with an optional connection count::
+
+    python -m benchmarks.bench_serving 1000
+"""
+
+import asyncio
+import itertools
+import json
+import socket
+import subprocess
+import sys
+import time
+
+from flat_earth_game.rpc_transport import RPCTransport
+from flat_earth_game.tests.mock_rpc import MockRPCNode
+
+CONNECTIONS = 1000
+GAMES = 2
+RPC_LATENCY = 0.02
+ARGUMENTS = [
+    "Satellites photograph a round Earth",
+    "Ships disappear over the horizon",
+    "Gravity pulls everything toward the center"
+]
+
+
+class StubQuai:
+    """Chain client that answers from a mock JSON-RPC node."""
+
+    game_address = "0x00000000000000000000000000000000000000aa"
+    token_address = "0x00000000000000000000000000000000000000bb"
+
+    def __init__(self, rpc_url):
+        self.rpc = RPCTransport(rpc_url, pool_size=64)
+        self._session_ids = itertools.count(1)
+
+    def start_game_session(self, player_address):
+        tx_hash = self.rpc.call("eth_sendTransaction", [{"from": player_address}])
+        return {"success": True, "session_id": next(self._session_ids), "transaction_hash": tx_hash}
+
+    def reward_winner(self, player_address, score):
+        tx_hash = self.rpc.call("eth_sendTransaction", [{"to": player_address}])
+        return {"success": True, "tokens_sent": min(score // 10, 100), "transaction_hash": tx_hash}
+
+    def get_player_token_balance(self, player_address):
+        return int(self.rpc.read("eth_call", [{"to": self.token_address}, "latest"]), 16)
+
+
+def serve(mode, port, rpc_url):
+    """Run one serving mode over StubQuai until killed."""
+    from flat_earth_game import api
+    api._quai = StubQuai(rpc_url)
+    if mode == "flask":
+        from werkzeug.serving import WSGIRequestHandler, make_server
+        from flat_earth_game.web_interface import create_app
+
+        class KeepAliveHandler(WSGIRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_request(self, *args):
+                pass
+
+        server = make_server("127.0.0.1", port, create_app(), threaded=True,
+                             request_handler=KeepAliveHandler)
+        server.socket.listen(CONNECTIONS * 2)
+        server.serve_forever()
+    else:
+        import uvicorn
+        from flat_earth_game.asgi_interface import app
+        uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning",
+                    backlog=CONNECTIONS * 2, access_log=False)
+
+
+class Client:
+    """One keep-alive HTTP/1.1 connection that reconnects when closed."""
+
+    def __init__(self, port):
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, body=None):
+        """Send a request and return (status, decoded JSON body)."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+        data = json.dumps(body).encode() if body is not None else b""
+        self.writer.write((f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+                           f"Content-Type: application/json\r\n"
+                           f"Content-Length: {len(data)}\r\n\r\n").encode() + data)
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode().partition(":")
+            headers[name.strip().lower()] = value.strip()
+        payload = json.loads(await self.reader.readexactly(int(headers["content-length"])))
+        if headers.get("connection", "").lower() == "close":
+            self.close()
+        return status, payload
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+async def play(port, wallet, latencies, errors):
+    """Play GAMES games over one connection, recording request latencies."""
+    client = Client(port)
+
+    async def timed(method, path, body=None):
+        began = time.perf_counter()
+        try:
+            status, payload = await client.request(method, path, body)
+        except (OSError, ValueError, asyncio.IncompleteReadError):
+            client.close()
+            errors.append(path)
+            return None
+        latencies.append(time.perf_counter() - began)
+        if status >= 400:
+            errors.append(path)
+        return payload
+
+    for _ in range(GAMES):
+        started = await timed("POST", "/start_game", {"wallet_address": wallet})
+        if not started or "session_id" not in started:
+            continue
+        for argument in ARGUMENTS:
+            await timed("POST", "/submit_argument", {
+                "argument": argument, "session_id": started["session_id"], "wallet_address": wallet
+            })
+        await timed("GET", f"/token_balance/{wallet}")
+    client.close()
+
+
+def wait_for_port(port, timeout=30.0):
+    """Block until something accepts connections on ``port``."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def free_port():
+    """Return a currently unused local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def load(mode, rpc_url, connections):
+    """Start one serving mode and drive it; return (requests, seconds, latencies, errors)."""
+    port = free_port()
+    server = subprocess.Popen([sys.executable, "-m", "benchmarks.bench_serving",
+                               "--serve", mode, str(port), rpc_url])
+    try:
+        wait_for_port(port)
+        latencies, errors = [], []
+
+        async def run_all():
+            await asyncio.gather(*(play(port, "0x%040x" % i, latencies, errors)
+                                   for i in range(connections)))
+
+        began = time.perf_counter()
+        asyncio.run(run_all())
+        elapsed = time.perf_counter() - began
+    finally:
+        server.kill()
+        server.wait()
+    latencies.sort()
+    return len(latencies), elapsed, latencies, errors
+
+
+def main(connections=CONNECTIONS):
+    """Print throughput and latency for both serving modes."""
+    with MockRPCNode(latency=RPC_LATENCY) as node:
+        node.handlers["eth_call"] = lambda tx, block="latest": "0x2a"
+        print(f"{connections} connections x {GAMES} games, "
+              f"{RPC_LATENCY * 1000:.0f} ms RPC latency\n")
+        print(f"{'mode':>6} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for mode in ("flask", "asgi"):
+            requests, elapsed, latencies, errors = load(mode, node.url, connections)
+            if not latencies:
+                print(f"{mode:>6} {0:>9} {'-':>8} {'-':>8} {'-':>8} {len(errors):>7}")
+                continue
+            print(f"{mode:>6} {requests:>9} {requests / elapsed:>8.0f} "
+                  f"{latencies[len(latencies) // 2] * 1000:>8.1f} "
+                  f"{latencies[int(len(latencies) * 0.99)] * 1000:>8.1f} {len(errors):>7}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--serve"]:
+        serve(sys.argv[2], int(sys.argv[3]), sys.argv[4])
+    else:
+        main(*(int(arg) for arg in sys.argv[1:2]))
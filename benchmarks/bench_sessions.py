@@ -0,0 +1,65 @@
+"""
+Per-request cost and memory of the session store as live sessions grow.
+
+Fills an in-memory session store up to 100,000 concurrent sessions and
+measures a full turn (lookup, process_argument, save) at each size, then
+shows that the LRU ceiling keeps memory bounded when more sessions arrive.
+"""
+
+import random
+import time
+import tracemalloc
+
+from flat_earth_game.session_store import InMemorySessionBackend, SessionStore
+
+SESSION_COUNTS = (1000, 10000, 100000)
+TURNS = 20000
+
+ARGUMENTS = [
+    "Ships disappear bottom-first over the horizon",
+    "Gravity pulls everything to the center",
+    "Different time zones prove Earth is round",
+    "People have sailed around the world",
+    "Satellites show Earth from space",
+]
+
+
+def turn_cost(store, session_count, rng):
+    """Return the mean seconds per turn against random live sessions."""
+    start = time.perf_counter()
+    for _ in range(TURNS):
+        session_id = rng.randrange(session_count)
+        game = store.get(session_id)
+        game.process_argument(rng.choice(ARGUMENTS))
+        store.save(session_id, game)
+    return (time.perf_counter() - start) / TURNS
+
+
+def main():
+    """Print per-turn cost and memory at each session count."""
+    rng = random.Random(0)
+    print(f"{'sessions':>10} {'us/turn':>10} {'MiB':>10}")
+    for count in SESSION_COUNTS:
+        tracemalloc.start()
+        store = SessionStore(InMemorySessionBackend(max_sessions=count))
+        for session_id in range(count):
+            store.create(session_id)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        cost = turn_cost(store, count, rng)
+        print(f"{count:>10} {cost * 1e6:>10.2f} {memory / 2**20:>10.1f}")
+
+    ceiling = SESSION_COUNTS[-1] // 2
+    tracemalloc.start()
+    backend = InMemorySessionBackend(max_sessions=ceiling)
+    store = SessionStore(backend)
+    for session_id in range(SESSION_COUNTS[-1]):
+        store.create(session_id)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"\n{SESSION_COUNTS[-1]} sessions created with a ceiling of {ceiling}: "
+          f"{len(backend)} held, {backend.evictions} evicted, {memory / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Simulated games per second, in one process and across a process pool.
+
+Plays GAMES games with every built-in strategy, first in this process and
+then on one worker per CPU, and projects the time a million games per
+strategy would take. Pass the number of games as the first argument
+(default 20,000).
+"""
+
+import os
+import sys
+import time
+
+from flat_earth_game.simulation import STRATEGIES, simulate
+
+GAMES = 20000
+TARGET = 1000000
+
+
+def run(games, processes):
+    """Return (games played, seconds) for every strategy."""
+    strategies = [strategy() for strategy in STRATEGIES.values()]
+    began = time.perf_counter()
+    results = simulate(strategies, games, processes=processes)
+    return sum(result.games for result in results.values()), time.perf_counter() - began
+
+
+def main():
+    """Print throughput for a single process and the full pool."""
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else GAMES
+    cpus = os.cpu_count()
+    print(f"{'processes':>9} {'games':>9} {'seconds':>8} {'games/s':>9} {'1M/strategy':>12}")
+    for processes in sorted({1, cpus}):
+        played, seconds = run(games, processes)
+        rate = played / seconds
+        projected = TARGET * len(STRATEGIES) / rate
+        print(f"{processes:>9} {played:>9} {seconds:>8.2f} {rate:>9,.0f} {projected:>11.0f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Solana payment verification latency and RPC usage against a fake node.
+
+Each player has HISTORY transactions with the entry fee paid in the oldest,
+and every RPC call takes LATENCY seconds. "serial" fetches one transaction
+at a time, "fan-out" keeps up to eight in flight, and "recheck" verifies an
+unpaid player a second time, which only reads the history added since the
+first scan. "index" verifies the paying player from the payment index kept
+by follow_payments, after a fake logs subscription announced the payment.
+"""
+
+import asyncio
+import os
+import time
+
+from solders.pubkey import Pubkey
+
+from flat_earth_game import solana_integration
+from flat_earth_game.solana_integration import GameToken
+from flat_earth_game.tests.fake_solana import FakeLogsSocket, FakeSolanaClient, transfer
+
+HISTORY = 200
+LATENCY = 0.002
+GAME_WALLET = str(Pubkey(bytes([1] * 32)))
+
+
+def run(client, token, player, checks=1):
+    """Time ``checks`` verifications and count the RPC calls they made."""
+    client.calls.clear()
+    began = time.perf_counter()
+    for _ in range(checks):
+        paid = asyncio.run(token.verify_payment(player))
+    return paid, time.perf_counter() - began, sum(client.calls.values())
+
+
+async def follow_and_verify(client, token, player, signature):
+    """Index a payment from the subscription, then time verifying it."""
+    socket = FakeLogsSocket()
+    solana_integration.connect = socket.connect
+    follower = asyncio.ensure_future(token.follow_payments())
+    try:
+        while not socket.subscriptions:
+            await asyncio.sleep(0)
+        socket.notify(signature)
+        while player not in token.payment_index.dump():
+            await asyncio.sleep(LATENCY)
+        client.calls.clear()
+        began = time.perf_counter()
+        paid = await token.verify_payment(player)
+        return paid, time.perf_counter() - began, sum(client.calls.values())
+    finally:
+        follower.cancel()
+
+
+def main():
+    """Print verification latency and RPC calls for each mode."""
+    os.environ.setdefault("GAME_WALLET", GAME_WALLET)
+    os.environ.setdefault("TOKEN_MINT", str(Pubkey(bytes([2] * 32))))
+    client = FakeSolanaClient(latency=LATENCY)
+    paying = str(Pubkey(bytes([3] * 32)))
+    unpaid = str(Pubkey(bytes([4] * 32)))
+    client.add(paying, "payment", transfer(paying, Pubkey.from_string(os.environ["GAME_WALLET"]), 0.1))
+    for n in range(HISTORY - 1):
+        client.add(paying, f"paying{n}")
+        client.add(unpaid, f"unpaid{n}")
+
+    print(f"{HISTORY} transactions per player, {LATENCY * 1000:.0f} ms per call\n")
+    print(f"{'mode':>8} {'ms':>8} {'rpc calls':>10}")
+    for mode, concurrency in (("serial", 1), ("fan-out", 8)):
+        token = GameToken(max_concurrency=concurrency)
+        token.client = client
+        paid, elapsed, calls = run(client, token, paying)
+        assert paid
+        print(f"{mode:>8} {elapsed * 1000:>8.1f} {calls:>10}")
+
+    token = GameToken()
+    token.client = client
+    run(client, token, unpaid)
+    client.add(unpaid, "latest")
+    paid, elapsed, calls = run(client, token, unpaid)
+    assert not paid
+    print(f"{'recheck':>8} {elapsed * 1000:>8.1f} {calls:>10}")
+
+    token = GameToken()
+    token.client = client
+    paid, elapsed, calls = asyncio.run(follow_and_verify(client, token, paying, "payment"))
+    assert paid
+    print(f"{'index':>8} {elapsed * 1000:>8.1f} {calls:>10}")
+
+
+if __name__ == "__main__":
+    main()
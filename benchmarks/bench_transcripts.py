@@ -0,0 +1,82 @@
+"""
+Cost of exporting turns and of aggregating the exported transcripts.
+
+Records TURNS turns (cycled from a few hundred real games) through a
+TranscriptWriter in a temporary directory and reports:
+
+- time each record() call adds to the request thread
+- turns exported per second, and bytes per turn on disk
+- summarize() throughput, and the most memory it had allocated at once,
+  which stays flat however many turns are read
+
+Pass the number of turns as the first argument (default 5,000,000).
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from flat_earth_game.game import FlatEarthDebateGame
+from flat_earth_game.simulation import FreshEvidence, RandomEvidence
+from flat_earth_game.transcripts import TranscriptWriter, summarize, transcript_files
+
+TURNS = 5000000
+GAMES = 500
+
+
+def played_turns():
+    """Return (session id, result) pairs from GAMES scripted games."""
+    rng = random.Random(0)
+    turns = []
+    for session_id in range(GAMES):
+        strategy = (FreshEvidence() if session_id % 2 else RandomEvidence())
+        game = FlatEarthDebateGame(seed=session_id)
+        strategy.start(game, rng)
+        for _ in range(50):
+            result = game.process_argument(strategy.next_argument(game, rng))
+            turns.append((session_id, result))
+            if result["state"]["convinced"]:
+                break
+    return turns
+
+
+def main():
+    """Print export and aggregation figures."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else TURNS
+    turns = played_turns()
+    directory = tempfile.mkdtemp()
+    try:
+        writer = TranscriptWriter(directory, max_chunks=64)
+        record = writer.record
+        began = time.perf_counter()
+        for i in range(count):
+            session_id, result = turns[i % len(turns)]
+            record(session_id + i // len(turns) * GAMES, result)
+        recorded = time.perf_counter() - began
+        writer.close()
+        exported = time.perf_counter() - began
+        size = sum(os.path.getsize(path) for path in transcript_files(directory))
+        print(f"record():  {recorded / count * 1e6:6.2f} us per turn on the request thread")
+        print(f"export:    {count / exported:>10,.0f} turns/s, {size / count:.1f} bytes per turn, "
+              f"{writer.rows_dropped:,} turns dropped")
+
+        began = time.perf_counter()
+        summary = summarize(transcript_files(directory))
+        elapsed = time.perf_counter() - began
+        tracemalloc.start()
+        summarize(transcript_files(directory))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"summarize: {summary['turns'] / elapsed:>10,.0f} turns/s ({summary['turns']:,} turns, "
+              f"{summary['games']:,} games, win rate {summary['win_rate']:.2f}), "
+              f"peak allocation {peak / 1e6:.1f} MB")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
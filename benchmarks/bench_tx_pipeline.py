@@ -0,0 +1,81 @@
+"""
+Latency and throughput of concurrent game starts, blocking versus pipelined.
+
+Both modes run against a local mock JSON-RPC node that mines a block every
+BLOCK_TIME seconds. The blocking mode sends a transaction and polls for its
+receipt inside the request, like ``wait_for_transaction_receipt``. The
+pipelined mode hands the transaction to a TransactionPipeline and answers at
+once, while one background poller batches the receipt lookups.
+"""
+
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flat_earth_game.rpc_transport import RPCTransport
+from flat_earth_game.tests.mock_rpc import MockRPCNode
+from flat_earth_game.tx_pipeline import TransactionPipeline
+
+GAME_STARTS = 500
+WORKERS = 16
+BLOCK_TIME = 0.5
+RECEIPT_POLL = 0.1
+
+
+def percentile(values, fraction):
+    """Return the given percentile of ``values``."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_blocking(node, rpc):
+    """Send and wait for each receipt on the request path."""
+    def start_game(_):
+        began = time.perf_counter()
+        tx_hash = rpc([("eth_sendTransaction", [{}])])[0]
+        while rpc([("eth_getTransactionReceipt", [tx_hash])])[0] is None:
+            time.sleep(RECEIPT_POLL)
+        return time.perf_counter() - began
+
+    with ThreadPoolExecutor(WORKERS) as workers:
+        began = time.perf_counter()
+        latencies = list(workers.map(start_game, range(GAME_STARTS)))
+        return latencies, time.perf_counter() - began
+
+
+def run_pipelined(node, rpc):
+    """Submit through the pipeline and wait for all handles afterwards."""
+    pipeline = TransactionPipeline(rpc, poll_interval=RECEIPT_POLL)
+    send = lambda: rpc([("eth_sendTransaction", [{}])])[0]
+    handles = []
+
+    def start_game(_):
+        began = time.perf_counter()
+        handles.append(pipeline.submit(send, label="start_game"))
+        return time.perf_counter() - began
+
+    with ThreadPoolExecutor(WORKERS) as workers:
+        began = time.perf_counter()
+        latencies = list(workers.map(start_game, range(GAME_STARTS)))
+        for handle in handles:
+            handle.wait()
+        elapsed = time.perf_counter() - began
+    pipeline.close()
+    assert all(handle.status == "confirmed" for handle in handles)
+    return latencies, elapsed
+
+
+def main():
+    """Print request latency, confirmation throughput and RPC usage."""
+    print(f"{GAME_STARTS} game starts, {WORKERS} request workers, {BLOCK_TIME}s blocks\n")
+    print(f"{'mode':>10} {'p50 ms':>10} {'p99 ms':>10} {'starts/s':>10} {'http reqs':>10}")
+    for name, runner in (("blocking", run_blocking), ("pipelined", run_pipelined)):
+        with MockRPCNode(block_time=BLOCK_TIME) as node:
+            latencies, elapsed = runner(node, RPCTransport(node.url))
+            print(f"{name:>10} {statistics.median(latencies) * 1e3:>10.2f} "
+                  f"{percentile(latencies, 0.99) * 1e3:>10.2f} "
+                  f"{GAME_STARTS / elapsed:>10.1f} {node.http_requests:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+Regression benchmark suite for the game engine and API hot paths.
+
+Runs a fixed set of cases and stores their results as JSON, so a run can
+be compared against a saved baseline::
+
+    python -m benchmarks.suite run --output results.json
+    python -m benchmarks.suite compare benchmarks/baseline.json results.json
+    python -m benchmarks.suite check
+
+``check`` runs the suite and compares it against ``benchmarks/baseline.json``
+in one go. ``compare`` and ``check`` exit with status 1 when any metric got
+worse than its baseline by more than ``--threshold`` (a fraction, 0.2 by
+default). Record a new baseline on the machine the comparisons will run
+on, keeping the best of a few runs::
+
+    python -m benchmarks.suite run --runs 3 --output benchmarks/baseline.json
+
+Timings are the best of several repeats, to keep scheduler noise out of the
+comparison.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from benchmarks.bench_analyzer import build_table
+from flat_earth_game import api, metrics
+from flat_earth_game.argument_analyzer import ArgumentAnalyzer
+from flat_earth_game.game import FlatEarthDebateGame
+from flat_earth_game.game_state import GameState
+from flat_earth_game.knowledge_base import KnowledgeBase
+from flat_earth_game.session_store import InMemorySessionBackend, SessionStore
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_THRESHOLD = 0.2
+REPEATS = 7
+
+KEYWORD_TABLE_SIZES = (30, 1000, 10000)
+
+# Argument lengths players actually send: a short claim, a paragraph, an essay
+ARGUMENT_LENGTHS = {
+    "short": 40,
+    "paragraph": 400,
+    "essay": 4000
+}
+
+WORDS = ("the earth is round because we can see that ships and light behave "
+         "as if the surface curves away from every observer on it").split()
+
+# Five distinct kinds of evidence, enough to win a game
+WINNING_ARGUMENTS = [
+    "Satellites photograph a round Earth",
+    "Ships disappear over the horizon",
+    "Gravity pulls everything toward the center",
+    "Each time zone has its own noon",
+    "Magellan sailed around the world"
+]
+
+CASES = {}
+
+# Importing api turns spans on for the servers; measure the bare hot paths
+metrics.disable()
+
+
+def case(name):
+    """Register a function returning {metric: (value, unit, better)} as a case."""
+    def register(func):
+        CASES[name] = func
+        return func
+    return register
+
+
+def best_time(func, number):
+    """Return the fastest of REPEATS runs of ``number`` calls, in seconds per call."""
+    func()  # warm up caches before timing
+    best = None
+    for _ in range(REPEATS):
+        gc.collect()
+        began = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = (time.perf_counter() - began) / number
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def make_argument(length, rng):
+    """Build a text of about ``length`` characters with one evidence keyword."""
+    words = []
+    while sum(len(word) + 1 for word in words) < length:
+        words.append(rng.choice(WORDS))
+    words.insert(rng.randrange(len(words) + 1), "horizon")
+    return " ".join(words)
+
+
+class StubQuai:
+    """Chain client returning canned results instantly."""
+
+    game_address = "0x00000000000000000000000000000000000000aa"
+    token_address = "0x00000000000000000000000000000000000000bb"
+    balance_cache = None
+
+    def reward_winner(self, player_address, score):
+        return {"success": True, "tokens_sent": min(score // 10, 100), "transaction_hash": "0x0"}
+
+    def get_player_token_balance(self, player_address):
+        return 0
+
+
+@case("analyze_argument")
+def bench_analyze_argument():
+    """Nanoseconds per analyze_argument call by argument length and keyword table size."""
+    rng = random.Random(0)
+    results = {}
+    for size in KEYWORD_TABLE_SIZES:
+        table = build_table(size)
+        analyzer = ArgumentAnalyzer(KnowledgeBase(table, {name: ["No."] for name in table}))
+        for label, length in ARGUMENT_LENGTHS.items():
+            texts = [make_argument(length, rng) for _ in range(20)]
+            number = max(1, 20000 // (length // 40 + 1) // len(texts))
+
+            def run():
+                for text in texts:
+                    analyzer.analyze_argument(text)
+            seconds = best_time(run, number) / len(texts)
+            results[f"{label}/keywords={size}"] = (seconds * 1e9, "ns", "lower")
+    return results
+
+
+@case("game_to_win")
+def bench_game_to_win():
+    """Microseconds to play a fresh game through process_argument until it is won."""
+    def play():
+        game = FlatEarthDebateGame()
+        for argument in WINNING_ARGUMENTS:
+            game.process_argument(argument)
+        assert game.game_state.is_convinced()
+    return {"game": (best_time(play, 2000) * 1e6, "us", "lower")}
+
+
+@case("game_state_churn")
+def bench_game_state_churn():
+    """Nanoseconds to create, update, serialize and restore a GameState."""
+    categories = FlatEarthDebateGame().analyzer.categories
+
+    def churn():
+        state = GameState(categories)
+        for category_id in range(len(categories)):
+            state.mark_used(category_id)
+            state.update_score(20)
+        GameState.from_dict(state.to_dict(), categories).get_status()
+    return {"create_update_roundtrip": (best_time(churn, 20000) * 1e9, "ns", "lower")}
+
+
+@case("flask_submit_argument")
+def bench_flask_submit_argument():
+    """Requests per second through the Flask test client with a stub chain client."""
+    from flat_earth_game.web_interface import create_app
+    saved = api._quai
+    api._quai = StubQuai()
+    try:
+        client = create_app().test_client()
+        session_ids = iter(range(10 ** 9, 2 * 10 ** 9))
+
+        def game():
+            session_id = next(session_ids)
+            api.sessions.create(session_id)
+            for argument in WINNING_ARGUMENTS:
+                response = client.post("/submit_argument", json={
+                    "argument": argument, "session_id": session_id, "wallet_address": "0xabc"
+                })
+                assert response.status_code == 200
+        seconds = best_time(game, 100) / len(WINNING_ARGUMENTS)
+    finally:
+        api._quai = saved
+    return {"requests_per_second": (1 / seconds, "req/s", "higher")}
+
+
+@case("session_memory")
+def bench_session_memory():
+    """Bytes held per live game session in the in-memory session store."""
+    count = 20000
+    FlatEarthDebateGame()  # build the shared tables outside the measurement
+    gc.collect()
+    tracemalloc.start()
+    store = SessionStore(InMemorySessionBackend(max_sessions=count))
+    for session_id in range(count):
+        store.create(session_id)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return {"bytes_per_session": (memory / count, "bytes", "lower")}
+
+
+def run(only=None, runs=1):
+    """
+    Run the suite.
+
+    Args:
+        only (list): Names of the cases to run; every case when omitted
+        runs (int): Times to run each case; the best value of each metric
+            is kept, which steadies baselines on noisy machines
+
+    Returns:
+        dict: Results with machine metadata, ready to save as JSON
+    """
+    results = {}
+    for name, func in CASES.items():
+        if only and name not in only:
+            continue
+        for attempt in range(runs):
+            print(f"running {name} ({attempt + 1}/{runs})...", file=sys.stderr)
+            for metric, (value, unit, better) in func().items():
+                key = f"{name}/{metric}"
+                best = results.get(key)
+                if best is None or (value < best["value"] if better == "lower" else value > best["value"]):
+                    results[key] = {"value": round(value, 3), "unit": unit, "better": better}
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "results": results
+    }
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare two suite results.
+
+    Args:
+        baseline (dict): Saved results to compare against
+        current (dict): New results
+        threshold (float): Fraction by which a metric may get worse
+
+    Returns:
+        list: (metric, baseline value, current value, relative change,
+            regressed) rows, where a positive change is an improvement
+    """
+    rows = []
+    for metric, result in current["results"].items():
+        saved = baseline["results"].get(metric)
+        if saved is None or not saved["value"]:
+            rows.append((metric, None, result["value"], None, False))
+            continue
+        change = (result["value"] - saved["value"]) / saved["value"]
+        if result["better"] == "lower":
+            change = -change
+        rows.append((metric, saved["value"], result["value"], change, change < -threshold))
+    return rows
+
+
+def print_comparison(rows, threshold):
+    """Print a comparison table and return True if anything regressed."""
+    width = max(len(row[0]) for row in rows)
+    print(f"{'metric':<{width}} {'baseline':>12} {'current':>12} {'change':>8}")
+    for metric, saved, value, change, regressed in rows:
+        if saved is None:
+            print(f"{metric:<{width}} {'-':>12} {value:>12.1f} {'new':>8}")
+            continue
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{metric:<{width}} {saved:>12.1f} {value:>12.1f} {change:>+8.1%}{flag}")
+    regressions = sum(row[4] for row in rows)
+    print(f"\n{regressions} regression(s) beyond {threshold:.0%}")
+    return regressions > 0
+
+
+def load(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    """Command line entry point; returns the process exit status."""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite", description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the suite and save its results")
+    run_parser.add_argument("--output", help="JSON file to write; printed when omitted")
+    run_parser.add_argument("--only", nargs="+", choices=sorted(CASES), help="cases to run")
+    run_parser.add_argument("--runs", type=int, default=1, help="runs per case, keeping the best")
+    compare_parser = commands.add_parser("compare", help="compare two saved results")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    check_parser = commands.add_parser("check", help="run the suite and compare it to a baseline")
+    check_parser.add_argument("--baseline", default=BASELINE_PATH)
+    check_parser.add_argument("--only", nargs="+", choices=sorted(CASES), help="cases to run")
+    check_parser.add_argument("--runs", type=int, default=1, help="runs per case, keeping the best")
+    for sub in (compare_parser, check_parser):
+        sub.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                         help="fraction a metric may worsen before it is flagged")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results = run(args.only, args.runs)
+        text = json.dumps(results, indent=2, sort_keys=True) + "\n"
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(text)
+        else:
+            print(text, end="")
+        return 0
+    if args.command == "compare":
+        baseline, current = load(args.baseline), load(args.current)
+    else:
+        baseline, current = load(args.baseline), run(args.only, args.runs)
+    return 1 if print_comparison(compare(baseline, current, args.threshold), args.threshold) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
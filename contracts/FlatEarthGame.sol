@@ -16,6 +16,7 @@ contract FlatEarthGame is Ownable {
     
     mapping(address => GameSession) public gameSessions;
     mapping(address => bool) public payments;
+    mapping(bytes32 => bool) public settledRewards;
     
     event GameStarted(address player, uint256 sessionId);
     event GameCompleted(address player, uint256 score, uint256 tokens);
@@ -44,6 +45,36 @@ contract FlatEarthGame is Ownable {
         require(gameSessions[player].active, "No active game session");
         require(!gameSessions[player].completed, "Game already completed");
         
+        _completeGame(player, score);
+    }
+    
+    // Settle many wins in one transaction. Each win carries an idempotency
+    // key; keys that were already settled, and players without an open
+    // session, are skipped so one bad entry cannot revert the whole batch.
+    function completeGames(
+        address[] calldata players,
+        uint256[] calldata scores,
+        bytes32[] calldata rewardKeys
+    ) external onlyOwner {
+        require(
+            players.length == scores.length && players.length == rewardKeys.length,
+            "Array length mismatch"
+        );
+        
+        for (uint256 i = 0; i < players.length; i++) {
+            if (settledRewards[rewardKeys[i]]) {
+                continue;
+            }
+            GameSession storage session = gameSessions[players[i]];
+            if (!session.active || session.completed) {
+                continue;
+            }
+            settledRewards[rewardKeys[i]] = true;
+            _completeGame(players[i], scores[i]);
+        }
+    }
+    
+    function _completeGame(address player, uint256 score) internal {
         // Calculate token reward (1 token per 10 points, max 100)
         uint256 tokenReward = (score / 10) > 100 ? 100 : (score / 10);
         
@@ -0,0 +1,95 @@
+"""
+Contract ABIs, precompiled into a single package-relative artifact.
+
+The solc output for each contract (``contracts/GameABI.json`` and
+``contracts/TokenABI.json``) is compacted into ``contract_abis.json`` next to
+this module, so the ABIs ship with the package and load without depending on
+the working directory. Rebuild the artifact after recompiling the contracts::
+
+    python -m flat_earth_game.abi contracts
+"""
+
+import json
+import os
+import sys
+from functools import lru_cache
+
+ARTIFACT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "contract_abis.json")
+
+# Contract name -> solc output file in the contracts directory
+SOURCES = {
+    "Game": "GameABI.json",
+    "Token": "TokenABI.json"
+}
+
+
+def read_source(path):
+    """
+    Read one contract's ABI from compiler output.
+
+    Args:
+        path (str): Either a bare ABI list or a build artifact with an
+            "abi" key
+
+    Returns:
+        list: The ABI entries
+    """
+    with open(path, "r") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data["abi"]
+    return data
+
+
+def build_artifact(source_dir="contracts", path=ARTIFACT_PATH):
+    """
+    Compact every contract's compiler output into the package artifact.
+
+    Args:
+        source_dir (str): Directory holding the solc output files
+        path (str): Artifact file to write
+
+    Returns:
+        dict: Contract name -> ABI, as written
+    """
+    abis = {name: read_source(os.path.join(source_dir, filename))
+            for name, filename in SOURCES.items()}
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(abis, f, separators=(",", ":"), sort_keys=True)
+    os.replace(tmp_path, path)
+    _artifact.cache_clear()
+    load_abi.cache_clear()
+    return abis
+
+
+@lru_cache(maxsize=None)
+def _artifact():
+    if not os.path.exists(ARTIFACT_PATH):
+        return {}
+    with open(ARTIFACT_PATH, "r") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def load_abi(name, source_dir="contracts"):
+    """
+    Get a contract's ABI, parsed once per process.
+
+    Args:
+        name (str): Contract name, a key of ``SOURCES``
+        source_dir (str): Directory of raw solc output, used when the
+            package artifact has not been built
+
+    Returns:
+        list: The ABI entries; shared, so callers must not modify it
+    """
+    abis = _artifact()
+    if name in abis:
+        return abis[name]
+    return read_source(os.path.join(source_dir, SOURCES[name]))
+
+
+if __name__ == "__main__":
+    built = build_artifact(*sys.argv[1:2])
+    print(f"Wrote {len(built)} ABIs to {ARTIFACT_PATH}")
@@ -0,0 +1,388 @@
+"""
+Framework-independent handlers for the game API.
+
+The Flask app in ``web_interface`` and the ASGI app in ``asgi_interface``
+both serve these handlers, so clients see the same JSON whichever server
+runs. Each handler takes the parsed request and returns a
+``(payload, status)`` pair; a ``str`` payload is sent as plain text.
+Handlers marked as blocking wait on the chain; the rest only touch local
+game state.
+"""
+import os
+import threading
+from . import metrics
+from .event_log import EventLog
+from .game_state import json_default  # re-exported for the servers
+from .leaderboard import BOARDS, Leaderboards
+from .rate_limit import IdempotencyCache, RateLimiter
+from .reward_queue import RewardQueue, reward_key
+from .session_store import InMemorySessionBackend, SessionStore
+
+# Larger request bodies get a 413 before any of the body is parsed
+max_request_bytes = int(os.getenv('MAX_REQUEST_BYTES', 65536))
+
+_session_ttl = float(os.getenv('SESSION_TTL', 3600))
+sessions = SessionStore(InMemorySessionBackend(
+    ttl=_session_ttl,
+    max_sessions=int(os.getenv('MAX_SESSIONS', 100000))
+))
+
+# Journal sessions and restore them after a restart when EVENT_LOG_DIR is set
+if os.getenv('EVENT_LOG_DIR'):
+    sessions.event_log = EventLog(
+        os.getenv('EVENT_LOG_DIR'),
+        sync=os.getenv('EVENT_LOG_SYNC', '1').lower() not in ('0', 'false', 'no'),
+        commit_delay=float(os.getenv('EVENT_LOG_COMMIT_DELAY', 0)),
+        snapshot_every=int(os.getenv('EVENT_LOG_SNAPSHOT_EVERY', 100000)),
+        session_ttl=_session_ttl
+    )
+    sessions.recover()
+
+# Throttle each wallet and session when RATE_LIMIT_PER_SECOND is set
+rate_limiter = None
+if float(os.getenv('RATE_LIMIT_PER_SECOND', 0)) > 0:
+    rate_limiter = RateLimiter(
+        float(os.getenv('RATE_LIMIT_PER_SECOND')),
+        float(os.getenv('RATE_LIMIT_BURST', 10)),
+        slots=int(os.getenv('RATE_LIMIT_SLOTS', 65536))
+    )
+
+# Answer retried /start_game calls from the first response for IDEMPOTENCY_TTL seconds
+start_requests = None
+if float(os.getenv('IDEMPOTENCY_TTL', 0)) > 0:
+    start_requests = IdempotencyCache(ttl=float(os.getenv('IDEMPOTENCY_TTL')))
+
+# Export every played turn for analytics when TRANSCRIPT_DIR is set
+transcripts = None
+if os.getenv('TRANSCRIPT_DIR'):
+    from .transcripts import TranscriptWriter
+    transcripts = TranscriptWriter(
+        os.getenv('TRANSCRIPT_DIR'),
+        chunk_rows=int(os.getenv('TRANSCRIPT_CHUNK_ROWS', 8192)),
+        format=os.getenv('TRANSCRIPT_FORMAT', 'columnar')
+    )
+
+# Pick up new versions of a compiled knowledge base file as they are published
+knowledge_reloader = None
+if os.getenv('KNOWLEDGE_BASE_PATH') and float(os.getenv('KNOWLEDGE_BASE_RELOAD_INTERVAL', 5)) > 0:
+    from .knowledge_file import KnowledgeBaseReloader
+    knowledge_reloader = KnowledgeBaseReloader(
+        os.getenv('KNOWLEDGE_BASE_PATH'),
+        interval=float(os.getenv('KNOWLEDGE_BASE_RELOAD_INTERVAL', 5))
+    )
+    knowledge_reloader.start()
+
+# Rank players by best game and token balance; won games on this process feed
+# it, and contract events too once LEADERBOARD_START_BLOCK is set
+leaderboards = Leaderboards()
+leaderboard_max_limit = int(os.getenv('LEADERBOARD_MAX_LIMIT', 100))
+
+_quai = None
+_reward_queue = None
+_clients_lock = threading.Lock()
+
+# Record spans unless METRICS_ENABLED is false; sample stacks if PROFILER is set
+metrics.configure_from_env()
+
+
+def get_quai():
+    """
+    Get the process-wide Quai contract client, building it on first use
+
+    Returns:
+        QuaiGameContract: The shared contract client
+    """
+    global _quai
+    if _quai is None:
+        with _clients_lock:
+            if _quai is None:
+                from .quai_integration import QuaiGameContract
+                quai = QuaiGameContract()
+                # Cache token balances when BALANCE_CACHE_SIZE is set
+                if int(os.getenv('BALANCE_CACHE_SIZE', 0)) > 0:
+                    quai.enable_balance_cache(
+                        max_entries=int(os.getenv('BALANCE_CACHE_SIZE')),
+                        per_block=os.getenv('BALANCE_CACHE_PER_BLOCK', '').lower() in ('1', 'true', 'yes')
+                    )
+                # Rank from GameCompleted and Transfer events when LEADERBOARD_START_BLOCK is set
+                if os.getenv('LEADERBOARD_START_BLOCK'):
+                    quai.enable_leaderboard(
+                        leaderboards,
+                        start_block=int(os.getenv('LEADERBOARD_START_BLOCK'))
+                    )
+                _quai = quai
+    return _quai
+
+
+def get_reward_queue():
+    """
+    Get the process-wide reward queue, starting it on first use
+
+    Rewards are batched only when REWARD_BATCH_SIZE is set; each win is
+    paid on its own otherwise.
+
+    Returns:
+        RewardQueue: The shared queue, or None if batching is disabled
+    """
+    global _reward_queue
+    if _reward_queue is None and int(os.getenv('REWARD_BATCH_SIZE', 0)) > 0:
+        with _clients_lock:
+            if _reward_queue is None:
+                queue = RewardQueue(
+                    get_quai().reward_winners,
+                    max_batch=int(os.getenv('REWARD_BATCH_SIZE')),
+                    max_delay=float(os.getenv('REWARD_BATCH_DELAY', 5.0)),
+                    max_attempts=int(os.getenv('REWARD_MAX_ATTEMPTS', 5))
+                )
+                queue.start()
+                _reward_queue = queue
+    return _reward_queue
+
+
+def throttle(*keys):
+    """
+    Take a token from each key's bucket
+
+    Returns:
+        tuple: A 429 (payload, status) pair if any bucket is empty, else None
+    """
+    if rate_limiter is None:
+        return None
+    wait = 0.0
+    for key in keys:
+        wait = max(wait, rate_limiter.acquire(key))
+    if wait:
+        return {'error': 'Too many requests', 'retry_after': round(wait, 3)}, 429
+    return None
+
+
+def start_game(data):
+    """
+    Start a new game session after payment verification (blocking)
+
+    A retry carrying the same idempotency_key gets the first call's
+    response while IDEMPOTENCY_TTL is set. Calls without a key always
+    start a new game.
+    """
+    wallet_address = data.get('wallet_address')
+
+    if not wallet_address:
+        return {'error': 'Wallet address required'}, 400
+    limited = throttle('wallet:' + wallet_address)
+    if limited is not None:
+        return limited
+    key = data.get('idempotency_key')
+    if start_requests is not None and key:
+        return start_requests.run((wallet_address, key, bool(data.get('async'))), _start_game, data)
+    return _start_game(data)
+
+
+def _start_game(data):
+    wallet_address = data.get('wallet_address')
+    quai = get_quai()
+    if data.get('async'):
+        # Return immediately; the session is created once the payment is mined
+        pending = quai.submit_game_session(
+            wallet_address,
+            on_started=lambda session: sessions.create(session['session_id'], wallet=wallet_address)
+        )
+        return {
+            'transaction_id': pending.id,
+            'status': pending.status,
+            'status_url': f'/transaction/{pending.id}',
+            'message': 'Payment submitted. Poll the status URL for your session id.'
+        }, 202
+
+    # Verify payment and start game session
+    result = quai.start_game_session(wallet_address)
+    if not result['success']:
+        return {
+            'error': 'Payment required',
+            'required_amount': 0.1,
+            'contract_address': quai.game_address,
+            'details': result.get('error', 'Payment failed')
+        }, 402
+
+    # Create new game session
+    sessions.create(result['session_id'], wallet=wallet_address)
+
+    return {
+        'session_id': result['session_id'],
+        'transaction_hash': result['transaction_hash'],
+        'message': 'Game started! Payment verified.'
+    }, 200
+
+
+def play_argument(data):
+    """
+    Score a player's argument against their session
+
+    Args:
+        data: Request body with argument, session_id and wallet_address
+
+    Only the wallet that paid for the session may play it; any other
+    wallet gets a 403.
+
+    Returns:
+        tuple: (payload, status, won), where won is the address of the
+            session's wallet when the argument won the game and the reward
+            is still to be paid, and None otherwise
+    """
+    argument = data.get('argument')
+    session_id = data.get('session_id')
+    wallet_address = data.get('wallet_address')
+
+    if not all([argument, session_id, wallet_address]):
+        return {'error': 'Missing required data'}, 400, None
+    limited = throttle('wallet:' + str(wallet_address), 'session:' + str(session_id))
+    if limited is not None:
+        return limited + (None,)
+
+    game = sessions.get(session_id)
+    if game is None:
+        return {'error': 'Unknown or expired session'}, 404, None
+    if not game.game_state.owned_by(wallet_address):
+        return {'error': 'Session belongs to another wallet'}, 403, None
+    result = game.process_argument(argument)
+    if transcripts is not None:
+        transcripts.record(session_id, result)
+
+    if result.get('state', {}).get('convinced', False):
+        state = result['state']
+        winner = game.game_state.wallet or wallet_address
+        leaderboards.record_game(winner, state['credibility_score'], state['attempts'])
+        sessions.end(session_id)
+        return result, 200, winner
+    sessions.save(session_id, game, result)
+    return result, 200, None
+
+
+def pay_reward(data, result, winner):
+    """
+    Send the token reward for a won game (blocking)
+
+    Args:
+        data: Request body of the winning argument
+        result: Payload returned by play_argument
+        winner: Wallet of the won session, as returned by play_argument
+
+    Returns:
+        dict: Reward details, added to the payload as "reward"
+    """
+    if str(data.get('wallet_address')).lower() != str(winner).lower():
+        return {'success': False, 'error': 'Session belongs to another wallet'}
+    wallet_address = winner
+    score = result['state']['credibility_score']
+    reward_queue = get_reward_queue()
+    if reward_queue is not None:
+        queued = reward_queue.enqueue(wallet_address, score, reward_key(data.get('session_id')))
+        return {
+            'success': queued,
+            'queued': queued,
+            'tokens_pending': min(score // 10, 100)
+        }
+    if data.get('async'):
+        return get_quai().submit_reward(wallet_address, score).to_dict()
+    return get_quai().reward_winner(wallet_address, score)
+
+
+def submit_argument(data):
+    """Handle player arguments and return game response (blocking on a win)"""
+    result, status, winner = play_argument(data)
+
+    # If game is won, send token reward
+    if winner:
+        result['reward'] = pay_reward(data, result, winner)
+    return result, status
+
+
+def transaction_status(transaction_id):
+    """Get the status of a transaction submitted in async mode"""
+    pending = get_quai().transaction_status(transaction_id)
+    if pending is None:
+        return {'error': 'Unknown transaction'}, 404
+    return pending.to_dict(), 200
+
+
+def rpc_metrics():
+    """Get RPC transport load: in-flight requests, retries and pool saturation"""
+    quai = get_quai()
+    stats = quai.transport.metrics.snapshot()
+    if quai.balance_cache is not None:
+        stats['balance_cache'] = quai.balance_cache.snapshot()
+    return stats, 200
+
+
+def metrics_text():
+    """Get span histograms and RPC load in the Prometheus text format"""
+    gauges = {}
+    # Report on the chain client only once a request has built it
+    if _quai is not None:
+        stats = dict(_quai.transport.metrics.snapshot())
+        if _quai.balance_cache is not None:
+            stats.update(('balance_cache_' + name, value)
+                         for name, value in _quai.balance_cache.snapshot().items())
+        gauges = {'flat_earth_rpc_' + name: value for name, value in stats.items()
+                  if isinstance(value, (int, float))}
+    return metrics.render_prometheus(gauges), 200
+
+
+def profile_text():
+    """Get the sampling profiler's stacks in collapsed flame graph format"""
+    if not metrics.profiler.running and not metrics.profiler.samples:
+        return {'error': 'Profiler is not running; set PROFILER=1 to enable it'}, 404
+    return metrics.profiler.collapsed(), 200
+
+
+def leaderboard(params):
+    """
+    Get a page of the score or token leaderboard, from memory
+
+    Args:
+        params: Query parameters: board ("score" or "tokens"), limit and offset
+    """
+    board = params.get('board', 'score')
+    try:
+        limit = int(params.get('limit', 10))
+        offset = int(params.get('offset', 0))
+    except (TypeError, ValueError):
+        return {'error': 'limit and offset must be integers'}, 400
+    if board not in BOARDS:
+        return {'error': f"board must be one of {', '.join(BOARDS)}"}, 400
+    if not 1 <= limit <= leaderboard_max_limit or offset < 0:
+        return {'error': f'limit must be between 1 and {leaderboard_max_limit}'}, 400
+    return {
+        'board': board,
+        'players': leaderboards.top(board, limit, offset),
+        'total': len(leaderboards.board(board))
+    }, 200
+
+
+def player_rank(address):
+    """Get a player's rank and points on every leaderboard, from memory"""
+    standing = leaderboards.standing(address)
+    if all(entry is None for entry in standing.values()):
+        return {'error': 'Player not ranked'}, 404
+    return dict(standing, address=address), 200
+
+
+def game_status():
+    """Get current game status and token info"""
+    quai = get_quai()
+    return {
+        'entry_fee': 0.1,
+        'token_contract': quai.token_address,
+        'game_contract': quai.game_address,
+        'network': 'cyprus1.testnet.quai.network'
+    }, 200
+
+
+def token_balance(address):
+    """Get player's token balance (blocking)"""
+    quai = get_quai()
+    balance = quai.get_player_token_balance(address)
+    return {
+        'address': address,
+        'balance': balance,
+        'token_contract': quai.token_address
+    }, 200
@@ -2,6 +2,12 @@
 Module for analyzing and evaluating player arguments in the Flat Earth Debate Game.
 """
 
+import random
+from itertools import islice
+
+from .knowledge_base import default_knowledge_base
+from .metrics import timed
+
 class ArgumentAnalyzer:
     """
     Analyzes player arguments and provides appropriate AI responses.
@@ -10,68 +16,39 @@ class ArgumentAnalyzer:
     and maintaining a database of possible AI rebuttals.
     """
     
-    def __init__(self):
-        """Initialize the argument analyzer with evidence types and rebuttals."""
-        self.evidence_weights = {
-            "satellite": {
-                "keywords": ["satellite", "space", "photo", "image", "picture", "nasa"],
-                "weight": 15,
-                "description": "Evidence from satellite imagery and space observation"
-            },
-            "gravity": {
-                "keywords": ["gravity", "gravitational", "mass", "attraction", "force"],
-                "weight": 20,
-                "description": "Arguments based on gravitational effects and physics"
-            },
-            "curvature": {
-                "keywords": ["curve", "horizon", "curvature", "ship", "disappear"],
-                "weight": 25,
-                "description": "Observations of Earth's curvature"
-            },
-            "time_zones": {
-                "keywords": ["time zone", "sun", "day", "night", "shadow", "timezone"],
-                "weight": 20,
-                "description": "Evidence from time zones and day/night cycles"
-            },
-            "circumnavigation": {
-                "keywords": ["circumnavigation", "sail", "around", "magellan", "flight"],
-                "weight": 20,
-                "description": "Evidence from global circumnavigation"
-            }
-        }
-        
-        self.rebuttals = {
-            "satellite": [
-                "Those images could be manipulated or fake.",
-                "NASA could be part of a grand conspiracy.",
-                "CGI technology can create very convincing images these days."
-            ],
-            "gravity": [
-                "What you call gravity could just be density and buoyancy.",
-                "If gravity pulled everything to the center, why don't the oceans fall off?",
-                "Heavy things fall because they're dense, not because of gravity."
-            ],
-            "curvature": [
-                "The horizon appears flat when you look at it.",
-                "Ships don't really disappear bottom-first; that's just perspective.",
-                "If Earth was curved, buildings would appear tilted."
-            ],
-            "time_zones": [
-                "The sun is just a spotlight moving across a flat plane.",
-                "Time zones could work the same way on a flat disk.",
-                "The sun circles above the flat Earth like a carousel."
-            ],
-            "circumnavigation": [
-                "You can travel in a circle on a flat surface too.",
-                "The edge of the Earth is surrounded by an ice wall (Antarctica).",
-                "Nobody has actually circumnavigated north to south."
-            ]
-        }
+    def __init__(self, knowledge_base=None):
+        """
+        Initialize the argument analyzer with evidence types and rebuttals.
+
+        Args:
+            knowledge_base (KnowledgeBase): Tables to analyze against; the
+                shared built-in knowledge base is used when omitted
+        """
+        self.knowledge_base = knowledge_base if knowledge_base is not None else default_knowledge_base()
+
+    @property
+    def evidence_weights(self):
+        """Mapping: Read-only evidence categories with keywords and weights."""
+        return self.knowledge_base.evidence_weights
+
+    @property
+    def rebuttals(self):
+        """Mapping: Read-only rebuttal lines for each category."""
+        return self.knowledge_base.rebuttals
+
+    @property
+    def keyword_index(self):
+        """KeywordIndex: Compiled index over the evidence keywords."""
+        return self.knowledge_base.keyword_index
     
+    @timed("analyzer.analyze_argument")
     def analyze_argument(self, text):
         """
         Analyze a player's argument and determine its category and weight.
-        
+
+        The text is normalized and scanned a chunk at a time, so a long
+        argument is never copied whole.
+
         Args:
             text (str): The player's argument text
             
@@ -79,31 +56,68 @@ class ArgumentAnalyzer:
             tuple: (category, weight) where category is the type of argument
                   and weight is its persuasive value
         """
-        text = text.lower()
-        max_weight = 0
-        best_category = None
-        
-        for category, data in self.evidence_weights.items():
-            for keyword in data["keywords"]:
-                if keyword.lower() in text:
-                    if data["weight"] > max_weight:
-                        max_weight = data["weight"]
-                        best_category = category
-        
-        return best_category, max_weight
+        return self.keyword_index.classify_text(text)
 
-    def get_rebuttal(self, category):
+    def analyze_batch(self, texts):
+        """
+        Analyze many arguments in one call.
+
+        Gives the same results as calling ``analyze_argument`` on each text,
+        returned as compact arrays instead of per-item tuples.
+
+        Args:
+            texts (list): The argument texts
+
+        Returns:
+            tuple: (category_ids, weights) as ``array.array`` objects. A
+                category id indexes ``categories`` and is -1 where no
+                evidence was found.
+        """
+        return self.keyword_index.classify_batch(texts)
+
+    def analyze_stream(self, texts, batch_size=4096):
+        """
+        Analyze an iterable of arguments in fixed-size batches.
+
+        Args:
+            texts (iterable): The argument texts, consumed lazily
+            batch_size (int): Number of texts scored per batch
+
+        Yields:
+            tuple: (category_ids, weights) arrays for each batch, in order
+        """
+        texts = iter(texts)
+        while True:
+            batch = list(islice(texts, batch_size))
+            if not batch:
+                return
+            yield self.keyword_index.classify_batch(batch)
+
+    @property
+    def categories(self):
+        """tuple: Category names in id order, for decoding batch results."""
+        return self.knowledge_base.categories
+
+    @property
+    def category_ids(self):
+        """Mapping: Id of each category name."""
+        return self.knowledge_base.category_ids
+
+    def get_rebuttal(self, category, draw=None):
         """
         Get a random rebuttal for a given argument category.
         
         Args:
             category (str): The category of argument
+            draw (callable): Returns a random index below its argument, such
+                as a game state's ``draw``; the global ``random.randrange``
+                is used when omitted
             
         Returns:
             str: A rebuttal appropriate for the argument category
         """
-        import random
-        return random.choice(self.rebuttals[category])
+        lines = self.knowledge_base.rebuttal_table[self.category_ids[category]]
+        return lines[(draw or random.randrange)(len(lines))]
 
     def get_evidence_description(self, category):
         """
@@ -115,4 +129,25 @@ class ArgumentAnalyzer:
         Returns:
             str: Description of the evidence category
         """
-        return self.evidence_weights[category]["description"]
\ No newline at end of file
+        return self.evidence_weights[category]["description"]
+
+
+_default = None
+
+
+def default_analyzer():
+    """
+    Get the process-wide analyzer over the default knowledge base.
+
+    The analyzer holds no per-game state, so every game can share it. A new
+    analyzer is made when a new default knowledge base is installed.
+
+    Returns:
+        ArgumentAnalyzer: The shared analyzer
+    """
+    global _default
+    knowledge_base = default_knowledge_base()
+    analyzer = _default
+    if analyzer is None or analyzer.knowledge_base is not knowledge_base:
+        analyzer = _default = ArgumentAnalyzer(knowledge_base)
+    return analyzer
@@ -0,0 +1,247 @@
+"""
+ASGI serving mode for the Flat Earth Debate Game API.
+
+Serves the same routes and JSON as the Flask app in ``web_interface`` on any
+ASGI server, for example::
+
+    uvicorn flat_earth_game.asgi_interface:app
+
+Game logic runs inline on the event loop. Handlers that wait on the chain
+run on a bounded I/O thread pool and are awaited, so a slow RPC call holds
+a pool thread rather than the loop. Arguments longer than ``inline_chars``
+are scored on a separate bounded pool so they cannot stall other requests.
+When a synchronous event log is attached, every turn waits for its record
+to reach disk, so arguments are played on the I/O pool instead of inline.
+"""
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+from . import api, metrics
+
+CORS_HEADERS = [
+    (b'access-control-allow-origin', b'*'),
+    (b'access-control-allow-headers', b'content-type'),
+    (b'access-control-allow-methods', b'GET, POST, OPTIONS')
+]
+
+
+class GameASGIApp:
+    """ASGI application serving the game API routes"""
+
+    def __init__(self, io_workers: int = 64, cpu_workers: int = None, inline_chars: int = 4096,
+                 max_body: int = None):
+        """
+        Args:
+            io_workers: Threads available for blocking chain calls
+            cpu_workers: Threads for scoring long arguments; one per CPU
+                when omitted
+            inline_chars: Longest argument scored directly on the event loop
+            max_body: Largest request body accepted, in bytes;
+                api.max_request_bytes when omitted
+        """
+        self.inline_chars = inline_chars
+        self.max_body = max_body if max_body is not None else api.max_request_bytes
+        self.io_executor = ThreadPoolExecutor(io_workers, thread_name_prefix='asgi-io')
+        self.cpu_executor = ThreadPoolExecutor(cpu_workers or os.cpu_count(),
+                                               thread_name_prefix='asgi-cpu')
+        # (method, path) -> handler for fixed paths; prefix -> (method, handler)
+        self.routes = {
+            ('POST', '/start_game'): self.start_game,
+            ('POST', '/submit_argument'): self.submit_argument,
+            ('GET', '/rpc_metrics'): self.rpc_metrics,
+            ('GET', '/metrics'): self.prometheus_metrics,
+            ('GET', '/profile'): self.profile,
+            ('GET', '/game_status'): self.game_status,
+            ('GET', '/leaderboard'): self.leaderboard
+        }
+        self.prefix_routes = {
+            '/transaction/': ('GET', self.transaction_status),
+            '/token_balance/': ('GET', self.token_balance),
+            '/leaderboard/': ('GET', self.player_rank)
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def start_game(self, request):
+        return await self._io(api.start_game, await request.json())
+
+    async def submit_argument(self, request):
+        data = await request.json()
+        argument = data.get('argument')
+        if isinstance(argument, str) and len(argument) > self.inline_chars:
+            loop = asyncio.get_running_loop()
+            result, status, winner = await loop.run_in_executor(self.cpu_executor, api.play_argument, data)
+        elif _waits_for_disk():
+            result, status, winner = await self._io(api.play_argument, data)
+        else:
+            result, status, winner = api.play_argument(data)
+
+        # If game is won, send token reward
+        if winner:
+            result['reward'] = await self._io(api.pay_reward, data, result, winner)
+        return result, status
+
+    async def transaction_status(self, request, transaction_id):
+        return await self._io(api.transaction_status, transaction_id)
+
+    async def rpc_metrics(self, request):
+        return await self._io(api.rpc_metrics)
+
+    async def prometheus_metrics(self, request):
+        return api.metrics_text()
+
+    async def profile(self, request):
+        return api.profile_text()
+
+    async def leaderboard(self, request):
+        return api.leaderboard(request.query)
+
+    async def player_rank(self, request, address):
+        return api.player_rank(address)
+
+    async def game_status(self, request):
+        return await self._io(api.game_status)
+
+    async def token_balance(self, request, address):
+        return await self._io(api.token_balance, address)
+
+    def close(self):
+        """Release the worker threads"""
+        self.io_executor.shutdown(wait=False)
+        self.cpu_executor.shutdown(wait=False)
+
+    async def _io(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.io_executor, func, *args)
+
+    def _route(self, method, path):
+        """Find the handler and its path arguments, or an error status"""
+        handler = self.routes.get((method, path))
+        if handler is not None:
+            return handler, (), None
+        allowed = any(route_path == path for _, route_path in self.routes)
+        for prefix, (route_method, handler) in self.prefix_routes.items():
+            if path.startswith(prefix) and '/' not in path[len(prefix):] and len(path) > len(prefix):
+                if route_method == method:
+                    return handler, (path[len(prefix):],), None
+                allowed = True
+        return None, (), 405 if allowed else 404
+
+    async def _http(self, scope, receive, send):
+        if scope['method'] == 'OPTIONS':
+            await _send_response(send, 200, b'', [])
+            return
+        handler, args, error = self._route(scope['method'], scope['path'])
+        if handler is None:
+            message = 'Method not allowed' if error == 405 else 'Not found'
+            await _send_json(send, {'error': message}, error)
+            return
+        request = Request(scope, receive, self.max_body)
+        began = time.perf_counter()
+        try:
+            payload, status = await handler(request, *args)
+        except InvalidJSON:
+            payload, status = {'error': 'Invalid JSON'}, 400
+        except RequestTooLarge:
+            payload, status = {'error': 'Request body too large'}, 413
+        except Exception as e:
+            print(f"Error handling {scope['path']}: {e}")
+            payload, status = {'error': 'Internal server error'}, 500
+        if isinstance(payload, str):
+            await _send_response(send, status, payload.encode('utf-8'),
+                                 [(b'content-type', b'text/plain; version=0.0.4; charset=utf-8')])
+        else:
+            await _send_json(send, payload, status)
+        metrics.observe('endpoint.' + handler.__name__, time.perf_counter() - began)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+class InvalidJSON(ValueError):
+    """Request body is not valid JSON"""
+
+
+class RequestTooLarge(Exception):
+    """Request body is longer than the app accepts"""
+
+
+class Request:
+    """Incoming HTTP request whose body is read on demand"""
+
+    def __init__(self, scope, receive, max_body=None):
+        self.scope = scope
+        self._receive = receive
+        self.max_body = max_body
+
+    @property
+    def query(self):
+        """dict: Query string parameters; the first value wins for repeated names, as in Flask"""
+        return dict(reversed(parse_qsl(self.scope.get('query_string', b'').decode('latin-1'))))
+
+    async def body(self):
+        limit = self.max_body
+        if limit is not None:
+            for name, value in self.scope.get('headers', ()):
+                if name == b'content-length' and int(value) > limit:
+                    raise RequestTooLarge()
+        chunks = []
+        size = 0
+        while True:
+            message = await self._receive()
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if limit is not None and size > limit:
+                raise RequestTooLarge()
+            chunks.append(chunk)
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    async def json(self):
+        try:
+            return json.loads(await self.body())
+        except ValueError:
+            raise InvalidJSON()
+
+
+def _waits_for_disk():
+    """Check whether playing a turn blocks until the event log fsyncs it"""
+    event_log = api.sessions.event_log
+    return event_log is not None and event_log.sync
+
+
+async def _send_json(send, payload, status):
+    # Same encoding as Flask's jsonify, so both modes return identical bodies
+    with metrics.span('api.encode'):
+        body = json.dumps(payload, default=api.json_default, separators=(',', ':'), sort_keys=True)
+    await _send_response(send, status, (body + '\n').encode('utf-8'),
+                         [(b'content-type', b'application/json')])
+
+
+async def _send_response(send, status, body, headers):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': headers + CORS_HEADERS + [(b'content-length', str(len(body)).encode())]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+app = GameASGIApp(
+    io_workers=int(os.getenv('ASGI_IO_WORKERS', 64)),
+    inline_chars=int(os.getenv('ASGI_INLINE_CHARS', 4096))
+)
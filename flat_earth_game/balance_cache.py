@@ -0,0 +1,194 @@
+"""
+Read-through cache of token balances with block and event invalidation.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+def topic_address(topic):
+    """
+    Decode an address from an indexed event topic.
+
+    Args:
+        topic (str): 32-byte hex topic holding a left-padded address
+
+    Returns:
+        str: The lowercase hex address
+    """
+    if not isinstance(topic, str):
+        topic = "0x" + bytes(topic).hex()
+    return "0x" + topic[-40:].lower()
+
+
+class BalanceCache:
+    """
+    Caches balances by address, fetching each miss once.
+
+    Concurrent misses for the same address share a single ``fetch`` call.
+    Entries are dropped by ``invalidate`` when a ``Transfer`` touches the
+    address or a reward is paid to it. With ``per_block`` set, every entry
+    also expires as soon as ``advance`` reports a newer block; without it,
+    entries live until invalidated, so the cache is bypassed whenever the
+    event feed has not synced within ``max_staleness`` seconds.
+    """
+
+    def __init__(self, fetch, max_entries=100000, per_block=True, max_staleness=30.0,
+                 normalize=str.lower, clock=time.monotonic):
+        """
+        Args:
+            fetch (callable): Reads one address's balance over RPC
+            max_entries (int): Number of addresses kept before the least
+                recently used is evicted
+            per_block (bool): Expire every entry on each new block
+            max_staleness (float): Seconds after the last sync during which
+                event invalidation alone is trusted
+            normalize (callable): Maps an address to its canonical form
+            clock (callable): Returns the current time in seconds
+        """
+        self.fetch = fetch
+        self.max_entries = max_entries
+        self.per_block = per_block
+        self.max_staleness = max_staleness
+        self.normalize = normalize
+        self.clock = clock
+        self.block = None
+        self.synced_at = None
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self.fetch_seconds = 0.0
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, address):
+        """
+        Get an address's balance, fetching it on a miss.
+
+        Args:
+            address (str): Wallet address
+
+        Returns:
+            int: The balance
+
+        Raises:
+            Exception: Whatever ``fetch`` raised; failures are not cached
+        """
+        key = self.normalize(address)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._valid(entry):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                future = self._inflight[key] = Future()
+                leader = True
+            block = self.block
+        if not leader:
+            return future.result()
+
+        began = self.clock()
+        try:
+            balance = self.fetch(address)
+        except Exception as e:
+            with self._lock:
+                self.fetch_seconds += self.clock() - began
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self.fetch_seconds += self.clock() - began
+            # An invalidation during the fetch detaches it; its value may be stale
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+                self._entries[key] = (balance, block)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        future.set_result(balance)
+        return balance
+
+    def invalidate(self, address):
+        """
+        Drop an address's cached balance, including any fetch in flight.
+
+        Args:
+            address (str): Wallet address whose balance changed
+        """
+        key = self.normalize(address)
+        with self._lock:
+            self.invalidations += 1
+            self._entries.pop(key, None)
+            self._inflight.pop(key, None)
+
+    def on_transfer(self, log):
+        """
+        Invalidate both sides of a ``Transfer(address,address,uint256)`` log.
+
+        Args:
+            log (dict): Raw log as returned by ``eth_getLogs``
+        """
+        for topic in log["topics"][1:3]:
+            self.invalidate(topic_address(topic))
+
+    def advance(self, block_number):
+        """
+        Record that the chain, and the event feed, reached a block.
+
+        Args:
+            block_number (int): Latest block seen
+        """
+        with self._lock:
+            if self.block is None or block_number > self.block:
+                self.block = block_number
+            self.synced_at = self.clock()
+
+    def clear(self):
+        """Drop every cached balance."""
+        with self._lock:
+            self._entries.clear()
+            self._inflight.clear()
+
+    def snapshot(self):
+        """
+        Get the cache's counters.
+
+        Returns:
+            dict: Counters plus ``hit_rate`` and ``avg_fetch_ms``, the mean
+                RPC latency of a miss
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            fetches = self.misses - self.coalesced
+            return {
+                "entries": len(self._entries),
+                "block": self.block,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "avg_fetch_ms": self.fetch_seconds / fetches * 1000 if fetches else 0.0
+            }
+
+    def _valid(self, entry):
+        if self.per_block:
+            return entry[1] is not None and entry[1] == self.block
+        return self.synced_at is not None and self.clock() - self.synced_at <= self.max_staleness
@@ -0,0 +1,657 @@
+"""
+Multi-process serving with sticky session routing.
+
+Runs the ASGI app in several worker processes on one port::
+
+    python -m flat_earth_game.cluster --workers 8 --port 5000
+
+Every worker accepts connections on the public port (the kernel spreads
+them with SO_REUSEPORT) and owns the sessions that a consistent hash ring
+assigns to it. A ``/submit_argument`` for a session owned by another worker
+is forwarded to the owner over a local keep-alive connection, so each game
+is only ever played in one process. Games started on a worker that does not
+own them are handed to their owner straight away.
+
+A ``/start_game`` is likewise forwarded to the worker that owns its wallet,
+so a retried call meets the first one's idempotency cache entry and the
+wallet's rate limit bucket is kept in one place. ``/submit_argument`` checks
+the wallet's bucket on the worker that owns the session, so a wallet
+playing sessions owned by different workers gets a bucket on each of them.
+
+When workers are added (SIGTTIN) or removed (SIGTTOU), or a worker dies and
+is replaced, the supervisor sends every worker the new ring. Each worker
+then migrates the sessions it no longer owns to their new owners; adding or
+removing one of N workers moves about 1/N of the sessions. Requests for a
+session that is migrating at that moment may see it as unknown.
+
+Worker-to-worker traffic uses an internal port per worker, on 127.0.0.1,
+under the ``/_cluster/`` paths. The event log is not used in cluster mode,
+since sessions move between processes.
+"""
+
+import argparse
+import asyncio
+import bisect
+import hashlib
+import http.client
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from itertools import count
+
+from .game import FlatEarthDebateGame
+from .game_state import GameState
+from .session_store import SessionBackend
+
+RING_REPLICAS = 160
+MIGRATION_BATCH = 500
+
+# Public POST paths routed to the owner of a body field: (field, key prefix)
+ROUTED_PATHS = {
+    "/submit_argument": ("session_id", ""),
+    "/start_game": ("wallet_address", "wallet:")
+}
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping session keys to worker ids.
+
+    Each worker is placed on the ring at ``replicas`` points, so keys spread
+    evenly and a membership change only moves the keys next to the points
+    that were added or removed.
+    """
+
+    def __init__(self, workers=(), replicas=RING_REPLICAS):
+        """
+        Args:
+            workers (iterable): Worker ids
+            replicas (int): Points per worker on the ring
+        """
+        self.replicas = replicas
+        self._workers = set(workers)
+        self._points = []
+        self._owners = []
+        self._rebuild()
+
+    @property
+    def workers(self):
+        """tuple: Worker ids, sorted."""
+        return tuple(sorted(self._workers))
+
+    def add(self, worker):
+        self._workers.add(worker)
+        self._rebuild()
+
+    def remove(self, worker):
+        self._workers.discard(worker)
+        self._rebuild()
+
+    def owner(self, key):
+        """
+        Find the worker that owns a key.
+
+        Args:
+            key (str): Session key
+
+        Returns:
+            str: Worker id, or None if the ring is empty
+        """
+        if not self._points:
+            return None
+        i = bisect.bisect(self._points, _hash(key))
+        return self._owners[i if i < len(self._points) else 0]
+
+    def _rebuild(self):
+        points = sorted((_hash(f"{worker}#{replica}"), worker)
+                        for worker in self._workers for replica in range(self.replicas))
+        self._points = [point for point, _ in points]
+        self._owners = [worker for _, worker in points]
+
+
+class ClusterNode:
+    """
+    One worker's view of the cluster: its id, the ring and peer addresses.
+    """
+
+    def __init__(self, worker_id, timeout=5.0):
+        """
+        Args:
+            worker_id (str): This worker's id
+            timeout (float): Seconds to wait on a peer
+        """
+        self.worker_id = worker_id
+        self.timeout = timeout
+        self.ring = HashRing()
+        self.addresses = {}
+        self._local = threading.local()
+
+    def set_members(self, addresses):
+        """
+        Replace the cluster membership.
+
+        Args:
+            addresses (dict): Worker id -> "host:port" of its internal port
+        """
+        ring = HashRing(addresses)
+        self.addresses = dict(addresses)
+        self.ring = ring
+
+    def owner(self, key):
+        """Worker id that owns a session key; this worker when the ring is empty."""
+        owner = self.ring.owner(key)
+        return self.worker_id if owner is None else owner
+
+    def owns(self, key):
+        return self.owner(key) == self.worker_id
+
+    def request(self, worker, method, path, payload=None):
+        """
+        Call a peer's internal port, reusing one connection per thread.
+
+        Args:
+            worker (str): Peer worker id
+            method (str): HTTP method
+            path (str): Request path
+            payload: JSON body
+
+        Returns:
+            tuple: (status, decoded JSON body)
+        """
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+        address = self.addresses[worker]
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        for attempt in range(2):
+            connection = connections.get(address)
+            if connection is None:
+                host, port = address.rsplit(":", 1)
+                connection = connections[address] = http.client.HTTPConnection(host, int(port), timeout=self.timeout)
+            try:
+                connection.request(method, path, body, {"Content-Type": "application/json"})
+                response = connection.getresponse()
+                return response.status, json.loads(response.read() or b"null")
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                del connections[address]
+                if attempt:
+                    raise
+
+
+class ClusterSessionBackend(SessionBackend):
+    """
+    Session backend that keeps this worker's sessions and hands the rest to
+    their owners.
+    """
+
+    def __init__(self, local, node):
+        """
+        Args:
+            local (InMemorySessionBackend): Storage for owned sessions
+            node (ClusterNode): This worker's cluster view
+        """
+        self.local = local
+        self.node = node
+        self.migrated_in = 0
+        self.migrated_out = 0
+
+    def get(self, key):
+        return self.local.get(key)
+
+    def set(self, key, game):
+        owner = self.node.owner(key)
+        if owner == self.node.worker_id:
+            self.local.set(key, game)
+            return
+        self._push(owner, {key: game.game_state.to_dict()})
+        self.local.delete(key)
+
+    def delete(self, key):
+        self.local.delete(key)
+        owner = self.node.owner(key)
+        if owner != self.node.worker_id:
+            self.node.request(owner, "DELETE", f"/_cluster/sessions/{key}")
+
+    def receive(self, states):
+        """
+        Store sessions handed over by another worker.
+
+        Args:
+            states (dict): Session key -> ``GameState.to_dict`` output
+
+        Returns:
+            int: Number of sessions stored
+        """
+        for key, state in states.items():
+            self.local.set(key, FlatEarthDebateGame(GameState.from_dict(state)))
+        self.migrated_in += len(states)
+        return len(states)
+
+    def rebalance(self):
+        """
+        Move every session this worker no longer owns to its owner.
+
+        Returns:
+            int: Number of sessions moved
+        """
+        before = self.migrated_out
+        batches = {}
+        for key in self.local.keys():
+            owner = self.node.owner(key)
+            if owner == self.node.worker_id:
+                continue
+            game = self.local.get(key)
+            if game is None:
+                continue
+            batch = batches.setdefault(owner, {})
+            batch[key] = game.game_state.to_dict()
+            if len(batch) >= MIGRATION_BATCH:
+                self._push(owner, batches.pop(owner))
+        for owner, batch in batches.items():
+            self._push(owner, batch)
+        return self.migrated_out - before
+
+    def _push(self, owner, states):
+        status, _ = self.node.request(owner, "POST", "/_cluster/sessions", states)
+        if status != 200:
+            raise OSError(f"Worker {owner} refused {len(states)} sessions")
+        for key in states:
+            self.local.delete(key)
+        self.migrated_out += len(states)
+
+
+class ClusterApp:
+    """
+    ASGI middleware that routes session requests to their owning worker and
+    serves the internal ``/_cluster/`` endpoints.
+    """
+
+    def __init__(self, app, node, backend, internal_port, max_body=None):
+        """
+        Args:
+            app: The game's ASGI app
+            node (ClusterNode): This worker's cluster view
+            backend (ClusterSessionBackend): This worker's session backend
+            internal_port (int): Port that peers and the supervisor use
+            max_body (int): Largest request body read for routing, in bytes
+        """
+        self.app = app
+        self.max_body = max_body
+        self.node = node
+        self.backend = backend
+        self.internal_port = internal_port
+        self.forwarded = 0
+        self._idle = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        internal = (scope.get("server") or (None, None))[1] == self.internal_port
+        path = scope["path"]
+        if path.startswith("/_cluster/"):
+            if internal:
+                await self._internal(scope, receive, send)
+            else:
+                await _send_json(send, {"error": "Not found"}, 404)
+            return
+        route = ROUTED_PATHS.get(path) if scope["method"] == "POST" else None
+        if internal or route is None:
+            await self.app(scope, receive, send)
+            return
+        field, prefix = route
+
+        body = await _read_body(receive, self.max_body)
+        if body is None:
+            await _send_json(send, {"error": "Request body too large"}, 413)
+            return
+        try:
+            key = json.loads(body).get(field)
+        except (ValueError, AttributeError):
+            key = None
+        if key is not None:
+            owner = self.node.owner(prefix + str(key))
+            if owner != self.node.worker_id and owner in self.node.addresses:
+                await self._forward(self.node.addresses[owner], scope, body, send)
+                return
+        await self.app(scope, _replay(body), send)
+
+    async def _internal(self, scope, receive, send):
+        path, method = scope["path"], scope["method"]
+        loop = asyncio.get_running_loop()
+        if path == "/_cluster/ring" and method == "POST":
+            self.node.set_members(json.loads(await _read_body(receive))["workers"])
+            moved = await loop.run_in_executor(None, self.backend.rebalance)
+            await _send_json(send, {"moved": moved}, 200)
+        elif path == "/_cluster/sessions" and method == "POST":
+            states = json.loads(await _read_body(receive))
+            await _send_json(send, {"received": self.backend.receive(states)}, 200)
+        elif path.startswith("/_cluster/sessions/") and method == "DELETE":
+            self.backend.local.delete(path[len("/_cluster/sessions/"):])
+            await _send_json(send, {"deleted": True}, 200)
+        elif path == "/_cluster/status" and method == "GET":
+            await _send_json(send, {
+                "worker": self.node.worker_id,
+                "workers": list(self.node.ring.workers),
+                "sessions": len(self.backend.local),
+                "forwarded": self.forwarded,
+                "migrated_in": self.backend.migrated_in,
+                "migrated_out": self.backend.migrated_out
+            }, 200)
+        else:
+            await _send_json(send, {"error": "Not found"}, 404)
+
+    async def _forward(self, address, scope, body, send):
+        """Relay a request to a peer's internal port and its response back."""
+        head = (f"{scope['method']} {scope['path']} HTTP/1.1\r\nhost: {address}\r\n"
+                f"content-type: application/json\r\ncontent-length: {len(body)}\r\n\r\n").encode()
+        idle = self._idle.setdefault(address, [])
+        reader = None
+        while idle and reader is None:
+            reader, writer = idle.pop()
+            if reader.at_eof() or writer.is_closing():
+                # The peer closed it while idle, before anything was sent on it
+                writer.close()
+                reader = None
+        if reader is None:
+            host, port = address.rsplit(":", 1)
+            try:
+                reader, writer = await asyncio.open_connection(host, int(port))
+            except OSError:
+                await _send_json(send, {"error": "Session owner unavailable"}, 503)
+                return
+        # Once the request is written the owner may have applied it, so a
+        # failure from here on is never retried: the turn must not be
+        # played twice
+        try:
+            writer.write(head + body)
+            status = int((await reader.readline()).split()[1])
+            headers = []
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.partition(b":")
+                name, value = name.strip().lower(), value.strip()
+                if name == b"content-length":
+                    length = int(value)
+                if name not in (b"date", b"server"):  # this worker's server adds its own
+                    headers.append((name, value))
+            payload = await reader.readexactly(length)
+        except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+            writer.close()
+            await _send_json(send, {"error": "Session owner unavailable"}, 503)
+            return
+        idle.append((reader, writer))
+        self.forwarded += 1
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": payload})
+
+
+async def _read_body(receive, limit=None):
+    """Read a request body; None if it is longer than ``limit`` bytes."""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        size += len(chunks[-1])
+        if limit is not None and size > limit:
+            return None
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+def _replay(body):
+    """Build a receive callable that delivers an already read body."""
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+    return receive
+
+
+async def _send_json(send, payload, status):
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8") + b"\n"
+    await send({"type": "http.response.start", "status": status, "headers": [
+        (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())
+    ]})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _listen(host, port, reuse_port=False, backlog=2048):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def serve_worker(worker_id, host, port, internal_socket, setup=None):
+    """
+    Run one worker until it is terminated.
+
+    Args:
+        worker_id (str): The worker's id
+        host (str): Public interface
+        port (int): Public port, shared with the other workers
+        internal_socket (socket.socket): Bound socket for cluster traffic
+        setup (callable): Called first, before the app is imported
+    """
+    os.environ.pop("EVENT_LOG_DIR", None)
+    if setup is not None:
+        setup()
+    import uvicorn
+    from . import api
+    from .asgi_interface import GameASGIApp
+
+    node = ClusterNode(worker_id)
+    backend = ClusterSessionBackend(api.sessions.backend, node)
+    api.sessions.backend = backend
+    app = ClusterApp(GameASGIApp(
+        io_workers=int(os.getenv("ASGI_IO_WORKERS", 64)),
+        inline_chars=int(os.getenv("ASGI_INLINE_CHARS", 4096))
+    ), node, backend, internal_socket.getsockname()[1], api.max_request_bytes)
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning", access_log=False))
+    server.run(sockets=[_listen(host, port, reuse_port=True), internal_socket])
+
+
+class Cluster:
+    """
+    Supervisor that starts the workers and keeps the ring up to date.
+    """
+
+    def __init__(self, workers, host="127.0.0.1", port=5000, setup=None):
+        """
+        Args:
+            workers (int): Number of workers to start
+            host (str): Public interface
+            port (int): Public port
+            setup (callable): Run in each worker before the app is imported,
+                for example to install a test chain client
+
+        Raises:
+            RuntimeError: If OWNER_ADDRESS is set, since every worker would
+                hand out the owner account's nonces
+        """
+        if os.getenv("OWNER_ADDRESS"):
+            raise RuntimeError("OWNER_ADDRESS must not be set in cluster mode: each worker would "
+                               "hand out the owner account's nonces and they would collide")
+        self.initial_workers = workers
+        self.host = host
+        self.port = port
+        self.setup = setup
+        self.workers = {}  # worker id -> (process, internal address)
+        self._ids = count()
+        self._context = multiprocessing.get_context("fork")
+
+    def start(self):
+        """Start the workers and send them the ring."""
+        for _ in range(self.initial_workers):
+            self._spawn()
+        self.broadcast()
+
+    def add_worker(self):
+        """
+        Start one more worker and move its share of the sessions to it.
+
+        Returns:
+            str: The new worker's id
+        """
+        worker_id = self._spawn()
+        self.broadcast()
+        return worker_id
+
+    def remove_worker(self, worker_id=None):
+        """
+        Stop a worker after moving its sessions to the others.
+
+        Args:
+            worker_id (str): Worker to stop; the newest one when omitted
+        """
+        if worker_id is None:
+            worker_id = max(self.workers, key=lambda w: int(w[1:]))
+        process, address = self.workers.pop(worker_id)
+        # The leaving worker gets the ring without itself, so it hands off everything
+        self.broadcast(extra={worker_id: address})
+        process.terminate()
+        process.join()
+
+    def broadcast(self, extra=None):
+        """
+        Send the ring to every worker and wait for their migrations.
+
+        Args:
+            extra (dict): Workers outside the ring that should also be told
+        """
+        addresses = {worker_id: address for worker_id, (_, address) in self.workers.items()}
+        payload = json.dumps({"workers": addresses})
+        for address in list(addresses.values()) + list((extra or {}).values()):
+            self._call(address, "POST", "/_cluster/ring", payload)
+
+    def status(self):
+        """
+        Get every worker's status.
+
+        Returns:
+            list: ``/_cluster/status`` output of each worker
+        """
+        return [self._call(address, "GET", "/_cluster/status")
+                for _, address in self.workers.values()]
+
+    def replace_dead(self):
+        """
+        Replace workers that exited; their sessions are lost.
+
+        Returns:
+            int: Number of workers replaced
+        """
+        dead = [worker_id for worker_id, (process, _) in self.workers.items() if not process.is_alive()]
+        for worker_id in dead:
+            print(f"Worker {worker_id} exited; starting a replacement")
+            del self.workers[worker_id]
+            self._spawn()
+        if dead:
+            self.broadcast()
+        return len(dead)
+
+    def stop(self):
+        """Terminate every worker."""
+        for process, _ in self.workers.values():
+            process.terminate()
+        for process, _ in self.workers.values():
+            process.join()
+        self.workers.clear()
+
+    def run(self):
+        """Serve until SIGINT or SIGTERM; SIGTTIN adds a worker, SIGTTOU removes one."""
+        requests = []
+        signal.signal(signal.SIGTTIN, lambda *_: requests.append("add"))
+        signal.signal(signal.SIGTTOU, lambda *_: requests.append("remove"))
+        signal.signal(signal.SIGTERM, lambda *_: requests.append("stop"))
+        self.start()
+        print(f"Serving on http://{self.host}:{self.port} with {len(self.workers)} workers")
+        try:
+            while True:
+                time.sleep(0.5)
+                while requests:
+                    action = requests.pop(0)
+                    if action == "stop":
+                        return
+                    if action == "add":
+                        print(f"Added worker {self.add_worker()}")
+                    elif len(self.workers) > 1:
+                        self.remove_worker()
+                        print(f"Removed a worker; {len(self.workers)} left")
+                self.replace_dead()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def _spawn(self):
+        worker_id = f"w{next(self._ids)}"
+        internal = _listen("127.0.0.1", 0)
+        address = f"127.0.0.1:{internal.getsockname()[1]}"
+        process = self._context.Process(target=serve_worker, name=f"game-worker-{worker_id}", daemon=True,
+                                        args=(worker_id, self.host, self.port, internal, self.setup))
+        process.start()
+        internal.close()
+        self.workers[worker_id] = (process, address)
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                self._call(address, "GET", "/_cluster/status")
+                return worker_id
+            except OSError:
+                if time.monotonic() > deadline or not process.is_alive():
+                    raise RuntimeError(f"Worker {worker_id} did not start")
+                time.sleep(0.05)
+
+    def _call(self, address, method, path, body=None):
+        host, port = address.rsplit(":", 1)
+        connection = http.client.HTTPConnection(host, int(port), timeout=60)
+        try:
+            connection.request(method, path, body, {"Content-Type": "application/json"})
+            return json.loads(connection.getresponse().read())
+        finally:
+            connection.close()
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(prog="python -m flat_earth_game.cluster",
+                                     description="Serve the game API from several worker processes.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    args = parser.parse_args(argv)
+    try:
+        cluster = Cluster(args.workers, args.host, args.port)
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    cluster.run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
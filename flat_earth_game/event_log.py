@@ -0,0 +1,377 @@
+"""
+Append-only journal of game events, with snapshots for crash recovery.
+
+Every session start, scored turn and session end is appended to a binary
+log as a small checksummed record. A background writer commits whatever has
+been appended since its last commit in one write and one fsync, so many
+turns share each fsync (group commit). Once a log segment holds
+``snapshot_every`` events a new segment is started, and the sealed segments
+are folded into a snapshot of every live ``GameState`` in the background.
+
+After a restart ``recover`` loads the latest snapshot and replays the log
+segments written after it. A log directory belongs to a single process.
+"""
+
+import os
+import struct
+import threading
+import time
+import zlib
+
+from .argument_analyzer import default_analyzer
+from .game import FlatEarthDebateGame
+from .game_state import GameState
+
+START, TURN, END, OWNED_START = 1, 2, 3, 4
+
+LOG_MAGIC = b"FELOG\x00\x01\n"
+SNAPSHOT_MAGIC = b"FESNP\x00\x02\n"
+# Snapshots written before sessions were bound to a wallet
+SNAPSHOT_MAGIC_V1 = b"FESNP\x00\x01\n"
+
+# Record: kind, key length, timestamp, key, payload, CRC-32 of all before it.
+# An owned start is a start followed by the wallet's length and UTF-8 bytes.
+_HEADER = struct.Struct("<BBd")
+_START = struct.Struct("<Q")  # seed of the game's random generator
+_OWNED_START = struct.Struct("<QB")  # seed, wallet length
+_TURN = struct.Struct("<Bi")  # category id, points awarded
+_CRC = struct.Struct("<I")
+_PAYLOAD_SIZES = {START: _START.size, TURN: _TURN.size, END: 0, OWNED_START: _OWNED_START.size}
+
+# Snapshot entry: key length, credibility score, attempts, confidence
+# threshold, used mask, skepticism, random generator state, last event time,
+# wallet length (0 for none), then the key and the wallet
+_SNAPSHOT_COUNT = struct.Struct("<Q")
+_SNAPSHOT_ENTRY = struct.Struct("<BqqqQdQdB")
+_SNAPSHOT_ENTRY_V1 = struct.Struct("<BqqqQdQd")
+
+
+class EventLog:
+    """
+    Durable journal of the turns played in every session.
+    """
+
+    def __init__(self, directory, sync=True, commit_delay=0.0, snapshot_every=100000,
+                 session_ttl=None, fsync=True, analyzer=None, clock=time.time):
+        """
+        Args:
+            directory (str): Directory holding the log segments and snapshots
+            sync (bool): Make each append wait until its record is on disk
+            commit_delay (float): Seconds the writer waits after the first
+                pending record, to gather larger commits
+            snapshot_every (int): Events per log segment before it is
+                sealed and folded into a snapshot; 0 never snapshots
+            session_ttl (float): Seconds after its last event that a session
+                is dropped on recovery or snapshot; sessions are kept when
+                omitted
+            fsync (bool): Flush every commit to stable storage
+            analyzer (ArgumentAnalyzer): Analyzer the logged games use; the
+                shared default analyzer is used when omitted
+            clock (callable): Returns the wall-clock time in seconds
+        """
+        self.directory = directory
+        self.sync = sync
+        self.commit_delay = commit_delay
+        self.snapshot_every = snapshot_every
+        self.session_ttl = session_ttl
+        self.fsync = fsync
+        self.analyzer = analyzer if analyzer is not None else default_analyzer()
+        self.clock = clock
+        self.commits = 0
+        self.snapshots = 0
+        os.makedirs(directory, exist_ok=True)
+
+        self._cond = threading.Condition()
+        self._buffer = bytearray()
+        self._appended = 0
+        self._durable = 0
+        self._error = None
+        self._closed = False
+        # Serializes recovery and compaction, which both read sealed files
+        self._compact_lock = threading.Lock()
+        self._compactor = None
+        # Never append to a segment from an earlier run: its tail may be torn
+        self._segment = max([n + 1 for n in self._numbered(".log")] +
+                            self._numbered(".snapshot") + [1])
+        self._segment_events = 0
+        self._file = self._open_segment(self._segment)
+        self._writer = threading.Thread(target=self._run, name="event-log-writer", daemon=True)
+        self._writer.start()
+
+    def log_start(self, key, seed, wallet=None):
+        """
+        Record that a session started.
+
+        Args:
+            key (str): Session key
+            seed (int): Initial state of the game's random generator
+            wallet (str): Address the session is bound to, if any
+        """
+        if wallet is None:
+            self._append(START, key, _START.pack(seed))
+            return
+        wallet = wallet.encode("utf-8")
+        if len(wallet) > 255:
+            raise ValueError("Wallet address is too long for the event log")
+        self._append(OWNED_START, key, _OWNED_START.pack(seed, len(wallet)) + wallet)
+
+    def log_turn(self, key, category_id, score):
+        """
+        Record a scored turn.
+
+        Args:
+            key (str): Session key
+            category_id (int): Id of the argument's evidence category
+            score (int): Points the turn awarded
+        """
+        self._append(TURN, key, _TURN.pack(category_id, score))
+
+    def log_end(self, key):
+        """
+        Record that a session ended.
+
+        Args:
+            key (str): Session key
+        """
+        self._append(END, key, b"")
+
+    def flush(self):
+        """Wait until every record appended so far is on disk."""
+        with self._cond:
+            self._wait_durable(self._appended)
+
+    def close(self):
+        """Commit outstanding records and stop the writer."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join()
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+        self._file.close()
+
+    def recover(self):
+        """
+        Rebuild the sessions recorded by earlier runs.
+
+        Call this at startup, before logging new events.
+
+        Returns:
+            dict: Session key -> FlatEarthDebateGame, for every session
+                that was started, has not ended and has not expired
+        """
+        with self._compact_lock:
+            return {key: game for key, (game, _) in self._load(self._segment).items()}
+
+    def compact(self):
+        """
+        Fold every sealed log segment into a new snapshot and delete them.
+
+        Returns:
+            int: Number of sessions in the snapshot
+        """
+        with self._cond:
+            upto = self._segment
+        with self._compact_lock:
+            sessions = self._load(upto)
+            self._write_snapshot(upto, sessions)
+            for number in self._numbered(".snapshot"):
+                if number < upto:
+                    os.remove(self._path(number, ".snapshot"))
+            for number in self._numbered(".log"):
+                if number < upto:
+                    os.remove(self._path(number, ".log"))
+            self.snapshots += 1
+            return len(sessions)
+
+    def _append(self, kind, key, payload):
+        key = key.encode("utf-8")
+        if len(key) > 255:
+            raise ValueError("Session key is too long for the event log")
+        record = _HEADER.pack(kind, len(key), self.clock()) + key + payload
+        record += _CRC.pack(zlib.crc32(record))
+        with self._cond:
+            if self._closed:
+                raise ValueError("Event log is closed")
+            self._buffer += record
+            self._appended += 1
+            self._cond.notify_all()
+            if self.sync:
+                self._wait_durable(self._appended)
+
+    def _wait_durable(self, sequence):
+        """Block until ``sequence`` records are committed; call holding the condition."""
+        while self._durable < sequence and self._error is None:
+            self._cond.wait()
+        if self._error is not None:
+            raise OSError("Event log write failed") from self._error
+
+    def _run(self):
+        """Commit pending records until the log is closed."""
+        while True:
+            with self._cond:
+                while not self._buffer and not self._closed:
+                    self._cond.wait()
+                if not self._buffer:
+                    return
+            if self.commit_delay:
+                time.sleep(self.commit_delay)
+            with self._cond:
+                data, self._buffer = self._buffer, bytearray()
+                committed = self._appended
+            try:
+                self._file.write(data)
+                self._file.flush()
+                if self.fsync:
+                    os.fsync(self._file.fileno())
+            except OSError as e:
+                with self._cond:
+                    self._error = e
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self._segment_events += committed - self._durable
+                self._durable = committed
+                self.commits += 1
+                self._cond.notify_all()
+            if self.snapshot_every and self._segment_events >= self.snapshot_every:
+                self._rotate()
+
+    def _rotate(self):
+        """Seal the current segment and snapshot it unless a snapshot is running."""
+        self._file.close()
+        with self._cond:
+            self._segment += 1
+            self._segment_events = 0
+        self._file = self._open_segment(self._segment)
+        if self._compactor is None or not self._compactor.is_alive():
+            self._compactor = threading.Thread(target=self.compact, name="event-log-snapshot", daemon=True)
+            self._compactor.start()
+
+    def _path(self, number, suffix):
+        return os.path.join(self.directory, f"{number:012d}{suffix}")
+
+    def _numbered(self, suffix):
+        """Sorted numbers of the files with ``suffix`` in the log directory."""
+        return sorted(int(name[:-len(suffix)]) for name in os.listdir(self.directory)
+                      if name.endswith(suffix) and name[:-len(suffix)].isdigit())
+
+    def _open_segment(self, number):
+        segment = open(self._path(number, ".log"), "ab")
+        if segment.tell() == 0:
+            segment.write(LOG_MAGIC)
+            segment.flush()
+        return segment
+
+    def _load(self, upto):
+        """
+        Replay the latest snapshot and the segments after it, up to segment ``upto``.
+
+        Returns:
+            dict: Session key -> [FlatEarthDebateGame, last event time]
+        """
+        base = max((n for n in self._numbered(".snapshot") if n <= upto), default=0)
+        sessions = self._read_snapshot(base) if base else {}
+        for number in self._numbered(".log"):
+            if base <= number < upto:
+                self._replay(self._path(number, ".log"), sessions)
+        if self.session_ttl is not None:
+            cutoff = self.clock() - self.session_ttl
+            sessions = {key: entry for key, entry in sessions.items() if entry[1] >= cutoff}
+        return sessions
+
+    def _replay(self, path, sessions):
+        """Apply the records of one segment, stopping at a torn or corrupt tail."""
+        with open(path, "rb") as f:
+            data = memoryview(f.read())
+        if bytes(data[:len(LOG_MAGIC)]) != LOG_MAGIC:
+            return
+        analyzer = self.analyzer
+        categories = analyzer.categories
+        offset = len(LOG_MAGIC)
+        while offset + _HEADER.size <= len(data):
+            kind, key_length, timestamp = _HEADER.unpack_from(data, offset)
+            payload_size = _PAYLOAD_SIZES.get(kind)
+            if payload_size is None:
+                break
+            key_start = offset + _HEADER.size
+            payload_start = key_start + key_length
+            end = payload_start + payload_size
+            if kind == OWNED_START and end <= len(data):
+                end += data[end - 1]  # the wallet follows its length
+            if end + _CRC.size > len(data) or zlib.crc32(data[offset:end]) != _CRC.unpack_from(data, end)[0]:
+                break
+            key = str(data[key_start:payload_start], "utf-8")
+            if kind == TURN:
+                entry = sessions.get(key)
+                if entry is not None:
+                    entry[0].replay_turn(*_TURN.unpack_from(data, payload_start))
+                    entry[1] = timestamp
+            elif kind == START:
+                seed, = _START.unpack_from(data, payload_start)
+                sessions[key] = [FlatEarthDebateGame(GameState(categories, seed), analyzer), timestamp]
+            elif kind == OWNED_START:
+                seed, _ = _OWNED_START.unpack_from(data, payload_start)
+                wallet = str(data[payload_start + _OWNED_START.size:end], "utf-8")
+                sessions[key] = [FlatEarthDebateGame(GameState(categories, seed, wallet), analyzer),
+                                 timestamp]
+            else:
+                sessions.pop(key, None)
+            offset = end + _CRC.size
+
+    def _write_snapshot(self, number, sessions):
+        """Write a snapshot atomically, replacing any partial one."""
+        out = bytearray(SNAPSHOT_MAGIC)
+        out += _SNAPSHOT_COUNT.pack(len(sessions))
+        for key, (game, last_seen) in sessions.items():
+            state = game.game_state
+            key = key.encode("utf-8")
+            wallet = state.wallet.encode("utf-8") if state.wallet is not None else b""
+            out += _SNAPSHOT_ENTRY.pack(len(key), state.credibility_score, state.attempts,
+                                        state.confidence_threshold, state.used_mask,
+                                        state.current_skepticism, state.rng_state, last_seen,
+                                        len(wallet))
+            out += key + wallet
+        out += _CRC.pack(zlib.crc32(out))
+        path = self._path(number, ".snapshot")
+        with open(path + ".tmp", "wb") as f:
+            f.write(out)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+    def _read_snapshot(self, number):
+        with open(self._path(number, ".snapshot"), "rb") as f:
+            data = memoryview(f.read())
+        body = len(data) - _CRC.size
+        magic = bytes(data[:len(SNAPSHOT_MAGIC)])
+        if magic not in (SNAPSHOT_MAGIC, SNAPSHOT_MAGIC_V1) or zlib.crc32(data[:body]) != _CRC.unpack_from(data, body)[0]:
+            raise ValueError(f"Corrupt event log snapshot {number}")
+        entry = _SNAPSHOT_ENTRY if magic == SNAPSHOT_MAGIC else _SNAPSHOT_ENTRY_V1
+        analyzer = self.analyzer
+        categories = analyzer.categories
+        count, = _SNAPSHOT_COUNT.unpack_from(data, len(SNAPSHOT_MAGIC))
+        offset = len(SNAPSHOT_MAGIC) + _SNAPSHOT_COUNT.size
+        sessions = {}
+        for _ in range(count):
+            (key_length, credibility_score, attempts, confidence_threshold, used_mask,
+             skepticism, rng_state, last_seen, *wallet_length) = entry.unpack_from(data, offset)
+            offset += entry.size
+            key = str(data[offset:offset + key_length], "utf-8")
+            offset += key_length
+            wallet = None
+            if wallet_length and wallet_length[0]:
+                wallet = str(data[offset:offset + wallet_length[0]], "utf-8")
+                offset += wallet_length[0]
+            state = GameState(categories, rng_state, wallet)
+            state.credibility_score = credibility_score
+            state.attempts = attempts
+            state.confidence_threshold = confidence_threshold
+            state.used_mask = used_mask
+            state.current_skepticism = skepticism
+            sessions[key] = [FlatEarthDebateGame(state, analyzer), last_seen]
+        return sessions
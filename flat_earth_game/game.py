@@ -2,19 +2,35 @@
 Main game module for the Flat Earth Debate Game.
 """
 
-from .argument_analyzer import ArgumentAnalyzer
+from .argument_analyzer import default_analyzer
 from .game_state import GameState
+from .metrics import timed
 
 class FlatEarthDebateGame:
     """
     Main game class that coordinates the gameplay elements.
     """
     
-    def __init__(self):
-        """Initialize a new game instance."""
-        self.game_state = GameState()
-        self.analyzer = ArgumentAnalyzer()
+    def __init__(self, game_state=None, analyzer=None, seed=None):
+        """
+        Initialize a new game instance.
+
+        Rebuttals and hints are drawn from the game state's own random
+        generator, so a game started with a seed replays exactly when given
+        the same arguments.
+
+        Args:
+            game_state (GameState): State to resume from; a fresh game is
+                started when omitted
+            analyzer (ArgumentAnalyzer): Analyzer to judge arguments with;
+                the shared default analyzer is used when omitted
+            seed (int): Seed for a fresh game's random generator; a random
+                seed is used when omitted
+        """
+        self.analyzer = analyzer if analyzer is not None else default_analyzer()
+        self.game_state = game_state if game_state is not None else GameState(self.analyzer.categories, seed)
         
+    @timed("game.process_argument")
     def process_argument(self, argument):
         """
         Process a player's argument and return the game's response.
@@ -23,7 +39,9 @@ class FlatEarthDebateGame:
             argument (str): The player's argument text
             
         Returns:
-            dict: Game response including scores and AI rebuttal
+            dict: Game response including scores and AI rebuttal; "state" is
+                a read-only ``GameStatus`` mapping, so use ``dict()`` on it or
+                ``game_state.json_default`` to serialize the response
         """
         category, score = self.analyzer.analyze_argument(argument)
         
@@ -31,19 +49,20 @@ class FlatEarthDebateGame:
             return {
                 "success": False,
                 "message": "I don't understand how that proves the Earth is round. Please provide clearer evidence.",
-                "state": self.game_state.get_status()
+                "state": self.game_state.status()
             }
             
-        if category in self.game_state.used_arguments:
+        category_id = self.analyzer.category_ids[category]
+        if self.game_state.is_used(category_id):
             score = score // 2
             repeat_message = "This type of argument has been used before. Reduced effectiveness."
         else:
             repeat_message = None
             
-        self.game_state.used_arguments.add(category)
+        self.game_state.mark_used(category_id)
         self.game_state.update_score(score)
         
-        rebuttal = self.analyzer.get_rebuttal(category)
+        rebuttal = self.analyzer.get_rebuttal(category, self.game_state.draw)
         
         return {
             "success": True,
@@ -51,10 +70,27 @@ class FlatEarthDebateGame:
             "score": score,
             "rebuttal": rebuttal,
             "repeat_message": repeat_message,
-            "state": self.game_state.get_status(),
+            "state": self.game_state.status(),
             "evidence_type": self.analyzer.get_evidence_description(category)
         }
         
+    def replay_turn(self, category_id, score):
+        """
+        Re-apply a turn that ``process_argument`` played, such as one read
+        back from an event log.
+
+        Leaves the game exactly as the original turn did, random generator
+        included, without analyzing any text.
+
+        Args:
+            category_id (int): Id of the argument's evidence category
+            score (int): Points the turn awarded
+        """
+        self.game_state.mark_used(category_id)
+        self.game_state.update_score(score)
+        # The original turn drew one rebuttal
+        self.game_state.draw(len(self.analyzer.knowledge_base.rebuttal_table[category_id]))
+
     def get_hint(self):
         """
         Get a gameplay hint based on current state.
@@ -62,11 +98,10 @@ class FlatEarthDebateGame:
         Returns:
             str: A helpful hint for the player
         """
-        unused_categories = set(self.analyzer.evidence_weights.keys()) - self.game_state.used_arguments
-        if unused_categories:
-            import random
-            category = random.choice(list(unused_categories))
-            return f"Try using evidence about {self.analyzer.get_evidence_description(category)}"
+        knowledge_base = self.analyzer.knowledge_base
+        unused = knowledge_base.unused_ids(self.game_state.used_mask)
+        if unused:
+            return knowledge_base.hint_table[unused[self.game_state.draw(len(unused))]]
         return "Try combining different types of evidence in your argument"
 
 def main():
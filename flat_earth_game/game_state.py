@@ -2,50 +2,385 @@
 Module for managing the game state in the Flat Earth Debate Game.
 """
 
+import os
+from array import array
+from collections.abc import Mapping
+from itertools import count
+
+from .knowledge_base import default_knowledge_base
+
+
+_MASK64 = (1 << 64) - 1
+
+# Unseeded games take consecutive seeds from a random starting point, which
+# is cheaper than reading the OS entropy source for every game
+_fresh_seeds = count(int.from_bytes(os.urandom(8), "little"))
+
+
+def _category_names(categories, used_mask):
+    """Decode a used-category bitmask into category names, in id order."""
+    return [name for category_id, name in enumerate(categories) if used_mask >> category_id & 1]
+
+
+class GameStatus(Mapping):
+    """
+    Read-only snapshot of a game's status.
+
+    Capturing a snapshot only copies a few numbers; the status dictionary is
+    built when the snapshot is first read or serialized.
+    """
+
+    __slots__ = ("credibility_score", "attempts", "skepticism", "convinced",
+                 "used_mask", "categories", "_data")
+
+    def __init__(self, credibility_score, attempts, skepticism, convinced, used_mask, categories):
+        self.credibility_score = credibility_score
+        self.attempts = attempts
+        self.skepticism = skepticism
+        self.convinced = convinced
+        self.used_mask = used_mask
+        self.categories = categories
+        self._data = None
+
+    def to_dict(self):
+        """
+        Get the status as a dictionary.
+
+        Returns:
+            dict: Current game state information
+        """
+        if self._data is None:
+            self._data = {
+                "credibility_score": self.credibility_score,
+                "attempts": self.attempts,
+                "skepticism": self.skepticism,
+                "convinced": self.convinced,
+                "used_arguments": _category_names(self.categories, self.used_mask)
+            }
+        return dict(self._data)
+
+    def __getitem__(self, key):
+        if key == "convinced":
+            return self.convinced
+        if key == "credibility_score":
+            return self.credibility_score
+        if self._data is None:
+            self.to_dict()
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(("credibility_score", "attempts", "skepticism", "convinced", "used_arguments"))
+
+    def __len__(self):
+        return 5
+
+
+def json_default(o):
+    """
+    Render values the json module cannot, such as lazy status snapshots.
+
+    Pass it as ``json.dumps(result, default=json_default)`` to serialize a
+    ``process_argument`` result.
+    """
+    if isinstance(o, GameStatus):
+        return o.to_dict()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
 class GameState:
     """
     Manages the current state of the game, including scores and progress.
+
+    Used evidence categories are stored as a bitmask over category ids, where
+    a category's id is its position in ``categories``.
+
+    Each game also owns a small random generator (splitmix64) whose whole
+    state is one integer, so it is saved and restored along with the rest of
+    the game and a seeded game always makes the same random choices.
+
+    ``wallet`` is the address that paid for the game, or None for a game
+    not bound to a player.
     """
-    
-    def __init__(self):
-        """Initialize a new game state with default values."""
+
+    __slots__ = ("credibility_score", "attempts", "confidence_threshold",
+                 "used_mask", "current_skepticism", "categories", "rng_state", "wallet")
+
+    def __init__(self, categories=None, seed=None, wallet=None):
+        """
+        Initialize a new game state with default values.
+
+        Args:
+            categories (tuple): Category names in id order; the built-in
+                categories are used when omitted
+            seed (int): Seed for the game's random generator; a random seed
+                is used when omitted
+            wallet (str): Address of the player who paid for the game
+        """
         self.credibility_score = 0
         self.attempts = 0
         self.confidence_threshold = 100
-        self.used_arguments = set()
+        self.used_mask = 0
         self.current_skepticism = 100
-        
+        self.categories = categories if categories is not None else default_knowledge_base().categories
+        self.rng_state = (next(_fresh_seeds) if seed is None else seed) & _MASK64
+        self.wallet = wallet
+
+    def owned_by(self, wallet):
+        """
+        Check whether a wallet may play this game.
+
+        Args:
+            wallet (str): Address claimed by the request
+
+        Returns:
+            bool: True if the game is unbound or bound to ``wallet``;
+                addresses compare case-insensitively
+        """
+        return self.wallet is None or str(wallet).lower() == self.wallet.lower()
+
+    @property
+    def used_arguments(self):
+        """frozenset: Names of the evidence categories used so far."""
+        return frozenset(_category_names(self.categories, self.used_mask))
+
+    def is_used(self, category_id):
+        """
+        Check whether an evidence category has been used before.
+
+        Args:
+            category_id (int): Id of the category
+
+        Returns:
+            bool: True if the category was already used
+        """
+        return bool(self.used_mask >> category_id & 1)
+
+    def mark_used(self, category_id):
+        """
+        Record that an evidence category has been used.
+
+        Args:
+            category_id (int): Id of the category
+        """
+        self.used_mask |= 1 << category_id
+
+    def draw(self, n):
+        """
+        Draw a random index from the game's own generator.
+
+        Args:
+            n (int): Number of choices
+
+        Returns:
+            int: Uniformly chosen index in ``range(n)``
+        """
+        # splitmix64: advance by the golden gamma, then mix the new state
+        self.rng_state = z = (self.rng_state + 0x9E3779B97F4A7C15) & _MASK64
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+        return ((z ^ (z >> 31)) * n) >> 64
+
     def update_score(self, score_change):
         """
         Update the game state based on a new argument.
-        
+
         Args:
             score_change (int): The points to add to the credibility score
         """
         self.credibility_score += score_change
         self.attempts += 1
         self.current_skepticism = max(0, self.current_skepticism - (score_change / 2))
-        
+
     def is_convinced(self):
         """
         Check if the AI has been convinced.
-        
+
         Returns:
             bool: True if the credibility score exceeds the confidence threshold
         """
         return self.credibility_score >= self.confidence_threshold
-        
+
+    def status(self):
+        """
+        Get a lazy snapshot of the current game status.
+
+        Returns:
+            GameStatus: Snapshot that renders to the ``get_status`` dictionary
+        """
+        return GameStatus(self.credibility_score, self.attempts, self.current_skepticism,
+                          self.is_convinced(), self.used_mask, self.categories)
+
     def get_status(self):
         """
         Get a dictionary containing the current game status.
-        
+
         Returns:
             dict: Current game state information
         """
+        return self.status().to_dict()
+
+    def to_dict(self):
+        """
+        Get a plain dictionary holding everything needed to restore this state.
+
+        Returns:
+            dict: Serializable game state
+        """
         return {
             "credibility_score": self.credibility_score,
             "attempts": self.attempts,
+            "confidence_threshold": self.confidence_threshold,
+            "used_arguments": sorted(self.used_arguments),
             "skepticism": self.current_skepticism,
-            "convinced": self.is_convinced(),
-            "used_arguments": list(self.used_arguments)
-        }
\ No newline at end of file
+            "rng_state": self.rng_state,
+            "wallet": self.wallet
+        }
+
+    @classmethod
+    def from_dict(cls, data, categories=None):
+        """
+        Restore a game state saved with ``to_dict``.
+
+        Args:
+            data (dict): Serialized game state
+            categories (tuple): Category names in id order; the built-in
+                categories are used when omitted
+
+        Returns:
+            GameState: The restored state
+        """
+        state = cls(categories)
+        state.credibility_score = data["credibility_score"]
+        state.attempts = data["attempts"]
+        state.confidence_threshold = data["confidence_threshold"]
+        for category in data["used_arguments"]:
+            state.mark_used(state.categories.index(category))
+        state.current_skepticism = data["skepticism"]
+        # States saved before games carried a generator keep their fresh seed
+        if "rng_state" in data:
+            state.rng_state = data["rng_state"]
+        state.wallet = data.get("wallet")
+        return state
+
+
+class GameStatePool:
+    """
+    Struct-of-arrays storage for many game states.
+
+    Each game occupies a slot, and every field lives in its own contiguous
+    array, so a batch of turns across many games can be applied in one call
+    without allocating per-game objects.
+    """
+
+    def __init__(self, capacity=1024, categories=None, confidence_threshold=100):
+        """
+        Args:
+            capacity (int): Number of slots to allocate up front
+            categories (tuple): Category names in id order; the built-in
+                categories are used when omitted
+            confidence_threshold (int): Score needed to win
+        """
+        self.categories = categories if categories is not None else default_knowledge_base().categories
+        if len(self.categories) > 64:
+            raise ValueError("GameStatePool supports at most 64 categories")
+        self.confidence_threshold = confidence_threshold
+        self.credibility_scores = array("q")
+        self.attempts = array("q")
+        self.skepticism = array("d")
+        self.used_masks = array("Q")
+        self._free = []
+        self._grow(capacity)
+
+    def __len__(self):
+        return len(self.credibility_scores) - len(self._free)
+
+    def _grow(self, extra):
+        """Add ``extra`` free slots to every array."""
+        start = len(self.credibility_scores)
+        self.credibility_scores.extend(array("q", bytes(8 * extra)))
+        self.attempts.extend(array("q", bytes(8 * extra)))
+        self.skepticism.extend(array("d", [100.0]) * extra)
+        self.used_masks.extend(array("Q", bytes(8 * extra)))
+        self._free.extend(range(start + extra - 1, start - 1, -1))
+
+    def allocate(self):
+        """
+        Reserve a slot for a new game.
+
+        Returns:
+            int: The slot number
+        """
+        if not self._free:
+            self._grow(max(1, len(self.credibility_scores)))
+        slot = self._free.pop()
+        self.credibility_scores[slot] = 0
+        self.attempts[slot] = 0
+        self.skepticism[slot] = 100.0
+        self.used_masks[slot] = 0
+        return slot
+
+    def release(self, slot):
+        """
+        Return a slot to the pool once its game is over.
+
+        Args:
+            slot (int): The slot number
+        """
+        self._free.append(slot)
+
+    def play(self, slots, category_ids, scores):
+        """
+        Apply one turn to each of many games.
+
+        Repeated categories score half, exactly as in ``process_argument``.
+
+        Args:
+            slots (sequence): Slot of each game
+            category_ids (sequence): Evidence category id of each argument
+            scores (sequence): Full weight of each argument
+
+        Returns:
+            array: Points actually awarded to each game
+        """
+        credibility_scores = self.credibility_scores
+        attempts = self.attempts
+        skepticism = self.skepticism
+        used_masks = self.used_masks
+        awarded = array("q", scores)
+        for i, slot in enumerate(slots):
+            bit = 1 << category_ids[i]
+            score = awarded[i]
+            if used_masks[slot] & bit:
+                score //= 2
+                awarded[i] = score
+            used_masks[slot] |= bit
+            credibility_scores[slot] += score
+            attempts[slot] += 1
+            skepticism[slot] = max(0.0, skepticism[slot] - score / 2)
+        return awarded
+
+    def is_convinced(self, slot):
+        """
+        Check if the AI has been convinced in a game.
+
+        Args:
+            slot (int): The slot number
+
+        Returns:
+            bool: True if the game's score reached the confidence threshold
+        """
+        return self.credibility_scores[slot] >= self.confidence_threshold
+
+    def status(self, slot):
+        """
+        Get a lazy snapshot of a game's status.
+
+        Args:
+            slot (int): The slot number
+
+        Returns:
+            GameStatus: Snapshot of the game in that slot
+        """
+        return GameStatus(self.credibility_scores[slot], self.attempts[slot],
+                          self.skepticism[slot], self.is_convinced(slot),
+                          self.used_masks[slot], self.categories)
@@ -0,0 +1,337 @@
+"""
+Compiled multi-keyword index used to classify player arguments.
+"""
+
+import re
+from array import array
+from bisect import bisect_right
+
+# Joins a batch of texts into one string for scanning. No keyword may contain
+# it, so a match can never run from one text into the next.
+BATCH_SEPARATOR = "\x00"
+
+# Characters of raw text normalized and scanned at a time by classify_text
+CHUNK_CHARS = 16384
+
+# Tables with at most this many keywords are checked one keyword at a time,
+# best ranked first, which beats the regular expression while they are short
+SCAN_MAX_KEYWORDS = 64
+
+
+def normalize(text):
+    """
+    Lowercase text and collapse every run of whitespace to one space.
+
+    Args:
+        text (str): Raw text
+
+    Returns:
+        str: Normalized text
+    """
+    text = text.lower()
+    words = text.split()
+    if not words:
+        return " " if text else ""
+    # split() drops whitespace at the ends, which must still become a space
+    collapsed = " ".join(words)
+    if text[0].isspace():
+        collapsed = " " + collapsed
+    if text[-1].isspace():
+        collapsed += " "
+    return collapsed
+
+
+def normalized_chunks(text, chunk_chars=CHUNK_CHARS):
+    """
+    Normalize text a chunk at a time.
+
+    Joining the chunks gives ``normalize(text)``, but no more than
+    ``chunk_chars`` characters are copied at once.
+
+    Args:
+        text (str): Raw text
+        chunk_chars (int): Characters of ``text`` per chunk
+
+    Yields:
+        str: Normalized chunks, in order
+    """
+    after_space = False
+    for start in range(0, len(text), chunk_chars):
+        chunk = normalize(text[start:start + chunk_chars])
+        if after_space and chunk[:1] == " ":
+            chunk = chunk[1:]  # the run of whitespace began in the previous chunk
+        if chunk:
+            after_space = chunk[-1] == " "
+            yield chunk
+
+
+def _ranked(best):
+    """Keywords best ranked first, or None if the table is too large to scan."""
+    if len(best) > SCAN_MAX_KEYWORDS:
+        return None
+    return sorted(best.items(), key=lambda item: item[1], reverse=True)
+
+
+class KeywordIndex:
+    """
+    Classifies text against every evidence keyword in a single pass.
+
+    All keywords are merged into a trie and compiled into one regular
+    expression. After each match the search resumes one character past the
+    match's start, so overlapping keywords are all found, and each trie
+    branch is greedy so the match found at a position is the longest keyword
+    starting there. Every other keyword starting at the same position is a
+    prefix of that match, so each keyword is mapped ahead of time to the best
+    category among itself and its keyword prefixes. The result is identical to checking every keyword with
+    ``keyword in text``. Scanning stops at the first hit of the best ranked
+    keyword, since nothing later can outrank it.
+
+    The cost grows far slower than the keyword table, but it does grow: the
+    larger trie is slower to match, giving roughly half the classifications
+    per second at 10,000 keywords that it gives at 100. On tables of up to
+    ``SCAN_MAX_KEYWORDS`` keywords, such as the built-in one, a substring
+    check per keyword in rank order is faster than the expression, so those
+    are classified that way and stop at the first keyword found.
+
+    Keywords and texts are compared after ``normalize``, so case and the
+    amount of whitespace between words do not matter.
+    """
+
+    def __init__(self, evidence_weights):
+        """
+        Build the index from an evidence table.
+
+        Args:
+            evidence_weights (dict): Mapping of category name to a dict with
+                "keywords" and "weight" entries, in priority order
+        """
+        self.categories = tuple(evidence_weights)
+        # (weight, -order) ranks a hit exactly like the original scan: the
+        # highest weight wins and ties go to the category listed first.
+        # Categories without a positive weight can never win, and an empty
+        # keyword matches any text, so it becomes the starting rank.
+        ranks = {}
+        self._always = None
+        for order, (category, data) in enumerate(evidence_weights.items()):
+            rank = (data["weight"], -order)
+            if rank[0] <= 0:
+                continue
+            for keyword in data["keywords"]:
+                keyword = normalize(keyword)
+                if not keyword:
+                    if self._always is None or rank > self._always:
+                        self._always = rank
+                elif keyword not in ranks or rank > ranks[keyword]:
+                    ranks[keyword] = rank
+
+        trie = {}
+        for keyword in ranks:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[""] = True
+
+        self._batchable = not any(BATCH_SEPARATOR in keyword for keyword in ranks)
+        self._best = {}
+        self._resolve(trie, "", None, ranks)
+        self.max_keyword_length = max(map(len, ranks), default=0)
+        self._top = max(self._best.values(), default=None)
+        self._ranked = _ranked(self._best)
+        self._pattern = re.compile(self._compile(trie)) if ranks else None
+
+    @classmethod
+    def from_compiled(cls, categories, pattern, best, always=None):
+        """
+        Rebuild an index from the output of ``compiled``, skipping the trie.
+
+        Args:
+            categories (tuple): Category names in id order
+            pattern (str): Regular expression source; empty for no keywords
+            best (dict): Keyword -> (weight, -order) rank
+            always (tuple): Rank every text gets, from an empty keyword
+
+        Returns:
+            KeywordIndex: The index
+        """
+        index = cls.__new__(cls)
+        index.categories = tuple(categories)
+        index._always = always
+        index._best = best
+        index._batchable = not any(BATCH_SEPARATOR in keyword for keyword in best)
+        index.max_keyword_length = max(map(len, best), default=0)
+        index._top = max(best.values(), default=None)
+        index._ranked = _ranked(best)
+        index._pattern = re.compile(pattern) if pattern else None
+        return index
+
+    def compiled(self):
+        """
+        Get what ``from_compiled`` needs to rebuild this index.
+
+        Returns:
+            tuple: (pattern source, keyword -> rank dict, always rank)
+        """
+        pattern = self._pattern.pattern if self._pattern is not None else ""
+        return pattern, dict(self._best), self._always
+
+    def _resolve(self, node, prefix, inherited, ranks):
+        """Record, for each keyword, the best rank among it and its prefixes."""
+        if "" in node:
+            rank = ranks[prefix]
+            if inherited is None or rank > inherited:
+                inherited = rank
+            self._best[prefix] = inherited
+        for char, child in node.items():
+            if char:
+                self._resolve(child, prefix + char, inherited, ranks)
+
+    def _compile(self, node):
+        """Turn a trie node into a greedy regular expression fragment."""
+        branches = [re.escape(char) + self._compile(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:%s)" % "|".join(branches)
+        if "" in node:
+            return "(?:%s)?" % body
+        return body
+
+    def best_rank(self, text, best=None):
+        """
+        Find the best ranked keyword hit in already normalized text.
+
+        Args:
+            text (str): Normalized text to scan
+            best (tuple): Best rank found so far, in earlier text
+
+        Returns:
+            tuple: (weight, -order) of the best hit, or None if nothing matched
+        """
+        if best is None or (self._always is not None and self._always > best):
+            best = self._always
+        top = self._top
+        if best is not None and (top is None or best >= top):
+            return best
+        if self._ranked is not None:
+            for keyword, rank in self._ranked:
+                if best is not None and rank <= best:
+                    break
+                if keyword in text:
+                    return rank
+            return best
+        lookup = self._best
+        for match in self._matches(text):
+            rank = lookup[match.group()]
+            if best is None or rank > best:
+                best = rank
+                if rank == top:
+                    break
+        return best
+
+    def _matches(self, text):
+        """Yield the longest keyword match at every position, overlaps included."""
+        if self._pattern is None:
+            return
+        search = self._pattern.search
+        match = search(text)
+        while match is not None:
+            yield match
+            match = search(text, match.start() + 1)
+
+    def classify(self, text):
+        """
+        Classify already normalized text.
+
+        Args:
+            text (str): Normalized text to scan
+
+        Returns:
+            tuple: (category, weight), or (None, 0) if no keyword matched
+        """
+        return self._result(self.best_rank(text))
+
+    def classify_text(self, text, chunk_chars=CHUNK_CHARS):
+        """
+        Normalize and classify raw text in one pass over bounded chunks.
+
+        Gives the same result as ``classify(normalize(text))`` without
+        copying the whole text, and stops reading once the best ranked
+        keyword has been seen.
+
+        Args:
+            text (str): Raw text
+            chunk_chars (int): Characters normalized at a time
+
+        Returns:
+            tuple: (category, weight), or (None, 0) if no keyword matched
+        """
+        if len(text) <= chunk_chars:
+            return self._result(self.best_rank(normalize(text)))
+        # Rescan the end of each chunk with the next one, so a keyword
+        # split between them is still found
+        overlap = self.max_keyword_length - 1
+        best = None
+        tail = ""
+        for chunk in normalized_chunks(text, chunk_chars):
+            window = tail + chunk
+            best = self.best_rank(window, best)
+            if best is not None and (self._top is None or best >= self._top):
+                break
+            tail = window[-overlap:] if overlap > 0 else ""
+        return self._result(best if best is not None else self._always)
+
+    def _result(self, best):
+        if best is None:
+            return None, 0
+        weight, order = best
+        return self.categories[-order], weight
+
+    def classify_batch(self, texts):
+        """
+        Classify many texts with a single scan.
+
+        The texts are normalized, joined with ``BATCH_SEPARATOR`` and scanned
+        once; each hit is mapped back to its text by offset.
+
+        Args:
+            texts (list): Texts to classify
+
+        Returns:
+            tuple: (category_ids, weights) as ``array.array`` objects with
+                one entry per text. A category id indexes ``categories`` and
+                is -1 where nothing matched.
+        """
+        lowered = [normalize(text) for text in texts]
+        count = len(lowered)
+        if self._always is None:
+            category_ids = array("i", [-1]) * count
+            weights = array("l", [0]) * count
+        else:
+            weight, order = self._always
+            category_ids = array("i", [-order]) * count
+            weights = array("l", [weight]) * count
+        if self._pattern is None or not count:
+            return category_ids, weights
+        if not self._batchable:
+            for i, text in enumerate(lowered):
+                best = self.best_rank(text)
+                if best is not None:
+                    weights[i], category_ids[i] = best[0], -best[1]
+            return category_ids, weights
+
+        starts = []
+        position = 0
+        for text in lowered:
+            starts.append(position)
+            position += len(text) + 1
+        starts.append(position)
+        lookup = self._best
+        i = 0
+        for match in self._matches(BATCH_SEPARATOR.join(lowered)):
+            if match.start() >= starts[i + 1]:
+                i = bisect_right(starts, match.start(), i) - 1
+            weight, order = lookup[match.group()]
+            if weight > weights[i] or (weight == weights[i] and -order < category_ids[i]):
+                weights[i] = weight
+                category_ids[i] = -order
+        return category_ids, weights
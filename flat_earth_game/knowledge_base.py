@@ -0,0 +1,220 @@
+"""
+Evidence and rebuttal tables for the Flat Earth Debate Game.
+"""
+
+import os
+import threading
+from types import MappingProxyType
+
+from .keyword_index import KeywordIndex
+
+# Largest category count for which unused-category tuples are tabulated for
+# every used-category bitmask (2 ** n entries)
+MAX_TABULATED_CATEGORIES = 10
+
+# Games keep used categories in a 64-bit mask, so no table may have more
+MAX_CATEGORIES = 64
+
+EVIDENCE_WEIGHTS = {
+    "satellite": {
+        "keywords": ["satellite", "space", "photo", "image", "picture", "nasa"],
+        "weight": 15,
+        "description": "Evidence from satellite imagery and space observation"
+    },
+    "gravity": {
+        "keywords": ["gravity", "gravitational", "mass", "attraction", "force"],
+        "weight": 20,
+        "description": "Arguments based on gravitational effects and physics"
+    },
+    "curvature": {
+        "keywords": ["curve", "horizon", "curvature", "ship", "disappear"],
+        "weight": 25,
+        "description": "Observations of Earth's curvature"
+    },
+    "time_zones": {
+        "keywords": ["time zone", "sun", "day", "night", "shadow", "timezone"],
+        "weight": 20,
+        "description": "Evidence from time zones and day/night cycles"
+    },
+    "circumnavigation": {
+        "keywords": ["circumnavigation", "sail", "around", "magellan", "flight"],
+        "weight": 20,
+        "description": "Evidence from global circumnavigation"
+    }
+}
+
+REBUTTALS = {
+    "satellite": [
+        "Those images could be manipulated or fake.",
+        "NASA could be part of a grand conspiracy.",
+        "CGI technology can create very convincing images these days."
+    ],
+    "gravity": [
+        "What you call gravity could just be density and buoyancy.",
+        "If gravity pulled everything to the center, why don't the oceans fall off?",
+        "Heavy things fall because they're dense, not because of gravity."
+    ],
+    "curvature": [
+        "The horizon appears flat when you look at it.",
+        "Ships don't really disappear bottom-first; that's just perspective.",
+        "If Earth was curved, buildings would appear tilted."
+    ],
+    "time_zones": [
+        "The sun is just a spotlight moving across a flat plane.",
+        "Time zones could work the same way on a flat disk.",
+        "The sun circles above the flat Earth like a carousel."
+    ],
+    "circumnavigation": [
+        "You can travel in a circle on a flat surface too.",
+        "The edge of the Earth is surrounded by an ice wall (Antarctica).",
+        "Nobody has actually circumnavigated north to south."
+    ]
+}
+
+
+class KnowledgeBase:
+    """
+    Read-only evidence and rebuttal tables plus their compiled keyword index.
+
+    A knowledge base never changes after construction, so a single instance
+    can be shared by every game in the process.
+    """
+
+    def __init__(self, evidence_weights=EVIDENCE_WEIGHTS, rebuttals=REBUTTALS, version=0):
+        """
+        Freeze the given tables and compile their keyword index.
+
+        Args:
+            evidence_weights (dict): Mapping of category name to a dict with
+                "keywords", "weight" and "description" entries
+            rebuttals (dict): Mapping of category name to rebuttal lines
+            version (int): Version number of the tables
+
+        Raises:
+            ValueError: If a weight is not a 32-bit integer, or there are
+                more than ``MAX_CATEGORIES`` categories
+        """
+        for category, data in evidence_weights.items():
+            weight = data["weight"]
+            if not isinstance(weight, int) or isinstance(weight, bool) or not -2 ** 31 <= weight < 2 ** 31:
+                raise ValueError(f"Weight of category {category!r} must be a 32-bit integer, not {weight!r}")
+        self.version = version
+        self.evidence_weights = MappingProxyType({
+            category: MappingProxyType({
+                "keywords": tuple(data["keywords"]),
+                "weight": data["weight"],
+                "description": data["description"]
+            })
+            for category, data in evidence_weights.items()
+        })
+        self.rebuttals = MappingProxyType({
+            category: tuple(lines) for category, lines in rebuttals.items()
+        })
+        self.keyword_index = KeywordIndex(self.evidence_weights)
+        self._index_tables()
+
+    @classmethod
+    def from_compiled(cls, evidence_weights, rebuttals, keyword_index, version=0):
+        """
+        Wrap tables and an index that are already frozen and compiled, such
+        as the contents of a compiled knowledge base file.
+
+        Args:
+            evidence_weights (Mapping): Read-only evidence table
+            rebuttals (Mapping): Read-only category -> sequence of lines
+            keyword_index (KeywordIndex): Index over ``evidence_weights``
+            version (int): Version number of the tables
+
+        Returns:
+            KnowledgeBase: The knowledge base
+        """
+        knowledge_base = cls.__new__(cls)
+        knowledge_base.version = version
+        knowledge_base.evidence_weights = evidence_weights
+        knowledge_base.rebuttals = rebuttals
+        knowledge_base.keyword_index = keyword_index
+        knowledge_base._index_tables()
+        return knowledge_base
+
+    def _index_tables(self):
+        """Build the lookups keyed by category id."""
+        self.categories = self.keyword_index.categories
+        if len(self.categories) > MAX_CATEGORIES:
+            raise ValueError(f"A knowledge base may have at most {MAX_CATEGORIES} categories, "
+                             f"not {len(self.categories)}")
+        self.category_ids = MappingProxyType({
+            category: category_id for category_id, category in enumerate(self.categories)
+        })
+        # Indexed by category id, so picking a line is a single draw and lookup
+        self.rebuttal_table = tuple(self.rebuttals[category] for category in self.categories)
+        self.hint_table = tuple(
+            f"Try using evidence about {self.evidence_weights[category]['description']}"
+            for category in self.categories
+        )
+        if len(self.categories) <= MAX_TABULATED_CATEGORIES:
+            self._unused_table = tuple(
+                self._unused_ids(used_mask) for used_mask in range(1 << len(self.categories))
+            )
+        else:
+            self._unused_table = None
+
+    def unused_ids(self, used_mask):
+        """
+        Get the ids of the categories missing from a used-category bitmask.
+
+        Args:
+            used_mask (int): Bitmask of used category ids, as kept by GameState
+
+        Returns:
+            tuple: Unused category ids in ascending order
+        """
+        if self._unused_table is not None:
+            return self._unused_table[used_mask]
+        return self._unused_ids(used_mask)
+
+    def _unused_ids(self, used_mask):
+        return tuple(category_id for category_id in range(len(self.categories))
+                     if not used_mask >> category_id & 1)
+
+
+_installed = None
+_install_lock = threading.Lock()
+
+
+def default_knowledge_base():
+    """
+    Get the process-wide knowledge base.
+
+    On first use it is loaded from the compiled file named by
+    KNOWLEDGE_BASE_PATH, or built from the built-in tables when that is not
+    set. ``install_knowledge_base`` replaces it.
+
+    Returns:
+        KnowledgeBase: The shared knowledge base
+    """
+    knowledge_base = _installed
+    if knowledge_base is None:
+        with _install_lock:
+            if _installed is None:
+                path = os.getenv("KNOWLEDGE_BASE_PATH")
+                if path:
+                    from .knowledge_file import load_knowledge_base
+                    install_knowledge_base(load_knowledge_base(path))
+                else:
+                    install_knowledge_base(KnowledgeBase())
+            knowledge_base = _installed
+    return knowledge_base
+
+
+def install_knowledge_base(knowledge_base):
+    """
+    Make a knowledge base the process-wide default in one step.
+
+    Games already in progress keep the tables they started with, so their
+    category ids stay valid; games started afterwards use the new tables.
+
+    Args:
+        knowledge_base (KnowledgeBase): The new default
+    """
+    global _installed
+    _installed = knowledge_base
@@ -0,0 +1,331 @@
+"""
+Compiled knowledge base files, memory-mapped and shared between workers.
+
+``compile_knowledge_base`` writes the evidence and rebuttal tables, their
+strings and the precompiled keyword index into one versioned binary file.
+``load_knowledge_base`` maps the file rather than reading it: keywords and
+rebuttal lines are decoded from the mapping when used, so every worker on a
+machine shares one copy through the page cache, and loading skips building
+the keyword trie. ``KnowledgeBaseReloader`` watches the file and installs
+each new version as the process default while requests carry on.
+
+Publish a new version by compiling over the live file. The file is replaced
+atomically, so a worker maps either the old version or the new one::
+
+    python -m flat_earth_game.knowledge_file knowledge.fekb --source tables.json
+
+The source is a JSON object with "evidence_weights" and "rebuttals" tables;
+the built-in tables are compiled when it is omitted. New versions should
+keep existing categories in order and only add new ones, because the event
+log records categories by id.
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections.abc import Sequence
+from types import MappingProxyType
+
+from .keyword_index import KeywordIndex
+from .knowledge_base import EVIDENCE_WEIGHTS, REBUTTALS, KnowledgeBase, install_knowledge_base
+
+MAGIC = b"FEKB\x00\x00\r\n"
+FORMAT_VERSION = 1
+
+# Magic, format version, table version, category count, string count, index
+# entry count, string id of the keyword pattern, whether an empty keyword
+# matches every text, and that keyword's weight and category order. The
+# header is followed by native-endian 32-bit arrays: string offsets, then
+# seven fields per category (see _CATEGORY_FIELDS), then three per index
+# entry (keyword string id, weight, category order), then the UTF-8 strings.
+_HEADER = struct.Struct("<8sIQIIIIIii")
+_CATEGORY_FIELDS = 7
+_INDEX_FIELDS = 3
+
+
+class StringTable(Sequence):
+    """Strings stored back to back in a buffer, decoded on access."""
+
+    __slots__ = ("_data", "_offsets")
+
+    def __init__(self, data, offsets):
+        """
+        Args:
+            data (memoryview): UTF-8 bytes of every string
+            offsets (memoryview): Start of each string, plus the end of the last
+        """
+        self._data = data
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, string_id):
+        return str(self._data[self._offsets[string_id]:self._offsets[string_id + 1]], "utf-8")
+
+
+class MappedStrings(Sequence):
+    """Read-only run of consecutive entries of a StringTable."""
+
+    __slots__ = ("_table", "_start", "_count")
+
+    def __init__(self, table, start, count):
+        self._table = table
+        self._start = start
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return tuple(self[j] for j in range(*i.indices(self._count)))
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("string index out of range")
+        return self._table[self._start + i]
+
+    def __repr__(self):
+        return f"MappedStrings({list(self)!r})"
+
+
+def compile_knowledge_base(path, evidence_weights=EVIDENCE_WEIGHTS, rebuttals=REBUTTALS, version=1):
+    """
+    Compile tables into a knowledge base file, replacing it atomically.
+
+    Args:
+        path (str): File to write
+        evidence_weights (dict): Mapping of category name to a dict with
+            "keywords", "weight" and "description" entries
+        rebuttals (dict): Mapping of category name to rebuttal lines
+        version (int): Version number stored in the file
+
+    Returns:
+        KnowledgeBase: The compiled tables
+
+    Raises:
+        ValueError: If the tables are invalid, see ``KnowledgeBase``; the
+            file is left as it was
+    """
+    knowledge_base = KnowledgeBase(evidence_weights, rebuttals, version)
+    pattern, best, always = knowledge_base.keyword_index.compiled()
+    strings = []
+
+    def add(text):
+        strings.append(text)
+        return len(strings) - 1
+
+    categories = array("i")
+    for category in knowledge_base.categories:
+        data = knowledge_base.evidence_weights[category]
+        lines = knowledge_base.rebuttals[category]
+        name_id = add(category)
+        description_id = add(data["description"])
+        first_keyword = len(strings)
+        for keyword in data["keywords"]:
+            add(keyword)
+        first_rebuttal = len(strings)
+        for line in lines:
+            add(line)
+        categories.extend((name_id, description_id, data["weight"], first_keyword,
+                           len(data["keywords"]), first_rebuttal, len(lines)))
+    index = array("i")
+    for keyword, (weight, order) in best.items():
+        index.extend((add(keyword), weight, -order))
+    pattern_id = add(pattern)
+
+    encoded = [text.encode("utf-8") for text in strings]
+    offsets = array("I", [0])
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    always_weight, always_order = always if always is not None else (0, 0)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, version, len(knowledge_base.categories), len(strings),
+                          len(best), pattern_id, always is not None, always_weight, -always_order)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(offsets.tobytes())
+        f.write(categories.tobytes())
+        f.write(index.tobytes())
+        f.write(b"".join(encoded))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return knowledge_base
+
+
+def read_version(path):
+    """
+    Read the version number of a knowledge base file.
+
+    Args:
+        path (str): Compiled knowledge base file
+
+    Returns:
+        int: The version, or None if the file is missing or not compiled
+    """
+    try:
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+    except FileNotFoundError:
+        return None
+    if len(header) < _HEADER.size or header[:len(MAGIC)] != MAGIC:
+        return None
+    return _HEADER.unpack(header)[2]
+
+
+def load_knowledge_base(path):
+    """
+    Map a compiled knowledge base file.
+
+    Args:
+        path (str): File written by ``compile_knowledge_base``
+
+    Returns:
+        KnowledgeBase: Tables backed by the mapping
+    """
+    with open(path, "rb") as f:
+        view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    if len(view) < _HEADER.size:
+        raise ValueError(f"{path} is not a compiled knowledge base")
+    (magic, format_version, version, category_count, string_count, index_count,
+     pattern_id, has_always, always_weight, always_order) = _HEADER.unpack_from(view)
+    if magic != MAGIC or format_version != FORMAT_VERSION:
+        raise ValueError(f"{path} is not a compiled knowledge base")
+
+    position = _HEADER.size
+    sections = []
+    for count in (string_count + 1, category_count * _CATEGORY_FIELDS, index_count * _INDEX_FIELDS):
+        sections.append(view[position:position + 4 * count].cast("I" if not sections else "i"))
+        position += 4 * count
+    offsets, category_rows, index_rows = sections
+    strings = StringTable(view[position:], offsets)
+
+    evidence_weights = {}
+    rebuttals = {}
+    for row in range(0, len(category_rows), _CATEGORY_FIELDS):
+        (name_id, description_id, weight, first_keyword, keyword_count,
+         first_rebuttal, rebuttal_count) = category_rows[row:row + _CATEGORY_FIELDS]
+        category = strings[name_id]
+        evidence_weights[category] = MappingProxyType({
+            "keywords": MappedStrings(strings, first_keyword, keyword_count),
+            "weight": weight,
+            "description": strings[description_id]
+        })
+        rebuttals[category] = MappedStrings(strings, first_rebuttal, rebuttal_count)
+    best = {
+        strings[index_rows[row]]: (index_rows[row + 1], -index_rows[row + 2])
+        for row in range(0, len(index_rows), _INDEX_FIELDS)
+    }
+    always = (always_weight, -always_order) if has_always else None
+    keyword_index = KeywordIndex.from_compiled(tuple(evidence_weights), strings[pattern_id], best, always)
+    return KnowledgeBase.from_compiled(MappingProxyType(evidence_weights), MappingProxyType(rebuttals),
+                                       keyword_index, version)
+
+
+class KnowledgeBaseReloader:
+    """
+    Installs new versions of a compiled knowledge base file as they appear.
+
+    The new file is loaded on the reloader's thread and then installed in
+    one assignment, so requests never wait for a reload.
+    """
+
+    def __init__(self, path, interval=1.0):
+        """
+        Args:
+            path (str): Compiled knowledge base file to watch
+            interval (float): Seconds between checks
+        """
+        self.path = path
+        self.interval = interval
+        self.reloads = 0
+        self.errors = 0
+        self.last_reload_seconds = None
+        self._signature = self._stat()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def check(self):
+        """
+        Install the file if it changed since the last check.
+
+        Returns:
+            bool: True if a new version was installed
+        """
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return False
+        began = time.perf_counter()
+        try:
+            knowledge_base = load_knowledge_base(self.path)
+        except (OSError, ValueError) as e:
+            print(f"Error reloading knowledge base: {e}")
+            self.errors += 1
+            return False
+        install_knowledge_base(knowledge_base)
+        self._signature = signature
+        self.reloads += 1
+        self.last_reload_seconds = time.perf_counter() - began
+        return True
+
+    def start(self):
+        """Start checking in a background thread."""
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="knowledge-reloader", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop checking."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.check()
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(prog="python -m flat_earth_game.knowledge_file",
+                                     description="Compile a knowledge base file.")
+    parser.add_argument("output", help="knowledge base file to write")
+    parser.add_argument("--source", help="JSON file with evidence_weights and rebuttals")
+    parser.add_argument("--version", type=int, help="version number; one more than the current file by default")
+    args = parser.parse_args(argv)
+
+    evidence_weights, rebuttals = EVIDENCE_WEIGHTS, REBUTTALS
+    if args.source:
+        with open(args.source, "r") as f:
+            tables = json.load(f)
+        evidence_weights, rebuttals = tables["evidence_weights"], tables["rebuttals"]
+    version = args.version if args.version is not None else (read_version(args.output) or 0) + 1
+    try:
+        knowledge_base = compile_knowledge_base(args.output, evidence_weights, rebuttals, version)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Wrote version {version} with {len(knowledge_base.categories)} categories to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,460 @@
+"""
+Player rankings kept up to date as games finish and tokens move.
+
+``Leaderboard`` ranks players by an integer number of points and answers
+top-N and rank-of-player queries in O(log n) from memory. ``Leaderboards``
+keeps two of them: best game score, fed by won games and ``GameCompleted``
+events, and token balance, fed by ``Transfer`` events.
+"""
+
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+
+from .balance_cache import topic_address
+
+ZERO_ADDRESS = "0x" + "0" * 40
+
+# Low bits of a score board entry hold the attempts, so fewer attempts rank higher
+ATTEMPT_BITS = 16
+ATTEMPT_MASK = (1 << ATTEMPT_BITS) - 1
+
+BOARDS = ("score", "tokens")
+
+# FlatEarthToken amounts are in units of 10 ** -18 tokens
+TOKEN_DECIMALS = 18
+
+
+def decode_game_completed(log):
+    """
+    Decode a ``GameCompleted(address player, uint256 score, uint256 tokens)`` log.
+
+    Args:
+        log (dict): Raw log as returned by ``eth_getLogs``
+
+    Returns:
+        tuple: (player_address, score, tokens)
+    """
+    data = log["data"]
+    if not isinstance(data, str):
+        data = "0x" + bytes(data).hex()
+    data = data[2:]
+    return "0x" + data[24:64], int(data[64:128], 16), int(data[128:192], 16)
+
+
+class RankIndex:
+    """
+    Sorted set of 64-bit integers with positional lookups.
+
+    Values are kept in ascending blocks of packed ``array("q")`` holding
+    between 1 and ``2 * load`` entries, with the largest value of each block
+    in a separate list to find the right block by bisection. A Fenwick tree
+    over the block sizes counts the values before any block, so ranks and
+    positions are found in O(log n); an insert or removal also moves at
+    most ``2 * load`` packed entries. Each value costs 8 bytes.
+    """
+
+    def __init__(self, values=(), load=1024):
+        """
+        Args:
+            values (iterable): Distinct values to start with
+            load (int): Target block size
+        """
+        self.load = load
+        values = sorted(values)
+        self._blocks = [array("q", values[start:start + load]) for start in range(0, len(values), load)]
+        self._maxes = [block[-1] for block in self._blocks]
+        self._tree = None  # rebuilt after blocks are split or dropped
+        self._len = len(values)
+
+    def __len__(self):
+        return self._len
+
+    def _fenwick(self):
+        tree = self._tree
+        if tree is None:
+            tree = self._tree = [len(block) for block in self._blocks]
+            for i in range(len(tree)):
+                parent = i | (i + 1)
+                if parent < len(tree):
+                    tree[parent] += tree[i]
+        return tree
+
+    def _adjust(self, i, delta):
+        tree = self._tree
+        if tree is not None:
+            while i < len(tree):
+                tree[i] += delta
+                i |= i + 1
+
+    def _before(self, i):
+        """Count the values in the blocks before block ``i``."""
+        tree = self._fenwick()
+        total = 0
+        while i > 0:
+            total += tree[i - 1]
+            i &= i - 1
+        return total
+
+    def add(self, value):
+        """
+        Insert a value that is not in the set.
+
+        Args:
+            value (int): Value to insert
+        """
+        if not self._blocks:
+            self._blocks.append(array("q", [value]))
+            self._maxes.append(value)
+            self._tree = None
+            self._len = 1
+            return
+        i = bisect_left(self._maxes, value)
+        if i == len(self._blocks):
+            i -= 1
+        block = self._blocks[i]
+        block.insert(bisect_right(block, value), value)
+        self._maxes[i] = block[-1]
+        self._len += 1
+        if len(block) > 2 * self.load:
+            self._blocks[i:i + 1] = [block[:self.load], block[self.load:]]
+            self._maxes[i:i + 1] = [block[self.load - 1], block[-1]]
+            self._tree = None
+        else:
+            self._adjust(i, 1)
+
+    def remove(self, value):
+        """
+        Remove a value from the set.
+
+        Args:
+            value (int): Value to remove
+
+        Raises:
+            KeyError: If the value is not in the set
+        """
+        i = bisect_left(self._maxes, value)
+        if i == len(self._blocks):
+            raise KeyError(value)
+        block = self._blocks[i]
+        position = bisect_left(block, value)
+        if block[position] != value:
+            raise KeyError(value)
+        del block[position]
+        self._len -= 1
+        if block:
+            self._maxes[i] = block[-1]
+            self._adjust(i, -1)
+        else:
+            del self._blocks[i]
+            del self._maxes[i]
+            self._tree = None
+
+    def count_below(self, value):
+        """
+        Count the values smaller than ``value``.
+
+        Args:
+            value (int): Value to compare with
+
+        Returns:
+            int: Number of smaller values
+        """
+        i = bisect_left(self._maxes, value)
+        if i == len(self._blocks):
+            return self._len
+        return self._before(i) + bisect_left(self._blocks[i], value)
+
+    def descending(self, offset=0):
+        """
+        Iterate over the values from largest to smallest.
+
+        Args:
+            offset (int): Number of largest values to skip
+
+        Yields:
+            int: Values in descending order
+        """
+        if offset >= self._len:
+            return
+        # Find the block holding the value with ascending position ``start``
+        start = self._len - 1 - offset
+        tree = self._fenwick()
+        i = 0
+        step = 1 << max(len(tree) - 1, 0).bit_length()
+        while step:
+            if i + step <= len(tree) and tree[i + step - 1] <= start:
+                i += step
+                start -= tree[i - 1]
+            step >>= 1
+        blocks = self._blocks
+        for value in reversed(blocks[i][:start + 1]):
+            yield value
+        for j in range(i - 1, -1, -1):
+            yield from reversed(blocks[j])
+
+
+class Leaderboard:
+    """
+    Ranks players by points, highest first.
+
+    Each player gets a slot number the first time it is seen. A player's
+    entry in the ``RankIndex`` packs its points above the slot bits, so
+    equal points are ordered by slot and the player seen first ranks
+    higher. Up to ``2 ** slot_bits`` players can be ranked, with points
+    below ``2 ** (63 - slot_bits)``.
+    """
+
+    def __init__(self, slot_bits=24, load=1024, normalize=str.lower):
+        """
+        Args:
+            slot_bits (int): Bits of each entry used for the player's slot
+            load (int): Block size of the rank index
+            normalize (callable): Maps a player address to its key
+        """
+        self.slot_bits = slot_bits
+        self.max_points = (1 << (63 - slot_bits)) - 1
+        self.normalize = normalize
+        self._slot_mask = (1 << slot_bits) - 1
+        self._slots = {}  # player -> slot
+        self._players = []  # slot -> player
+        self._points = array("q")  # slot -> points
+        self._index = RankIndex(load=load)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._players)
+
+    def _entry(self, slot, points):
+        return (points << self.slot_bits) | (self._slot_mask - slot)
+
+    def _update(self, player, points, combine):
+        """Apply ``combine(old, points)`` to a player's points."""
+        player = self.normalize(player)
+        with self._lock:
+            slot = self._slots.get(player)
+            if slot is None:
+                slot = len(self._players)
+                if slot > self._slot_mask:
+                    raise OverflowError(f"Leaderboard is full at {slot} players")
+                self._slots[player] = slot
+                self._players.append(player)
+                self._points.append(0)
+                old = None
+            else:
+                old = self._points[slot]
+            new = min(max(combine(old, points), 0), self.max_points)
+            if new == old:
+                return new
+            if old is not None:
+                self._index.remove(self._entry(slot, old))
+            self._index.add(self._entry(slot, new))
+            self._points[slot] = new
+            return new
+
+    def set(self, player, points):
+        """
+        Set a player's points.
+
+        Args:
+            player (str): Player address
+            points (int): New points, clamped to 0 and ``max_points``
+
+        Returns:
+            int: The player's points
+        """
+        return self._update(player, points, lambda old, new: new)
+
+    def add(self, player, delta):
+        """
+        Add to a player's points, starting from 0.
+
+        Args:
+            player (str): Player address
+            delta (int): Points to add; may be negative
+
+        Returns:
+            int: The player's points
+        """
+        return self._update(player, delta, lambda old, delta: (old or 0) + delta)
+
+    def record_best(self, player, points):
+        """
+        Raise a player's points if ``points`` is higher.
+
+        Args:
+            player (str): Player address
+            points (int): Points from one result
+
+        Returns:
+            int: The player's points
+        """
+        return self._update(player, points, lambda old, new: new if old is None else max(old, new))
+
+    def points(self, player):
+        """
+        Get a player's points.
+
+        Args:
+            player (str): Player address
+
+        Returns:
+            int: The points, or None if the player is not ranked
+        """
+        slot = self._slots.get(self.normalize(player))
+        return None if slot is None else self._points[slot]
+
+    def rank(self, player):
+        """
+        Get a player's position on the board.
+
+        Args:
+            player (str): Player address
+
+        Returns:
+            int: 1 for the top player, or None if the player is not ranked
+        """
+        with self._lock:
+            slot = self._slots.get(self.normalize(player))
+            if slot is None:
+                return None
+            return len(self._index) - self._index.count_below(self._entry(slot, self._points[slot]))
+
+    def top(self, limit, offset=0):
+        """
+        Get the highest ranked players.
+
+        Args:
+            limit (int): Maximum number of players returned
+            offset (int): Number of higher ranked players to skip
+
+        Returns:
+            list: (player, points) pairs, best first
+        """
+        players, mask, shift = self._players, self._slot_mask, self.slot_bits
+        entries = []
+        with self._lock:
+            for entry in self._index.descending(offset):
+                if len(entries) == limit:
+                    break
+                entries.append(entry)
+        return [(players[mask - (entry & mask)], entry >> shift) for entry in entries]
+
+
+class Leaderboards:
+    """
+    Game score and token balance rankings.
+
+    The score board ranks each player's best won game by credibility score,
+    then by fewest attempts; a game known only from a ``GameCompleted``
+    event ranks after games with the same score whose attempts are known.
+    The token board sums the player's ``Transfer`` events, so it holds the
+    balance when the events are followed from the token's first block. Exact
+    balances are kept in base units and ranked in whole tokens, which fit
+    the board's points however many tokens a player holds.
+    """
+
+    def __init__(self, slot_bits=24, load=1024, token_decimals=TOKEN_DECIMALS):
+        """
+        Args:
+            slot_bits (int): Bits of each entry used for the player's slot
+            load (int): Block size of the rank indexes
+            token_decimals (int): Decimals of the token's base unit
+        """
+        self.scores = Leaderboard(slot_bits, load)
+        self.tokens = Leaderboard(slot_bits, load)
+        self.token_unit = 10 ** token_decimals
+        self._balances = {}  # address -> balance in base units
+        self._balances_lock = threading.Lock()
+
+    def board(self, name):
+        """
+        Get a board by name.
+
+        Args:
+            name (str): "score" or "tokens"
+
+        Returns:
+            Leaderboard: The board
+        """
+        return self.scores if name == "score" else self.tokens
+
+    def record_game(self, player, score, attempts=None):
+        """
+        Rank a won game.
+
+        Args:
+            player (str): Player address
+            score (int): Final credibility score
+            attempts (int): Arguments the game took; None when unknown
+        """
+        low = 0 if attempts is None else ATTEMPT_MASK - min(attempts, ATTEMPT_MASK - 1)
+        score = min(max(score, 0), self.scores.max_points >> ATTEMPT_BITS)
+        self.scores.record_best(player, (score << ATTEMPT_BITS) | low)
+
+    def on_game_completed(self, log):
+        """
+        Rank the game in a ``GameCompleted`` log.
+
+        Args:
+            log (dict): Raw log as returned by ``eth_getLogs``
+        """
+        player, score, _ = decode_game_completed(log)
+        self.record_game(player, score)
+
+    def on_transfer(self, log):
+        """
+        Move tokens between the players in a ``Transfer(address,address,uint256)`` log.
+
+        Args:
+            log (dict): Raw log as returned by ``eth_getLogs``
+        """
+        data = log["data"]
+        if not isinstance(data, str):
+            data = "0x" + bytes(data).hex()
+        value = int(data[2:] or "0", 16)
+        sender, receiver = (topic_address(topic) for topic in log["topics"][1:3])
+        with self._balances_lock:
+            for player, delta in ((sender, -value), (receiver, value)):
+                if player != ZERO_ADDRESS:
+                    balance = self._balances[player] = self._balances.get(player, 0) + delta
+                    self.tokens.set(player, balance // self.token_unit)
+
+    def _describe(self, name, points):
+        if name == "tokens":
+            return {"tokens": points}
+        low = points & ATTEMPT_MASK
+        return {"score": points >> ATTEMPT_BITS, "attempts": ATTEMPT_MASK - low if low else None}
+
+    def top(self, name, limit, offset=0):
+        """
+        Get a page of a board.
+
+        Args:
+            name (str): "score" or "tokens"
+            limit (int): Maximum number of players returned
+            offset (int): Number of higher ranked players to skip
+
+        Returns:
+            list: One dict per player with its rank, address and points
+        """
+        return [dict(self._describe(name, points), rank=offset + i + 1, address=player)
+                for i, (player, points) in enumerate(self.board(name).top(limit, offset))]
+
+    def standing(self, player):
+        """
+        Get a player's rank and points on every board.
+
+        Args:
+            player (str): Player address
+
+        Returns:
+            dict: Board name -> rank and points, or None where unranked
+        """
+        standing = {}
+        for name in BOARDS:
+            board = self.board(name)
+            rank = board.rank(player)
+            points = board.points(player)
+            standing[name] = None if rank is None else dict(self._describe(name, points), rank=rank)
+        return standing
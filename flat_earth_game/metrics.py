@@ -0,0 +1,376 @@
+"""
+Timing spans, latency histograms and a sampling profiler.
+
+Spans record how long instrumented code takes into per-name histograms,
+rendered in the Prometheus text format by ``render_prometheus``. Spans are
+off until ``enable`` is called; while off, a ``timed`` function costs one
+extra call and a flag check, and a ``span`` block a shared no-op object.
+"""
+
+import bisect
+import functools
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import Counter
+
+# Upper bounds in seconds, from 1 microsecond to 10 seconds
+DEFAULT_BUCKETS = (
+    1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+    1e-3, 2.5e-3, 5e-3, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+METRIC_NAME = "flat_earth_span_seconds"
+
+enabled = False
+
+
+class _ThreadToken:
+    """Weakly referenceable marker whose collection means its thread exited."""
+
+    __slots__ = ("__weakref__",)
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram.
+
+    Every thread counts into its own shard, so recording takes no lock;
+    ``snapshot`` adds the shards up. When a thread exits its shard is folded
+    into a shared total, so a server running a thread per request keeps a
+    shard only per live thread.
+    """
+
+    __slots__ = ("name", "bounds", "_local", "_shards", "_retired", "_lock")
+
+    def __init__(self, name, bounds=DEFAULT_BUCKETS):
+        """
+        Args:
+            name (str): Span name
+            bounds (tuple): Sorted bucket upper bounds in seconds
+        """
+        self.name = name
+        self.bounds = bounds
+        self._local = threading.local()
+        self._shards = {}  # id -> shard of a live thread
+        self._retired = [0] * (len(bounds) + 1) + [0.0]  # shards of exited threads
+        self._lock = threading.Lock()
+
+    @property
+    def count(self):
+        with self._lock:
+            shards = [self._retired] + list(self._shards.values())
+        return sum(sum(shard[:-1]) for shard in shards)
+
+    def observe(self, seconds):
+        """
+        Record one duration.
+
+        Args:
+            seconds (float): Duration to record
+        """
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard[bisect.bisect_left(self.bounds, seconds)] += 1
+        shard[-1] += seconds
+
+    def snapshot(self):
+        """
+        Get cumulative bucket counts.
+
+        Returns:
+            tuple: (list of (upper bound, cumulative count), sum, count);
+                the last bound is ``float("inf")``
+        """
+        with self._lock:
+            shards = [self._retired] + list(self._shards.values())
+        totals = [sum(column) for column in zip(*shards)]
+        cumulative = []
+        running = 0
+        for bound, bucket in zip(self.bounds + (float("inf"),), totals):
+            running += bucket
+            cumulative.append((bound, running))
+        return cumulative, totals[-1], running
+
+    def _new_shard(self):
+        # One count per bucket, one for overflow, then the running sum
+        shard = self._local.shard = [0] * (len(self.bounds) + 1) + [0.0]
+        # The thread-local drops the token when the thread exits
+        token = self._local.token = _ThreadToken()
+        with self._lock:
+            self._shards[id(shard)] = shard
+        weakref.finalize(token, self._retire, shard)
+        return shard
+
+    def _retire(self, shard):
+        """Fold an exited thread's shard into the shared total."""
+        with self._lock:
+            if self._shards.pop(id(shard), None) is not None:
+                self._retired = [total + value for total, value in zip(self._retired, shard)]
+
+
+class Registry:
+    """
+    Histograms by span name.
+    """
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name):
+        """
+        Get the histogram for a span, creating it on first use.
+
+        Args:
+            name (str): Span name
+
+        Returns:
+            Histogram: The span's histogram
+        """
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, Histogram(name, self.bounds))
+        return histogram
+
+    def histograms(self):
+        """
+        Get every histogram, ordered by span name.
+
+        Returns:
+            list: Histograms
+        """
+        with self._lock:
+            return [self._histograms[name] for name in sorted(self._histograms)]
+
+    def clear(self):
+        """Drop every histogram."""
+        with self._lock:
+            self._histograms.clear()
+
+
+registry = Registry()
+
+
+def enable():
+    """Start recording spans."""
+    global enabled
+    enabled = True
+
+
+def disable():
+    """Stop recording spans."""
+    global enabled
+    enabled = False
+
+
+def observe(name, seconds):
+    """
+    Record a duration measured elsewhere, such as a whole HTTP request.
+
+    Args:
+        name (str): Span name
+        seconds (float): Duration to record
+    """
+    if enabled:
+        registry.histogram(name).observe(seconds)
+
+
+def timed(name):
+    """
+    Decorate a function so every call is recorded as a span.
+
+    Args:
+        name (str): Span name
+
+    Returns:
+        callable: Decorator
+    """
+    def decorate(func):
+        histogram = registry.histogram(name)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            began = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - began)
+        return wrapper
+    return decorate
+
+
+class _Span:
+    __slots__ = ("histogram", "began")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.began = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.began)
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name):
+    """
+    Time a block of code as a span::
+
+        with span("quai.wait_for_receipt"):
+            ...
+
+    Args:
+        name (str): Span name
+
+    Returns:
+        A context manager
+    """
+    if not enabled:
+        return _NO_SPAN
+    return _Span(registry.histogram(name))
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+def render_prometheus(gauges=None):
+    """
+    Render every span histogram in the Prometheus text format.
+
+    Args:
+        gauges (dict): Extra gauges to include, metric name -> value
+
+    Returns:
+        str: Exposition text
+    """
+    lines = [
+        f"# HELP {METRIC_NAME} Time spent in instrumented game and chain code",
+        f"# TYPE {METRIC_NAME} histogram"
+    ]
+    for histogram in registry.histograms():
+        buckets, total, count = histogram.snapshot()
+        if not count:
+            continue
+        label = histogram.name.replace("\\", "\\\\").replace('"', '\\"')
+        for bound, cumulative in buckets:
+            lines.append(f'{METRIC_NAME}_bucket{{span="{label}",le="{_format_bound(bound)}"}} {cumulative}')
+        lines.append(f'{METRIC_NAME}_sum{{span="{label}"}} {total!r}')
+        lines.append(f'{METRIC_NAME}_count{{span="{label}"}} {count}')
+    for name, value in sorted((gauges or {}).items()):
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {float(value)!r}")
+    return "\n".join(lines) + "\n"
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler that samples every thread's stack at an interval.
+
+    Samples are aggregated as collapsed stacks ("outer;inner count" lines),
+    the input format of flame graph tools. The sampler runs in its own
+    thread and touches nothing else, so it can be switched on in production
+    to see where a busy process spends its time.
+    """
+
+    def __init__(self, interval=0.01, max_depth=64):
+        """
+        Args:
+            interval (float): Seconds between samples
+            max_depth (int): Innermost frames kept per stack
+        """
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self._stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        """Start sampling in a background thread."""
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop sampling; collected stacks are kept."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def sample(self):
+        """Record the current stack of every other thread once."""
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            self._stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def collapsed(self, limit=None):
+        """
+        Get the sampled stacks, most frequent first.
+
+        Args:
+            limit (int): Maximum number of stacks returned
+
+        Returns:
+            str: One "frame;frame;frame count" line per distinct stack
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common(limit))
+
+    def clear(self):
+        """Drop every collected sample."""
+        self._stacks.clear()
+        self.samples = 0
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+
+profiler = SamplingProfiler(float(os.getenv("PROFILER_INTERVAL", 0.01)))
+
+
+def configure_from_env():
+    """Enable spans unless METRICS_ENABLED is false, and start the profiler if PROFILER is set."""
+    if os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no"):
+        enable()
+    if os.getenv("PROFILER", "").lower() in ("1", "true", "yes"):
+        profiler.start()
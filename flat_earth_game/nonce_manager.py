@@ -0,0 +1,325 @@
+"""
+Local nonce allocation for transactions sent from the game owner account.
+
+Left to the node, every owner-signed call asks for the account's next nonce
+when it is sent, so concurrent workers either wait on each other or pick the
+same nonce. ``NonceManager`` hands out nonces itself, so any number of
+transactions can be in flight at once, and keeps them moving:
+
+- a nonce whose send failed is handed to the next transaction, and filled
+  with an empty self-transfer if none comes, so later transactions are not
+  held behind the gap
+- a transaction the node dropped is sent again
+- the oldest unmined transaction is resent with a higher gas price once it
+  has waited ``stuck_after`` seconds
+- after a restart, or when the node reports a nonce as used, the next nonce
+  is read back from the node's pending transaction count
+
+A manager must be the only sender for its account. ``check`` takes any
+nonce it did not hand out for a gap and fills it, so a second manager in
+another process (a cluster worker, or another Flask worker) would fill or
+replace that process's transactions. Run several serving processes with
+one owner account only if a single one of them sends owner transactions.
+"""
+
+import heapq
+import threading
+import time
+
+# Node error messages meaning a nonce is already taken by a pending transaction
+TAKEN_ERRORS = ("already known", "replacement transaction underpriced", "known transaction")
+
+
+def _is_nonce_too_low(error):
+    return "nonce too low" in str(error).lower()
+
+
+def _is_taken(error):
+    message = str(error).lower()
+    return any(text in message for text in TAKEN_ERRORS)
+
+
+def _hex(tx_hash):
+    return tx_hash if isinstance(tx_hash, str) else "0x" + bytes(tx_hash).hex()
+
+
+class _Sent:
+    """An in-flight transaction and every hash sent for its nonce."""
+
+    __slots__ = ("nonce", "send", "hashes", "gas_price", "sent_at")
+
+    def __init__(self, nonce, send, tx_hash, sent_at):
+        self.nonce = nonce
+        self.send = send
+        self.hashes = [tx_hash]
+        self.gas_price = None
+        self.sent_at = sent_at
+
+
+class NonceManager:
+    """
+    Hands out nonces for one sending account and tracks what is in flight.
+
+    Transactions are sent through ``send`` with a callable that takes the
+    transaction fields to use ("from", "nonce" and, when speeding it up,
+    "gasPrice") and returns the hash, such as a contract function's
+    ``transact``. ``check`` looks for gaps and stuck transactions; ``start``
+    runs it in the background. Only one manager per account may send, see
+    the module docstring.
+    """
+
+    def __init__(self, rpc, address, stuck_after=60.0, bump=1.125, on_replaced=None,
+                 clock=time.monotonic):
+        """
+        Args:
+            rpc (callable): Makes one JSON-RPC call from a method and params,
+                such as ``RPCTransport.call``
+            address (str): Sending account
+            stuck_after (float): Seconds the next transaction to be mined may
+                wait before it is resent with a higher gas price
+            bump (float): Gas price multiplier for a replacement; nodes
+                require at least 1.1
+            on_replaced (callable): Called with (old hash, new hash) when a
+                transaction is resent
+            clock (callable): Returns the current time in seconds
+        """
+        self.rpc = rpc
+        self.address = address
+        self.stuck_after = stuck_after
+        self.bump = bump
+        self.on_replaced = on_replaced
+        self.clock = clock
+        self.replacements = 0
+        self.gaps_filled = 0
+        self.resyncs = 0
+        self._next = None  # next nonce never handed out
+        self._free = []  # heap of released nonces below _next
+        self._sending = set()  # nonces handed out whose send has not returned
+        self._in_flight = {}  # nonce -> _Sent
+        self._by_hash = {}  # tx hash -> _Sent
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._in_flight)
+
+    def _count(self, block):
+        return int(self.rpc("eth_getTransactionCount", [self.address, block]), 16)
+
+    def sync(self):
+        """
+        Read the account's nonces back from the node.
+
+        Forgets transactions that have been mined and moves the next nonce up
+        to the node's pending count. Called before the first send, so a
+        restarted process continues after the transactions it sent before.
+        """
+        latest = self._count("latest")
+        pending = self._count("pending")
+        with self._lock:
+            self._confirm(latest)
+            if self._next is None or pending > self._next:
+                self._next = pending
+            self._free = [nonce for nonce in self._free if nonce >= latest]
+            heapq.heapify(self._free)
+        self.resyncs += 1
+
+    def _confirm(self, latest):
+        """Forget in-flight transactions with a nonce below ``latest``."""
+        for nonce in [nonce for nonce in self._in_flight if nonce < latest]:
+            for tx_hash in self._in_flight.pop(nonce).hashes:
+                self._by_hash.pop(tx_hash, None)
+
+    def _allocate(self):
+        if self._next is None:
+            self.sync()
+        with self._lock:
+            if self._free:
+                nonce = heapq.heappop(self._free)
+            else:
+                nonce = self._next
+                self._next += 1
+            self._sending.add(nonce)
+            return nonce
+
+    def _release(self, nonce):
+        with self._lock:
+            self._sending.discard(nonce)
+            heapq.heappush(self._free, nonce)
+
+    def send(self, send):
+        """
+        Send a transaction with the next free nonce.
+
+        Args:
+            send (callable): Sends the transaction with the given fields and
+                returns its hash
+
+        Returns:
+            str: The transaction hash
+
+        Raises:
+            Exception: Whatever ``send`` raised, once its nonce is released
+        """
+        resynced = 0
+        while True:
+            nonce = self._allocate()
+            try:
+                tx_hash = _hex(send({"from": self.address, "nonce": nonce}))
+            except Exception as e:
+                if _is_taken(e):
+                    with self._lock:
+                        self._sending.discard(nonce)
+                    continue  # sent before a restart; the nonce stays used
+                if _is_nonce_too_low(e) and resynced < 3:
+                    with self._lock:
+                        self._sending.discard(nonce)
+                    resynced += 1
+                    self.sync()
+                    continue
+                self._release(nonce)
+                raise
+            sent = _Sent(nonce, send, tx_hash, self.clock())
+            with self._lock:
+                self._sending.discard(nonce)
+                self._in_flight[nonce] = sent
+                self._by_hash[tx_hash] = sent
+            return tx_hash
+
+    def check(self):
+        """
+        Forget mined transactions, then fix the first gap or stuck transaction.
+
+        Returns:
+            str: What was done: "filled", "resent", "sped up", or None
+        """
+        latest = self._count("latest")
+        pending = self._count("pending")
+        with self._lock:
+            self._confirm(latest)
+            self._free = [nonce for nonce in self._free if nonce >= latest]
+            heapq.heapify(self._free)
+            if self._next is None or latest >= self._next:
+                return None
+            if pending < self._next:
+                # The node is missing this nonce, so everything after waits
+                missing = pending
+                if missing in self._sending:
+                    return None
+                sent = self._in_flight.get(missing)
+                if sent is None and missing in self._free:
+                    self._free.remove(missing)
+                    heapq.heapify(self._free)
+            else:
+                missing = None
+                sent = self._in_flight.get(latest)
+                if sent is None or self.clock() - sent.sent_at < self.stuck_after:
+                    return None
+        if missing is not None and sent is None:
+            self._fill(missing)
+            return "filled"
+        self._speed_up(sent)
+        return "resent" if missing is not None else "sped up"
+
+    def _fill(self, nonce):
+        """Use up a nonce with an empty transfer to the account itself."""
+        try:
+            self.rpc("eth_sendTransaction", [{"from": self.address, "to": self.address,
+                                              "value": "0x0", "nonce": hex(nonce)}])
+        except Exception as e:
+            if not _is_taken(e) and not _is_nonce_too_low(e):
+                self._release(nonce)
+                raise
+        self.gaps_filled += 1
+
+    def _speed_up(self, sent):
+        """Resend a transaction with the same nonce and a higher gas price."""
+        market = int(self.rpc("eth_gasPrice", []), 16)
+        gas_price = market if sent.gas_price is None else max(market, int(sent.gas_price * self.bump) + 1)
+        try:
+            tx_hash = _hex(sent.send({"from": self.address, "nonce": sent.nonce, "gasPrice": gas_price}))
+        except Exception as e:
+            if _is_nonce_too_low(e):
+                return  # mined in the meantime
+            if not _is_taken(e):
+                raise
+            # The market price is no higher than before; outbid ourselves
+            gas_price = int((sent.gas_price or market) * self.bump) + 1
+            tx_hash = _hex(sent.send({"from": self.address, "nonce": sent.nonce, "gasPrice": gas_price}))
+        with self._lock:
+            old_hash = sent.hashes[-1]
+            sent.hashes.append(tx_hash)
+            sent.gas_price = gas_price
+            sent.sent_at = self.clock()
+            self._by_hash[tx_hash] = sent
+        self.replacements += 1
+        if self.on_replaced is not None:
+            self.on_replaced(old_hash, tx_hash)
+
+    def hashes(self, tx_hash):
+        """
+        Get every hash sent for the same nonce as a transaction.
+
+        Args:
+            tx_hash (str): Hash returned by ``send``
+
+        Returns:
+            list: Hashes in the order they were sent; any one may be mined
+        """
+        tx_hash = _hex(tx_hash)
+        with self._lock:
+            sent = self._by_hash.get(tx_hash)
+            return list(sent.hashes) if sent is not None else [tx_hash]
+
+    def wait_for_receipt(self, tx_hash, timeout=120, poll_interval=0.5):
+        """
+        Wait for a transaction, or one of its replacements, to be mined.
+
+        Args:
+            tx_hash (str): Hash returned by ``send``
+            timeout (float): Maximum seconds to wait
+            poll_interval (float): Seconds between receipt lookups
+
+        Returns:
+            dict: The mined transaction's receipt
+
+        Raises:
+            TimeoutError: If nothing was mined in time
+        """
+        tx_hash = _hex(tx_hash)
+        with self._lock:
+            sent = self._by_hash.get(tx_hash)
+        deadline = self.clock() + timeout
+        while True:
+            # The list grows in place while the transaction is sped up
+            for candidate in (list(sent.hashes) if sent is not None else [tx_hash]):
+                receipt = self.rpc("eth_getTransactionReceipt", [candidate])
+                if receipt:
+                    return receipt
+            if self.clock() >= deadline:
+                raise TimeoutError(f"Transaction {tx_hash} was not mined in {timeout} seconds")
+            time.sleep(poll_interval)
+
+    def start(self, interval=5.0):
+        """
+        Run ``check`` every ``interval`` seconds in a background thread.
+
+        Args:
+            interval (float): Seconds between checks
+        """
+        def run():
+            while not self._stopped.wait(interval):
+                try:
+                    self.check()
+                except Exception as e:
+                    print(f"Error checking owner transactions: {e}")
+
+        self._thread = threading.Thread(target=run, name="nonce-manager", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background checks."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,271 @@
+"""
+Local index of entry-fee payments, fed by on-chain events.
+"""
+
+import json
+import os
+import threading
+import time
+
+
+def decode_game_started(log):
+    """
+    Decode a ``GameStarted(address player, uint256 sessionId)`` log.
+
+    Args:
+        log (dict): Raw log as returned by ``eth_getLogs``
+
+    Returns:
+        tuple: (player_address, session_id)
+    """
+    data = log["data"]
+    if not isinstance(data, str):
+        data = "0x" + bytes(data).hex()
+    data = data[2:]
+    return "0x" + data[24:64], int(data[64:128], 16)
+
+
+class PaymentIndex:
+    """
+    Answers "has this player paid?" from a local set of paying addresses.
+
+    The index is kept up to date by an event follower. While the follower has
+    synced recently, a miss is trusted and answered locally. Once the index is
+    more than ``max_staleness`` seconds behind, misses fall back to
+    ``fallback``, normally a ``checkPayment`` RPC call.
+    """
+
+    def __init__(self, fallback=None, max_staleness=30.0, normalize=str.lower, clock=time.monotonic):
+        """
+        Args:
+            fallback (callable): Checks a player's payment over RPC
+            max_staleness (float): Seconds after the last sync during which
+                the index alone is trusted
+            normalize (callable): Maps an address to its canonical form;
+                hex addresses are case-insensitive by default
+            clock (callable): Returns the current time in seconds
+        """
+        self.fallback = fallback
+        self.normalize = normalize
+        self.max_staleness = max_staleness
+        self.clock = clock
+        self.synced_block = None
+        self.synced_at = None
+        self.lookups = 0
+        self.fallbacks = 0
+        self._paid = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._paid)
+
+    def record(self, player_address):
+        """
+        Record that a player has paid.
+
+        Args:
+            player_address (str): Paying wallet address
+        """
+        with self._lock:
+            self._paid.add(self.normalize(player_address))
+
+    def dump(self):
+        """
+        Get the paid addresses for saving with the follower's checkpoint.
+
+        Returns:
+            list: Normalized paying addresses
+        """
+        with self._lock:
+            return sorted(self._paid)
+
+    def restore(self, paid):
+        """
+        Add addresses saved by ``dump``.
+
+        Args:
+            paid (list): Normalized paying addresses
+        """
+        with self._lock:
+            self._paid.update(paid)
+
+    def mark_synced(self, block_number=None):
+        """
+        Record that the index has caught up with the chain.
+
+        Args:
+            block_number (int): Last block whose events were indexed
+        """
+        self.synced_block = block_number
+        self.synced_at = self.clock()
+
+    def is_fresh(self):
+        """
+        Check whether the index synced within ``max_staleness`` seconds.
+
+        Returns:
+            bool: True if misses can be answered locally
+        """
+        return self.synced_at is not None and self.clock() - self.synced_at <= self.max_staleness
+
+    def lookup(self, player_address):
+        """
+        Answer a payment check from the index alone.
+
+        Args:
+            player_address (str): Player's wallet address
+
+        Returns:
+            bool: Whether the player paid, or None if the index is too stale
+                to rule a payment out
+        """
+        self.lookups += 1
+        if self.normalize(player_address) in self._paid:
+            return True
+        if self.is_fresh():
+            return False
+        return None
+
+    def verify(self, player_address):
+        """
+        Check whether a player has paid, falling back to RPC when stale.
+
+        Args:
+            player_address (str): Player's wallet address
+
+        Returns:
+            bool: True if payment verified
+        """
+        paid = self.lookup(player_address)
+        if paid is not None:
+            return paid
+        if self.fallback is None:
+            return False
+        self.fallbacks += 1
+        paid = self.fallback(player_address)
+        if paid:
+            self.record(player_address)
+        return paid
+
+
+class EventFollower:
+    """
+    Follows contract logs with ``eth_getLogs`` from a checkpointed block.
+
+    Each poll fetches the logs between the checkpoint and the latest block,
+    hands them to ``on_log``, and then advances and saves the checkpoint, so
+    a restarted follower resumes where it stopped. Whatever ``on_log`` builds
+    up must be saved with the checkpoint as ``state``, or it is lost on a
+    restart while the checkpoint says those logs were handled.
+    """
+
+    def __init__(self, rpc_batch, address, topic, on_log, on_synced=None,
+                 checkpoint_path=None, start_block=0, poll_interval=2.0, max_range=2000,
+                 state=None):
+        """
+        Args:
+            rpc_batch (callable): Sends a list of (method, params) calls as
+                one batch, such as ``RPCTransport.batch``
+            address (str): Contract address to follow
+            topic (str): Event signature topic to filter on
+            on_log (callable): Called with every matching log, in order
+            on_synced (callable): Called with the checkpoint block after
+                every successful poll
+            checkpoint_path (str): File the checkpoint is saved to
+            start_block (int): Block to start from without a checkpoint
+            poll_interval (float): Seconds between polls
+            max_range (int): Maximum number of blocks fetched per poll
+            state (object): Saved in the checkpoint file with its ``dump()``
+                and loaded back with ``restore(data)``; a checkpoint without
+                saved state is ignored, so the state is rebuilt from
+                ``start_block``
+        """
+        self.rpc_batch = rpc_batch
+        self.address = address
+        self.topic = topic
+        self.on_log = on_log
+        self.on_synced = on_synced
+        self.checkpoint_path = checkpoint_path
+        self.poll_interval = poll_interval
+        self.max_range = max_range
+        self.state = state
+        self.checkpoint = self._load_checkpoint(start_block - 1)
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def poll_once(self):
+        """
+        Fetch and handle logs up to the latest block.
+
+        Returns:
+            int: Number of logs handled
+        """
+        handled = 0
+        latest = int(self._call("eth_blockNumber", []), 16)
+        while self.checkpoint < latest:
+            from_block = self.checkpoint + 1
+            to_block = min(latest, from_block + self.max_range - 1)
+            logs = self._call("eth_getLogs", [{
+                "address": self.address,
+                "topics": [self.topic],
+                "fromBlock": hex(from_block),
+                "toBlock": hex(to_block)
+            }])
+            for log in logs:
+                self.on_log(log)
+            handled += len(logs)
+            self.checkpoint = to_block
+            self._save_checkpoint()
+        if self.on_synced is not None:
+            self.on_synced(self.checkpoint)
+        return handled
+
+    def start(self):
+        """Start polling in a background thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="event-follower", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background thread."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"Error following contract events: {e}")
+            if self._stopped.wait(self.poll_interval):
+                return
+
+    def _call(self, method, params):
+        result = self.rpc_batch([(method, params)])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def _load_checkpoint(self, default):
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, 'r') as f:
+                saved = json.load(f)
+            if self.state is None:
+                return saved["block"]
+            if "state" in saved:
+                self.state.restore(saved["state"])
+                return saved["block"]
+        return default
+
+    def _save_checkpoint(self):
+        if not self.checkpoint_path:
+            return
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            saved = {"block": self.checkpoint}
+            if self.state is not None:
+                saved["state"] = self.state.dump()
+            json.dump(saved, f)
+        os.replace(tmp_path, self.checkpoint_path)
@@ -2,9 +2,64 @@
 Quai Network integration for the Flat Earth Debate Game.
 """
 from web3 import Web3
-import json
+from web3.providers.base import JSONBaseProvider
 import os
 from dotenv import load_dotenv
+from .abi import load_abi
+from .balance_cache import BalanceCache
+from .leaderboard import Leaderboards
+from .metrics import span, timed
+from .nonce_manager import NonceManager
+from .payment_index import EventFollower, PaymentIndex, decode_game_started
+from .rpc_transport import RPCTransport
+from .tx_pipeline import TransactionPipeline
+
+GAME_COMPLETED_TOPIC = Web3.to_hex(Web3.keccak(text='GameCompleted(address,uint256,uint256)'))
+
+def count_completed(receipt, game_address: str) -> int:
+    """
+    Count the games a transaction completed from its GameCompleted logs
+    
+    Args:
+        receipt: Transaction receipt
+        game_address: Game contract address
+        
+    Returns:
+        int: Number of GameCompleted events the game contract emitted
+    """
+    return sum(
+        1 for log in receipt['logs']
+        if log['address'].lower() == game_address.lower()
+        and log['topics'] and Web3.to_hex(log['topics'][0]) == GAME_COMPLETED_TOPIC
+    )
+
+def encode_call(contract, function_name: str, args: list) -> str:
+    """
+    ABI-encode a contract function call with this web3 version's encoder
+    
+    web3 7 renamed ``encodeABI(fn_name=...)`` to ``encode_abi(abi_element_identifier=...)``.
+    
+    Args:
+        contract: Contract instance to call
+        function_name: Name of the function
+        args: Function arguments
+        
+    Returns:
+        str: Hex-encoded call data
+    """
+    if hasattr(contract, 'encode_abi'):
+        return contract.encode_abi(abi_element_identifier=function_name, args=args)
+    return contract.encodeABI(fn_name=function_name, args=args)
+
+class TransportProvider(JSONBaseProvider):
+    """Web3 provider that sends every request through a shared RPCTransport"""
+    
+    def __init__(self, transport: RPCTransport):
+        super().__init__()
+        self.transport = transport
+        
+    def make_request(self, method, params):
+        return self.transport.request(method, params)
 
 class QuaiGameContract:
     """Manages the game's blockchain operations on Quai Network"""
@@ -12,15 +67,21 @@ class QuaiGameContract:
     def __init__(self):
         load_dotenv()
         # Quai Testnet Cyprus-1 Zone RPC
-        self.w3 = Web3(Web3.HTTPProvider(os.getenv('QUAI_RPC_URL', 'https://rpc.cyprus1.testnet.quai.network')))
+        self.rpc_url = os.getenv('QUAI_RPC_URL', 'https://rpc.cyprus1.testnet.quai.network')
+        self.transport = RPCTransport(
+            self.rpc_url,
+            pool_size=int(os.getenv('RPC_POOL_SIZE', 16)),
+            timeout=float(os.getenv('RPC_TIMEOUT', 10)),
+            retries=int(os.getenv('RPC_RETRIES', 3))
+        )
+        self.w3 = Web3(TransportProvider(self.transport))
         self.game_address = os.getenv('GAME_CONTRACT_ADDRESS')
         self.token_address = os.getenv('TOKEN_CONTRACT_ADDRESS')
+        self.owner_address = os.getenv('OWNER_ADDRESS')
         
-        # Load contract ABIs
-        with open('contracts/GameABI.json', 'r') as f:
-            self.game_abi = json.load(f)
-        with open('contracts/TokenABI.json', 'r') as f:
-            self.token_abi = json.load(f)
+        # Load contract ABIs, parsed once per process
+        self.game_abi = load_abi('Game')
+        self.token_abi = load_abi('Token')
             
         # Initialize contract instances
         self.game_contract = self.w3.eth.contract(
@@ -31,27 +92,44 @@ class QuaiGameContract:
             address=self.token_address,
             abi=self.token_abi
         )
+        self._pipeline = None
+        self._nonces = None
+        self.payment_index = None
+        self._payment_follower = None
+        self.balance_cache = None
+        self._transfer_follower = None
+        self.leaderboards = None
+        self._leaderboard_followers = []
         
+    @timed("quai.verify_payment")
     def verify_payment(self, player_address: str) -> bool:
         """
         Verify that a player has paid the required QUAI
         
+        Uses the local payment index when it is enabled, and a
+        checkPayment call otherwise.
+        
         Args:
             player_address: Player's Quai wallet address
             
         Returns:
             bool: True if payment verified
         """
+        if self.payment_index is not None:
+            return self.payment_index.verify(player_address)
+        return self._check_payment(player_address)
+
+    def _check_payment(self, player_address: str) -> bool:
+        """Ask the game contract whether a player has paid"""
         try:
             required_amount = self.w3.to_wei(0.1, 'ether')  # 0.1 QUAI
-            payment_status = self.game_contract.functions.checkPayment(
-                player_address
-            ).call()
-            return payment_status
+            payment_status = self._read(self.game_contract, 'checkPayment', player_address)
+            return payment_status != 0
         except Exception as e:
             print(f"Error verifying payment: {e}")
             return False
             
+    @timed("quai.start_game_session")
     def start_game_session(self, player_address: str) -> dict:
         """
         Start a new game session
@@ -67,10 +145,13 @@ class QuaiGameContract:
                 'from': player_address,
                 'value': self.w3.to_wei(0.1, 'ether')
             })
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+            with span("quai.wait_for_receipt"):
+                receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
             session_id = self.game_contract.functions.getSessionId(
                 player_address
             ).call()
+            if self.payment_index is not None:
+                self.payment_index.record(player_address)
             return {
                 'success': True,
                 'session_id': session_id,
@@ -82,6 +163,7 @@ class QuaiGameContract:
                 'error': str(e)
             }
             
+    @timed("quai.reward_winner")
     def reward_winner(self, player_address: str, score: int) -> dict:
         """
         Send token rewards to winning player
@@ -96,11 +178,13 @@ class QuaiGameContract:
         try:
             # Calculate token reward (1 token per 10 points, max 100)
             token_amount = min(score // 10, 100)
-            tx_hash = self.game_contract.functions.rewardPlayer(
+            tx_hash = self._owner_transact(self.game_contract.functions.rewardPlayer(
                 player_address,
                 token_amount
-            ).transact()
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+            ))
+            with span("quai.wait_for_receipt"):
+                receipt = self._wait_for_receipt(tx_hash)
+            self._balance_changed(player_address)
             return {
                 'success': True,
                 'tokens_sent': token_amount,
@@ -112,6 +196,278 @@ class QuaiGameContract:
                 'error': str(e)
             }
             
+    def enable_payment_index(self, checkpoint_path: str = None, start_block: int = 0,
+                             max_staleness: float = 30.0, poll_interval: float = 2.0) -> PaymentIndex:
+        """
+        Answer verify_payment from a local index fed by GameStarted events
+        
+        Args:
+            checkpoint_path: File the last indexed block and the paid
+                addresses are saved to
+            start_block: Block to start indexing from without a checkpoint;
+                until the index has caught up, misses fall back to RPC
+            max_staleness: Seconds after the last sync during which the
+                index alone is trusted; older misses fall back to RPC
+            poll_interval: Seconds between event polls
+            
+        Returns:
+            PaymentIndex: The running payment index
+        """
+        if self.payment_index is None:
+            self.payment_index = PaymentIndex(self._check_payment, max_staleness)
+            self._payment_follower = EventFollower(
+                self.transport,
+                self.game_address,
+                Web3.to_hex(Web3.keccak(text='GameStarted(address,uint256)')),
+                on_log=lambda log: self.payment_index.record(decode_game_started(log)[0]),
+                on_synced=self.payment_index.mark_synced,
+                checkpoint_path=checkpoint_path,
+                state=self.payment_index,
+                start_block=start_block,
+                poll_interval=poll_interval
+            )
+            self._payment_follower.start()
+        return self.payment_index
+
+    def enable_balance_cache(self, max_entries: int = 100000, per_block: bool = False,
+                             max_staleness: float = 30.0, poll_interval: float = 2.0) -> BalanceCache:
+        """
+        Serve get_player_token_balance from a cache kept fresh by Transfer events
+        
+        Args:
+            max_entries: Number of balances kept before LRU eviction
+            per_block: Expire every cached balance on each new block instead
+                of only those touched by a Transfer
+            max_staleness: Seconds after the last event poll during which
+                cached balances are trusted; older entries are refetched
+            poll_interval: Seconds between event polls
+            
+        Returns:
+            BalanceCache: The running balance cache
+        """
+        if self.balance_cache is None:
+            self.balance_cache = BalanceCache(
+                self._balance_of,
+                max_entries=max_entries,
+                per_block=per_block,
+                max_staleness=max_staleness
+            )
+            self._transfer_follower = EventFollower(
+                self.transport,
+                self.token_address,
+                Web3.to_hex(Web3.keccak(text='Transfer(address,address,uint256)')),
+                on_log=self.balance_cache.on_transfer,
+                on_synced=self.balance_cache.advance,
+                start_block=self.w3.eth.block_number,
+                poll_interval=poll_interval
+            )
+            self._transfer_follower.start()
+        return self.balance_cache
+
+    def enable_leaderboard(self, leaderboards: Leaderboards, start_block: int = 0,
+                           poll_interval: float = 2.0) -> Leaderboards:
+        """
+        Feed the leaderboards from GameCompleted and Transfer events
+        
+        The boards live in memory only, so the events are replayed from
+        start_block on every start; use the token's deployment block for
+        exact balances.
+        
+        Args:
+            leaderboards: Boards to rank players on
+            start_block: Block to start following events from
+            poll_interval: Seconds between event polls
+            
+        Returns:
+            Leaderboards: The boards being fed
+        """
+        if self.leaderboards is None:
+            self.leaderboards = leaderboards
+            self._leaderboard_followers = [
+                EventFollower(
+                    self.transport,
+                    self.game_address,
+                    GAME_COMPLETED_TOPIC,
+                    on_log=leaderboards.on_game_completed,
+                    start_block=start_block,
+                    poll_interval=poll_interval
+                ),
+                EventFollower(
+                    self.transport,
+                    self.token_address,
+                    Web3.to_hex(Web3.keccak(text='Transfer(address,address,uint256)')),
+                    on_log=leaderboards.on_transfer,
+                    start_block=start_block,
+                    poll_interval=poll_interval
+                )
+            ]
+            for follower in self._leaderboard_followers:
+                follower.start()
+        return self.leaderboards
+
+    @timed("quai.reward_winners")
+    def reward_winners(self, entries: list) -> dict:
+        """
+        Send token rewards to many winning players in one transaction
+        
+        Args:
+            entries: (player_address, score, reward_key) tuples, where
+                reward_key is the 32-byte idempotency key of the win
+            
+        Returns:
+            dict: Settlement transaction details; "rewards_settled" counts
+                the wins the contract paid, which leaves out entries it
+                skipped as already settled or without an open session
+        """
+        try:
+            players = [player for player, _, _ in entries]
+            scores = [score for _, score, _ in entries]
+            keys = [key for _, _, key in entries]
+            tx_hash = self._owner_transact(self.game_contract.functions.completeGames(
+                players,
+                scores,
+                keys
+            ))
+            with span("quai.wait_for_receipt"):
+                receipt = self._wait_for_receipt(tx_hash)
+            if not receipt['status']:
+                return {
+                    'success': False,
+                    'error': 'Settlement transaction reverted',
+                    'transaction_hash': receipt['transactionHash'].hex()
+                }
+            for player in players:
+                self._balance_changed(player)
+            return {
+                'success': True,
+                'rewards_settled': count_completed(receipt, self.game_address),
+                'transaction_hash': receipt['transactionHash'].hex()
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+            
+    @property
+    def nonces(self) -> NonceManager:
+        """Nonce manager for the owner account, or None unless OWNER_ADDRESS is set"""
+        if self._nonces is None and self.owner_address:
+            self._nonces = NonceManager(
+                self.transport.call,
+                Web3.to_checksum_address(self.owner_address),
+                stuck_after=float(os.getenv('TX_STUCK_AFTER', 60)),
+                on_replaced=self._transaction_replaced
+            )
+            self._nonces.start(float(os.getenv('NONCE_CHECK_INTERVAL', 5)))
+        return self._nonces
+
+    def _owner_transact(self, function):
+        """Send an owner-signed contract call, with a local nonce when managed"""
+        if self.nonces is None:
+            return function.transact()
+        return self.nonces.send(function.transact)
+
+    def _wait_for_receipt(self, tx_hash):
+        """Wait for a transaction, or the replacement the nonce manager sent for it"""
+        if self._nonces is None:
+            return self.w3.eth.wait_for_transaction_receipt(tx_hash)
+        mined = self._nonces.wait_for_receipt(tx_hash)
+        return self.w3.eth.get_transaction_receipt(mined['transactionHash'])
+
+    def _transaction_replaced(self, old_hash: str, new_hash: str):
+        if self._pipeline is not None:
+            self._pipeline.replace(old_hash, new_hash)
+
+    @property
+    def pipeline(self) -> TransactionPipeline:
+        """Background transaction pipeline, started on first use"""
+        if self._pipeline is None:
+            self._pipeline = TransactionPipeline(
+                self.transport,
+                poll_interval=float(os.getenv('RECEIPT_POLL_INTERVAL', 1.0))
+            )
+        return self._pipeline
+
+    @timed("quai.submit_game_session")
+    def submit_game_session(self, player_address: str, on_started=None):
+        """
+        Start a new game session without waiting for the transaction to be mined
+        
+        Args:
+            player_address: Player's Quai wallet address
+            on_started: Called with the session information once confirmed
+            
+        Returns:
+            PendingTransaction: Handle resolving to the session information
+        """
+        def send():
+            return self.game_contract.functions.startGame().transact({
+                'from': player_address,
+                'value': self.w3.to_wei(0.1, 'ether')
+            })
+
+        def on_receipt(receipt):
+            session_id = self.game_contract.functions.getSessionId(
+                player_address
+            ).call()
+            if self.payment_index is not None:
+                self.payment_index.record(player_address)
+            result = {
+                'session_id': session_id,
+                'transaction_hash': receipt['transactionHash']
+            }
+            if on_started is not None:
+                on_started(result)
+            return result
+
+        return self.pipeline.submit(send, on_receipt, label='start_game')
+
+    @timed("quai.submit_reward")
+    def submit_reward(self, player_address: str, score: int):
+        """
+        Send token rewards without waiting for the transaction to be mined
+        
+        Args:
+            player_address: Player's Quai wallet address
+            score: Final game score
+            
+        Returns:
+            PendingTransaction: Handle resolving to the reward details
+        """
+        token_amount = min(score // 10, 100)
+
+        def send():
+            return self._owner_transact(self.game_contract.functions.rewardPlayer(
+                player_address,
+                token_amount
+            ))
+
+        def on_receipt(receipt):
+            self._balance_changed(player_address)
+            return {
+                'tokens_sent': token_amount,
+                'transaction_hash': receipt['transactionHash']
+            }
+
+        return self.pipeline.submit(send, on_receipt, label='reward')
+
+    @timed("quai.transaction_status")
+    def transaction_status(self, transaction_id: str):
+        """
+        Look up a transaction submitted through the pipeline
+        
+        Args:
+            transaction_id: Id of the pending transaction handle
+            
+        Returns:
+            PendingTransaction: The handle, or None if unknown or expired
+        """
+        if self._pipeline is None:
+            return None
+        return self._pipeline.get(transaction_id)
+
+    @timed("quai.get_player_token_balance")
     def get_player_token_balance(self, player_address: str) -> int:
         """
         Get player's game token balance
@@ -123,10 +479,37 @@ class QuaiGameContract:
             int: Token balance
         """
         try:
-            balance = self.token_contract.functions.balanceOf(
-                player_address
-            ).call()
-            return balance
+            if self.balance_cache is not None:
+                return self.balance_cache.get(player_address)
+            return self._balance_of(player_address)
         except Exception as e:
             print(f"Error getting token balance: {e}")
-            return 0
\ No newline at end of file
+            return 0
+
+    def _balance_of(self, player_address: str) -> int:
+        """Ask the token contract for a player's balance"""
+        return self._read(self.token_contract, 'balanceOf', player_address)
+
+    def _balance_changed(self, player_address: str):
+        """Drop a player's cached balance after paying them tokens"""
+        if self.balance_cache is not None:
+            self.balance_cache.invalidate(player_address)
+
+    def _read(self, contract, function_name: str, *args) -> int:
+        """
+        Call a view function returning a single integer or bool
+        
+        Concurrent reads from different request threads are sent to the
+        node together as one JSON-RPC batch.
+        
+        Args:
+            contract: Contract instance to call
+            function_name: Name of the view function
+            args: Function arguments
+            
+        Returns:
+            int: The decoded return value
+        """
+        data = encode_call(contract, function_name, list(args))
+        result = self.transport.read('eth_call', [{'to': contract.address, 'data': data}, 'latest'])
+        return int(result, 16)
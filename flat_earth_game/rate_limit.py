@@ -0,0 +1,173 @@
+"""
+Request rate limiting and deduplication for the game API.
+
+``RateLimiter`` is a token bucket per key, such as a wallet or a session,
+kept in a fixed-size table of packed arrays rather than a dictionary, so
+memory stays bounded however many keys bots cycle through. A slot whose
+bucket has refilled completely holds no information and is reused by the
+next key that hashes near it.
+
+``IdempotencyCache`` remembers the responses of successful requests for a
+while, so a retried request gets the stored response instead of sending
+another transaction. A duplicate that arrives while the first request is
+still running waits for its response, or runs again if that one failed.
+"""
+
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+
+class RateLimiter:
+    """
+    Token buckets in a fixed-size open-addressed table.
+
+    Each key may make ``burst`` requests at once and then ``rate`` requests
+    per second. A key is looked up in ``probes`` neighbouring slots. When
+    every one of them holds a bucket that is still refilling, the bucket
+    used least recently is evicted; the evicted key starts again with a
+    full bucket, so size ``slots`` above the number of keys active within
+    ``burst / rate`` seconds.
+    """
+
+    def __init__(self, rate, burst, slots=65536, probes=4, clock=time.monotonic):
+        """
+        Args:
+            rate (float): Tokens added to each bucket per second
+            burst (float): Bucket capacity
+            slots (int): Table size, rounded up to a power of two
+            probes (int): Slots searched for each key
+            clock (callable): Returns the current time in seconds
+        """
+        self.rate = rate
+        self.burst = burst
+        self.probes = probes
+        self.clock = clock
+        self.evictions = 0
+        size = 1 << max(slots - 1, 1).bit_length()
+        self._mask = size - 1
+        self._refill = burst / rate  # seconds an empty bucket takes to fill
+        self._hashes = array("q", bytes(8 * size))  # hash of the slot's key; 0 when empty
+        self._tokens = array("d", bytes(8 * size))
+        self._stamps = array("d", bytes(8 * size))  # time the tokens were counted
+        self._lock = threading.Lock()
+
+    def acquire(self, key, cost=1):
+        """
+        Take tokens from a key's bucket.
+
+        Args:
+            key (str): Bucket key
+            cost (float): Tokens the request uses
+
+        Returns:
+            float: 0.0 if the request may proceed, otherwise the seconds
+                until the bucket holds enough tokens
+        """
+        h = hash(key) or 1
+        now = self.clock()
+        hashes, tokens, stamps = self._hashes, self._tokens, self._stamps
+        with self._lock:
+            slot = h & self._mask
+            free = oldest = -1
+            for _ in range(self.probes):
+                stored = hashes[slot]
+                if stored == h:
+                    available = tokens[slot] + (now - stamps[slot]) * self.rate
+                    if available > self.burst:
+                        available = self.burst
+                    break
+                if free < 0:
+                    if stored == 0 or now - stamps[slot] >= self._refill:
+                        free = slot
+                    elif oldest < 0 or stamps[slot] < stamps[oldest]:
+                        oldest = slot
+                slot = (slot + 1) & self._mask
+            else:
+                if free < 0:
+                    free = oldest
+                    self.evictions += 1
+                slot = free
+                hashes[slot] = h
+                available = self.burst
+            stamps[slot] = now
+            if available >= cost:
+                tokens[slot] = available - cost
+                return 0.0
+            tokens[slot] = available
+            return (cost - available) / self.rate
+
+
+class IdempotencyCache:
+    """
+    Stores successful responses by request key for ``ttl`` seconds after
+    they complete.
+    """
+
+    def __init__(self, ttl=60, max_entries=100000, clock=time.monotonic):
+        """
+        Args:
+            ttl (float): Seconds a response is kept once stored
+            max_entries (int): Responses kept at most; the oldest go first
+            clock (callable): Returns the current time in seconds
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        self._entries = OrderedDict()  # key -> [stored at, done event, response]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def run(self, key, handler, *args):
+        """
+        Get the stored response for a key, or call the handler for it.
+
+        Only responses with a 2xx status are stored, so a request that
+        failed runs again when retried, including by duplicates that were
+        waiting for it.
+
+        Args:
+            key: Request key, such as a client-supplied idempotency key
+            handler (callable): Returns a ``(payload, status)`` pair
+            *args: Arguments for the handler
+
+        Returns:
+            tuple: (payload, status)
+        """
+        while True:
+            now = self.clock()
+            with self._lock:
+                entry = self._entries.get(key)
+                # A request still running never expires; a stored response
+                # expires ttl seconds after it was stored
+                if entry is not None and entry[1].is_set() and now - entry[0] > self.ttl:
+                    del self._entries[key]
+                    entry = None
+                if entry is None:
+                    entry = self._entries[key] = [now, threading.Event(), None]
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                    break
+            entry[1].wait()
+            if entry[2] is not None:
+                self.hits += 1
+                return entry[2]
+            # The first request failed and was forgotten: run it again
+
+        response = None
+        try:
+            response = handler(*args)
+            return response
+        finally:
+            if response is not None and 200 <= response[1] < 300:
+                entry[0] = self.clock()
+                entry[2] = response
+            else:
+                with self._lock:
+                    if self._entries.get(key) is entry:
+                        del self._entries[key]
+            entry[1].set()
@@ -0,0 +1,199 @@
+"""
+Queue that settles token rewards for many winners in one transaction.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+def reward_key(session_id):
+    """
+    Derive the idempotency key for a game session's reward.
+
+    Args:
+        session_id: Session id issued by the game contract
+
+    Returns:
+        bytes: 32-byte key, matching the contract's ``bytes32`` reward keys
+    """
+    return hashlib.sha256(str(session_id).encode("utf-8")).digest()
+
+
+class RewardQueue:
+    """
+    Collects winning games and pays them out in batches.
+
+    The background thread started by ``start`` settles a batch as soon as
+    ``max_batch`` wins are queued, or once the oldest queued win has waited
+    ``max_delay`` seconds; ``enqueue`` only wakes it, so a winner's request
+    never waits for a settlement to be mined. Every win carries an
+    idempotency key: a key is accepted only once, and the contract skips keys
+    it has already settled, so a winner is never paid twice even if a batch
+    is retried. A win that has been in ``max_attempts`` failed batches is
+    moved to ``dead_letters`` so it cannot hold up the wins queued after it.
+    """
+
+    def __init__(self, settle, max_batch=100, max_delay=5.0, max_keys=1000000, max_attempts=5,
+                 clock=time.monotonic):
+        """
+        Args:
+            settle (callable): Pays a list of (player_address, score, key)
+                entries and returns a result dict with a "success" flag and
+                optionally "rewards_settled", the number of entries paid
+                rather than skipped
+            max_batch (int): Number of queued wins that triggers a settlement
+            max_delay (float): Seconds a win may wait before it is settled
+            max_keys (int): Number of recent keys remembered locally
+            max_attempts (int): Failed settlements after which a win is
+                moved to ``dead_letters``
+            clock (callable): Returns the current time in seconds
+        """
+        self.settle = settle
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_keys = max_keys
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self.batches_settled = 0
+        self.rewards_settled = 0
+        self.rewards_skipped = 0
+        # (player_address, score, key, error) of wins that were given up on
+        self.dead_letters = []
+        self._queue = []
+        self._oldest = None
+        self._attempts = {}
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+        self._settle_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._wake = threading.Event()  # set when a full batch is queued
+        self._thread = None
+
+    def __len__(self):
+        return len(self._queue)
+
+    def enqueue(self, player_address, score, key):
+        """
+        Queue a win for payout.
+
+        Args:
+            player_address: Winner's wallet address
+            score (int): Final game score
+            key (bytes): Idempotency key, see ``reward_key``
+
+        Returns:
+            bool: False if a win with this key was already queued or paid
+        """
+        with self._lock:
+            if key in self._keys:
+                return False
+            self._keys[key] = True
+            while len(self._keys) > self.max_keys:
+                self._keys.popitem(last=False)
+            if not self._queue:
+                self._oldest = self.clock()
+            self._queue.append((player_address, score, key))
+            if len(self._queue) >= self.max_batch:
+                self._wake.set()
+        return True
+
+    def flush(self):
+        """
+        Settle everything queued so far, in batches of at most ``max_batch``.
+
+        Wins from a batch that failed to settle are put back at the front of
+        the queue and retried on the next flush, unless they have now failed
+        ``max_attempts`` times; those go to ``dead_letters``.
+
+        Returns:
+            int: Number of wins settled, including any the contract skipped
+        """
+        settled = 0
+        with self._settle_lock:
+            while True:
+                with self._lock:
+                    batch = self._queue[:self.max_batch]
+                    del self._queue[:self.max_batch]
+                if not batch:
+                    return settled
+                try:
+                    result = self.settle(batch)
+                except Exception as e:
+                    result = {"success": False, "error": str(e)}
+                if not result.get("success"):
+                    error = result.get("error")
+                    print(f"Error settling rewards: {error}")
+                    retry = []
+                    with self._lock:
+                        for entry in batch:
+                            attempts = self._attempts.get(entry[2], 0) + 1
+                            if attempts < self.max_attempts:
+                                self._attempts[entry[2]] = attempts
+                                retry.append(entry)
+                            else:
+                                self._attempts.pop(entry[2], None)
+                                self.dead_letters.append((*entry, error))
+                        self._queue[:0] = retry
+                        self._oldest = self.clock()
+                    if len(retry) < len(batch):
+                        print(f"Gave up on {len(batch) - len(retry)} rewards after {self.max_attempts} attempts")
+                    return settled
+                paid = result.get("rewards_settled", len(batch))
+                with self._lock:
+                    for _, _, key in batch:
+                        self._attempts.pop(key, None)
+                settled += len(batch)
+                self.batches_settled += 1
+                self.rewards_settled += paid
+                self.rewards_skipped += len(batch) - paid
+
+    def requeue_dead_letters(self):
+        """
+        Queue every dead-lettered win again with a fresh attempt count.
+
+        Returns:
+            int: Number of wins queued
+        """
+        with self._lock:
+            entries = [entry[:3] for entry in self.dead_letters]
+            self.dead_letters = []
+            if entries and not self._queue:
+                self._oldest = self.clock()
+            self._queue.extend(entries)
+        return len(entries)
+
+    def due(self):
+        """
+        Check whether the oldest queued win has waited long enough.
+
+        Returns:
+            bool: True if a time-triggered flush is due
+        """
+        with self._lock:
+            return bool(self._queue) and self.clock() - self._oldest >= self.max_delay
+
+    def start(self):
+        """Start a background thread that flushes on the size and time triggers."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="reward-queue", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background thread and settle whatever is left."""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while True:
+            woken = self._wake.wait(min(1.0, self.max_delay / 4))
+            self._wake.clear()
+            if self._stopped.is_set():
+                return
+            if woken or self.due():
+                self.flush()
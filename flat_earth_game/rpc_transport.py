@@ -0,0 +1,312 @@
+"""
+Shared JSON-RPC transport with connection pooling, retries and batching.
+"""
+
+import asyncio
+import http.client
+import itertools
+import json
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+# Calls that change chain state are never retried, so a request that reached
+# the node but lost its response cannot be submitted twice.
+UNSAFE_METHODS = ("eth_sendTransaction", "eth_sendRawTransaction", "sendTransaction")
+
+
+class RPCError(Exception):
+    """Error returned by a JSON-RPC node for a single call."""
+
+
+class TransportMetrics:
+    """
+    Counters describing how busy an RPC transport is.
+    """
+
+    def __init__(self, pool_size):
+        """
+        Args:
+            pool_size (int): Number of pooled connections
+        """
+        self.pool_size = pool_size
+        self.requests = 0
+        self.calls = 0
+        self.retries = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.pool_waits = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self, calls=1):
+        """Count one HTTP request carrying ``calls`` JSON-RPC calls while it runs."""
+        with self._lock:
+            self.requests += 1
+            self.calls += calls
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def count(self, name):
+        """Increment the counter called ``name``."""
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self):
+        """
+        Get the current counter values.
+
+        Returns:
+            dict: Counters plus ``pool_saturation``, the fraction of the
+                pool currently in use
+        """
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "calls": self.calls,
+                "retries": self.retries,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "pool_size": self.pool_size,
+                "pool_waits": self.pool_waits,
+                "pool_saturation": self.in_flight / self.pool_size if self.pool_size else 0.0
+            }
+
+
+def backoff_delay(attempt, backoff):
+    """Exponential backoff with full jitter for retry ``attempt`` (0-based)."""
+    return backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+async def retry_async(func, *args, retries=3, backoff=0.1, metrics=None):
+    """
+    Await ``func(*args)``, retrying failures with jittered backoff.
+
+    Args:
+        func (callable): Coroutine function making one RPC call
+        retries (int): Retries after the first attempt
+        backoff (float): Base delay in seconds
+        metrics (TransportMetrics): Counters to update
+
+    Returns:
+        The call's result
+    """
+    for attempt in itertools.count():
+        try:
+            if metrics is None:
+                return await func(*args)
+            with metrics.track():
+                return await func(*args)
+        except Exception:
+            if attempt >= retries:
+                if metrics is not None:
+                    metrics.count("errors")
+                raise
+            if metrics is not None:
+                metrics.count("retries")
+            await asyncio.sleep(backoff_delay(attempt, backoff))
+
+
+class RPCTransport:
+    """
+    Thread-safe JSON-RPC client over a pool of keep-alive HTTP connections.
+
+    At most ``pool_size`` requests are in flight at once; further callers wait
+    for a free connection. Failed read requests are retried with jittered
+    exponential backoff. ``read`` coalesces calls made by concurrent threads
+    within ``batch_window`` seconds into a single JSON-RPC batch request.
+    """
+
+    def __init__(self, url, pool_size=16, timeout=10.0, retries=3, backoff=0.1,
+                 batch_window=0.002, max_batch=100):
+        """
+        Args:
+            url (str): JSON-RPC endpoint
+            pool_size (int): Maximum number of open connections
+            timeout (float): Seconds to wait for each HTTP request
+            retries (int): Retries for failed read requests
+            backoff (float): Base retry delay in seconds
+            batch_window (float): Seconds ``read`` waits to collect a batch
+            max_batch (int): Maximum calls per coalesced batch
+        """
+        parts = urlsplit(url)
+        self.url = url
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.metrics = TransportMetrics(pool_size)
+        self._host = parts.hostname
+        self._port = parts.port
+        self._path = parts.path or "/"
+        if parts.query:
+            self._path += "?" + parts.query
+        self._connection_class = (http.client.HTTPSConnection if parts.scheme == "https"
+                                  else http.client.HTTPConnection)
+        self._pool = queue.LifoQueue()
+        for _ in range(pool_size):
+            self._pool.put(None)
+        self._ids = itertools.count(1)
+        self._reads = []
+        self._reads_lock = threading.Lock()
+
+    def request(self, method, params):
+        """
+        Send one JSON-RPC call and return the raw response object.
+
+        Args:
+            method (str): Method name
+            params (list): Method parameters
+
+        Returns:
+            dict: JSON-RPC response with either "result" or "error"
+        """
+        payload = {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params}
+        return self._post(payload, method not in UNSAFE_METHODS, 1)
+
+    def call(self, method, params):
+        """
+        Send one JSON-RPC call.
+
+        Args:
+            method (str): Method name
+            params (list): Method parameters
+
+        Returns:
+            The call's result
+
+        Raises:
+            RPCError: If the node returned an error
+        """
+        response = self.request(method, params)
+        if "error" in response:
+            raise RPCError(response["error"].get("message", response["error"]))
+        return response.get("result")
+
+    def batch(self, calls):
+        """
+        Send many JSON-RPC calls in one HTTP request.
+
+        Args:
+            calls (list): (method, params) pairs
+
+        Returns:
+            list: Results in call order; a call that failed on the node is
+                returned as an ``RPCError`` instead of a result
+        """
+        if not calls:
+            return []
+        # Ids only need to be unique within one request
+        payload = [{"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+                   for i, (method, params) in enumerate(calls)]
+        safe = not any(method in UNSAFE_METHODS for method, _ in calls)
+        responses = {item.get("id"): item for item in self._post(payload, safe, len(calls))}
+        results = []
+        for i in range(len(calls)):
+            item = responses.get(i, {"error": {"message": "missing response"}})
+            if "error" in item:
+                results.append(RPCError(item["error"].get("message", item["error"])))
+            else:
+                results.append(item.get("result"))
+        return results
+
+    __call__ = batch
+
+    def read(self, method, params):
+        """
+        Make a read-only call, batched with concurrent reads from other threads.
+
+        Args:
+            method (str): Method name, e.g. "eth_call"
+            params (list): Method parameters
+
+        Returns:
+            The call's result
+
+        Raises:
+            RPCError: If the node returned an error
+        """
+        future = Future()
+        with self._reads_lock:
+            self._reads.append((method, params, future))
+            leader = len(self._reads) == 1
+        if leader:
+            # The first caller waits briefly for others, then sends for everyone
+            time.sleep(self.batch_window)
+            with self._reads_lock:
+                pending, self._reads = self._reads, []
+            for start in range(0, len(pending), self.max_batch):
+                chunk = pending[start:start + self.max_batch]
+                try:
+                    results = self.batch([(m, p) for m, p, _ in chunk])
+                except Exception as e:
+                    for _, _, waiting in chunk:
+                        waiting.set_exception(e)
+                    continue
+                for (_, _, waiting), result in zip(chunk, results):
+                    if isinstance(result, Exception):
+                        waiting.set_exception(result)
+                    else:
+                        waiting.set_result(result)
+        return future.result()
+
+    def close(self):
+        """Close every idle pooled connection."""
+        while True:
+            try:
+                connection = self._pool.get_nowait()
+            except queue.Empty:
+                return
+            if connection is not None:
+                connection.close()
+
+    def _post(self, payload, retry, calls):
+        body = json.dumps(payload).encode("utf-8")
+        for attempt in itertools.count():
+            try:
+                return self._send(body, calls)
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                if not retry or attempt >= self.retries:
+                    self.metrics.count("errors")
+                    raise
+                self.metrics.count("retries")
+                time.sleep(backoff_delay(attempt, self.backoff))
+
+    def _send(self, body, calls):
+        try:
+            connection = self._pool.get_nowait()
+        except queue.Empty:
+            self.metrics.count("pool_waits")
+            connection = self._pool.get()
+        try:
+            with self.metrics.track(calls):
+                if connection is None:
+                    connection = self._connection_class(self._host, self._port, timeout=self.timeout)
+                connection.request("POST", self._path, body, {"Content-Type": "application/json"})
+                response = connection.getresponse()
+                data = response.read()
+                if response.status >= 500 or response.status == 429:
+                    raise http.client.HTTPException(f"HTTP {response.status}")
+                if response.will_close:
+                    connection.close()
+                    connection = None
+                return json.loads(data)
+        except Exception:
+            if connection is not None:
+                connection.close()
+                connection = None
+            raise
+        finally:
+            self._pool.put(connection)
@@ -0,0 +1,263 @@
+"""
+Server-side storage for in-progress games, keyed by session id.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from .game import FlatEarthDebateGame
+from .game_state import GameState
+
+
+class SessionBackend:
+    """
+    Interface for session storage backends.
+
+    A backend maps session keys to ``FlatEarthDebateGame`` instances and is
+    responsible for expiring sessions that have been idle for too long.
+    """
+
+    def get(self, key):
+        """
+        Get the game stored for a session.
+
+        Args:
+            key (str): Session key
+
+        Returns:
+            FlatEarthDebateGame: The stored game, or None if missing or expired
+        """
+        raise NotImplementedError
+
+    def set(self, key, game):
+        """
+        Store a game for a session, resetting its idle timer.
+
+        Args:
+            key (str): Session key
+            game (FlatEarthDebateGame): Game to store
+        """
+        raise NotImplementedError
+
+    def delete(self, key):
+        """
+        Remove a session if it exists.
+
+        Args:
+            key (str): Session key
+        """
+        raise NotImplementedError
+
+
+class InMemorySessionBackend(SessionBackend):
+    """
+    In-process LRU session cache with idle expiry.
+
+    Games are kept as live objects, so a lookup costs one dictionary access.
+    The cache never holds more than ``max_sessions`` games: the least recently
+    used session is evicted to make room, and sessions idle for longer than
+    ``ttl`` seconds are dropped.
+    """
+
+    def __init__(self, ttl=3600, max_sessions=100000, clock=time.monotonic):
+        """
+        Args:
+            ttl (float): Seconds a session may stay idle before it expires
+            max_sessions (int): Maximum number of sessions held at once
+            clock (callable): Returns the current time in seconds
+        """
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.clock = clock
+        self.evictions = 0
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def keys(self):
+        """
+        Get the key of every stored session, expired or not.
+
+        Returns:
+            list: Session keys, least recently used first
+        """
+        with self._lock:
+            return list(self._sessions)
+
+    def get(self, key):
+        now = self.clock()
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is None:
+                return None
+            game, last_used = entry
+            if now - last_used > self.ttl:
+                del self._sessions[key]
+                self.evictions += 1
+                return None
+            self._sessions[key] = (game, now)
+            self._sessions.move_to_end(key)
+            return game
+
+    def set(self, key, game):
+        now = self.clock()
+        with self._lock:
+            self._sessions[key] = (game, now)
+            self._sessions.move_to_end(key)
+            self._evict(now)
+
+    def delete(self, key):
+        with self._lock:
+            self._sessions.pop(key, None)
+
+    def evict_expired(self):
+        """
+        Drop every session that has been idle for longer than the TTL.
+
+        Returns:
+            int: Number of sessions evicted
+        """
+        with self._lock:
+            before = self.evictions
+            self._evict(self.clock())
+            return self.evictions - before
+
+    def _evict(self, now):
+        """Evict idle and over-capacity sessions, oldest first."""
+        sessions = self._sessions
+        while sessions:
+            key, (game, last_used) = next(iter(sessions.items()))
+            if len(sessions) <= self.max_sessions and now - last_used <= self.ttl:
+                break
+            del sessions[key]
+            self.evictions += 1
+
+
+class RedisSessionBackend(SessionBackend):
+    """
+    Session backend for Redis or any server speaking the same commands.
+
+    Games are stored as JSON under ``prefix + key`` with a server-side expiry,
+    so sessions are shared between processes and survive restarts.
+    """
+
+    def __init__(self, client, ttl=3600, prefix="flat_earth:session:"):
+        """
+        Args:
+            client: Redis-compatible client providing ``get``, ``set`` with an
+                ``ex`` argument, and ``delete``
+            ttl (int): Seconds a session may stay idle before it expires
+            prefix (str): Prefix added to every session key
+        """
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        data = self.client.get(self.prefix + key)
+        if data is None:
+            return None
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        return FlatEarthDebateGame(GameState.from_dict(json.loads(data)))
+
+    def set(self, key, game):
+        data = json.dumps(game.game_state.to_dict())
+        self.client.set(self.prefix + key, data, ex=self.ttl)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+
+class SessionStore:
+    """
+    Keeps games alive between requests, keyed by session id.
+    """
+
+    def __init__(self, backend=None, event_log=None):
+        """
+        Args:
+            backend (SessionBackend): Storage backend; an in-memory LRU cache
+                is used when omitted
+            event_log (EventLog): Journal that session starts, turns and ends
+                are appended to, so sessions survive a restart
+        """
+        self.backend = backend if backend is not None else InMemorySessionBackend()
+        self.event_log = event_log
+
+    def create(self, session_id, seed=None, wallet=None):
+        """
+        Start a new game for a session, replacing any existing one.
+
+        Args:
+            session_id: Session id issued by the game contract
+            seed (int): Seed for the game's rebuttals and hints, to replay a
+                session; a random seed is used when omitted
+            wallet (str): Address that paid for the session; only it may
+                play the game when given
+
+        Returns:
+            FlatEarthDebateGame: The new game
+        """
+        game = FlatEarthDebateGame(seed=seed)
+        game.game_state.wallet = wallet
+        if self.event_log is not None:
+            self.event_log.log_start(str(session_id), game.game_state.rng_state, wallet)
+        self.backend.set(str(session_id), game)
+        return game
+
+    def get(self, session_id):
+        """
+        Get the game for a session.
+
+        Args:
+            session_id: Session id issued by the game contract
+
+        Returns:
+            FlatEarthDebateGame: The game, or None if unknown or expired
+        """
+        return self.backend.get(str(session_id))
+
+    def save(self, session_id, game, result=None):
+        """
+        Persist a game after a turn has been played.
+
+        Args:
+            session_id: Session id issued by the game contract
+            game (FlatEarthDebateGame): The updated game
+            result (dict): The turn's ``process_argument`` response, which is
+                journaled when an event log is attached
+        """
+        if self.event_log is not None and result is not None and result["success"]:
+            self.event_log.log_turn(str(session_id), game.analyzer.category_ids[result["category"]],
+                                    result["score"])
+        self.backend.set(str(session_id), game)
+
+    def end(self, session_id):
+        """
+        Remove a finished session.
+
+        Args:
+            session_id: Session id issued by the game contract
+        """
+        if self.event_log is not None:
+            self.event_log.log_end(str(session_id))
+        self.backend.delete(str(session_id))
+
+    def recover(self):
+        """
+        Restore the sessions journaled by the event log before a restart.
+
+        Returns:
+            int: Number of sessions restored
+        """
+        if self.event_log is None:
+            return 0
+        games = self.event_log.recover()
+        for key, game in games.items():
+            self.backend.set(key, game)
+        return len(games)
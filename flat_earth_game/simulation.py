@@ -0,0 +1,423 @@
+"""
+Headless simulation of many Flat Earth Debate games.
+
+Plays games through the real ``FlatEarthDebateGame`` rules with scripted
+player strategies, to see how the evidence weights and the token reward
+play out across millions of games. Games are split into fixed-size shards
+that run on a process pool; each shard returns histograms rather than
+per-game records, so memory stays flat however many games are played::
+
+    python -m flat_earth_game.simulation --games 1000000 --processes 8
+
+Every shard seeds its own ``random.Random`` from the run seed and the shard
+number. Strategy choices draw from it, and it seeds each game's own
+generator for rebuttals and hints. The same seed therefore gives the same
+results whatever the number of processes.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from .argument_analyzer import ArgumentAnalyzer
+from .game import FlatEarthDebateGame
+from .game_state import GameState
+from .knowledge_base import EVIDENCE_WEIGHTS, REBUTTALS, KnowledgeBase
+
+DEFAULT_SHARD_SIZE = 10000
+DEFAULT_MAX_TURNS = 50
+
+# Said by players who have no evidence to offer; matches no keyword
+NO_EVIDENCE = "Just look outside, it is obviously round"
+
+
+def reward_tokens(score):
+    """Tokens paid for winning with ``score``, as the reward contracts pay them."""
+    return min(score // 10, 100)
+
+
+class CountHistogram:
+    """
+    Exact histogram of small non-negative integers.
+
+    Holds one counter per value seen so far, so adding is constant time and
+    memory is bounded by the largest value rather than the number of samples.
+    Histograms from different shards are combined with ``merge``.
+    """
+
+    __slots__ = ("counts",)
+
+    def __init__(self):
+        self.counts = array("q")
+
+    @property
+    def total(self):
+        return sum(self.counts)
+
+    def add(self, value, count=1):
+        """
+        Count one or more occurrences of a value.
+
+        Args:
+            value (int): Non-negative value
+            count (int): Occurrences to add
+        """
+        if value >= len(self.counts):
+            self.counts.extend([0] * (value + 1 - len(self.counts)))
+        self.counts[value] += count
+
+    def merge(self, other):
+        """
+        Add another histogram's counts to this one.
+
+        Args:
+            other (CountHistogram): Histogram to add
+        """
+        if len(other.counts) > len(self.counts):
+            self.counts.extend([0] * (len(other.counts) - len(self.counts)))
+        for value, count in enumerate(other.counts):
+            self.counts[value] += count
+
+    def mean(self):
+        total = self.total
+        if not total:
+            return 0.0
+        return sum(value * count for value, count in enumerate(self.counts)) / total
+
+    def percentile(self, fraction):
+        """
+        Get the smallest value at or below which ``fraction`` of samples fall.
+
+        Args:
+            fraction (float): Between 0 and 1
+
+        Returns:
+            int: The value, or None when the histogram is empty
+        """
+        total = self.total
+        if not total:
+            return None
+        needed = max(1, fraction * total)
+        running = 0
+        for value, count in enumerate(self.counts):
+            running += count
+            if running >= needed:
+                return value
+        return len(self.counts) - 1
+
+    def to_dict(self):
+        """
+        Get the non-zero counts.
+
+        Returns:
+            dict: value -> count
+        """
+        return {value: count for value, count in enumerate(self.counts) if count}
+
+
+class StrategyResult:
+    """
+    Aggregated outcome of every game one strategy played.
+    """
+
+    __slots__ = ("strategy", "games", "wins", "arguments", "attempts_to_win", "payouts", "scores")
+
+    def __init__(self, strategy):
+        """
+        Args:
+            strategy (str): Strategy name
+        """
+        self.strategy = strategy
+        self.games = 0
+        self.wins = 0
+        self.arguments = 0
+        # Arguments submitted in won games, including ones not understood
+        self.attempts_to_win = CountHistogram()
+        # Tokens paid per game; lost games count as zero
+        self.payouts = CountHistogram()
+        # Final credibility score of every game
+        self.scores = CountHistogram()
+
+    def merge(self, other):
+        """
+        Add another result for the same strategy into this one.
+
+        Args:
+            other (StrategyResult): Result to add
+        """
+        self.games += other.games
+        self.wins += other.wins
+        self.arguments += other.arguments
+        self.attempts_to_win.merge(other.attempts_to_win)
+        self.payouts.merge(other.payouts)
+        self.scores.merge(other.scores)
+
+    def summary(self):
+        """
+        Get the headline numbers.
+
+        Returns:
+            dict: Win rate, attempts-to-win percentiles and payout figures
+        """
+        attempts = self.attempts_to_win
+        return {
+            "strategy": self.strategy,
+            "games": self.games,
+            "wins": self.wins,
+            "win_rate": self.wins / self.games if self.games else 0.0,
+            "arguments_per_game": self.arguments / self.games if self.games else 0.0,
+            "attempts_to_win": {
+                "mean": attempts.mean(),
+                "p50": attempts.percentile(0.5),
+                "p90": attempts.percentile(0.9),
+                "p99": attempts.percentile(0.99),
+                "max": attempts.percentile(1.0)
+            },
+            "tokens_paid": sum(value * count for value, count in enumerate(self.payouts.counts)),
+            "tokens_per_game": self.payouts.mean(),
+            "payouts": self.payouts.to_dict()
+        }
+
+
+class Strategy:
+    """
+    Base class for scripted players.
+
+    Subclasses pick the text of each argument. Strategies are pickled to the
+    worker processes, so they must be defined at module level, and they must
+    take every random choice from the ``rng`` they are given to keep runs
+    reproducible.
+    """
+
+    name = "strategy"
+
+    def start(self, game, rng):
+        """Called once before each game's first argument."""
+
+    def next_argument(self, game, rng):
+        """
+        Choose the next argument.
+
+        Args:
+            game (FlatEarthDebateGame): The game being played
+            rng (random.Random): The shard's random source
+
+        Returns:
+            str: Argument text
+        """
+        raise NotImplementedError
+
+
+def _evidence(game, category, rng):
+    """Build an argument citing one keyword of a category."""
+    keyword = rng.choice(game.analyzer.evidence_weights[category]["keywords"])
+    return f"Consider the {keyword}"
+
+
+class RandomEvidence(Strategy):
+    """Cites a random kind of evidence every time, repeats and all."""
+
+    name = "random"
+
+    def next_argument(self, game, rng):
+        return _evidence(game, rng.choice(game.analyzer.categories), rng)
+
+
+class FreshEvidence(Strategy):
+    """Cites a kind of evidence it has not used yet, in random order."""
+
+    name = "fresh"
+
+    def start(self, game, rng):
+        self.remaining = list(game.analyzer.categories)
+        rng.shuffle(self.remaining)
+
+    def next_argument(self, game, rng):
+        if not self.remaining:
+            return RandomEvidence.next_argument(self, game, rng)
+        return _evidence(game, self.remaining.pop(), rng)
+
+
+class HintFollower(Strategy):
+    """Asks for a hint before every argument and cites what it suggests."""
+
+    name = "hints"
+
+    def start(self, game, rng):
+        knowledge_base = game.analyzer.knowledge_base
+        self.by_hint = dict(zip(knowledge_base.hint_table, knowledge_base.categories))
+
+    def next_argument(self, game, rng):
+        category = self.by_hint.get(game.get_hint())
+        if category is None:
+            category = rng.choice(game.analyzer.categories)
+        return _evidence(game, category, rng)
+
+
+class Unprepared(RandomEvidence):
+    """Offers no evidence at all for a share of its arguments."""
+
+    name = "unprepared"
+
+    def __init__(self, miss_rate=0.4):
+        """
+        Args:
+            miss_rate (float): Chance that an argument cites no evidence
+        """
+        self.miss_rate = miss_rate
+
+    def next_argument(self, game, rng):
+        if rng.random() < self.miss_rate:
+            return NO_EVIDENCE
+        return super().next_argument(game, rng)
+
+
+STRATEGIES = {strategy.name: strategy for strategy in (RandomEvidence, FreshEvidence, HintFollower, Unprepared)}
+
+
+def play_shard(strategy, games, seed, shard, max_turns=DEFAULT_MAX_TURNS,
+               evidence_weights=None, rebuttals=None):
+    """
+    Play one shard of games with a strategy.
+
+    Args:
+        strategy (Strategy): Player strategy
+        games (int): Number of games to play
+        seed (int): Run seed
+        shard (int): Shard number, mixed into the seed
+        max_turns (int): Arguments after which an unwon game is abandoned
+        evidence_weights (dict): Evidence table; the built-in one when omitted
+        rebuttals (dict): Rebuttal table; the built-in one when omitted
+
+    Returns:
+        StrategyResult: The shard's aggregated outcome
+    """
+    rng = random.Random(f"{seed}/{shard}")
+    analyzer = ArgumentAnalyzer(KnowledgeBase(evidence_weights or EVIDENCE_WEIGHTS, rebuttals or REBUTTALS))
+    categories = analyzer.categories
+    result = StrategyResult(strategy.name)
+    for _ in range(games):
+        state = GameState(categories, rng.getrandbits(64))
+        game = FlatEarthDebateGame(state, analyzer)
+        strategy.start(game, rng)
+        turns = 0
+        while turns < max_turns:
+            game.process_argument(strategy.next_argument(game, rng))
+            turns += 1
+            if state.is_convinced():
+                break
+        result.arguments += turns
+        result.scores.add(max(0, state.credibility_score))
+        if state.is_convinced():
+            result.wins += 1
+            result.attempts_to_win.add(turns)
+            result.payouts.add(reward_tokens(state.credibility_score))
+        else:
+            result.payouts.add(0)
+    result.games = games
+    return result
+
+
+def _run_shard(job):
+    return job[0], play_shard(*job[1:])
+
+
+def simulate(strategies, games, seed=0, processes=None, shard_size=DEFAULT_SHARD_SIZE,
+             max_turns=DEFAULT_MAX_TURNS, evidence_weights=None, rebuttals=None):
+    """
+    Play ``games`` games with each strategy and aggregate the outcomes.
+
+    Args:
+        strategies (list): Strategy instances
+        games (int): Games per strategy
+        seed (int): Run seed; equal seeds give equal results
+        processes (int): Worker processes; one per CPU when omitted, and
+            the games run in this process when 1
+        shard_size (int): Games per unit of work
+        max_turns (int): Arguments after which an unwon game is abandoned
+        evidence_weights (dict): Evidence table to try; the built-in one
+            when omitted
+        rebuttals (dict): Rebuttal table matching ``evidence_weights``
+
+    Returns:
+        dict: Strategy name -> StrategyResult
+    """
+    results = {strategy.name: StrategyResult(strategy.name) for strategy in strategies}
+    jobs = []
+    for index, strategy in enumerate(strategies):
+        for shard, start in enumerate(range(0, games, shard_size)):
+            count = min(shard_size, games - start)
+            # Shard seeds depend only on the strategy's position and the shard number
+            jobs.append((strategy.name, strategy, count, seed, f"{index}.{shard}",
+                         max_turns, evidence_weights, rebuttals))
+
+    processes = processes or os.cpu_count()
+    if processes == 1 or len(jobs) == 1:
+        for name, result in map(_run_shard, jobs):
+            results[name].merge(result)
+        return results
+    with ProcessPoolExecutor(min(processes, len(jobs))) as executor:
+        for name, result in executor.map(_run_shard, jobs):
+            results[name].merge(result)
+    return results
+
+
+def _show(value):
+    return "-" if value is None else str(value)
+
+
+def format_report(results, elapsed=None):
+    """
+    Render simulation results as a text table.
+
+    Args:
+        results (dict): Output of ``simulate``
+        elapsed (float): Wall time of the run in seconds, if known
+
+    Returns:
+        str: The report
+    """
+    lines = [f"{'strategy':>10} {'games':>9} {'win rate':>9} {'args/game':>9} "
+             f"{'win p50':>7} {'p90':>5} {'p99':>5} {'tokens/game':>11} {'tokens paid':>12}"]
+    total = 0
+    for result in results.values():
+        summary = result.summary()
+        attempts = summary["attempts_to_win"]
+        total += summary["games"]
+        lines.append(f"{summary['strategy']:>10} {summary['games']:>9} {summary['win_rate']:>9.1%} "
+                     f"{summary['arguments_per_game']:>9.2f} {_show(attempts['p50']):>7} "
+                     f"{_show(attempts['p90']):>5} {_show(attempts['p99']):>5} "
+                     f"{summary['tokens_per_game']:>11.2f} {summary['tokens_paid']:>12}")
+    for result in results.values():
+        payouts = ", ".join(f"{tokens}: {count}" for tokens, count in result.payouts.to_dict().items())
+        lines.append(f"{result.strategy} payouts (tokens: games): {payouts}")
+    if elapsed is not None:
+        lines.append(f"{total} games in {elapsed:.1f}s ({total / elapsed:,.0f} games/s)")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(prog="python -m flat_earth_game.simulation",
+                                     description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument("--games", type=int, default=100000, help="games per strategy")
+    parser.add_argument("--strategy", nargs="+", choices=sorted(STRATEGIES), default=sorted(STRATEGIES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, help="worker processes; one per CPU by default")
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+    parser.add_argument("--max-turns", type=int, default=DEFAULT_MAX_TURNS)
+    args = parser.parse_args(argv)
+
+    began = time.perf_counter()
+    results = simulate([STRATEGIES[name]() for name in args.strategy], args.games, args.seed,
+                       args.processes, args.shard_size, args.max_turns)
+    print(format_report(results, time.perf_counter() - began))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
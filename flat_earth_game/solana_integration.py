@@ -1,21 +1,65 @@
 """
 Solana blockchain integration for the Flat Earth Debate Game.
 """
+import asyncio
+from collections import OrderedDict
+from functools import partial
+import httpx
 from solana.rpc.async_api import AsyncClient
+from solana.rpc.websocket_api import connect
 from solana.transaction import Transaction
 from solana.system_program import TransferParams, transfer
 from solders.pubkey import Pubkey
+from solders.rpc.config import RpcTransactionLogsFilterMentions
 import os
 from dotenv import load_dotenv
+from .payment_index import PaymentIndex
+from .rpc_transport import TransportMetrics, retry_async
 
 class GameToken:
     """Manages the game's token operations"""
-    def __init__(self):
+    def __init__(self, max_concurrency: int = 8, page_size: int = 100, max_cached_wallets: int = 10000,
+                 max_pages: int = 10):
+        """
+        Args:
+            max_concurrency: Maximum get_transaction calls in flight per verification
+            page_size: Signatures fetched per get_signatures_for_address page
+            max_cached_wallets: Wallets whose scan progress is remembered
+            max_pages: Most signature pages one verification reads
+        """
         load_dotenv()
-        self.client = AsyncClient(os.getenv("SOLANA_RPC_URL", "https://api.devnet.solana.com"))
+        self.max_concurrency = max_concurrency
+        self.page_size = page_size
+        self.max_cached_wallets = max_cached_wallets
+        self.max_pages = max_pages
+        # Newest signature up to which each wallet's history holds no payment
+        self._scanned_until = OrderedDict()
+        pool_size = int(os.getenv("RPC_POOL_SIZE", 16))
+        timeout = float(os.getenv("RPC_TIMEOUT", 10))
+        self.retries = int(os.getenv("RPC_RETRIES", 3))
+        self.metrics = TransportMetrics(pool_size)
+        self.client = AsyncClient(os.getenv("SOLANA_RPC_URL", "https://api.devnet.solana.com"), timeout=timeout)
+        # solana-py takes no HTTP session, so where its provider exposes one,
+        # swap in a bounded keep-alive pool and keep the default to close it
+        self._default_session = None
+        provider = getattr(self.client, "_provider", None)
+        if isinstance(getattr(provider, "session", None), httpx.AsyncClient):
+            self._default_session = provider.session
+            provider.session = httpx.AsyncClient(
+                timeout=timeout,
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+            )
         self.game_wallet = Pubkey.from_string(os.getenv("GAME_WALLET"))
         self.token_mint = Pubkey.from_string(os.getenv("TOKEN_MINT"))
+        self.ws_url = os.getenv("SOLANA_WS_URL", "wss://api.devnet.solana.com")
+        self.payment_index = None
         
+    async def close(self):
+        """Close the RPC client along with the session it was built with"""
+        if self._default_session is not None:
+            await self._default_session.aclose()
+        await self.client.close()
+
     async def verify_payment(self, player_wallet: str, amount: float = 0.1) -> bool:
         """
         Verify that a player has paid the required SOL
@@ -27,26 +71,141 @@ class GameToken:
         Returns:
             bool: True if payment verified, False otherwise
         """
+        if self.payment_index is not None:
+            paid = self.payment_index.lookup(player_wallet)
+            if paid is not None:
+                return paid
+            self.payment_index.fallbacks += 1
         try:
-            # Check recent transactions for payment
+            # Check transactions newer than the last scan for payment
             player_pubkey = Pubkey.from_string(player_wallet)
-            recent_txs = await self.client.get_signatures_for_address(player_pubkey)
-            
-            for tx in recent_txs.value:
-                transaction = await self.client.get_transaction(tx.signature)
-                # Verify transaction details
-                if (transaction.value and 
-                    transaction.value.transaction.message.recent_blockhash and
-                    transaction.value.transaction.signatures):
-                    # Check if transaction is a transfer to game wallet
-                    for ix in transaction.value.transaction.message.instructions:
-                        if (ix.program_id == self.game_wallet and 
-                            ix.data.amount == amount * 10**9):  # Convert to lamports
-                            return True
+            until = self._scanned_until.get(player_wallet)
+            before = None
+            scanned = []
+            missing = set()
+            for _ in range(self.max_pages):
+                page = await self._rpc(partial(
+                    self.client.get_signatures_for_address,
+                    player_pubkey, before=before, until=until, limit=self.page_size
+                ))
+                signatures = [tx.signature for tx in page.value]
+                if not signatures:
+                    break
+                scanned.extend(signatures)
+                if await self._find_payment(signatures, amount, missing):
+                    if self.payment_index is not None:
+                        self.payment_index.record(player_wallet)
+                    return True
+                if len(signatures) < self.page_size:
+                    break
+                before = signatures[-1]
+            else:
+                # Older history is still unread, so the cursor cannot move
+                return False
+
+            # Move the cursor down to the newest signature below every
+            # transaction the node has not returned yet, so those are rechecked
+            cursor = until
+            unresolved = [i for i, signature in enumerate(scanned) if signature in missing]
+            if not unresolved:
+                cursor = scanned[0] if scanned else until
+            elif unresolved[-1] + 1 < len(scanned):
+                cursor = scanned[unresolved[-1] + 1]
+            if cursor is not None:
+                self._scanned_until[player_wallet] = cursor
+                self._scanned_until.move_to_end(player_wallet)
+                while len(self._scanned_until) > self.max_cached_wallets:
+                    self._scanned_until.popitem(last=False)
             return False
         except Exception as e:
             print(f"Error verifying payment: {e}")
             return False
+
+    async def _find_payment(self, signatures: list, amount: float, missing: set) -> bool:
+        """
+        Fetch transactions concurrently and stop as soon as one is a payment
+        
+        Args:
+            signatures: Transaction signatures to inspect
+            amount: Amount of SOL required
+            missing: Signatures whose transaction the node did not return
+                are added to it
+            
+        Returns:
+            bool: True if any of the transactions pays the entry fee
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def inspect(signature):
+            async with semaphore:
+                transaction = await self._rpc(self.client.get_transaction, signature)
+            if not transaction.value:
+                missing.add(signature)
+                return False
+            return self._is_payment(transaction, amount)
+
+        tasks = [asyncio.ensure_future(inspect(signature)) for signature in signatures]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                if await finished:
+                    return True
+            return False
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _rpc(self, func, *args):
+        """Make a read-only RPC call with retries, counted in the transport metrics"""
+        return await retry_async(func, *args, retries=self.retries, metrics=self.metrics)
+
+    def _is_payment(self, transaction, amount: float) -> bool:
+        """Check whether a fetched transaction pays the entry fee to the game wallet"""
+        # Verify transaction details
+        if (transaction.value and 
+            transaction.value.transaction.message.recent_blockhash and
+            transaction.value.transaction.signatures):
+            # Check if transaction is a transfer to game wallet
+            for ix in transaction.value.transaction.message.instructions:
+                if (ix.program_id == self.game_wallet and 
+                    ix.data.amount == amount * 10**9):  # Convert to lamports
+                    return True
+        return False
+
+    async def follow_payments(self, amount: float = 0.1, max_staleness: float = 30.0):
+        """
+        Keep a local payment index current from a signature subscription
+        
+        Subscribes to transactions mentioning the game wallet and records
+        the payer of every entry-fee transfer, so verify_payment can answer
+        from the index instead of scanning the player's history. Runs
+        until cancelled.
+        
+        Args:
+            amount: Amount of SOL required (default 0.1)
+            max_staleness: Seconds without word from the subscription after
+                which verify_payment falls back to RPC
+        """
+        if self.payment_index is None:
+            # Base58 addresses are case-sensitive
+            self.payment_index = PaymentIndex(max_staleness=max_staleness, normalize=str)
+        async with connect(self.ws_url) as websocket:
+            await websocket.logs_subscribe(RpcTransactionLogsFilterMentions(self.game_wallet))
+            await websocket.recv()
+            self.payment_index.mark_synced()
+            while True:
+                try:
+                    messages = await asyncio.wait_for(websocket.recv(), timeout=max_staleness / 2)
+                except asyncio.TimeoutError:
+                    # The subscription is alive, there were just no payments
+                    self.payment_index.mark_synced()
+                    continue
+                for message in messages:
+                    signature = message.result.value.signature
+                    transaction = await self._rpc(self.client.get_transaction, signature)
+                    if self._is_payment(transaction, amount):
+                        payer = transaction.value.transaction.message.account_keys[0]
+                        self.payment_index.record(str(payer))
+                self.payment_index.mark_synced()
             
     async def reward_token(self, player_wallet: str, score: int) -> bool:
         """
@@ -75,7 +234,9 @@ class GameToken:
             
             # Create and send transaction
             transaction = Transaction().add(transfer_ix)
-            result = await self.client.send_transaction(transaction)
+            # Sends are not retried so a lost response cannot pay out twice
+            result = await retry_async(self.client.send_transaction, transaction,
+                                       retries=0, metrics=self.metrics)
             
             return "result" in result and result["result"]
         except Exception as e:
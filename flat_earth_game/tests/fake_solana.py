@@ -0,0 +1,123 @@
+"""
+In-process stand-in for solana-py's AsyncClient for tests and benchmarks.
+"""
+
+import asyncio
+from collections import Counter
+from types import SimpleNamespace
+
+LAMPORTS_PER_SOL = 10**9
+
+
+def transfer(payer, game_wallet, amount):
+    """
+    Build a fetched transaction as ``get_transaction`` returns it.
+
+    Args:
+        payer (str): Fee payer, the first account key
+        game_wallet (Pubkey): Program the instruction goes to
+        amount (float): SOL carried by the instruction
+
+    Returns:
+        SimpleNamespace: The transaction, with the fields GameToken reads
+    """
+    instruction = SimpleNamespace(program_id=game_wallet,
+                                  data=SimpleNamespace(amount=amount * LAMPORTS_PER_SOL))
+    message = SimpleNamespace(recent_blockhash="blockhash", instructions=[instruction], account_keys=[payer])
+    return SimpleNamespace(transaction=SimpleNamespace(message=message, signatures=["signature"]))
+
+
+class FakeSolanaClient:
+    """
+    Wallet histories answered by ``get_signatures_for_address`` and
+    ``get_transaction`` like an RPC node, with every call counted in ``calls``.
+
+    ``histories`` maps a wallet to its signatures, newest first, and
+    ``transactions`` maps a signature to what ``get_transaction`` returns as
+    its value; a signature missing from it is not found yet, as when the node
+    has not caught up with it. Every call sleeps ``latency`` seconds.
+    """
+
+    def __init__(self, latency=0.0):
+        """
+        Args:
+            latency (float): Seconds every call takes
+        """
+        self.latency = latency
+        self.histories = {}
+        self.transactions = {}
+        self.calls = Counter()
+
+    def add(self, wallet, signature, transaction=None):
+        """
+        Add a signature at the head of a wallet's history.
+
+        Args:
+            wallet (str): Wallet the transaction mentions
+            signature (str): Its signature
+            transaction (object): Fetched transaction, or None for one
+                without any instruction
+        """
+        self.histories.setdefault(wallet, []).insert(0, signature)
+        if transaction is None:
+            transaction = SimpleNamespace(transaction=SimpleNamespace(
+                message=SimpleNamespace(recent_blockhash="blockhash", instructions=[], account_keys=[wallet]),
+                signatures=["signature"]))
+        self.transactions[signature] = transaction
+
+    async def get_signatures_for_address(self, account, before=None, until=None, limit=None):
+        self.calls["get_signatures_for_address"] += 1
+        await asyncio.sleep(self.latency)
+        history = self.histories.get(str(account), [])
+        start = history.index(before) + 1 if before in history else 0
+        end = history.index(until) if until in history else len(history)
+        page = history[start:end][:limit]
+        return SimpleNamespace(value=[SimpleNamespace(signature=signature) for signature in page])
+
+    async def get_transaction(self, signature):
+        self.calls["get_transaction"] += 1
+        await asyncio.sleep(self.latency)
+        return SimpleNamespace(value=self.transactions.get(signature))
+
+
+class FakeLogsSocket:
+    """
+    Logs subscription handed out by ``connect`` in place of solana-py's.
+
+    ``recv`` answers ``logs_subscribe`` with a confirmation and then returns
+    the notification batches passed to ``notify``, waiting while none are
+    queued.
+    """
+
+    def __init__(self):
+        self.subscriptions = []
+        self.urls = []
+        self._batches = asyncio.Queue()
+
+    def connect(self, url):
+        """Stand in for ``solana.rpc.websocket_api.connect``."""
+        self.urls.append(url)
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def logs_subscribe(self, filter_):
+        self.subscriptions.append(filter_)
+        self._batches.put_nowait([SimpleNamespace(result=len(self.subscriptions))])
+
+    def notify(self, *signatures):
+        """
+        Queue one batch of log notifications.
+
+        Args:
+            *signatures (str): Signatures of the transactions announced
+        """
+        self._batches.put_nowait([SimpleNamespace(result=SimpleNamespace(value=SimpleNamespace(signature=signature)))
+                                  for signature in signatures])
+
+    async def recv(self):
+        return await self._batches.get()
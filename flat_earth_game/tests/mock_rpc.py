@@ -0,0 +1,256 @@
+"""
+Local mock of an Ethereum-style JSON-RPC node for tests and benchmarks.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _int(value):
+    """Read a quantity given as an int or a hex string."""
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class MockRPCNode:
+    """
+    In-process JSON-RPC node that mines sent transactions into blocks.
+
+    Transactions sent with ``eth_sendTransaction``, and logs added with
+    ``emit_log``, stay pending until the next block is mined, either by
+    calling ``mine`` or automatically every ``block_time`` seconds. Every call is counted per method in ``calls``.
+    Extra methods can be added by assigning callables to ``handlers``.
+
+    Transactions with a "from" address are ordered by nonce like on a dev
+    chain: one without a nonce gets the sender's next one, a nonce already
+    mined is rejected, a nonce already pending is only replaced by a gas
+    price at least 10% higher, and a nonce past a gap waits until the gap is
+    filled. Transactions priced below ``min_gas_price`` are not mined.
+    """
+
+    def __init__(self, block_time=None, latency=0.0):
+        """
+        Args:
+            block_time (float): Seconds between automatically mined blocks;
+                blocks are only mined by ``mine`` when omitted
+            latency (float): Seconds of simulated latency per HTTP request
+        """
+        self.block_time = block_time
+        self.latency = latency
+        self.block_number = 0
+        self.calls = {}
+        self.http_requests = 0
+        self.handlers = {}
+        self.receipts = {}
+        self.pending = []
+        self.logs = []
+        self.pending_logs = []
+        self.accounts = {}
+        self.gas_price = 10 ** 9
+        self.min_gas_price = 0
+        self._tx_count = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._server = _Server(("127.0.0.1", 0), self._handler_class())
+        self.url = "http://127.0.0.1:%d" % self._server.server_address[1]
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """Start serving requests, and mining blocks if ``block_time`` is set."""
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        if self.block_time:
+            threading.Thread(target=self._mine_forever, daemon=True).start()
+
+    def stop(self):
+        """Stop serving requests."""
+        self._stopped.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def mine(self):
+        """
+        Mine a block containing every pending transaction that can be mined.
+
+        Returns:
+            int: The new block number
+        """
+        with self._lock:
+            self.block_number += 1
+            for index, tx_hash in enumerate(self.pending):
+                self.receipts[tx_hash] = {
+                    "transactionHash": tx_hash,
+                    "blockNumber": hex(self.block_number),
+                    "transactionIndex": hex(index),
+                    "status": "0x1"
+                }
+            index = len(self.pending)
+            self.pending = []
+            for account in self.accounts.values():
+                pool = account["pool"]
+                while account["nonce"] in pool and pool[account["nonce"]][1] >= self.min_gas_price:
+                    tx_hash = pool.pop(account["nonce"])[0]
+                    self.receipts[tx_hash] = {
+                        "transactionHash": tx_hash,
+                        "blockNumber": hex(self.block_number),
+                        "transactionIndex": hex(index),
+                        "status": "0x1"
+                    }
+                    account["nonce"] += 1
+                    index += 1
+            for log in self.pending_logs:
+                log["blockNumber"] = hex(self.block_number)
+                self.logs.append(log)
+            self.pending_logs = []
+            return self.block_number
+
+    def emit_log(self, address, topics, data):
+        """
+        Add a contract log to the next mined block.
+
+        Args:
+            address (str): Emitting contract address
+            topics (list): Log topics
+            data (str): Hex-encoded log data
+        """
+        with self._lock:
+            self.pending_logs.append({"address": address, "topics": topics, "data": data})
+
+    def get_logs(self, query):
+        """Return mined logs matching an ``eth_getLogs`` filter."""
+        from_block = int(query.get("fromBlock", "0x0"), 16)
+        to_block = int(query.get("toBlock", hex(self.block_number)), 16)
+        topics = query.get("topics") or []
+        return [log for log in self.logs
+                if from_block <= int(log["blockNumber"], 16) <= to_block
+                and log["address"] == query.get("address", log["address"])
+                and all(topic is None or log["topics"][i] == topic
+                        for i, topic in enumerate(topics))]
+
+    def send_transaction(self, tx=None):
+        """
+        Accept a transaction into the pending pool.
+
+        Returns:
+            str: The transaction hash
+
+        Raises:
+            ValueError: If the sender's nonce was already used
+        """
+        tx = tx or {}
+        with self._lock:
+            if "from" in tx:
+                account = self.accounts.setdefault(tx["from"].lower(), {"nonce": 0, "pool": {}})
+                nonce = _int(tx.get("nonce", self._pending_nonce(account)))
+                gas_price = _int(tx.get("gasPrice", self.gas_price))
+                if nonce < account["nonce"]:
+                    raise ValueError("nonce too low")
+                replaced = account["pool"].get(nonce)
+                if replaced is not None and gas_price * 10 < replaced[1] * 11:
+                    raise ValueError("replacement transaction underpriced")
+            self._tx_count += 1
+            tx_hash = "0x%064x" % self._tx_count
+            if "from" in tx:
+                account["pool"][nonce] = (tx_hash, gas_price)
+            else:
+                self.pending.append(tx_hash)
+            return tx_hash
+
+    def transaction_count(self, address, block="latest"):
+        """Return an address's nonce after the latest block, or counting pending transactions."""
+        with self._lock:
+            account = self.accounts.get(address.lower(), {"nonce": 0, "pool": {}})
+            nonce = self._pending_nonce(account) if block == "pending" else account["nonce"]
+            return hex(nonce)
+
+    def _pending_nonce(self, account):
+        nonce = account["nonce"]
+        while nonce in account["pool"]:
+            nonce += 1
+        return nonce
+
+    def call(self, method, params):
+        """
+        Execute a single JSON-RPC method.
+
+        Args:
+            method (str): Method name
+            params (list): Method parameters
+
+        Returns:
+            The method result
+        """
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+        if method in self.handlers:
+            return self.handlers[method](*params)
+        if method == "eth_sendTransaction":
+            return self.send_transaction(params[0])
+        if method == "eth_getTransactionReceipt":
+            return self.receipts.get(params[0])
+        if method == "eth_getLogs":
+            return self.get_logs(params[0])
+        if method == "eth_getTransactionCount":
+            return self.transaction_count(*params)
+        if method == "eth_gasPrice":
+            return hex(self.gas_price)
+        if method == "eth_blockNumber":
+            return hex(self.block_number)
+        if method == "eth_chainId":
+            return "0x1"
+        raise KeyError(method)
+
+    def _respond(self, request):
+        """Build the response object for one JSON-RPC request."""
+        try:
+            result = self.call(request["method"], request.get("params", []))
+            return {"jsonrpc": "2.0", "id": request.get("id"), "result": result}
+        except KeyError as e:
+            return {"jsonrpc": "2.0", "id": request.get("id"),
+                    "error": {"code": -32601, "message": "Method not found: %s" % e}}
+        except ValueError as e:
+            return {"jsonrpc": "2.0", "id": request.get("id"),
+                    "error": {"code": -32000, "message": str(e)}}
+
+    def _mine_forever(self):
+        while not self._stopped.wait(self.block_time):
+            self.mine()
+
+    def _handler_class(self):
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with node._lock:
+                    node.http_requests += 1
+                if node.latency:
+                    time.sleep(node.latency)
+                if isinstance(body, list):
+                    response = [node._respond(request) for request in body]
+                else:
+                    response = node._respond(body)
+                data = json.dumps(response).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,200 @@
+"""
+Unit tests for the game API served by the Flask and ASGI apps.
+"""
+
+import asyncio
+import json
+import threading
+import unittest
+from flat_earth_game import api, metrics
+from flat_earth_game.asgi_interface import GameASGIApp
+from flat_earth_game.rpc_transport import RPCTransport
+from flat_earth_game.web_interface import create_app
+
+
+class FakeQuai:
+    """Minimal stand-in for the Quai contract client."""
+
+    game_address = "0xgame"
+    token_address = "0xtoken"
+    balance_cache = None
+
+    def __init__(self):
+        self.rewards = []
+        self.transport = RPCTransport("http://127.0.0.1:1")
+
+    def reward_winner(self, player_address, score):
+        self.rewards.append((player_address, score))
+        return {"success": True, "tokens_sent": min(score // 10, 100)}
+
+    def get_player_token_balance(self, player_address):
+        return 42
+
+
+def call_asgi(app, method, path, body=None):
+    """Send one request to an ASGI app and return (status, body bytes)."""
+    messages = [{"type": "http.request", "body": json.dumps(body).encode() if body is not None else b""}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    path, _, query = path.partition("?")
+    scope = {"type": "http", "method": method, "path": path, "query_string": query.encode(), "headers": []}
+    asyncio.run(app(scope, receive, send))
+    return sent[0]["status"], sent[1]["body"]
+
+
+class TestGameAPI(unittest.TestCase):
+    """Test that both serving modes return the same responses."""
+
+    def setUp(self):
+        """Build both apps over a fake chain client."""
+        self.quai = FakeQuai()
+        self.saved_quai = api._quai
+        api._quai = self.quai
+        self.flask = create_app().test_client()
+        self.asgi = GameASGIApp(io_workers=2, cpu_workers=1, inline_chars=100)
+
+    def tearDown(self):
+        """Restore the chain client and stop the ASGI workers."""
+        api._quai = self.saved_quai
+        self.asgi.close()
+
+    def both(self, method, path, body=None, asgi_body=None):
+        """Make the same request to both apps and check they agree."""
+        response = self.flask.open(path, method=method, json=body)
+        status, data = call_asgi(self.asgi, method, path, asgi_body or body)
+        self.assertEqual(status, response.status_code)
+        flask_data, data = response.get_json(), json.loads(data)
+        # Rebuttals are picked at random
+        if isinstance(data, dict) and "rebuttal" in data:
+            self.assertIn(data["rebuttal"], api.sessions.get(2).analyzer.rebuttals[data["category"]])
+            flask_data["rebuttal"] = data["rebuttal"]
+        self.assertEqual(data, flask_data)
+        return status, data
+
+    def test_same_responses(self):
+        """Test that a game played through either app returns identical JSON."""
+        for session_id in (1, 2):
+            api.sessions.create(session_id)
+        argument = {"wallet_address": "0xabc"}
+        for text in ("Satellites photograph a round Earth", "Satellite photos again", "Nonsense"):
+            status, data = self.both("POST", "/submit_argument",
+                                     dict(argument, argument=text, session_id=1),
+                                     dict(argument, argument=text, session_id=2))
+            self.assertEqual(status, 200)
+            self.assertIn("state", data)
+        self.assertEqual(self.both("GET", "/token_balance/0xabc")[1]["balance"], 42)
+        self.assertEqual(self.both("GET", "/game_status")[1]["game_contract"], "0xgame")
+        self.assertEqual(self.both("POST", "/submit_argument", {"argument": "x"})[0], 400)
+        self.assertEqual(self.both("POST", "/submit_argument",
+                                   dict(argument, argument="x", session_id=99))[0], 404)
+
+    def test_win_pays_reward(self):
+        """Test that a winning argument pays out through the chain client."""
+        api.sessions.create(3)
+        arguments = ["ships vanish over the horizon", "each time zone has its own noon",
+                     "gravity pulls toward the center", "magellan sailed the globe",
+                     "satellites take photos of earth"]
+        status, data = None, {}
+        for argument in arguments:
+            status, data = call_asgi(self.asgi, "POST", "/submit_argument", {
+                "argument": argument * 50, "session_id": 3, "wallet_address": "0xabc"
+            })
+            data = json.loads(data)
+            if "reward" in data:
+                break
+        self.assertEqual(status, 200)
+        self.assertTrue(data["reward"]["success"])
+        self.assertEqual(self.quai.rewards[0][0], "0xabc")
+
+    def test_session_is_bound_to_its_wallet(self):
+        """Test that only the wallet that paid for a session can play it and collect the reward."""
+        api.sessions.create(6, wallet="0xAbC")
+        api.sessions.create(7, wallet="0xAbC")
+        status, data = self.both("POST", "/submit_argument",
+                                 {"argument": "gravity", "session_id": 6, "wallet_address": "0xevil"},
+                                 {"argument": "gravity", "session_id": 7, "wallet_address": "0xevil"})
+        self.assertEqual((status, data), (403, {"error": "Session belongs to another wallet"}))
+        self.assertEqual(api.sessions.get(6).game_state.attempts, 0)
+
+        arguments = ["ships vanish over the horizon", "each time zone has its own noon",
+                     "gravity pulls toward the center", "magellan sailed the globe",
+                     "satellites take photos of earth"]
+        data = {}
+        for argument in arguments:
+            status, data = call_asgi(self.asgi, "POST", "/submit_argument", {
+                "argument": argument * 50, "session_id": 7, "wallet_address": "0xabc"
+            })
+            data = json.loads(data)
+            if "reward" in data:
+                break
+        self.assertTrue(data["reward"]["success"])
+        self.assertEqual(self.quai.rewards, [("0xAbC", data["state"]["credibility_score"])])
+        self.assertEqual(api.pay_reward({"wallet_address": "0xevil"}, data, "0xAbC"),
+                         {"success": False, "error": "Session belongs to another wallet"})
+
+    def test_durable_turns_leave_the_event_loop(self):
+        """Test that a short argument is played off the loop when turns wait for fsync."""
+        class SyncLog:
+            sync = True
+            threads = []
+
+            def log_start(self, key, seed):
+                pass
+
+            def log_turn(self, key, category_id, score):
+                self.threads.append(threading.current_thread().name)
+
+        api.sessions.create(5)
+        api.sessions.event_log = SyncLog()
+        try:
+            status, _ = call_asgi(self.asgi, "POST", "/submit_argument", {
+                "argument": "gravity", "session_id": 5, "wallet_address": "0xabc"
+            })
+        finally:
+            api.sessions.event_log = None
+        self.assertEqual(status, 200)
+        self.assertEqual(len(SyncLog.threads), 1)
+        self.assertTrue(SyncLog.threads[0].startswith("asgi-io"))
+
+    def test_metrics_endpoint(self):
+        """Test that both apps expose endpoint and game spans as Prometheus text."""
+        metrics.enable()
+        api.sessions.create(4)
+        self.flask.post("/submit_argument", json={
+            "argument": "gravity", "session_id": 4, "wallet_address": "0xabc"
+        })
+        response = self.flask.get("/metrics")
+        self.assertTrue(response.mimetype.startswith("text/plain"))
+        text = response.get_data(as_text=True)
+        self.assertIn('flat_earth_span_seconds_count{span="endpoint.submit_argument"}', text)
+        self.assertIn('flat_earth_span_seconds_count{span="game.process_argument"}', text)
+        self.assertIn("flat_earth_rpc_in_flight 0.0", text)
+        status, body = call_asgi(self.asgi, "GET", "/metrics")
+        self.assertEqual(status, 200)
+        self.assertIn(b'span="analyzer.analyze_argument"', body)
+
+    def test_routing_errors(self):
+        """Test unknown paths, wrong methods and malformed bodies on the ASGI app."""
+        self.assertEqual(call_asgi(self.asgi, "GET", "/nope")[0], 404)
+        self.assertEqual(call_asgi(self.asgi, "GET", "/submit_argument")[0], 405)
+        self.assertEqual(call_asgi(self.asgi, "POST", "/token_balance/0xabc")[0], 405)
+        status, data = call_asgi(self.asgi, "POST", "/start_game")
+        self.assertEqual((status, json.loads(data)), (400, {"error": "Invalid JSON"}))
+
+    def test_oversized_body(self):
+        """Test that both apps refuse a body over the size limit before parsing it."""
+        argument = "the horizon curves " * (api.max_request_bytes // 19 + 1)
+        status, data = self.both("POST", "/submit_argument", {
+            "argument": argument, "session_id": 5, "wallet_address": "0xabc"
+        })
+        self.assertEqual((status, data), (413, {"error": "Request body too large"}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,386 @@
+"""
+Unit tests for the blockchain-facing helpers, run against a local mock node.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import unittest
+from hexbytes import HexBytes
+from flat_earth_game.abi import build_artifact
+from flat_earth_game.balance_cache import BalanceCache
+from flat_earth_game.payment_index import EventFollower, PaymentIndex, decode_game_started
+from flat_earth_game.quai_integration import (GAME_COMPLETED_TOPIC, QuaiGameContract, TransportProvider,
+                                              count_completed)
+from flat_earth_game.reward_queue import RewardQueue, reward_key
+from flat_earth_game.rpc_transport import RPCError, RPCTransport
+from flat_earth_game.tests.mock_rpc import MockRPCNode
+from flat_earth_game.tx_pipeline import TransactionPipeline
+
+
+class TestRPCTransport(unittest.TestCase):
+    """Test cases for the pooled JSON-RPC transport."""
+
+    def setUp(self):
+        """Start a mock node and a transport connected to it."""
+        self.node = MockRPCNode()
+        self.node.start()
+        self.rpc = RPCTransport(self.node.url, pool_size=4)
+
+    def tearDown(self):
+        """Close the transport and stop the mock node."""
+        self.rpc.close()
+        self.node.stop()
+
+    def test_batch_and_errors(self):
+        """Test that a batch returns results in order and errors in place."""
+        results = self.rpc.batch([("eth_chainId", []), ("eth_unknown", []), ("eth_blockNumber", [])])
+        self.assertEqual(results[0], "0x1")
+        self.assertIsInstance(results[1], RPCError)
+        self.assertEqual(results[2], "0x0")
+        with self.assertRaises(RPCError):
+            self.rpc.call("eth_unknown", [])
+
+    def test_concurrent_reads_are_coalesced(self):
+        """Test that reads from many threads share a few HTTP requests."""
+        self.rpc.batch_window = 0.05
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.rpc.read("eth_chainId", [])))
+                   for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ["0x1"] * 20)
+        self.assertLess(self.node.http_requests, 20)
+        snapshot = self.rpc.metrics.snapshot()
+        self.assertEqual(snapshot["calls"], 20)
+        self.assertEqual(snapshot["in_flight"], 0)
+
+
+class TestTransactionPipeline(unittest.TestCase):
+    """Test cases for non-blocking transaction submission."""
+
+    def setUp(self):
+        """Start a mock node and a pipeline polling it."""
+        self.node = MockRPCNode()
+        self.node.start()
+        self.rpc = RPCTransport(self.node.url)
+        self.pipeline = TransactionPipeline(self.rpc, poll_interval=0.01)
+
+    def tearDown(self):
+        """Stop the pipeline and the mock node."""
+        self.pipeline.close()
+        self.node.stop()
+
+    def send(self):
+        return self.rpc([("eth_sendTransaction", [{}])])[0]
+
+    def test_handles_resolve_after_mining(self):
+        """Test that handles stay pending until their block is mined."""
+        handles = [self.pipeline.submit(self.send, on_receipt=lambda r: r["blockNumber"])
+                   for _ in range(5)]
+        self.assertFalse(handles[0].wait(0.1))
+        self.assertEqual(handles[0].status, "pending")
+
+        self.node.mine()
+        for handle in handles:
+            self.assertTrue(handle.wait(2))
+            self.assertEqual(handle.status, "confirmed")
+            self.assertEqual(handle.result, "0x1")
+        self.assertIs(self.pipeline.get(handles[0].id), handles[0])
+
+    def test_failed_send(self):
+        """Test that a send error fails the handle."""
+        def send():
+            raise ValueError("insufficient funds")
+
+        handle = self.pipeline.submit(send)
+        self.assertTrue(handle.wait(2))
+        self.assertEqual(handle.to_dict()["error"], "insufficient funds")
+
+
+class TestRewardQueue(unittest.TestCase):
+    """Test cases for batched reward settlement."""
+
+    def setUp(self):
+        """Create a queue that records every settled batch."""
+        self.batches = []
+        self.fail = False
+        self.queue = RewardQueue(self.settle, max_batch=3, max_delay=60)
+
+    def settle(self, entries):
+        if self.fail:
+            return {"success": False, "error": "nonce too low"}
+        self.batches.append(entries)
+        return {"success": True}
+
+    def test_size_trigger_and_idempotency(self):
+        """Test that a full batch wakes the flusher without blocking the winner, and duplicates are rejected."""
+        release, settled = threading.Event(), threading.Event()
+
+        def settle(entries):
+            release.wait(2)
+            settled.set()
+            return self.settle(entries)
+
+        self.queue.settle = settle
+        self.queue.start()
+        for session_id in range(4):
+            self.assertTrue(self.queue.enqueue("0xabc", 100, reward_key(session_id)))
+        self.assertFalse(self.queue.enqueue("0xabc", 100, reward_key(1)))
+        self.assertEqual(self.batches, [])  # settlement is still blocked
+        release.set()
+        self.assertTrue(settled.wait(2))
+        self.queue.stop()
+        self.assertEqual(len(self.batches[0]), 3)
+        keys = [key for batch in self.batches for _, _, key in batch]
+        self.assertEqual(len(keys), len(set(keys)))
+        self.assertEqual(self.queue.rewards_settled, 4)
+
+    def test_failed_batches_are_retried(self):
+        """Test that wins from a failed settlement are kept for the next flush."""
+        self.fail = True
+        self.queue.enqueue("0xabc", 100, reward_key("a"))
+        self.assertEqual(self.queue.flush(), 0)
+        self.assertEqual(len(self.queue), 1)
+        self.fail = False
+        self.assertEqual(self.queue.flush(), 1)
+
+    def test_failing_wins_are_dead_lettered(self):
+        """Test that wins stop being retried after max_attempts, so later wins still settle."""
+        self.queue.max_attempts = 2
+        self.fail = True
+        self.queue.enqueue("0xabc", 100, reward_key("a"))
+        self.assertEqual(self.queue.flush(), 0)
+        self.assertEqual(self.queue.flush(), 0)
+        self.assertEqual(len(self.queue), 0)
+        self.assertEqual(self.queue.dead_letters, [("0xabc", 100, reward_key("a"), "nonce too low")])
+        self.fail = False
+        self.queue.enqueue("0xdef", 90, reward_key("b"))
+        self.assertEqual(self.queue.flush(), 1)
+        self.assertEqual(self.queue.requeue_dead_letters(), 1)
+        self.assertEqual(self.queue.flush(), 1)
+        self.assertEqual(self.queue.dead_letters, [])
+
+    def test_skipped_wins_are_not_counted_as_paid(self):
+        """Test that wins the contract skipped are counted apart from the ones it paid."""
+        receipt = {"logs": [
+            {"address": "0x" + "AA" * 20, "topics": [HexBytes(GAME_COMPLETED_TOPIC)]},
+            {"address": "0x" + "aa" * 20, "topics": [HexBytes("0x" + "11" * 32)]},
+            {"address": "0x" + "bb" * 20, "topics": [HexBytes(GAME_COMPLETED_TOPIC)]}
+        ]}
+        paid = count_completed(receipt, "0x" + "aa" * 20)
+        self.assertEqual(paid, 1)
+        self.queue.settle = lambda entries: {"success": True, "rewards_settled": paid}
+        for session_id in range(3):
+            self.queue.enqueue("0xabc", 100, reward_key(session_id))
+        self.assertEqual(self.queue.flush(), 3)
+        self.assertEqual((self.queue.rewards_settled, self.queue.rewards_skipped), (1, 2))
+
+
+class TestPaymentIndex(unittest.TestCase):
+    """Test cases for the event-fed payment index."""
+
+    CONTRACT = "0x00000000000000000000000000000000000000aa"
+    TOPIC = "0x" + "ab" * 32
+
+    def setUp(self):
+        """Start a mock node with a few paid games."""
+        self.node = MockRPCNode()
+        self.node.start()
+        self.players = ["0x%040x" % (0xbeef0 + i) for i in range(3)]
+        for session_id, player in enumerate(self.players):
+            data = "0x" + player[2:].rjust(64, "0") + "%064x" % session_id
+            self.node.emit_log(self.CONTRACT, [self.TOPIC], data)
+        self.node.mine()
+        self.rpc_checks = []
+        self.index = PaymentIndex(self.check_payment, max_staleness=60)
+
+    def tearDown(self):
+        """Stop the mock node."""
+        self.node.stop()
+
+    def check_payment(self, player):
+        self.rpc_checks.append(player)
+        return player == "0xlate"
+
+    def follower(self, checkpoint_path=None, state=None):
+        return EventFollower(
+            RPCTransport(self.node.url), self.CONTRACT, self.TOPIC,
+            on_log=lambda log: self.index.record(decode_game_started(log)[0]),
+            on_synced=self.index.mark_synced,
+            checkpoint_path=checkpoint_path,
+            state=state
+        )
+
+    def test_verification_is_local_once_synced(self):
+        """Test that a synced index answers without RPC calls."""
+        self.assertTrue(self.index.verify("0xlate"))
+        self.assertEqual(self.rpc_checks, ["0xlate"])
+
+        self.assertEqual(self.follower().poll_once(), 3)
+        for player in self.players:
+            self.assertTrue(self.index.verify(player.upper().replace("0X", "0x")))
+        self.assertFalse(self.index.verify("0x%040x" % 1))
+        self.assertEqual(self.rpc_checks, ["0xlate"])
+
+    def test_checkpoint_resume(self):
+        """Test that a restarted follower resumes after its checkpoint."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "payments.json")
+            self.assertEqual(self.follower(path).poll_once(), 3)
+            self.node.emit_log(self.CONTRACT, [self.TOPIC], "0x" + "00" * 63 + "01" + "00" * 32)
+            self.node.mine()
+            follower = self.follower(path)
+            self.assertEqual(follower.checkpoint, 1)
+            self.assertEqual(follower.poll_once(), 1)
+
+    def test_restart_keeps_paid_players(self):
+        """Test that paid players survive a restart, and an old checkpoint is rebuilt."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "payments.json")
+            self.assertEqual(self.follower(path, self.index).poll_once(), 3)
+
+            self.index = PaymentIndex(self.check_payment, max_staleness=60)
+            self.assertEqual(self.follower(path, self.index).poll_once(), 0)
+            self.assertTrue(all(self.index.verify(player) for player in self.players))
+
+            # A checkpoint saved without the paid set replays from the start
+            with open(path, "w") as f:
+                json.dump({"block": 1}, f)
+            self.index = PaymentIndex(self.check_payment, max_staleness=60)
+            follower = self.follower(path, self.index)
+            self.assertFalse(self.index.verify(self.players[0]))  # not synced, so asked over RPC
+            self.assertEqual(self.rpc_checks, [self.players[0]])
+            self.assertEqual(follower.poll_once(), 3)
+            self.assertTrue(self.index.verify(self.players[0]))
+
+
+class TestBalanceCache(unittest.TestCase):
+    """Test cases for the token balance cache."""
+
+    TOKEN = "0x00000000000000000000000000000000000000bb"
+    TOPIC = "0x" + "cd" * 32
+
+    def setUp(self):
+        """Create a cache over a dict of balances."""
+        self.balances = {}
+        self.fetches = []
+        self.gate = None
+        self.cache = BalanceCache(self.fetch, max_entries=2, per_block=False)
+        self.cache.advance(1)
+
+    def fetch(self, address):
+        self.fetches.append(address)
+        if self.gate is not None:
+            self.gate.wait(2)
+        return self.balances.get(address.lower(), 0)
+
+    def test_hits_and_lru_eviction(self):
+        """Test that repeat lookups hit and the oldest address is evicted."""
+        self.balances["0xa"] = 5
+        self.assertEqual(self.cache.get("0xA"), 5)
+        self.assertEqual(self.cache.get("0xa"), 5)
+        self.cache.get("0xb")
+        self.cache.get("0xc")
+        self.cache.get("0xa")
+        self.assertEqual(self.fetches, ["0xA", "0xb", "0xc", "0xa"])
+        self.assertEqual(self.cache.snapshot()["hit_rate"], 0.2)
+
+    def test_concurrent_misses_share_one_fetch(self):
+        """Test that concurrent misses for one address make one fetch."""
+        self.balances["0xa"] = 7
+        self.gate = threading.Event()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.cache.get("0xa")))
+                   for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        self.gate.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [7] * 10)
+        self.assertEqual(len(self.fetches), 1)
+        self.assertEqual(self.cache.coalesced, 9)
+
+    def test_transfer_invalidation(self):
+        """Test that Transfer logs invalidate both addresses, also via a follower."""
+        for address in ("0x%040x" % 1, "0x%040x" % 2):
+            self.cache.get(address)
+        self.balances["0x%040x" % 2] = 3
+        with MockRPCNode() as node:
+            node.emit_log(self.TOKEN, [self.TOPIC, "0x" + "%064x" % 1, "0x" + "%064x" % 2], "0x")
+            node.mine()
+            follower = EventFollower(RPCTransport(node.url), self.TOKEN, self.TOPIC,
+                                     on_log=self.cache.on_transfer, on_synced=self.cache.advance)
+            self.assertEqual(follower.poll_once(), 1)
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.get("0x%040x" % 2), 3)
+
+    def test_invalidation_during_fetch_is_not_cached(self):
+        """Test that a balance fetched across an invalidation is not stored."""
+        self.gate = threading.Event()
+        thread = threading.Thread(target=self.cache.get, args=("0xa",))
+        thread.start()
+        while not self.fetches:
+            pass
+        self.cache.invalidate("0xa")
+        self.gate.set()
+        thread.join()
+        self.assertEqual(len(self.cache), 0)
+
+    def test_per_block_expiry(self):
+        """Test that per-block entries expire on the next block."""
+        self.cache.per_block = True
+        self.cache.get("0xa")
+        self.cache.get("0xa")
+        self.cache.advance(2)
+        self.cache.get("0xa")
+        self.assertEqual(len(self.fetches), 2)
+
+
+class TestContractReads(unittest.TestCase):
+    """Test cases for view calls made through the shared transport."""
+
+    def test_read_through_transport_provider(self):
+        """Test that _read encodes the call with the installed web3 and decodes the result."""
+        from web3 import Web3
+        calls = []
+        with MockRPCNode() as node:
+            node.handlers["eth_call"] = lambda tx, block: calls.append(tx) or "0x%064x" % 42
+            rpc = RPCTransport(node.url)
+            token = Web3(TransportProvider(rpc)).eth.contract(
+                address="0x" + "22" * 20,
+                abi=[{"type": "function", "name": "balanceOf", "stateMutability": "view",
+                      "inputs": [{"name": "account", "type": "address"}],
+                      "outputs": [{"name": "", "type": "uint256"}]}]
+            )
+            quai = QuaiGameContract.__new__(QuaiGameContract)
+            quai.transport = rpc
+            self.assertEqual(quai._read(token, "balanceOf", "0x" + "33" * 20), 42)
+            rpc.close()
+        # balanceOf(address) selector, then the address as one ABI word
+        self.assertEqual(calls[0]["data"], "0x70a08231" + "00" * 12 + "33" * 20)
+
+
+class TestContractABIs(unittest.TestCase):
+    """Test cases for the precompiled ABI artifact."""
+
+    def test_build_artifact(self):
+        """Test that bare and wrapped compiler output compact into one file."""
+        entry = {"type": "function", "name": "checkPayment", "inputs": [], "outputs": []}
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "GameABI.json"), "w") as f:
+                json.dump([entry], f, indent=4)
+            with open(os.path.join(tmp, "TokenABI.json"), "w") as f:
+                json.dump({"contractName": "FlatEarthToken", "abi": []}, f)
+            path = os.path.join(tmp, "abis.json")
+            build_artifact(tmp, path)
+            with open(path) as f:
+                self.assertEqual(json.load(f), {"Game": [entry], "Token": []})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,247 @@
+"""
+Unit tests for sticky session routing between worker processes.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import unittest
+from collections import Counter
+
+from flat_earth_game.cluster import Cluster, ClusterApp, ClusterNode, ClusterSessionBackend, HashRing
+from flat_earth_game.game import FlatEarthDebateGame
+from flat_earth_game.session_store import InMemorySessionBackend
+
+
+class FakeCluster:
+    """Routes ClusterNode requests straight to other workers' backends."""
+
+    def __init__(self, workers):
+        self.backends = {}
+        for worker in workers:
+            node = ClusterNode(worker)
+            node.request = lambda owner, method, path, payload=None: self.request(owner, method, path, payload)
+            self.backends[worker] = ClusterSessionBackend(InMemorySessionBackend(), node)
+        self.set_members(workers)
+
+    def set_members(self, workers):
+        for backend in self.backends.values():
+            backend.node.set_members({worker: f"127.0.0.1:{i}" for i, worker in enumerate(workers)})
+
+    def request(self, owner, method, path, payload):
+        backend = self.backends[owner]
+        if method == "POST":
+            return 200, {"received": backend.receive(payload)}
+        backend.local.delete(path.rsplit("/", 1)[1])
+        return 200, {"deleted": True}
+
+
+def run_app(app, path, body, server_port):
+    """Call an ASGI app once; return (status, decoded body)."""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": json.dumps(body).encode(), "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+    scope = {"type": "http", "method": "POST", "path": path, "server": ("127.0.0.1", server_port)}
+    asyncio.run(app(scope, receive, send))
+    return messages[0]["status"], json.loads(messages[1]["body"])
+
+
+async def echo_app(scope, receive, send):
+    """ASGI app that answers with the request body."""
+    body = (await receive())["body"]
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": body})
+
+
+class TestHashRing(unittest.TestCase):
+    """Test cases for the consistent hash ring."""
+
+    def test_keys_spread_evenly(self):
+        """Test that every worker owns a similar share of the keys."""
+        ring = HashRing([f"w{i}" for i in range(8)])
+        owners = Counter(ring.owner(str(key)) for key in range(40000))
+        self.assertEqual(len(owners), 8)
+        self.assertLess(max(owners.values()) / min(owners.values()), 1.5)
+
+    def test_membership_change_moves_few_keys(self):
+        """Test that adding or removing a worker only moves that worker's keys."""
+        ring = HashRing([f"w{i}" for i in range(4)])
+        before = {key: ring.owner(str(key)) for key in range(10000)}
+        ring.add("w4")
+        after = {key: ring.owner(str(key)) for key in range(10000)}
+        moved = [key for key in before if before[key] != after[key]]
+        self.assertTrue(all(after[key] == "w4" for key in moved))
+        self.assertLess(len(moved), 10000 * 0.3)
+
+        ring.remove("w1")
+        again = {key: ring.owner(str(key)) for key in range(10000)}
+        self.assertTrue(all(again[key] != after[key] for key in after if after[key] == "w1"))
+        self.assertTrue(all(again[key] == after[key] for key in after if after[key] != "w1"))
+
+    def test_empty_ring_has_no_owner(self):
+        """Test that an empty ring owns nothing."""
+        self.assertIsNone(HashRing().owner("1"))
+
+
+class TestClusterSessionBackend(unittest.TestCase):
+    """Test cases for handing sessions to their owners."""
+
+    def test_sessions_are_stored_by_their_owner(self):
+        """Test that a game set on any worker ends up on the owner only."""
+        cluster = FakeCluster(["w0", "w1", "w2"])
+        for key in map(str, range(300)):
+            cluster.backends["w0"].set(key, FlatEarthDebateGame())
+        for worker, backend in cluster.backends.items():
+            for key in backend.local.keys():
+                self.assertEqual(backend.node.owner(key), worker)
+        self.assertEqual(sum(len(backend.local) for backend in cluster.backends.values()), 300)
+
+    def test_rebalance_moves_games_with_their_state(self):
+        """Test that a membership change migrates games, keeping their progress."""
+        cluster = FakeCluster(["w0", "w1"])
+        cluster.backends["w2"] = ClusterSessionBackend(InMemorySessionBackend(), ClusterNode("w2"))
+        cluster.backends["w2"].node.request = cluster.backends["w0"].node.request
+        for key in map(str, range(200)):
+            game = FlatEarthDebateGame()
+            game.process_argument("NASA has satellite photos")
+            cluster.backends["w0"].set(key, game)
+
+        cluster.set_members(["w0", "w1", "w2"])
+        moved = sum(cluster.backends[worker].rebalance() for worker in ("w0", "w1"))
+        self.assertEqual(moved, len(cluster.backends["w2"].local))
+        self.assertGreater(moved, 0)
+        for worker, backend in cluster.backends.items():
+            for key in backend.local.keys():
+                self.assertEqual(backend.node.owner(key), worker)
+                self.assertEqual(backend.get(key).game_state.attempts, 1)
+
+    def test_delete_reaches_the_owner(self):
+        """Test that ending a session on another worker removes it from the owner."""
+        cluster = FakeCluster(["w0", "w1"])
+        key = next(k for k in map(str, range(100)) if cluster.backends["w0"].node.owner(k) == "w1")
+        cluster.backends["w0"].set(key, FlatEarthDebateGame())
+        self.assertIsNotNone(cluster.backends["w1"].get(key))
+        cluster.backends["w0"].delete(key)
+        self.assertIsNone(cluster.backends["w1"].get(key))
+
+
+class TestClusterApp(unittest.TestCase):
+    """Test cases for request routing."""
+
+    def setUp(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            closed_address = f"127.0.0.1:{sock.getsockname()[1]}"
+        self.node = ClusterNode("w0")
+        self.node.set_members({"w0": "127.0.0.1:1", "w1": closed_address})
+        self.backend = ClusterSessionBackend(InMemorySessionBackend(), self.node)
+        self.app = ClusterApp(echo_app, self.node, self.backend, internal_port=9001)
+        self.owned = next(k for k in range(100) if self.node.owns(str(k)))
+        self.remote = next(k for k in range(100) if not self.node.owns(str(k)))
+
+    def test_owned_sessions_are_served_locally(self):
+        """Test that a session this worker owns reaches the app with its body intact."""
+        body = {"session_id": self.owned, "argument": "Ships disappear over the horizon"}
+        self.assertEqual(run_app(self.app, "/submit_argument", body, 5000), (200, body))
+
+    def test_unreachable_owner_is_reported(self):
+        """Test that a session owned by a worker that is down gets a 503."""
+        status, body = run_app(self.app, "/submit_argument", {"session_id": self.remote}, 5000)
+        self.assertEqual(status, 503)
+        self.assertEqual(body, {"error": "Session owner unavailable"})
+
+    def test_start_game_goes_to_the_wallet_owner(self):
+        """Test that /start_game is served by the worker owning the wallet, so retries share one cache."""
+        owned = next(f"0x{k:040x}" for k in range(100) if self.node.owns(f"wallet:0x{k:040x}"))
+        remote = next(f"0x{k:040x}" for k in range(100) if not self.node.owns(f"wallet:0x{k:040x}"))
+        body = {"wallet_address": owned, "idempotency_key": "retry"}
+        self.assertEqual(run_app(self.app, "/start_game", body, 5000), (200, body))
+        status, _ = run_app(self.app, "/start_game", {"wallet_address": remote}, 5000)
+        self.assertEqual(status, 503)
+
+    def test_internal_requests_are_not_forwarded(self):
+        """Test that requests arriving on the internal port are served where they land."""
+        body = {"session_id": self.remote}
+        self.assertEqual(run_app(self.app, "/submit_argument", body, 9001), (200, body))
+
+    def test_cluster_endpoints_are_internal_only(self):
+        """Test that session handover is refused on the public port."""
+        status, _ = run_app(self.app, "/_cluster/sessions", {}, 5000)
+        self.assertEqual(status, 404)
+        status, body = run_app(self.app, "/_cluster/sessions", {str(self.owned): FlatEarthDebateGame().game_state.to_dict()}, 9001)
+        self.assertEqual((status, body), (200, {"received": 1}))
+        self.assertIsNotNone(self.backend.get(str(self.owned)))
+
+    def test_forwarded_request_is_sent_once(self):
+        """Test that a stale pooled connection is replaced, but a request the owner read is never resent."""
+        requests = []
+
+        async def owner(reader, writer):
+            # Keep-alive peer: "close" hangs up after answering, "crash" before
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    break
+                length = int(head.split(b"content-length: ")[1].split(b"\r\n")[0])
+                body = json.loads(await reader.readexactly(length))
+                requests.append(body)
+                if body.get("crash"):
+                    break
+                writer.write(b"HTTP/1.1 200 OK\r\ncontent-length: 2\r\n\r\n{}")
+                await writer.drain()
+                if body.get("close"):
+                    break
+            writer.close()
+
+        async def scenario():
+            server = await asyncio.start_server(owner, "127.0.0.1", 0)
+            self.node.set_members({"w0": "127.0.0.1:1",
+                                   "w1": f"127.0.0.1:{server.sockets[0].getsockname()[1]}"})
+            remote = next(k for k in range(100) if not self.node.owns(str(k)))
+            statuses = []
+            for body in ({"session_id": remote, "close": True}, {"session_id": remote},
+                         {"session_id": remote, "crash": True}):
+                messages = []
+
+                async def receive(body=body):
+                    return {"type": "http.request", "body": json.dumps(body).encode()}
+
+                async def send(message):
+                    messages.append(message)
+                await self.app({"type": "http", "method": "POST", "path": "/submit_argument",
+                                "server": ("127.0.0.1", 5000)}, receive, send)
+                statuses.append(messages[0]["status"])
+                await asyncio.sleep(0.05)  # let the owner's hang-up arrive
+            server.close()
+            await server.wait_closed()
+            return statuses
+
+        self.assertEqual(asyncio.run(scenario()), [200, 200, 503])
+        self.assertEqual(len(requests), 3)
+
+
+class TestCluster(unittest.TestCase):
+    """Test cases for the supervisor."""
+
+    def test_refuses_owner_nonces_in_every_worker(self):
+        """Test that the cluster will not start workers that would all hand out owner nonces."""
+        saved = os.environ.get("OWNER_ADDRESS")
+        os.environ["OWNER_ADDRESS"] = "0x" + "11" * 20
+        try:
+            with self.assertRaises(RuntimeError):
+                Cluster(2)
+        finally:
+            if saved is None:
+                del os.environ["OWNER_ADDRESS"]
+            else:
+                os.environ["OWNER_ADDRESS"] = saved
+
+
+if __name__ == "__main__":
+    unittest.main()
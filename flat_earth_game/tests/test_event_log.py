@@ -0,0 +1,130 @@
+"""
+Unit tests for the game event log.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from flat_earth_game.event_log import EventLog
+from flat_earth_game.session_store import SessionStore
+
+ARGUMENTS = ["Ships disappear over the horizon", "Gravity pulls us down", "Ships again",
+             "I just know it", "Satellites see it"]
+
+
+class FakeClock:
+    """Manually advanced wall clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestEventLog(unittest.TestCase):
+    """Test cases for journaling and recovering sessions."""
+
+    def setUp(self):
+        """Create an empty log directory."""
+        self.directory = tempfile.mkdtemp()
+        self.logs = []
+
+    def tearDown(self):
+        """Close every log and remove the directory."""
+        for log in self.logs:
+            log.close()
+        shutil.rmtree(self.directory)
+
+    def open_store(self, **options):
+        log = EventLog(self.directory, fsync=False, **options)
+        self.logs.append(log)
+        store = SessionStore(event_log=log)
+        store.recover()
+        return store
+
+    def play(self, store, session_id, arguments):
+        game = store.get(session_id)
+        results = []
+        for argument in arguments:
+            result = game.process_argument(argument)
+            store.save(session_id, game, result)
+            results.append(result.get("rebuttal"))
+        return results
+
+    def test_restart_restores_sessions(self):
+        """Test that restored games match and continue exactly as before the restart."""
+        store = self.open_store()
+        store.create(1, seed=5)
+        store.create(2, wallet="0xAbC")
+        store.create(3)
+        self.play(store, 1, ARGUMENTS[:3])
+        self.play(store, 2, ARGUMENTS[:1])
+        store.end(3)
+        before = {key: store.get(key).game_state.to_dict() for key in ("1", "2")}
+        self.logs[-1].close()
+
+        restored = self.open_store()
+        self.assertEqual({key: restored.get(key).game_state.to_dict() for key in ("1", "2")}, before)
+        self.assertEqual(restored.get(2).game_state.wallet, "0xAbC")
+        self.assertIsNone(restored.get(3))
+
+        uninterrupted = SessionStore()
+        uninterrupted.create(1, seed=5)
+        expected = self.play(uninterrupted, 1, ARGUMENTS)[3:]
+        self.assertEqual(self.play(restored, 1, ARGUMENTS[3:]), expected)
+
+    def test_snapshots_compact_the_log(self):
+        """Test that sealed segments fold into a snapshot and recovery still matches."""
+        store = self.open_store(snapshot_every=20)
+        for session_id in range(30):
+            store.create(session_id, seed=session_id, wallet="0x%040x" % session_id if session_id % 2 else None)
+            self.play(store, session_id, ARGUMENTS[session_id % 3:])
+        store.end(0)
+        before = {str(i): store.get(i).game_state.to_dict() for i in range(1, 30)}
+        log = self.logs[-1]
+        log.close()
+        self.assertGreater(log.snapshots, 0)
+        self.assertTrue(any(name.endswith(".snapshot") for name in os.listdir(self.directory)))
+
+        restored = self.open_store()
+        self.assertEqual({key: restored.get(key).game_state.to_dict() for key in before}, before)
+        self.assertIsNone(restored.get(0))
+
+    def test_torn_tail_and_expired_sessions(self):
+        """Test that a partial last record is ignored and idle sessions are dropped."""
+        clock = FakeClock()
+        store = self.open_store(session_ttl=60, clock=clock)
+        store.create("idle")
+        clock.now += 120
+        store.create("active", seed=1)
+        self.play(store, "active", ARGUMENTS[:1])
+        log = self.logs[-1]
+        log.close()
+        with open(log._path(log._segment, ".log"), "ab") as f:
+            f.write(b"\x02\x06partial")
+
+        restored = self.open_store(session_ttl=60, clock=clock)
+        self.assertIsNone(restored.get("idle"))
+        self.assertEqual(restored.get("active").game_state.attempts, 1)
+
+    def test_group_commit(self):
+        """Test that concurrent synchronous appends share commits."""
+        log = EventLog(self.directory, commit_delay=0.005)
+        self.logs.append(log)
+
+        def append(worker):
+            for turn in range(50):
+                log.log_turn(f"session-{worker}", 0, 25)
+        threads = [threading.Thread(target=append, args=(worker,)) for worker in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertLess(log.commits, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
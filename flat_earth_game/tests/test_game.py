@@ -2,10 +2,12 @@
 Unit tests for the Flat Earth Debate Game.
 """
 
+import json
 import unittest
 from flat_earth_game.game import FlatEarthDebateGame
 from flat_earth_game.argument_analyzer import ArgumentAnalyzer
-from flat_earth_game.game_state import GameState
+from flat_earth_game.game_state import GameState, GameStatePool, json_default
+from flat_earth_game.keyword_index import SCAN_MAX_KEYWORDS, KeywordIndex, normalize, normalized_chunks
 
 class TestFlatEarthDebateGame(unittest.TestCase):
     """Test cases for the main game functionality."""
@@ -63,5 +65,211 @@ class TestFlatEarthDebateGame(unittest.TestCase):
             
         self.assertTrue(self.game.game_state.is_convinced())
 
+    def test_games_share_analyzer_tables(self):
+        """Test that games share one read-only knowledge base."""
+        other = FlatEarthDebateGame()
+        self.assertIs(self.game.analyzer.knowledge_base, other.analyzer.knowledge_base)
+        self.assertIsNot(self.game.game_state, other.game_state)
+        with self.assertRaises(TypeError):
+            self.game.analyzer.evidence_weights["satellite"] = {}
+
+    def test_status_snapshot(self):
+        """Test that turn results carry a snapshot of the state at that turn."""
+        first = self.game.process_argument("Gravity proves Earth is round")
+        self.game.process_argument("NASA has satellite photos")
+        self.assertEqual(first["state"]["credibility_score"], 20)
+        self.assertEqual(dict(first["state"]), {
+            "credibility_score": 20,
+            "attempts": 1,
+            "skepticism": 90.0,
+            "convinced": False,
+            "used_arguments": ["gravity"]
+        })
+        self.assertEqual(self.game.game_state.get_status()["used_arguments"], ["satellite", "gravity"])
+
+    def test_result_serializes(self):
+        """Test that a turn result serializes with json_default and fails plainly without it."""
+        result = self.game.process_argument("Gravity proves Earth is round")
+        decoded = json.loads(json.dumps(result, default=json_default))
+        self.assertEqual(decoded["state"], self.game.game_state.get_status())
+        with self.assertRaises(TypeError):
+            json.dumps({"state": object()}, default=json_default)
+
+class TestSeededGames(unittest.TestCase):
+    """Test cases for reproducible rebuttals and hints."""
+
+    ARGUMENTS = ("Ships disappear over the horizon", "Gravity pulls us down", "Ships again",
+                 "Satellites see it", "Gravity again", "The sun sets in time zones")
+
+    def transcript(self, game, arguments=ARGUMENTS):
+        lines = [game.get_hint()]
+        for argument in arguments:
+            lines.append(json.dumps(game.process_argument(argument), default=dict, sort_keys=True))
+            lines.append(game.get_hint())
+        return "\n".join(lines)
+
+    def test_same_seed_same_transcript(self):
+        """Test that a seeded game replays byte for byte, and seeds differ."""
+        self.assertEqual(self.transcript(FlatEarthDebateGame(seed=7)),
+                         self.transcript(FlatEarthDebateGame(seed=7)))
+        transcripts = {self.transcript(FlatEarthDebateGame(seed=seed)) for seed in range(5)}
+        self.assertGreater(len(transcripts), 1)
+
+    def test_saved_game_continues_sequence(self):
+        """Test that a game restored mid-way keeps drawing the same sequence."""
+        whole = FlatEarthDebateGame(seed=11)
+        self.transcript(whole, self.ARGUMENTS[:3])
+        expected = self.transcript(whole, self.ARGUMENTS[3:])
+        first = FlatEarthDebateGame(seed=11)
+        self.transcript(first, self.ARGUMENTS[:3])
+        restored = FlatEarthDebateGame(GameState.from_dict(first.game_state.to_dict()))
+        self.assertEqual(self.transcript(restored, self.ARGUMENTS[3:]), expected)
+
+    def test_hints_only_suggest_unused_evidence(self):
+        """Test that hints name unused categories until all are used."""
+        game = FlatEarthDebateGame(seed=1)
+        descriptions = {category: game.analyzer.get_evidence_description(category)
+                        for category in game.analyzer.categories}
+        for argument in ("Ships disappear", "Gravity", "Satellites", "Time zones"):
+            game.process_argument(argument)
+        for _ in range(20):
+            self.assertIn(descriptions["circumnavigation"], game.get_hint())
+        game.process_argument("Magellan sailed")
+        self.assertEqual(game.get_hint(), "Try combining different types of evidence in your argument")
+
+
+class TestGameStatePool(unittest.TestCase):
+    """Test cases for the struct-of-arrays game state pool."""
+
+    def test_pool_matches_game_state(self):
+        """Test that bulk updates follow the same rules as single games."""
+        analyzer = ArgumentAnalyzer()
+        pool = GameStatePool(capacity=1)
+        arguments = [
+            ["Gravity pulls", "Gravity again", "Ships disappear", "Satellites", "sail around", "sun"],
+            ["sun", "sun", "sun", "curve"],
+        ]
+        games = [FlatEarthDebateGame() for _ in arguments]
+        slots = [pool.allocate() for _ in arguments]
+        self.assertEqual(len(pool), 2)
+
+        for turn in range(max(map(len, arguments))):
+            playing = [i for i, args in enumerate(arguments) if turn < len(args)]
+            analyses = [analyzer.analyze_argument(arguments[i][turn]) for i in playing]
+            awarded = pool.play([slots[i] for i in playing],
+                                [analyzer.category_ids[category] for category, _ in analyses],
+                                [score for _, score in analyses])
+            for i, score in zip(playing, awarded):
+                self.assertEqual(games[i].process_argument(arguments[i][turn])["score"], score)
+
+        for game, slot in zip(games, slots):
+            self.assertEqual(dict(pool.status(slot)), game.game_state.get_status())
+
+class TestKeywordIndex(unittest.TestCase):
+    """Test cases for the compiled keyword index."""
+
+    def legacy_classify(self, table, text):
+        """The original per-keyword substring scan."""
+        text = text.lower()
+        max_weight = 0
+        best_category = None
+        for category, data in table.items():
+            for keyword in data["keywords"]:
+                if keyword.lower() in text:
+                    if data["weight"] > max_weight:
+                        max_weight = data["weight"]
+                        best_category = category
+        return best_category, max_weight
+
+    def padded(self, table):
+        """Add keywords that never match, so the table is matched with the regular expression."""
+        filler = {"keywords": [f"#{n}#" for n in range(SCAN_MAX_KEYWORDS)], "weight": 1}
+        return dict(table, filler=filler)
+
+    def test_matches_substring_scan(self):
+        """Test that the index agrees with the original scan."""
+        texts = [
+            "",
+            "Spaceships curve around the horizon",
+            "A TIME ZONE and a timezone",
+            "Gravitational attraction is a force",
+            "Nothing relevant here",
+            "sundays and shadows at night",
+        ]
+        evidence_weights = ArgumentAnalyzer().evidence_weights
+        for table in (evidence_weights, self.padded(evidence_weights)):
+            index = KeywordIndex(table)
+            for text in texts:
+                self.assertEqual(index.classify(text.lower()), self.legacy_classify(table, text))
+
+    def test_overlapping_keywords(self):
+        """Test keywords that are prefixes of, or overlap, other keywords."""
+        table = {
+            "short": {"keywords": ["ab"], "weight": 30},
+            "long": {"keywords": ["abcd"], "weight": 10},
+            "inner": {"keywords": ["bc"], "weight": 20},
+            "tie": {"keywords": ["cd"], "weight": 30},
+        }
+        for table in (table, self.padded(table)):
+            index = KeywordIndex(table)
+            for text in ["abcd", "abc", "bcd", "xabx", "cd", "zzz"]:
+                self.assertEqual(index.classify(text), self.legacy_classify(table, text))
+
+    def test_batch_matches_scalar(self):
+        """Test that batch and streaming analysis agree with the scalar path."""
+        analyzer = ArgumentAnalyzer()
+        texts = ["", "Ships disappear", "NASA satellite", "nothing", "Gravity and space",
+                 "sail around", "shadow", "CURVE"] * 3
+        expected = [analyzer.analyze_argument(text) for text in texts]
+
+        category_ids, weights = analyzer.analyze_batch(texts)
+        decoded = [(analyzer.categories[i] if i >= 0 else None, w)
+                   for i, w in zip(category_ids, weights)]
+        self.assertEqual(decoded, expected)
+
+        streamed = []
+        for category_ids, weights in analyzer.analyze_stream(iter(texts), batch_size=5):
+            streamed.extend(zip(category_ids, weights))
+        self.assertEqual(streamed, list(zip(*analyzer.analyze_batch(texts))))
+
+    def test_batch_ids_past_short_range(self):
+        """Test that batch category ids do not overflow past 32767 categories."""
+        table = {f"c{n}": {"keywords": [f"<{n}>"], "weight": 1} for n in range(33000)}
+        category_ids, weights = KeywordIndex(table).classify_batch(["a <32999> b", "none"])
+        self.assertEqual(list(category_ids), [32999, -1])
+        self.assertEqual(list(weights), [1, 0])
+
+    def test_chunked_normalization(self):
+        """Test that chunked scanning agrees with normalizing the whole text."""
+        index = KeywordIndex(ArgumentAnalyzer().evidence_weights)
+        texts = [
+            "Ships DISAPPEAR over the horizon",
+            "time \n\t  zones " * 40,
+            "x" * 95 + "satel" + "lite photo",
+            " " * 300 + "gravity" + "\n" * 300,
+            "nothing here " * 50,
+        ]
+        for text in texts:
+            expected = index.classify(normalize(text))
+            for chunk_chars in (7, 64, 100, 16384):
+                self.assertEqual(index.classify_text(text, chunk_chars), expected)
+                self.assertEqual("".join(normalized_chunks(text, chunk_chars)), normalize(text))
+
+    def test_stops_at_best_keyword(self):
+        """Test that text after a hit of the top ranked keyword is never read."""
+        class Unread:
+            """Text whose first chunk mentions curvature and the rest may not be read."""
+
+            def __len__(self):
+                return 10 ** 9
+
+            def __getitem__(self, piece):
+                if piece.start >= 100:
+                    raise AssertionError("read past the best keyword")
+                return ("the curvature of the horizon " * 10)[piece]
+
+        analyzer = ArgumentAnalyzer()
+        self.assertEqual(analyzer.keyword_index.classify_text(Unread(), 100), ("curvature", 25))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,103 @@
+"""
+Unit tests for compiled, memory-mapped knowledge base files.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from flat_earth_game import knowledge_base as knowledge_base_module
+from flat_earth_game.argument_analyzer import ArgumentAnalyzer, default_analyzer
+from flat_earth_game.game import FlatEarthDebateGame
+from flat_earth_game.knowledge_base import EVIDENCE_WEIGHTS, REBUTTALS, KnowledgeBase
+from flat_earth_game.knowledge_file import (KnowledgeBaseReloader, compile_knowledge_base,
+                                            load_knowledge_base, read_version)
+
+ARGUMENTS = [
+    "Ships disappear bottom-first over the horizon",
+    "NASA has many satellite photos of Earth taken from space",
+    "Different time zones prove Earth is round",
+    "Magellan sailed around the world",
+    "I just know it",
+    "Überall sieht man den Horizont",
+]
+
+
+class TestKnowledgeFile(unittest.TestCase):
+    """Test cases for compiling, mapping and reloading knowledge bases."""
+
+    def setUp(self):
+        """Create a scratch directory and remember the installed default."""
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "knowledge.fekb")
+        self.installed = knowledge_base_module._installed
+
+    def tearDown(self):
+        """Restore the default knowledge base and remove the directory."""
+        knowledge_base_module.install_knowledge_base(self.installed)
+        shutil.rmtree(self.directory)
+
+    def test_mapped_tables_match_built_in(self):
+        """Test that a mapped knowledge base judges and answers like the original."""
+        tables = {name: dict(data) for name, data in EVIDENCE_WEIGHTS.items()}
+        tables["empty"] = {"keywords": ["", "überall"], "weight": 1, "description": "Anything at all"}
+        rebuttals = dict(REBUTTALS, empty=["Nope."])
+        original = KnowledgeBase(tables, rebuttals)
+        compile_knowledge_base(self.path, tables, rebuttals, version=7)
+        mapped = load_knowledge_base(self.path)
+
+        self.assertEqual(mapped.version, 7)
+        self.assertEqual(read_version(self.path), 7)
+        self.assertEqual(mapped.categories, original.categories)
+        self.assertEqual(mapped.hint_table, original.hint_table)
+        for category in original.categories:
+            self.assertEqual(tuple(mapped.rebuttals[category]), original.rebuttals[category])
+            self.assertEqual(tuple(mapped.evidence_weights[category]["keywords"]),
+                             original.evidence_weights[category]["keywords"])
+        expected, mapped_analyzer = ArgumentAnalyzer(original), ArgumentAnalyzer(mapped)
+        for argument in ARGUMENTS:
+            self.assertEqual(mapped_analyzer.analyze_argument(argument), expected.analyze_argument(argument))
+        self.assertEqual(mapped_analyzer.analyze_batch(ARGUMENTS), expected.analyze_batch(ARGUMENTS))
+        self.assertIn(mapped_analyzer.get_rebuttal("curvature"), REBUTTALS["curvature"])
+
+    def test_reloader_swaps_new_games_only(self):
+        """Test that a new version is installed for new games while old games keep theirs."""
+        compile_knowledge_base(self.path, version=1)
+        knowledge_base_module.install_knowledge_base(load_knowledge_base(self.path))
+        reloader = KnowledgeBaseReloader(self.path)
+        running = FlatEarthDebateGame()
+        self.assertFalse(reloader.check())
+
+        tables = {name: dict(data) for name, data in EVIDENCE_WEIGHTS.items()}
+        tables["curvature"]["weight"] = 40
+        compile_knowledge_base(self.path, tables, REBUTTALS, version=2)
+        self.assertTrue(reloader.check())
+        self.assertEqual(default_analyzer().knowledge_base.version, 2)
+        self.assertEqual(FlatEarthDebateGame().process_argument("the horizon")["score"], 40)
+        self.assertEqual(running.process_argument("the horizon")["score"], 25)
+
+    def test_rejects_tables_games_cannot_store(self):
+        """Test that oversized tables and non-integer weights are refused before anything is written."""
+        compile_knowledge_base(self.path, version=1)
+        reloader = KnowledgeBaseReloader(self.path)
+        too_many = {f"c{n}": {"keywords": [f"k{n}"], "weight": 1, "description": "Filler"} for n in range(65)}
+        with self.assertRaises(ValueError):
+            compile_knowledge_base(self.path, too_many, {name: ["No."] for name in too_many}, version=2)
+        tables = {name: dict(data) for name, data in EVIDENCE_WEIGHTS.items()}
+        tables["curvature"]["weight"] = 25.5
+        with self.assertRaises(ValueError):
+            compile_knowledge_base(self.path, tables, REBUTTALS, version=3)
+        self.assertEqual(read_version(self.path), 1)
+        self.assertFalse(reloader.check())
+
+    def test_rejects_other_files(self):
+        """Test that a file that is not a compiled knowledge base is refused."""
+        with open(self.path, "wb") as f:
+            f.write(b"not a knowledge base" * 4)
+        with self.assertRaises(ValueError):
+            load_knowledge_base(self.path)
+        self.assertIsNone(read_version(self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+"""
+Unit tests for the player leaderboards.
+"""
+
+import json
+import random
+import unittest
+
+from flat_earth_game import api
+from flat_earth_game.asgi_interface import GameASGIApp
+from flat_earth_game.leaderboard import Leaderboard, Leaderboards, RankIndex
+from flat_earth_game.payment_index import EventFollower
+from flat_earth_game.rpc_transport import RPCTransport
+from flat_earth_game.tests.mock_rpc import MockRPCNode
+from flat_earth_game.tests.test_api import FakeQuai, call_asgi
+from flat_earth_game.web_interface import create_app
+
+TRANSFER_TOPIC = "0xddf252ad"
+COMPLETED_TOPIC = "0x1ea2c9f3"
+TOKEN = 10 ** 18  # base units per whole token
+
+
+def word(value):
+    """Encode an int or address as one 32-byte ABI word, without 0x."""
+    return "%064x" % (int(value, 16) if isinstance(value, str) else value)
+
+
+def address(n):
+    return "0x%040x" % n
+
+
+class TestRankIndex(unittest.TestCase):
+    """Test cases for the blocked order-statistics set."""
+
+    def test_matches_sorted_list(self):
+        """Test ranks and descending pages against a plain sorted list while blocks split and empty."""
+        rng = random.Random(7)
+        index = RankIndex(range(0, 200, 2), load=4)
+        reference = set(range(0, 200, 2))
+        for _ in range(3000):
+            value = rng.randrange(400)
+            if value in reference:
+                index.remove(value)
+                reference.discard(value)
+            else:
+                index.add(value)
+                reference.add(value)
+            if rng.random() < 0.1:
+                ordered = sorted(reference)
+                probe = rng.randrange(420)
+                self.assertEqual(index.count_below(probe), sum(1 for v in ordered if v < probe))
+                offset = rng.randrange(len(ordered) + 2)
+                self.assertEqual(list(index.descending(offset)), ordered[::-1][offset:])
+        self.assertEqual(len(index), len(reference))
+        with self.assertRaises(KeyError):
+            index.remove(401)
+
+
+class TestLeaderboard(unittest.TestCase):
+    """Test cases for ranking players by points."""
+
+    def test_ranks_and_ties(self):
+        """Test that updates move players and equal points keep the first player seen ahead."""
+        board = Leaderboard(slot_bits=8, load=2)
+        for player, points in (("0xA", 50), ("0xb", 90), ("0xc", 50), ("0xd", 10)):
+            board.record_best(player, points)
+        board.record_best("0xb", 20)  # lower than the best, so ignored
+        self.assertEqual(board.top(10), [("0xb", 90), ("0xa", 50), ("0xc", 50), ("0xd", 10)])
+        self.assertEqual([board.rank(p) for p in ("0xB", "0xa", "0xc", "0xd")], [1, 2, 3, 4])
+        self.assertEqual(board.top(2, offset=1), [("0xa", 50), ("0xc", 50)])
+
+        board.add("0xd", 100)
+        board.add("0xb", -1000)  # clamped at 0
+        self.assertEqual(board.top(10), [("0xd", 110), ("0xa", 50), ("0xc", 50), ("0xb", 0)])
+        self.assertIsNone(board.rank("0xe"))
+        self.assertEqual(len(board), 4)
+
+
+class TestLeaderboards(unittest.TestCase):
+    """Test cases for feeding the boards from games and contract events."""
+
+    def test_events_from_mock_node(self):
+        """Test that followed Transfer and GameCompleted logs rank players."""
+        boards = Leaderboards()
+        with MockRPCNode() as node:
+            rpc = RPCTransport(node.url)
+            mint = [TRANSFER_TOPIC, "0x" + word(0), "0x" + word(address(1))]
+            node.emit_log("0xtoken", mint, "0x" + word(70 * TOKEN))
+            node.emit_log("0xtoken", [TRANSFER_TOPIC, "0x" + word(address(1)), "0x" + word(address(2))],
+                          "0x" + word(30 * TOKEN + TOKEN // 2))
+            node.emit_log("0xgame", [COMPLETED_TOPIC], "0x" + word(address(2)) + word(950) + word(95))
+            node.mine()
+            for contract, topic, on_log in (("0xtoken", TRANSFER_TOPIC, boards.on_transfer),
+                                            ("0xgame", COMPLETED_TOPIC, boards.on_game_completed)):
+                EventFollower(rpc, contract, topic, on_log).poll_once()
+            rpc.close()
+
+        boards.record_game(address(3), 950, attempts=6)
+        boards.record_game(address(1), 700, attempts=5)
+        self.assertEqual([(entry["address"], entry["tokens"]) for entry in boards.top("tokens", 10)],
+                         [(address(1), 39), (address(2), 30)])
+        self.assertEqual(boards.top("score", 10), [
+            {"rank": 1, "address": address(3), "score": 950, "attempts": 6},
+            {"rank": 2, "address": address(2), "score": 950, "attempts": None},
+            {"rank": 3, "address": address(1), "score": 700, "attempts": 5}
+        ])
+        self.assertEqual(boards.standing(address(3)), {
+            "score": {"rank": 1, "score": 950, "attempts": 6}, "tokens": None
+        })
+
+
+    def test_token_balances_in_base_units(self):
+        """Test that 18-decimal amounts rank by whole tokens without saturating."""
+        boards = Leaderboards()
+
+        def transfer(sender, receiver, value):
+            boards.on_transfer({"topics": [TRANSFER_TOPIC, "0x" + word(sender), "0x" + word(receiver)],
+                                "data": "0x" + word(value)})
+        transfer(0, address(1), 10 * TOKEN)
+        transfer(0, address(2), 100 * TOKEN)
+        transfer(address(2), address(1), TOKEN)
+        transfer(0, address(3), 10 ** 9 * TOKEN)
+        self.assertEqual([(entry["address"], entry["tokens"]) for entry in boards.top("tokens", 10)],
+                         [(address(3), 10 ** 9), (address(2), 99), (address(1), 11)])
+
+
+class TestLeaderboardAPI(unittest.TestCase):
+    """Test that both serving modes answer leaderboard queries alike."""
+
+    def setUp(self):
+        self.saved = api._quai, api.leaderboards
+        api._quai = FakeQuai()
+        api.leaderboards = Leaderboards()
+        self.flask = create_app().test_client()
+        self.asgi = GameASGIApp(io_workers=1, cpu_workers=1)
+
+    def tearDown(self):
+        api._quai, api.leaderboards = self.saved
+        self.asgi.close()
+
+    def both(self, path):
+        response = self.flask.get(path)
+        status, data = call_asgi(self.asgi, "GET", path)
+        self.assertEqual((status, json.loads(data)), (response.status_code, response.get_json()))
+        return status, json.loads(data)
+
+    def test_won_game_is_ranked(self):
+        """Test that a won game shows up on the score board of both apps."""
+        api.sessions.create(20)
+        for argument in ("ships vanish over the horizon", "each time zone has its own noon",
+                         "gravity pulls toward the center", "magellan sailed the globe",
+                         "satellites take photos of earth"):
+            result, _, won = api.play_argument({"argument": argument * 50, "session_id": 20,
+                                                "wallet_address": "0xABC"})
+            if won:
+                break
+        self.assertTrue(won)
+        api.leaderboards.record_game("0xdef", 1, attempts=1)
+
+        status, data = self.both("/leaderboard?limit=1")
+        self.assertEqual(status, 200)
+        self.assertEqual(data["total"], 2)
+        self.assertEqual(data["players"], [{"rank": 1, "address": "0xabc",
+                                            "score": result["state"]["credibility_score"],
+                                            "attempts": result["state"]["attempts"]}])
+        self.assertEqual(self.both("/leaderboard/0xdef")[1]["score"]["rank"], 2)
+        self.assertEqual(self.both("/leaderboard?board=tokens")[1]["players"], [])
+        self.assertEqual(self.both("/leaderboard/0x999")[0], 404)
+        self.assertEqual(self.both("/leaderboard?limit=0")[0], 400)
+        self.assertEqual(self.both("/leaderboard?limit=x")[0], 400)
+        self.assertEqual(self.both("/leaderboard?board=wins")[0], 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Unit tests for timing spans and the sampling profiler.
+"""
+
+import threading
+import time
+import unittest
+from flat_earth_game import metrics
+
+
+class TestSpans(unittest.TestCase):
+    """Test cases for span histograms."""
+
+    def setUp(self):
+        """Start every test with spans disabled and no histograms."""
+        self.was_enabled = metrics.enabled
+        metrics.disable()
+        metrics.registry.clear()
+
+    def tearDown(self):
+        """Restore the recording flag."""
+        if self.was_enabled:
+            metrics.enable()
+
+    def test_disabled_spans_record_nothing(self):
+        """Test that timed functions and span blocks are free of side effects when off."""
+        double = metrics.timed("test.double")(lambda x: x * 2)
+        self.assertEqual(double(4), 8)
+        with metrics.span("test.block"):
+            pass
+        metrics.observe("test.observed", 0.5)
+        self.assertTrue(all(h.count == 0 for h in metrics.registry.histograms()))
+
+    def test_enabled_spans(self):
+        """Test that spans land in the right buckets, including on errors."""
+        metrics.enable()
+
+        @metrics.timed("test.fail")
+        def fail():
+            raise ValueError()
+
+        with self.assertRaises(ValueError):
+            fail()
+        with metrics.span("test.block"):
+            pass
+        metrics.observe("test.observed", 0.003)
+        buckets, total, count = metrics.registry.histogram("test.observed").snapshot()
+        self.assertEqual(count, 1)
+        self.assertEqual(dict(buckets)[0.0025], 0)
+        self.assertEqual(dict(buckets)[0.005], 1)
+        self.assertEqual(buckets[-1], (float("inf"), 1))
+        self.assertEqual(metrics.registry.histogram("test.fail").count, 1)
+
+    def test_exited_threads_leave_no_shards(self):
+        """Test that a thread per request does not grow the histogram's shards."""
+        histogram = metrics.Histogram("test.threads")
+        for _ in range(500):
+            thread = threading.Thread(target=histogram.observe, args=(0.001,))
+            thread.start()
+            thread.join()
+        histogram.observe(0.002)
+        self.assertLessEqual(len(histogram._shards), 2)
+        _, total, count = histogram.snapshot()
+        self.assertEqual(count, 501)
+        self.assertEqual(histogram.count, 501)
+        self.assertAlmostEqual(total, 0.502)
+
+    def test_prometheus_text(self):
+        """Test the exposition format for histograms and gauges."""
+        metrics.enable()
+        metrics.observe('odd"name', 2.0)
+        text = metrics.render_prometheus({"flat_earth_rpc_in_flight": 3})
+        self.assertIn("# TYPE flat_earth_span_seconds histogram", text)
+        self.assertIn('flat_earth_span_seconds_bucket{span="odd\\"name",le="1.0"} 0', text)
+        self.assertIn('flat_earth_span_seconds_bucket{span="odd\\"name",le="+Inf"} 1', text)
+        self.assertIn('flat_earth_span_seconds_sum{span="odd\\"name"} 2.0', text)
+        self.assertIn("flat_earth_rpc_in_flight 3.0", text)
+        self.assertTrue(text.endswith("\n"))
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    """Test cases for the sampling profiler."""
+
+    def test_samples_busy_thread(self):
+        """Test that a busy thread's function shows up in the collapsed stacks."""
+        stopped = threading.Event()
+
+        def spin_for_profiler():
+            while not stopped.is_set():
+                sum(range(1000))
+
+        worker = threading.Thread(target=spin_for_profiler, name="busy")
+        worker.start()
+        profiler = metrics.SamplingProfiler(interval=0.001)
+        profiler.start()
+        time.sleep(0.1)
+        profiler.stop()
+        stopped.set()
+        worker.join()
+        self.assertGreater(profiler.samples, 0)
+        stacks = profiler.collapsed()
+        self.assertIn("busy;", stacks)
+        self.assertIn("spin_for_profiler (test_metrics.py:", stacks)
+
+
+if __name__ == '__main__':
+    unittest.main()
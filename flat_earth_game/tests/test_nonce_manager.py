@@ -0,0 +1,133 @@
+"""
+Unit tests for owner account nonce management, run against a local mock node.
+"""
+
+import threading
+import unittest
+
+from flat_earth_game.nonce_manager import NonceManager
+from flat_earth_game.rpc_transport import RPCTransport
+from flat_earth_game.tests.mock_rpc import MockRPCNode
+from flat_earth_game.tests.test_session_store import FakeClock
+from flat_earth_game.tx_pipeline import TransactionPipeline
+
+OWNER = "0x00000000000000000000000000000000000000aa"
+
+
+class TestNonceManager(unittest.TestCase):
+    """Test cases for local nonce allocation and recovery."""
+
+    def setUp(self):
+        """Start a mock node and a manager for the owner account."""
+        self.node = MockRPCNode()
+        self.node.start()
+        self.rpc = RPCTransport(self.node.url, pool_size=8)
+        self.clock = FakeClock()
+        self.nonces = NonceManager(self.rpc.call, OWNER, stuck_after=30, clock=self.clock)
+
+    def tearDown(self):
+        """Close the transport and stop the mock node."""
+        self.rpc.close()
+        self.node.stop()
+
+    def transfer(self, fields):
+        return self.rpc.call("eth_sendTransaction", [dict(fields, to="0xbb")])
+
+    def test_concurrent_sends_get_distinct_nonces(self):
+        """Test that parallel sends use every nonce once and all get mined."""
+        hashes = []
+        threads = [threading.Thread(target=lambda: hashes.append(self.nonces.send(self.transfer)))
+                   for _ in range(50)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.nonces), 50)
+        self.node.mine()
+        self.assertTrue(all(tx_hash in self.node.receipts for tx_hash in hashes))
+        self.assertIsNone(self.nonces.check())
+        self.assertEqual(len(self.nonces), 0)
+
+    def test_failed_send_gap_is_filled(self):
+        """Test that a nonce whose send failed is reused, or filled when nothing else comes."""
+        def failing(fields):
+            raise ValueError("insufficient funds")
+
+        first = self.nonces.send(self.transfer)
+        with self.assertRaises(ValueError):
+            self.nonces.send(failing)
+        self.nonces.send(self.transfer)  # reuses nonce 1
+        self.node.mine()
+        self.assertEqual(self.node.transaction_count(OWNER), "0x2")
+
+        # The next send fails only after a later one went out behind it
+        later_sent = threading.Event()
+
+        def failing_later(fields):
+            later_sent.wait(2)
+            raise ValueError("insufficient funds")
+
+        thread = threading.Thread(target=lambda: self.assertRaises(ValueError, self.nonces.send, failing_later))
+        thread.start()
+        while not self.nonces._sending:
+            later_sent.wait(0.001)
+        queued = self.nonces.send(self.transfer)  # nonce 3, held behind the gap at 2
+        later_sent.set()
+        thread.join()
+        self.node.mine()
+        self.assertNotIn(queued, self.node.receipts)
+        self.assertEqual(self.nonces.check(), "filled")
+        self.node.mine()
+        self.assertIn(queued, self.node.receipts)
+        self.assertIn(first, self.node.receipts)
+        self.assertEqual(self.nonces.gaps_filled, 1)
+
+    def test_stuck_transaction_is_sped_up(self):
+        """Test that an underpriced transaction is replaced and its handle follows."""
+        pipeline = TransactionPipeline(self.rpc.batch, poll_interval=0.01)
+        self.nonces.on_replaced = pipeline.replace
+        self.node.min_gas_price = 2 * 10 ** 9  # sent at the old 1 gwei price
+        handle = pipeline.submit(lambda: self.nonces.send(self.transfer))
+        while handle.status == "submitting":
+            handle.wait(0.01)
+        old_hash = handle.tx_hash
+        self.node.mine()
+        self.assertIsNone(self.nonces.check())
+
+        self.node.gas_price = 2 * 10 ** 9
+        self.clock.now = 31
+        self.assertEqual(self.nonces.check(), "sped up")
+        self.node.mine()
+        self.assertTrue(handle.wait(2))
+        pipeline.close()
+        self.assertEqual(handle.status, "confirmed")
+        self.assertNotEqual(handle.tx_hash, old_hash)
+        self.assertEqual(self.nonces.wait_for_receipt(old_hash)["transactionHash"], handle.tx_hash)
+
+    def test_dropped_transaction_is_resent(self):
+        """Test that a transaction missing from the node is sent again."""
+        self.nonces.send(self.transfer)
+        dropped = self.nonces.send(self.transfer)
+        self.nonces.send(self.transfer)
+        self.node.accounts[OWNER]["pool"].pop(1)
+        self.assertEqual(self.nonces.check(), "resent")
+        self.node.mine()
+        self.assertEqual(self.node.transaction_count(OWNER), "0x3")
+        self.assertIn(self.nonces.wait_for_receipt(dropped)["transactionHash"], self.node.receipts)
+
+    def test_restart_continues_after_sent_transactions(self):
+        """Test that a new manager skips nonces a previous process already used."""
+        self.nonces.send(self.transfer)
+        self.node.mine()
+        self.transfer({"from": OWNER, "nonce": 2})  # queued behind a gap at 1
+        restarted = NonceManager(self.rpc.call, OWNER)
+        self.assertEqual(self.node.transaction_count(OWNER, "pending"), "0x1")
+        restarted.send(self.transfer)
+        restarted.send(self.transfer)
+        self.assertEqual(sorted(restarted._in_flight), [1, 3])
+        self.node.mine()
+        self.assertEqual(self.node.transaction_count(OWNER), "0x4")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+"""
+Unit tests for request rate limiting and deduplication.
+"""
+
+import threading
+import time
+import unittest
+
+from flat_earth_game import api
+from flat_earth_game.rate_limit import IdempotencyCache, RateLimiter
+from flat_earth_game.tests.test_session_store import FakeClock
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Test cases for the token bucket table."""
+
+    def test_burst_then_rate(self):
+        """Test that a key gets its burst at once and then refills at the rate."""
+        clock = FakeClock()
+        limiter = RateLimiter(rate=2, burst=3, clock=clock)
+        self.assertEqual([limiter.acquire("a") for _ in range(4)], [0.0, 0.0, 0.0, 0.5])
+        self.assertEqual(limiter.acquire("b"), 0.0)
+        clock.now = 0.5
+        self.assertEqual(limiter.acquire("a"), 0.0)
+        self.assertEqual(limiter.acquire("a"), 0.5)
+        clock.now = 100
+        self.assertEqual([limiter.acquire("a") for _ in range(4)], [0.0, 0.0, 0.0, 0.5])
+
+    def test_table_stays_bounded(self):
+        """Test that many keys reuse refilled slots and only evict when the table is busy."""
+        clock = FakeClock()
+        limiter = RateLimiter(rate=1, burst=1, slots=64, clock=clock)
+        for key in range(10000):
+            clock.now = key  # every earlier bucket has refilled
+            self.assertEqual(limiter.acquire(str(key)), 0.0)
+        self.assertEqual(limiter.evictions, 0)
+        self.assertEqual(len(limiter._hashes), 64)
+
+        for key in range(1000):
+            limiter.acquire(f"busy{key}")
+        self.assertGreater(limiter.evictions, 0)
+
+
+class TestIdempotencyCache(unittest.TestCase):
+    """Test cases for replaying stored responses."""
+
+    def test_concurrent_duplicates_run_once(self):
+        """Test that duplicates arriving mid-request wait for the first response."""
+        cache = IdempotencyCache()
+        calls = []
+
+        def handler():
+            calls.append(1)
+            time.sleep(0.05)
+            return {"session_id": len(calls)}, 200
+        responses = []
+        threads = [threading.Thread(target=lambda: responses.append(cache.run("k", handler)))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(responses, [({"session_id": 1}, 200)] * 5)
+        self.assertEqual(cache.hits, 4)
+
+    def test_waiters_retry_after_a_failure(self):
+        """Test that duplicates waiting on a failed request run it again instead of replaying the failure."""
+        cache = IdempotencyCache()
+        calls = []
+
+        def handler():
+            calls.append(1)
+            time.sleep(0.05)
+            if len(calls) == 1:
+                return {"error": "Payment failed"}, 500
+            return {"session_id": len(calls)}, 200
+        responses = []
+        threads = [threading.Thread(target=lambda: responses.append(cache.run("k", handler)))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(responses.count(({"error": "Payment failed"}, 500)), 1)
+        self.assertEqual(responses.count(({"session_id": 2}, 200)), 4)
+        self.assertEqual(cache.hits, 3)
+
+    def test_running_request_never_expires(self):
+        """Test that a duplicate of a request slower than the ttl waits for it, and the ttl starts when it ends."""
+        clock = FakeClock()
+        cache = IdempotencyCache(ttl=10, clock=clock)
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def handler():
+            calls.append(1)
+            started.set()
+            release.wait(2)
+            return {"session_id": len(calls)}, 200
+        first = threading.Thread(target=cache.run, args=("k", handler))
+        first.start()
+        started.wait(2)
+        clock.now = 30  # the receipt wait outlasts the ttl
+        duplicate = []
+        second = threading.Thread(target=lambda: duplicate.append(cache.run("k", handler)))
+        second.start()
+        release.set()
+        first.join()
+        second.join()
+        self.assertEqual(duplicate, [({"session_id": 1}, 200)])
+        clock.now = 39
+        self.assertEqual(cache.run("k", handler), ({"session_id": 1}, 200))
+        self.assertEqual(len(calls), 1)
+
+    def test_failures_and_expired_responses_run_again(self):
+        """Test that only fresh successful responses are replayed."""
+        clock = FakeClock()
+        cache = IdempotencyCache(ttl=10, clock=clock)
+        self.assertEqual(cache.run("k", lambda: ({"error": "Payment required"}, 402)),
+                         ({"error": "Payment required"}, 402))
+        self.assertEqual(cache.run("k", lambda: ({"session_id": 1}, 200)), ({"session_id": 1}, 200))
+        self.assertEqual(cache.run("k", lambda: ({"session_id": 2}, 200)), ({"session_id": 1}, 200))
+        clock.now = 11
+        self.assertEqual(cache.run("k", lambda: ({"session_id": 3}, 200)), ({"session_id": 3}, 200))
+
+
+class CountingQuai:
+    """Chain client that issues a new session for every payment."""
+
+    game_address = "0xgame"
+
+    def __init__(self):
+        self.payments = 0
+
+    def start_game_session(self, player_address):
+        self.payments += 1
+        return {"success": True, "session_id": 1000 + self.payments, "transaction_hash": "0x1"}
+
+
+class TestAPILimits(unittest.TestCase):
+    """Test cases for the limits applied by the API handlers."""
+
+    def setUp(self):
+        self.saved = api._quai, api.rate_limiter, api.start_requests
+        api._quai = CountingQuai()
+
+    def tearDown(self):
+        api._quai, api.rate_limiter, api.start_requests = self.saved
+
+    def test_retried_start_game_pays_once(self):
+        """Test that a retried /start_game returns the first session."""
+        api.start_requests = IdempotencyCache()
+        first = api.start_game({"wallet_address": "0xabc", "idempotency_key": "r1"})
+        self.assertEqual(api.start_game({"wallet_address": "0xabc", "idempotency_key": "r1"}), first)
+        other = api.start_game({"wallet_address": "0xabc", "idempotency_key": "r2"})
+        self.assertNotEqual(other[0]["session_id"], first[0]["session_id"])
+        self.assertEqual(api._quai.payments, 2)
+
+    def test_games_without_a_key_are_not_deduplicated(self):
+        """Test that one wallet can start two games in a row without an idempotency_key."""
+        api.start_requests = IdempotencyCache()
+        first = api.start_game({"wallet_address": "0xabc"})
+        second = api.start_game({"wallet_address": "0xabc"})
+        self.assertNotEqual(second[0]["session_id"], first[0]["session_id"])
+        self.assertEqual(api._quai.payments, 2)
+        self.assertEqual(len(api.start_requests), 0)
+
+    def test_arguments_are_throttled(self):
+        """Test that hammering the API gets 429s without scoring."""
+        api.rate_limiter = RateLimiter(rate=0.001, burst=2)
+        session_id = api.start_game({"wallet_address": "0xdef"})[0]["session_id"]
+        data = {"argument": "NASA has satellite photos", "session_id": session_id, "wallet_address": "0xdef"}
+        statuses = [api.play_argument(dict(data))[1] for _ in range(3)]
+        self.assertEqual(statuses, [200, 429, 429])
+        self.assertEqual(api.sessions.get(session_id).game_state.attempts, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
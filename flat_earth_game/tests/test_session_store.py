@@ -0,0 +1,92 @@
+"""
+Unit tests for the game session store.
+"""
+
+import unittest
+from flat_earth_game.session_store import (
+    InMemorySessionBackend, RedisSessionBackend, SessionStore
+)
+
+
+class FakeClock:
+    """Manually advanced clock for expiry tests."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRedis:
+    """Minimal stand-in for a Redis client."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, name):
+        return self.data.get(name)
+
+    def set(self, name, value, ex=None):
+        self.data[name] = value.encode("utf-8")
+
+    def delete(self, name):
+        self.data.pop(name, None)
+
+
+class TestSessionStore(unittest.TestCase):
+    """Test cases for session storage."""
+
+    def test_state_survives_between_turns(self):
+        """Test that a session keeps its game between requests."""
+        store = SessionStore()
+        store.create(42)
+        game = store.get("42")
+        game.process_argument("NASA has satellite photos")
+        store.save(42, game)
+
+        result = store.get(42).process_argument("There are many satellite images")
+        self.assertEqual(result["score"], 7)
+        self.assertEqual(result["state"]["attempts"], 2)
+
+    def test_idle_sessions_expire(self):
+        """Test that idle sessions are evicted after the TTL."""
+        clock = FakeClock()
+        backend = InMemorySessionBackend(ttl=10, clock=clock)
+        store = SessionStore(backend)
+        store.create("a")
+        store.create("b")
+        clock.now = 8
+        self.assertIsNotNone(store.get("a"))
+        clock.now = 15
+        self.assertEqual(backend.evict_expired(), 1)
+        self.assertIsNotNone(store.get("a"))
+        self.assertIsNone(store.get("b"))
+
+    def test_capacity_is_bounded(self):
+        """Test that the least recently used session is evicted when full."""
+        backend = InMemorySessionBackend(max_sessions=2)
+        store = SessionStore(backend)
+        store.create("a")
+        store.create("b")
+        store.get("a")
+        store.create("c")
+        self.assertEqual(len(backend), 2)
+        self.assertIsNone(store.get("b"))
+        self.assertIsNotNone(store.get("a"))
+
+    def test_redis_backend_round_trip(self):
+        """Test that games are serialized through a Redis-compatible client."""
+        store = SessionStore(RedisSessionBackend(FakeRedis()))
+        game = store.create("s1")
+        game.process_argument("Gravity proves Earth is round")
+        store.save("s1", game)
+
+        restored = store.get("s1")
+        self.assertEqual(restored.game_state.get_status(), game.game_state.get_status())
+        store.end("s1")
+        self.assertIsNone(store.get("s1"))
+
+
+if __name__ == '__main__':
+    unittest.main()
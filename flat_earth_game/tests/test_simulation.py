@@ -0,0 +1,56 @@
+"""
+Unit tests for the headless game simulation.
+"""
+
+import unittest
+from flat_earth_game.simulation import (CountHistogram, FreshEvidence, HintFollower, RandomEvidence,
+                                        Unprepared, simulate)
+
+
+class TestCountHistogram(unittest.TestCase):
+    """Test cases for the mergeable integer histogram."""
+
+    def test_merge_and_percentiles(self):
+        """Test that merged shards give the same statistics as one histogram."""
+        first, second = CountHistogram(), CountHistogram()
+        for value in range(1, 51):
+            first.add(value)
+        for value in range(51, 101):
+            second.add(value)
+        first.merge(second)
+        self.assertEqual(first.total, 100)
+        self.assertEqual(first.mean(), 50.5)
+        self.assertEqual(first.percentile(0.5), 50)
+        self.assertEqual(first.percentile(0.99), 99)
+        self.assertEqual(first.percentile(1.0), 100)
+        self.assertIsNone(CountHistogram().percentile(0.5))
+
+
+class TestSimulate(unittest.TestCase):
+    """Test cases for simulation runs."""
+
+    def test_fresh_evidence_follows_game_rules(self):
+        """Test that five distinct kinds of evidence always win, paying 10 tokens."""
+        result = simulate([FreshEvidence()], 200, processes=1)["fresh"]
+        self.assertEqual(result.games, 200)
+        self.assertEqual(result.wins, 200)
+        self.assertEqual(result.attempts_to_win.to_dict(), {5: 200})
+        self.assertEqual(result.payouts.to_dict(), {10: 200})
+
+    def test_deterministic_across_processes(self):
+        """Test that a seed gives identical results in one process or several."""
+        strategies = [RandomEvidence(), HintFollower(), Unprepared(miss_rate=0.9)]
+        single = simulate(strategies, 300, seed=3, processes=1, shard_size=100, max_turns=20)
+        pooled = simulate(strategies, 300, seed=3, processes=2, shard_size=100, max_turns=20)
+        for name in single:
+            self.assertEqual(single[name].summary(), pooled[name].summary())
+            self.assertEqual(single[name].scores.to_dict(), pooled[name].scores.to_dict())
+        unprepared = single["unprepared"]
+        self.assertLess(unprepared.wins, unprepared.games)
+        self.assertEqual(unprepared.payouts.to_dict()[0], unprepared.games - unprepared.wins)
+        other = simulate(strategies, 300, seed=4, processes=1, shard_size=100, max_turns=20)
+        self.assertNotEqual(single["random"].summary(), other["random"].summary())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Unit tests for Solana payment verification against a fake RPC client.
+"""
+
+import asyncio
+import os
+import unittest
+
+from solders.pubkey import Pubkey
+
+from flat_earth_game import solana_integration
+from flat_earth_game.solana_integration import GameToken
+from flat_earth_game.tests.fake_solana import FakeLogsSocket, FakeSolanaClient, transfer
+
+GAME_WALLET = str(Pubkey(bytes([1] * 32)))
+TOKEN_MINT = str(Pubkey(bytes([2] * 32)))
+PLAYER = str(Pubkey(bytes([3] * 32)))
+OTHER = str(Pubkey(bytes([4] * 32)))
+
+
+class TestVerifyPayment(unittest.TestCase):
+    """Test cases for scanning a player's history for the entry fee."""
+
+    def setUp(self):
+        self.environ = {name: os.environ.get(name) for name in ("GAME_WALLET", "TOKEN_MINT")}
+        os.environ["GAME_WALLET"] = GAME_WALLET
+        os.environ["TOKEN_MINT"] = TOKEN_MINT
+        self.client = FakeSolanaClient()
+        self.socket = FakeLogsSocket()
+        self.connect = solana_integration.connect
+        solana_integration.connect = self.socket.connect
+
+    def tearDown(self):
+        solana_integration.connect = self.connect
+        for name, value in self.environ.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    def token(self, **kwargs):
+        token = GameToken(**kwargs)
+        token.client = self.client
+        return token
+
+    def history(self, count, prefix="sig"):
+        for n in range(count):
+            self.client.add(PLAYER, f"{prefix}{n}")
+
+    def pay(self, signature):
+        self.client.add(PLAYER, signature, transfer(PLAYER, Pubkey.from_string(GAME_WALLET), 0.1))
+
+    def test_close_closes_every_session(self):
+        """Test that closing releases both the pooled session and the one it replaced."""
+        token = GameToken()
+        sessions = [token._default_session, token.client._provider.session]
+        self.assertIsNot(sessions[0], sessions[1])
+        asyncio.run(token.close())
+        self.assertTrue(all(session.is_closed for session in sessions))
+
+    def test_finds_payment_and_stops_fetching(self):
+        """Test that a payment is found and the remaining fetches are cancelled."""
+        self.history(30)
+        self.pay("paid")
+        token = self.token(max_concurrency=2, page_size=50)
+        self.assertTrue(asyncio.run(token.verify_payment(PLAYER)))
+        self.assertEqual(self.client.calls["get_signatures_for_address"], 1)
+        self.assertLess(self.client.calls["get_transaction"], 5)
+
+    def test_cursor_skips_scanned_history(self):
+        """Test that a second check only fetches signatures newer than the first scan."""
+        self.history(12)
+        token = self.token(page_size=5)
+        self.assertFalse(asyncio.run(token.verify_payment(PLAYER)))
+        self.assertEqual(self.client.calls["get_transaction"], 12)
+        self.client.add(PLAYER, "new")
+        self.assertFalse(asyncio.run(token.verify_payment(PLAYER)))
+        self.assertEqual(self.client.calls["get_transaction"], 13)
+        self.pay("paid")
+        self.assertTrue(asyncio.run(token.verify_payment(PLAYER)))
+        self.assertEqual(self.client.calls["get_transaction"], 14)
+
+    def test_page_limit_leaves_cursor_alone(self):
+        """Test that a scan cut short by max_pages does not mark the unread history as scanned."""
+        self.pay("paid")
+        self.history(20)
+        token = self.token(page_size=5, max_pages=2)
+        self.assertFalse(asyncio.run(token.verify_payment(PLAYER)))
+        self.assertEqual(self.client.calls["get_signatures_for_address"], 2)
+        self.assertEqual(self.client.calls["get_transaction"], 10)
+        self.assertNotIn(PLAYER, token._scanned_until)
+        token.max_pages = 10
+        self.assertTrue(asyncio.run(token.verify_payment(PLAYER)))
+
+    def test_unfetched_transaction_is_rechecked(self):
+        """Test that a payment the node has not returned yet is found by a later check."""
+        self.history(3, "old")
+        self.pay("paid")
+        self.history(3, "new")
+        payment = self.client.transactions.pop("paid")
+        token = self.token(page_size=100)
+        self.assertFalse(asyncio.run(token.verify_payment(PLAYER)))
+        self.assertEqual(token._scanned_until[PLAYER], "old2")
+        self.client.transactions["paid"] = payment
+        self.assertTrue(asyncio.run(token.verify_payment(PLAYER)))
+
+    def test_follower_answers_from_index(self):
+        """Test that payments seen on the subscription are verified without scanning any history."""
+        self.history(20)
+        self.pay("paid")
+        self.client.add(OTHER, "other")
+        token = self.token()
+
+        async def follow_and_verify():
+            follower = asyncio.ensure_future(token.follow_payments())
+            while not self.socket.subscriptions:
+                await asyncio.sleep(0)
+            self.socket.notify("paid", "other")
+            while self.client.calls["get_transaction"] < 2:
+                await asyncio.sleep(0.001)
+            try:
+                return [await token.verify_payment(PLAYER), await token.verify_payment(OTHER)]
+            finally:
+                follower.cancel()
+
+        self.assertEqual(asyncio.run(follow_and_verify()), [True, False])
+        self.assertEqual(self.client.calls["get_signatures_for_address"], 0)
+        self.assertEqual(self.client.calls["get_transaction"], 2)
+        self.assertEqual(token.payment_index.fallbacks, 0)
+
+        # A stale index no longer rules payments out
+        token.payment_index.synced_at -= 60
+        self.assertTrue(asyncio.run(token.verify_payment(PLAYER)))
+        self.assertFalse(asyncio.run(token.verify_payment(OTHER)))
+        self.assertEqual(self.client.calls["get_signatures_for_address"], 1)
+        self.assertEqual(token.payment_index.fallbacks, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Unit tests for the transcript export.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from flat_earth_game.game import FlatEarthDebateGame
+from flat_earth_game.game_state import GameStatus
+from flat_earth_game.transcripts import TranscriptWriter, read_turns, summarize, transcript_files
+
+ARGUMENTS = [
+    "Just look outside",
+    "NASA has satellite photos",
+    "Ships disappear over the horizon",
+    "Satellite images again",
+    "Gravity pulls everything toward the center",
+    "There are different time zones",
+    "Magellan circumnavigated the globe"
+]
+
+
+class TestTranscripts(unittest.TestCase):
+    """Test cases for writing and reading transcripts."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def play(self, writer, session_id):
+        game = FlatEarthDebateGame(seed=session_id)
+        results = []
+        for argument in ARGUMENTS:
+            result = game.process_argument(argument)
+            writer.record(session_id, result)
+            results.append(result)
+            if result["state"]["convinced"]:
+                break
+        return results
+
+    def test_turns_read_back_as_played(self):
+        """Test that every recorded field survives the round trip, across chunks and files."""
+        writer = TranscriptWriter(self.directory, chunk_rows=4, max_chunks=64, rotate_rows=8)
+        results = [result for session_id in range(5) for result in self.play(writer, session_id)]
+        writer.close()
+
+        self.assertGreater(len(transcript_files(self.directory)), 1)
+        turns = list(read_turns(transcript_files(self.directory)))
+        self.assertEqual(len(turns), len(results))
+        self.assertEqual(writer.rows_written, len(results))
+        for turn, result in zip(turns, results):
+            state = result["state"]
+            self.assertEqual(turn["category"], result.get("category"))
+            self.assertEqual(turn["score"], result.get("score", 0))
+            self.assertEqual(turn["repeated"], result.get("repeat_message") is not None)
+            self.assertEqual(turn["attempt"], state["attempts"])
+            self.assertEqual(turn["credibility_score"], state["credibility_score"])
+            self.assertEqual(turn["skepticism"], state["skepticism"])
+            self.assertEqual(turn["convinced"], state["convinced"])
+
+    def test_unstorable_row_is_rejected_whole(self):
+        """Test that a turn whose used mask overflows its column leaves every column untouched."""
+        with self.assertRaises(ValueError):
+            TranscriptWriter(self.directory, categories=tuple(f"c{n}" for n in range(65)))
+        writer = TranscriptWriter(self.directory, chunk_rows=4)
+        state = GameStatus(10, 1, 95.0, False, 1 << 70, writer.categories)
+        writer.record(1, {"success": True, "category": writer.categories[0], "score": 10, "state": state})
+        self.assertEqual(writer.rows_rejected, 1)
+        self.assertEqual({len(column) for column in writer._buffers.columns}, {0})
+        results = self.play(writer, 2)
+        writer.close()
+        turns = list(read_turns(transcript_files(self.directory)))
+        self.assertEqual([turn["score"] for turn in turns], [result.get("score", 0) for result in results])
+
+    def test_summary(self):
+        """Test the aggregate figures over a few complete games."""
+        writer = TranscriptWriter(self.directory, chunk_rows=3, max_chunks=64)
+        for session_id in range(4):
+            self.play(writer, session_id)
+        writer.close()
+
+        summary = summarize(transcript_files(self.directory))
+        self.assertEqual(summary["games"], 4)
+        self.assertEqual(summary["wins"], 4)
+        self.assertEqual(summary["win_rate"], 1.0)
+        self.assertEqual(summary["unmatched_turns"], 4)
+        self.assertEqual(summary["attempts_to_win"], {6: 4})
+        self.assertEqual(summary["categories"]["satellite"]["turns"], 8)
+        self.assertEqual(summary["categories"]["satellite"]["repeat_rate"], 0.5)
+        self.assertEqual(sorted(summary["skepticism_by_attempt"]), [1, 2, 3, 4, 5, 6])
+
+    def test_torn_chunk_is_ignored(self):
+        """Test that a partly written last chunk ends the file instead of failing."""
+        writer = TranscriptWriter(self.directory, chunk_rows=2)
+        self.play(writer, 1)
+        writer.close()
+        path, = transcript_files(self.directory)
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) - 3)
+        turns = list(read_turns([path]))
+        self.assertEqual(len(turns), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,450 @@
+"""
+Streaming export of played turns for analytics.
+
+``TranscriptWriter`` records each ``process_argument`` result with a
+snapshot of its ``GameState`` as one row. Rows are gathered column by
+column in typed arrays, and every ``chunk_rows`` rows are handed to a
+background thread that compresses and appends them to the current file, so
+requests only pay for a few array appends. At most ``max_chunks`` chunks
+wait for the writer; when it falls that far behind, further chunks are
+dropped and counted rather than held in memory or making requests wait.
+
+Files are columnar and chunked. By default each chunk holds every column
+as a packed array, zlib-compressed with a CRC. With ``format="arrow"``
+(which needs pyarrow) they are Arrow IPC streams with one record batch per
+chunk, which pandas, DuckDB and Spark read directly. ``read_chunks`` reads
+either kind back one chunk at a time, so ``summarize`` aggregates any number
+of turns in constant memory::
+
+    python -m flat_earth_game.transcripts transcripts/
+
+Each writer creates files named after its start time and process id, so
+several workers can export to the same directory.
+"""
+
+import argparse
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+
+from .knowledge_base import default_knowledge_base
+from .simulation import CountHistogram
+
+MAGIC = b"FETX\x00\x01\r\n"
+SUFFIXES = (".fetx", ".arrow")
+
+# Column name and array type code; "s" marks a UTF-8 string column
+COLUMNS = (
+    ("time", "d"),          # wall-clock time of the turn
+    ("session", "s"),       # session id
+    ("attempt", "i"),       # scored turns so far in the game, this one included
+    ("category", "b"),      # evidence category id, -1 if nothing matched
+    ("score", "i"),         # points the turn awarded
+    ("repeated", "b"),      # 1 if the category had been used before
+    ("credibility_score", "q"),
+    ("skepticism", "d"),
+    ("used_mask", "Q"),     # bit per evidence category used so far
+    ("convinced", "b"),     # 1 if the turn won the game
+)
+COLUMN_NAMES = tuple(name for name, _ in COLUMNS)
+
+_METADATA = struct.Struct("<I")      # length of the JSON metadata after it
+_CHUNK = struct.Struct("<III")       # rows, compressed length, CRC-32 of the compressed bytes
+_LENGTH = struct.Struct("<I")        # byte length of one column within a chunk
+
+
+class _Buffers:
+    """One chunk of rows, held as a typed array per column."""
+
+    __slots__ = ("columns", "rows")
+
+    def __init__(self):
+        self.columns = [array(code) if code != "s" else [] for _, code in COLUMNS]
+        self.rows = 0
+
+
+class TranscriptWriter:
+    """
+    Records played turns to columnar files in the background.
+    """
+
+    def __init__(self, directory, chunk_rows=8192, max_chunks=8, rotate_rows=10000000,
+                 format="columnar", categories=None, clock=time.time):
+        """
+        Args:
+            directory (str): Directory the transcript files are written to
+            chunk_rows (int): Rows gathered before a chunk is handed to the writer
+            max_chunks (int): Chunks that may wait for the writer before new
+                ones are dropped
+            rotate_rows (int): Rows per file before a new file is started
+            format (str): "columnar" for the built-in format, or "arrow" for
+                Arrow IPC streams (needs pyarrow)
+            categories (tuple): Category names in id order; those of the
+                default knowledge base when omitted. Turns in any other
+                category are recorded as unmatched
+            clock (callable): Returns the wall-clock time in seconds
+
+        Raises:
+            ValueError: If the format is unknown, or there are more than 64
+                categories, which the used_mask column cannot hold
+        """
+        if format not in ("columnar", "arrow"):
+            raise ValueError(f"Unknown transcript format: {format}")
+        if format == "arrow":
+            import pyarrow  # noqa: F401 -- fail now rather than on the writer thread
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        self.rotate_rows = rotate_rows
+        self.format = format
+        self.categories = tuple(categories if categories is not None else default_knowledge_base().categories)
+        if len(self.categories) > 64:
+            raise ValueError("Transcripts support at most 64 categories")
+        self.clock = clock
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.rows_rejected = 0
+        self.files = 0
+        os.makedirs(directory, exist_ok=True)
+
+        self._category_ids = {category: i for i, category in enumerate(self.categories)}
+        self._lock = threading.Lock()
+        self._buffers = _Buffers()
+        self._queue = queue.Queue(max_chunks)
+        self._file = None
+        self._file_rows = 0
+        self._closed = False
+        self._writer = threading.Thread(target=self._run, name="transcript-writer", daemon=True)
+        self._writer.start()
+
+    def record(self, session_id, result):
+        """
+        Add one turn.
+
+        A turn with a value its column cannot hold is counted in
+        ``rows_rejected`` and left out, rather than failing the request.
+
+        Args:
+            session_id: Session id the turn was played in
+            result (dict): The turn's ``process_argument`` response, with
+                its ``GameStatus`` snapshot
+        """
+        state = result["state"]
+        category = result.get("category")
+        with self._lock:
+            if self._closed:
+                raise ValueError("Transcript writer is closed")
+            buffers = self._buffers
+            row = (self.clock(), str(session_id), state.attempts, self._category_ids.get(category, -1),
+                   result.get("score", 0), result.get("repeat_message") is not None,
+                   state.credibility_score, state.skepticism, state.used_mask, state.convinced)
+            columns = buffers.columns
+            for appended, (column, value) in enumerate(zip(columns, row)):
+                try:
+                    column.append(value)
+                except (OverflowError, TypeError) as e:
+                    # Undo the partial row so every column keeps the same length
+                    for undone in columns[:appended]:
+                        undone.pop()
+                    self.rows_rejected += 1
+                    print(f"Error recording transcript row: {COLUMN_NAMES[appended]}: {e}")
+                    return
+            buffers.rows += 1
+            if buffers.rows >= self.chunk_rows:
+                self._hand_off()
+
+    def flush(self):
+        """Write every row recorded so far."""
+        with self._lock:
+            if self._buffers.rows:
+                self._hand_off(block=True)
+        self._queue.join()
+
+    def close(self):
+        """Write outstanding rows and stop the writer."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self._buffers.rows:
+                self._hand_off(block=True)
+        self._queue.put(None)
+        self._writer.join()
+
+    def _hand_off(self, block=False):
+        """Queue the current chunk for the writer; call holding the lock."""
+        buffers, self._buffers = self._buffers, _Buffers()
+        try:
+            self._queue.put(buffers, block=block)
+        except queue.Full:
+            self.rows_dropped += buffers.rows
+
+    def _run(self):
+        while True:
+            buffers = self._queue.get()
+            try:
+                if buffers is None:
+                    if self._file is not None:
+                        self._file.close()
+                    return
+                try:
+                    self._write(buffers)
+                except OSError as e:
+                    print(f"Error writing transcript: {e}")
+                    self.rows_dropped += buffers.rows
+            finally:
+                self._queue.task_done()
+
+    def _write(self, buffers):
+        if self._file is not None and self._file_rows >= self.rotate_rows:
+            self._file.close()
+            self._file = None
+        if self._file is None:
+            name = f"{time.time_ns():020d}-{os.getpid()}{'.arrow' if self.format == 'arrow' else '.fetx'}"
+            self._file = (_ArrowFile if self.format == "arrow" else _ColumnarFile)(
+                os.path.join(self.directory, name), self.categories)
+            self._file_rows = 0
+            self.files += 1
+        self._file.write(buffers)
+        self._file_rows += buffers.rows
+        self.rows_written += buffers.rows
+
+
+class _ColumnarFile:
+    """Transcript file in the built-in chunked columnar format."""
+
+    def __init__(self, path, categories):
+        self._file = open(path, "ab")
+        metadata = json.dumps({"columns": COLUMNS, "categories": categories}).encode("utf-8")
+        self._file.write(MAGIC + _METADATA.pack(len(metadata)) + metadata)
+        self._file.flush()
+
+    def write(self, buffers):
+        parts = []
+        for (_, code), column in zip(COLUMNS, buffers.columns):
+            if code == "s":
+                encoded = [value.encode("utf-8") for value in column]
+                offsets = array("I", [0])
+                for value in encoded:
+                    offsets.append(offsets[-1] + len(value))
+                data = offsets.tobytes() + b"".join(encoded)
+            else:
+                data = column.tobytes()
+            parts.append(_LENGTH.pack(len(data)))
+            parts.append(data)
+        compressed = zlib.compress(b"".join(parts), 1)
+        self._file.write(_CHUNK.pack(buffers.rows, len(compressed), zlib.crc32(compressed)) + compressed)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class _ArrowFile:
+    """Transcript file as an Arrow IPC stream."""
+
+    def __init__(self, path, categories):
+        import pyarrow as pa
+        types = {"d": pa.float64(), "s": pa.string(), "i": pa.int32(), "b": pa.int8(),
+                 "q": pa.int64(), "Q": pa.uint64()}
+        self._pa = pa
+        self._schema = pa.schema([(name, types[code]) for name, code in COLUMNS],
+                                 metadata={"categories": json.dumps(categories)})
+        self._sink = pa.OSFile(path, "wb")
+        self._stream = pa.ipc.new_stream(self._sink, self._schema)
+
+    def write(self, buffers):
+        arrays = [self._pa.array(column, type=field.type) for column, field in zip(buffers.columns, self._schema)]
+        self._stream.write_batch(self._pa.record_batch(arrays, schema=self._schema))
+
+    def close(self):
+        self._stream.close()
+        self._sink.close()
+
+
+def transcript_files(directory):
+    """
+    List the transcript files in a directory, oldest first.
+
+    Args:
+        directory (str): Directory a TranscriptWriter wrote to
+
+    Returns:
+        list: File paths
+    """
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+            if name.endswith(SUFFIXES)]
+
+
+def read_chunks(path):
+    """
+    Read a transcript file one chunk at a time.
+
+    A chunk that was only partly written, such as the last one of a file
+    whose writer was killed, ends the file.
+
+    Args:
+        path (str): Transcript file
+
+    Yields:
+        tuple: (categories, columns), where columns maps each name in
+            ``COLUMN_NAMES`` to a sequence of that chunk's values
+    """
+    if path.endswith(".arrow"):
+        yield from _read_arrow_chunks(path)
+        return
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a transcript file")
+        metadata = json.loads(f.read(_METADATA.unpack(f.read(_METADATA.size))[0]))
+        categories = tuple(metadata["categories"])
+        columns = metadata["columns"]
+        while True:
+            header = f.read(_CHUNK.size)
+            if len(header) < _CHUNK.size:
+                return
+            rows, length, crc = _CHUNK.unpack(header)
+            compressed = f.read(length)
+            if len(compressed) < length or zlib.crc32(compressed) != crc:
+                return
+            data = memoryview(zlib.decompress(compressed))
+            chunk = {}
+            offset = 0
+            for name, code in columns:
+                size, = _LENGTH.unpack_from(data, offset)
+                offset += _LENGTH.size
+                column = data[offset:offset + size]
+                offset += size
+                if code == "s":
+                    offsets = column[:4 * (rows + 1)].cast("I")
+                    strings = column[4 * (rows + 1):]
+                    chunk[name] = [str(strings[offsets[i]:offsets[i + 1]], "utf-8") for i in range(rows)]
+                else:
+                    chunk[name] = column.cast(code)
+            yield categories, chunk
+
+
+def _read_arrow_chunks(path):
+    import pyarrow as pa
+    with pa.OSFile(path, "rb") as source:
+        reader = pa.ipc.open_stream(source)
+        categories = tuple(json.loads(reader.schema.metadata[b"categories"]))
+        for batch in reader:
+            yield categories, {name: batch.column(i).to_pylist() for i, name in enumerate(batch.schema.names)}
+
+
+def read_turns(paths):
+    """
+    Read turns from transcript files, one row at a time.
+
+    Args:
+        paths (iterable): Transcript files, in the order to read them
+
+    Yields:
+        dict: One turn, keyed by ``COLUMN_NAMES``, with "category" given as
+            the category name or None
+    """
+    for path in paths:
+        for categories, chunk in read_chunks(path):
+            for row in zip(*(chunk[name] for name in COLUMN_NAMES)):
+                turn = dict(zip(COLUMN_NAMES, row))
+                turn["category"] = categories[turn["category"]] if turn["category"] >= 0 else None
+                turn["repeated"] = bool(turn["repeated"])
+                turn["convinced"] = bool(turn["convinced"])
+                yield turn
+
+
+def summarize(paths):
+    """
+    Aggregate transcript files without holding more than one chunk.
+
+    Games are counted from their first scored turn, so a game in which no
+    argument ever matched is not counted.
+
+    Args:
+        paths (iterable): Transcript files
+
+    Returns:
+        dict: Turn and game counts, win rate, attempts-to-win histogram,
+            per-category usage and mean skepticism by attempt number
+    """
+    categories = None
+    usage = {}
+    turns = unmatched = games = wins = 0
+    attempts_to_win = CountHistogram()
+    skepticism_sum = array("d")
+    skepticism_count = array("q")
+    for path in paths:
+        for chunk_categories, chunk in read_chunks(path):
+            categories = chunk_categories
+            turns += len(chunk["category"])
+            for category_id, attempt, score, repeated, skepticism, convinced in zip(
+                    chunk["category"], chunk["attempt"], chunk["score"], chunk["repeated"],
+                    chunk["skepticism"], chunk["convinced"]):
+                if category_id < 0:
+                    unmatched += 1
+                    continue
+                entry = usage.get(category_id)
+                if entry is None:
+                    entry = usage[category_id] = [0, 0, 0, 0]  # turns, points, repeats, winning turns
+                entry[0] += 1
+                entry[1] += score
+                entry[2] += repeated
+                if attempt == 1:
+                    games += 1
+                if convinced:
+                    wins += 1
+                    entry[3] += 1
+                    attempts_to_win.add(attempt)
+                if attempt >= len(skepticism_sum):
+                    skepticism_sum.extend([0.0] * (attempt + 1 - len(skepticism_sum)))
+                    skepticism_count.extend([0] * (attempt + 1 - len(skepticism_count)))
+                skepticism_sum[attempt] += skepticism
+                skepticism_count[attempt] += 1
+    return {
+        "turns": turns,
+        "unmatched_turns": unmatched,
+        "games": games,
+        "wins": wins,
+        "win_rate": wins / games if games else None,
+        "attempts_to_win": attempts_to_win.to_dict(),
+        "categories": {
+            categories[category_id]: {
+                "turns": entry[0],
+                "mean_score": entry[1] / entry[0],
+                "repeat_rate": entry[2] / entry[0],
+                "winning_turns": entry[3]
+            }
+            for category_id, entry in sorted(usage.items())
+        },
+        "skepticism_by_attempt": {
+            attempt: skepticism_sum[attempt] / skepticism_count[attempt]
+            for attempt in range(len(skepticism_count)) if skepticism_count[attempt]
+        }
+    }
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(prog="python -m flat_earth_game.transcripts",
+                                     description="Summarize exported game transcripts.")
+    parser.add_argument("paths", nargs="+", help="transcript files or directories")
+    args = parser.parse_args(argv)
+
+    paths = []
+    for path in args.paths:
+        paths.extend(transcript_files(path) if os.path.isdir(path) else [path])
+    began = time.perf_counter()
+    summary = summarize(paths)
+    json.dump(summary, sys.stdout, indent=2)
+    print(f"\n{summary['turns']:,} turns in {time.perf_counter() - began:.1f} s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
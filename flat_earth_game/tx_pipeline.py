@@ -0,0 +1,237 @@
+"""
+Non-blocking transaction submission with batched receipt polling.
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PendingTransaction:
+    """
+    Handle for a submitted transaction that resolves once it is mined.
+
+    ``status`` moves from "submitting" to "pending" once the node accepted the
+    transaction, then to "confirmed" or "failed".
+    """
+
+    def __init__(self, label=None):
+        """
+        Args:
+            label (str): Short description of what the transaction does
+        """
+        self.id = uuid.uuid4().hex
+        self.label = label
+        self.status = "submitting"
+        self.tx_hash = None
+        self.receipt = None
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.completed_at = None
+        self._done = threading.Event()
+
+    def done(self):
+        """
+        Check whether the transaction has been confirmed or has failed.
+
+        Returns:
+            bool: True once the handle is resolved
+        """
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Block until the handle is resolved.
+
+        Args:
+            timeout (float): Maximum seconds to wait
+
+        Returns:
+            bool: True if the handle resolved in time
+        """
+        return self._done.wait(timeout)
+
+    def to_dict(self):
+        """
+        Get the handle's current state for API responses.
+
+        Returns:
+            dict: Transaction status information
+        """
+        return {
+            "transaction_id": self.id,
+            "label": self.label,
+            "status": self.status,
+            "transaction_hash": self.tx_hash,
+            "result": self.result,
+            "error": self.error
+        }
+
+    def _resolve(self, status, result=None, error=None):
+        self.status = status
+        self.result = result
+        self.error = error
+        self.completed_at = time.time()
+        self._done.set()
+
+
+class TransactionPipeline:
+    """
+    Submits transactions without waiting for them to be mined.
+
+    ``submit`` returns a ``PendingTransaction`` straight away. Sending happens
+    on a bounded thread pool driven by an asyncio loop running in a background
+    thread, and a single poller looks up the receipts of every pending
+    transaction with batched ``eth_getTransactionReceipt`` calls.
+    """
+
+    def __init__(self, rpc_batch, poll_interval=1.0, max_batch=100, max_workers=8, retention=3600):
+        """
+        Args:
+            rpc_batch (callable): Sends a list of (method, params) calls as one
+                batch, such as ``RPCTransport.batch``
+            poll_interval (float): Seconds between receipt polls
+            max_batch (int): Maximum receipts requested per batch call
+            max_workers (int): Threads used to send transactions and run
+                receipt callbacks
+            retention (float): Seconds resolved handles stay queryable
+        """
+        self.rpc_batch = rpc_batch
+        self.poll_interval = poll_interval
+        self.max_batch = max_batch
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="tx-pipeline")
+        self._handles = {}
+        self._waiting = {}
+        self._replaced = {}  # handle id -> every hash sent for it, once replaced
+        self._lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._poller = self._loop.create_task(self._poll_forever())
+        self._thread = threading.Thread(target=self._run, name="tx-pipeline", daemon=True)
+        self._thread.start()
+
+    def submit(self, send, on_receipt=None, label=None):
+        """
+        Send a transaction in the background.
+
+        Args:
+            send (callable): Sends the transaction and returns its hash
+            on_receipt (callable): Called with the receipt once mined; its
+                return value becomes the handle's ``result``
+            label (str): Short description of what the transaction does
+
+        Returns:
+            PendingTransaction: Handle that resolves when the transaction is mined
+        """
+        handle = PendingTransaction(label)
+        with self._lock:
+            self._handles[handle.id] = handle
+        asyncio.run_coroutine_threadsafe(self._send(handle, send, on_receipt), self._loop)
+        return handle
+
+    def replace(self, old_hash, new_hash):
+        """
+        Also wait for a replacement of a pending transaction.
+
+        Whichever of the two is mined resolves the handle.
+
+        Args:
+            old_hash (str): Hash the handle is waiting for
+            new_hash (str): Hash of the transaction sent in its place
+        """
+        self._loop.call_soon_threadsafe(self._replace, old_hash, new_hash)
+
+    def _replace(self, old_hash, new_hash):
+        entry = self._waiting.get(old_hash)
+        if entry is None:
+            return
+        handle = entry[0]
+        self._replaced.setdefault(handle.id, [old_hash]).append(new_hash)
+        self._waiting[new_hash] = entry
+        handle.tx_hash = new_hash
+
+    def get(self, handle_id):
+        """
+        Look up a handle by id.
+
+        Args:
+            handle_id (str): Id of the handle
+
+        Returns:
+            PendingTransaction: The handle, or None if unknown or expired
+        """
+        with self._lock:
+            return self._handles.get(handle_id)
+
+    def close(self):
+        """Stop polling and release the worker threads."""
+        self._loop.call_soon_threadsafe(self._poller.cancel)
+        self._thread.join()
+        self._executor.shutdown(wait=False)
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(asyncio.gather(self._poller, return_exceptions=True))
+        self._loop.close()
+
+    async def _send(self, handle, send, on_receipt):
+        try:
+            tx_hash = await self._loop.run_in_executor(self._executor, send)
+        except Exception as e:
+            handle._resolve("failed", error=str(e))
+            return
+        if not isinstance(tx_hash, str):
+            tx_hash = "0x" + bytes(tx_hash).hex()
+        handle.tx_hash = tx_hash
+        handle.status = "pending"
+        self._waiting[tx_hash] = (handle, on_receipt)
+
+    async def _poll_forever(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self._poll()
+            except Exception as e:
+                print(f"Error polling transaction receipts: {e}")
+            self._prune()
+
+    async def _poll(self):
+        hashes = list(self._waiting)
+        for start in range(0, len(hashes), self.max_batch):
+            chunk = hashes[start:start + self.max_batch]
+            receipts = await self._loop.run_in_executor(
+                self._executor,
+                self.rpc_batch,
+                [("eth_getTransactionReceipt", [tx_hash]) for tx_hash in chunk]
+            )
+            for tx_hash, receipt in zip(chunk, receipts):
+                if isinstance(receipt, dict) and tx_hash in self._waiting:
+                    handle, on_receipt = self._waiting.pop(tx_hash)
+                    for other in self._replaced.pop(handle.id, ()):
+                        self._waiting.pop(other, None)
+                    handle.tx_hash = tx_hash
+                    self._loop.create_task(self._complete(handle, receipt, on_receipt))
+
+    async def _complete(self, handle, receipt, on_receipt):
+        handle.receipt = receipt
+        if receipt.get("status") in ("0x0", 0):
+            handle._resolve("failed", error="Transaction reverted")
+            return
+        try:
+            result = None
+            if on_receipt is not None:
+                result = await self._loop.run_in_executor(self._executor, on_receipt, receipt)
+            handle._resolve("confirmed", result=result)
+        except Exception as e:
+            handle._resolve("failed", error=str(e))
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        with self._lock:
+            expired = [handle_id for handle_id, handle in self._handles.items()
+                       if handle.completed_at is not None and handle.completed_at < cutoff]
+            for handle_id in expired:
+                del self._handles[handle_id]
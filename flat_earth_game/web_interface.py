@@ -1,86 +1,124 @@
 """
 Web interface for the Flat Earth Debate Game with Quai Network integration.
+
+The blockchain clients are built on first use rather than at import time,
+so importing this module, or building an app with ``create_app``, does not
+load web3, read the contract ABIs or touch the network. The route logic
+lives in ``api`` and is shared with the ASGI app in ``asgi_interface``.
 """
-from flask import Flask, request, jsonify
+import time
+from flask import Blueprint, Flask, Response, g, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from .game import FlatEarthDebateGame
-from .quai_integration import QuaiGameContract
+from . import api, metrics
+from .api import get_quai, get_reward_queue, sessions
+
+
+class GameJSONProvider(DefaultJSONProvider):
+    """JSON provider that renders lazy game status snapshots."""
+
+    @staticmethod
+    def default(o):
+        try:
+            return api.json_default(o)
+        except TypeError:
+            return DefaultJSONProvider.default(o)
+
+
+bp = Blueprint('game', __name__)
+
+
+def create_app():
+    """
+    Build the Flask application
+
+    Returns:
+        Flask: App serving the game routes
+    """
+    app = Flask(__name__)
+    app.json = GameJSONProvider(app)
+    # Werkzeug stops reading and raises a 413 past this size
+    app.config['MAX_CONTENT_LENGTH'] = api.max_request_bytes
+    CORS(app)  # Enable CORS for Pegasus wallet integration
+    app.register_blueprint(bp)
+
+    @app.errorhandler(413)
+    def request_too_large(error):
+        return jsonify({'error': 'Request body too large'}), 413
+
+    @app.before_request
+    def start_timer():
+        g.began = time.perf_counter()
+
+    @app.after_request
+    def record_latency(response):
+        if request.endpoint is not None and 'began' in g:
+            metrics.observe('endpoint.' + request.endpoint.rsplit('.', 1)[-1],
+                            time.perf_counter() - g.began)
+        return response
 
-app = Flask(__name__)
-CORS(app)  # Enable CORS for Pegasus wallet integration
-quai = QuaiGameContract()
+    return app
 
-@app.route('/start_game', methods=['POST'])
+def respond(response):
+    """Turn a (payload, status) pair from the api module into a Flask response"""
+    payload, status = response
+    if isinstance(payload, str):
+        return Response(payload, status, mimetype='text/plain; version=0.0.4')
+    with metrics.span('api.encode'):
+        return jsonify(payload), status
+
+@bp.route('/start_game', methods=['POST'])
 def start_game():
     """Start a new game session after payment verification"""
-    data = request.json
-    wallet_address = data.get('wallet_address')
-    
-    if not wallet_address:
-        return jsonify({'error': 'Wallet address required'}), 400
-        
-    # Verify payment and start game session
-    result = quai.start_game_session(wallet_address)
-    if not result['success']:
-        return jsonify({
-            'error': 'Payment required',
-            'required_amount': 0.1,
-            'contract_address': quai.game_address,
-            'details': result.get('error', 'Payment failed')
-        }), 402
-        
-    # Create new game session
-    game = FlatEarthDebateGame()
-    
-    return jsonify({
-        'session_id': result['session_id'],
-        'transaction_hash': result['transaction_hash'],
-        'message': 'Game started! Payment verified.'
-    })
-
-@app.route('/submit_argument', methods=['POST'])
+    return respond(api.start_game(request.json))
+
+@bp.route('/submit_argument', methods=['POST'])
 def submit_argument():
     """Handle player arguments and return game response"""
-    data = request.json
-    argument = data.get('argument')
-    session_id = data.get('session_id')
-    wallet_address = data.get('wallet_address')
-    
-    if not all([argument, session_id, wallet_address]):
-        return jsonify({'error': 'Missing required data'}), 400
-        
-    game = FlatEarthDebateGame()  # In production, this would be stored in a session
-    result = game.process_argument(argument)
-    
-    # If game is won, send token reward
-    if result.get('state', {}).get('convinced', False):
-        reward_result = quai.reward_winner(
-            wallet_address,
-            result['state']['credibility_score']
-        )
-        result['reward'] = reward_result
-        
-    return jsonify(result)
-
-@app.route('/game_status', methods=['GET'])
+    return respond(api.submit_argument(request.json))
+
+@bp.route('/transaction/<transaction_id>', methods=['GET'])
+def transaction_status(transaction_id):
+    """Get the status of a transaction submitted in async mode"""
+    return respond(api.transaction_status(transaction_id))
+
+@bp.route('/rpc_metrics', methods=['GET'])
+def rpc_metrics():
+    """Get RPC transport load: in-flight requests, retries and pool saturation"""
+    return respond(api.rpc_metrics())
+
+@bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Get span histograms and RPC load in the Prometheus text format"""
+    return respond(api.metrics_text())
+
+@bp.route('/profile', methods=['GET'])
+def profile():
+    """Get sampled stacks from the opt-in profiler"""
+    return respond(api.profile_text())
+
+@bp.route('/leaderboard', methods=['GET'])
+def leaderboard():
+    """Get the top players on a leaderboard"""
+    return respond(api.leaderboard(request.args))
+
+@bp.route('/leaderboard/<address>', methods=['GET'])
+def player_rank(address):
+    """Get a player's leaderboard ranks"""
+    return respond(api.player_rank(address))
+
+@bp.route('/game_status', methods=['GET'])
 def game_status():
     """Get current game status and token info"""
-    return jsonify({
-        'entry_fee': 0.1,
-        'token_contract': quai.token_address,
-        'game_contract': quai.game_address,
-        'network': 'cyprus1.testnet.quai.network'
-    })
-
-@app.route('/token_balance/<address>', methods=['GET'])
+    return respond(api.game_status())
+
+@bp.route('/token_balance/<address>', methods=['GET'])
 def token_balance(address):
     """Get player's token balance"""
-    balance = quai.get_player_token_balance(address)
-    return jsonify({
-        'address': address,
-        'balance': balance,
-        'token_contract': quai.token_address
-    })
+    return respond(api.token_balance(address))
+
+# WSGI entry point; building the app is cheap since clients are lazy
+app = create_app()
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)